@@ -0,0 +1,35 @@
+"""PID incremental sync — per-cell fingerprints and edge-backed connections.
+
+Revision ID: 200_pid_incremental_sync
+Revises: 199_mto_consumption
+
+``pid_documents.sync_fingerprints`` stores the content hash of every cell as
+of the last XML → DB sync so a save only touches changed cells.
+``pid_connections.mxgraph_cell_id`` ties each synced connection to the
+draw.io edge it was built from.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "200_pid_incremental_sync"
+down_revision = "199_mto_consumption"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("pid_documents", sa.Column("sync_fingerprints", JSONB(), nullable=True))
+    op.add_column("pid_connections", sa.Column("mxgraph_cell_id", sa.String(100), nullable=True))
+    op.create_index(
+        "idx_pid_connections_document_cell",
+        "pid_connections",
+        ["pid_document_id", "mxgraph_cell_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_pid_connections_document_cell", table_name="pid_connections")
+    op.drop_column("pid_connections", "mxgraph_cell_id")
+    op.drop_column("pid_documents", "sync_fingerprints")
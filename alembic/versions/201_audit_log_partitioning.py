@@ -0,0 +1,102 @@
+"""Convert audit_log to monthly range partitions on created_at.
+
+Revision ID: 201_audit_log_partitioning
+Revises: 200_pid_incremental_sync
+
+Retention used to delete expired rows in 10k batches, which bloated the
+table and competed with autovacuum. With one partition per month the
+retention job detaches and drops whole partitions instead
+(app.core.audit.purge_audit_log_before).
+
+The partitioned table is built next to the existing one, backfilled with
+one monthly partition per month of history plus the next three months and
+a DEFAULT partition, then swapped in. PostgreSQL requires the partition
+key in the primary key, which becomes (id, created_at).
+"""
+
+from alembic import op
+
+revision = "201_audit_log_partitioning"
+down_revision = "200_pid_incremental_sync"
+branch_labels = None
+depends_on = None
+
+_COLUMNS = (
+    "id, entity_id, user_id, action, resource_type, resource_id, "
+    "details, ip_address, user_agent, created_at"
+)
+
+_INDEXES = (
+    ("idx_audit_log_entity_created", "(entity_id, created_at)"),
+    ("idx_audit_log_resource", "(resource_type, resource_id)"),
+    ("idx_audit_log_user_created", "(user_id, created_at)"),
+    ("idx_audit_log_created", "(created_at)"),
+)
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE audit_log_partitioned (
+            id UUID NOT NULL DEFAULT gen_random_uuid(),
+            entity_id UUID,
+            user_id UUID REFERENCES users(id),
+            action VARCHAR(50) NOT NULL,
+            resource_type VARCHAR(100) NOT NULL,
+            resource_id VARCHAR(36),
+            details JSONB,
+            ip_address VARCHAR(45),
+            user_agent VARCHAR(500),
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            CONSTRAINT audit_log_partitioned_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("""
+        DO $$
+        DECLARE
+            month DATE := date_trunc('month', COALESCE((SELECT MIN(created_at) FROM audit_log), NOW()))::date;
+            last_month DATE := (date_trunc('month', NOW()) + INTERVAL '3 months')::date;
+        BEGIN
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF audit_log_partitioned FOR VALUES FROM (%L) TO (%L)',
+                    'audit_log_p' || to_char(month, 'YYYYMM'),
+                    month,
+                    (month + INTERVAL '1 month')::date
+                );
+                month := (month + INTERVAL '1 month')::date;
+            END LOOP;
+        END $$
+    """)
+    op.execute("CREATE TABLE audit_log_default PARTITION OF audit_log_partitioned DEFAULT")
+    op.execute(
+        f"INSERT INTO audit_log_partitioned ({_COLUMNS}) SELECT {_COLUMNS} FROM audit_log"
+    )
+    op.execute("DROP TABLE audit_log")
+    op.execute("ALTER TABLE audit_log_partitioned RENAME TO audit_log")
+    op.execute("ALTER TABLE audit_log RENAME CONSTRAINT audit_log_partitioned_pkey TO audit_log_pkey")
+    for name, columns in _INDEXES:
+        op.execute(f"CREATE INDEX {name} ON audit_log {columns}")
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE TABLE audit_log_plain (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            entity_id UUID,
+            user_id UUID REFERENCES users(id),
+            action VARCHAR(50) NOT NULL,
+            resource_type VARCHAR(100) NOT NULL,
+            resource_id VARCHAR(36),
+            details JSONB,
+            ip_address VARCHAR(45),
+            user_agent VARCHAR(500),
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """)
+    op.execute(f"INSERT INTO audit_log_plain ({_COLUMNS}) SELECT {_COLUMNS} FROM audit_log")
+    # Dropping the parent drops every partition with it.
+    op.execute("DROP TABLE audit_log")
+    op.execute("ALTER TABLE audit_log_plain RENAME TO audit_log")
+    op.execute("ALTER TABLE audit_log RENAME CONSTRAINT audit_log_plain_pkey TO audit_log_pkey")
+    for name, columns in _INDEXES:
+        op.execute(f"CREATE INDEX {name} ON audit_log {columns}")
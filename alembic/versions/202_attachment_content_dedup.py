@@ -0,0 +1,29 @@
+"""Index attachments by content hash and storage path.
+
+Revision ID: 202_attachment_content_dedup
+Revises: 201_audit_log_partitioning
+Create Date: 2026-10-19
+
+Uploads now reuse the stored object of an identical attachment of the same
+entity (lookup on entity_id + file_hash_sha256), and deleting an
+attachment only removes the object once no live row references its
+storage_path.
+"""
+
+from alembic import op
+
+
+revision = "202_attachment_content_dedup"
+down_revision = "201_audit_log_partitioning"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("idx_attachments_content_hash", "attachments", ["entity_id", "file_hash_sha256"])
+    op.create_index("idx_attachments_storage_path", "attachments", ["storage_path"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_attachments_storage_path", table_name="attachments")
+    op.drop_index("idx_attachments_content_hash", table_name="attachments")
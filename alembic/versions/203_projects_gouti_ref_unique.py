@@ -0,0 +1,49 @@
+"""Unique (entity_id, external_ref) for Gouti-imported projects.
+
+Revision ID: 203_projects_gouti_ref_unique
+Revises: 202_attachment_content_dedup
+Create Date: 2026-10-19
+
+The Gouti sync applies projects with INSERT … ON CONFLICT (entity_id,
+external_ref), which needs a unique index to infer. It is partial
+(``external_ref LIKE 'gouti:%'``) so other external references are not
+constrained. Pre-existing duplicates keep the most recently updated row
+on the canonical ref; the others get a ``:dup:<id>`` suffix and are no
+longer matched by the sync.
+"""
+
+from alembic import op
+
+
+revision = "203_projects_gouti_ref_unique"
+down_revision = "202_attachment_content_dedup"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        UPDATE projects p
+        SET external_ref = p.external_ref || ':dup:' || p.id::text
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY entity_id, external_ref ORDER BY updated_at DESC, id
+            ) AS rn
+            FROM projects
+            WHERE external_ref LIKE 'gouti:%'
+        ) d
+        WHERE p.id = d.id AND d.rn > 1
+        """
+    )
+    op.create_index(
+        "uq_projects_entity_gouti_ref",
+        "projects",
+        ["entity_id", "external_ref"],
+        unique=True,
+        postgresql_where="external_ref LIKE 'gouti:%'",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_projects_entity_gouti_ref", table_name="projects")
@@ -0,0 +1,36 @@
+"""users.external_ref for directory user sync.
+
+Revision ID: 204_users_external_ref
+Revises: 203_projects_gouti_ref_unique
+Create Date: 2026-10-19
+
+The user sync (LDAP / Azure AD / Okta / Keycloak / SCIM / Gouti) records
+the directory identity of imported users as ``<provider>:<id>``. It is
+what lets a sync deactivate the users that left that directory, and is
+indexed with ``varchar_pattern_ops`` so the ``LIKE '<provider>:%'`` scan
+uses it.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "204_users_external_ref"
+down_revision = "203_projects_gouti_ref_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("external_ref", sa.String(255), nullable=True))
+    op.create_index(
+        "ix_users_external_ref",
+        "users",
+        ["external_ref"],
+        postgresql_ops={"external_ref": "varchar_pattern_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_external_ref", table_name="users")
+    op.drop_column("users", "external_ref")
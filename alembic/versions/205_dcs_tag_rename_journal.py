@@ -0,0 +1,45 @@
+"""dcs_tag_rename_journal — reversible journal of DCS tag bulk renames
+
+Revision ID: 205_dcs_tag_rename_journal
+Revises: 204_users_external_ref
+Create Date: 2026-10-19
+
+One row per applied bulk rename (tag_rename_engine): the old/new name of
+every renamed tag and the number of references rewritten. A revert
+replays the journal backwards and writes its own row (reverts_id).
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+revision = "205_dcs_tag_rename_journal"
+down_revision = "204_users_external_ref"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dcs_tag_rename_journal",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("entity_id", UUID(as_uuid=True), sa.ForeignKey("entities.id"), nullable=False),
+        sa.Column("project_id", UUID(as_uuid=True), sa.ForeignKey("projects.id")),
+        sa.Column("renames", JSONB(), nullable=False),
+        sa.Column("references", JSONB(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("reverts_id", UUID(as_uuid=True), sa.ForeignKey("dcs_tag_rename_journal.id")),
+        sa.Column("reverted_at", sa.DateTime(timezone=True)),
+        sa.Column("created_by", UUID(as_uuid=True), sa.ForeignKey("users.id")),
+    )
+    op.create_index(
+        "idx_dcs_tag_rename_journal_entity_project",
+        "dcs_tag_rename_journal",
+        ["entity_id", "project_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_dcs_tag_rename_journal_entity_project", table_name="dcs_tag_rename_journal")
+    op.drop_table("dcs_tag_rename_journal")
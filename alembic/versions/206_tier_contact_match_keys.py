@@ -0,0 +1,51 @@
+"""tier_contacts match keys — indexed candidate lookup for external PAX dedup
+
+Revision ID: 206_tier_contact_match_keys
+Revises: 205_dcs_tag_rename_journal
+Create Date: 2026-10-19
+
+Normalised phonetic name / email / phone / badge keys used by
+``find_external_contact_matches`` to fetch candidate contacts with one
+indexed query, plus trigram indexes serving the ILIKE contact searches.
+The keys are filled by the model on write; existing rows are backfilled
+with ``python -m scripts.rebuild_contact_match_index`` (until then they
+stay candidates of every lookup).
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "206_tier_contact_match_keys"
+down_revision = "205_dcs_tag_rename_journal"
+branch_labels = None
+depends_on = None
+
+_KEYS = (
+    ("match_name_key", 201),
+    ("match_email", 255),
+    ("match_phone", 50),
+    ("match_badge", 100),
+)
+
+
+def upgrade() -> None:
+    for column, length in _KEYS:
+        op.add_column("tier_contacts", sa.Column(column, sa.String(length), nullable=True))
+        op.create_index(f"idx_tier_contacts_{column}", "tier_contacts", ["tier_id", column])
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tier_contacts_first_name_trgm "
+        "ON tier_contacts USING gin (first_name gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tier_contacts_last_name_trgm "
+        "ON tier_contacts USING gin (last_name gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_tier_contacts_last_name_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_tier_contacts_first_name_trgm")
+    for column, _length in reversed(_KEYS):
+        op.drop_index(f"idx_tier_contacts_{column}", table_name="tier_contacts")
+        op.drop_column("tier_contacts", column)
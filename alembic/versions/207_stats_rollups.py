@@ -0,0 +1,56 @@
+"""login_event_hourly + support_ticket_counters — dashboard statistics rollups
+
+Revision ID: 207_stats_rollups
+Revises: 206_tier_contact_match_keys
+Create Date: 2026-10-19
+
+Pre-aggregated tables read by ``/messaging/login-events/stats`` and
+``/support/stats`` (``app.services.core.stats_rollup``). Ticket counters
+are backfilled here; the login-event hourly buckets are backfilled by the
+``login_event_rollup`` job on its first run.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "207_stats_rollups"
+down_revision = "206_tier_contact_match_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "login_event_hourly",
+        sa.Column("bucket_start", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("successful", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("blocked", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("suspicious", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failure_reasons", postgresql.JSONB(), nullable=False, server_default="{}"),
+        sa.Column("ip_sketch", sa.LargeBinary(), nullable=False),
+    )
+    op.create_table(
+        "support_ticket_counters",
+        sa.Column(
+            "entity_id", postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("entities.id", ondelete="CASCADE"), primary_key=True,
+        ),
+        sa.Column("status", sa.String(20), primary_key=True),
+        sa.Column("ticket_type", sa.String(20), primary_key=True),
+        sa.Column("priority", sa.String(20), primary_key=True),
+        sa.Column("archived", sa.Boolean(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        "INSERT INTO support_ticket_counters (entity_id, status, ticket_type, priority, archived, count) "
+        "SELECT entity_id, status, ticket_type, priority, archived, count(*) "
+        "FROM support_tickets GROUP BY entity_id, status, ticket_type, priority, archived"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("support_ticket_counters")
+    op.drop_table("login_event_hourly")
@@ -6,11 +6,18 @@ from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload
 
 from app.core.database import get_db
 from app.services.core.module_lifecycle_service import is_module_enabled
 from app.core.acting_context import resolve_acting_context
+from app.core.auth_context import (
+    AuthPrincipal,
+    get_principal,
+    last_lookup_hit,
+    record_saved_queries,
+    token_cache_key,
+)
 from app.core.redis_client import get_redis
 from app.core.security import JWTError, decode_token
 from app.models.common import (
@@ -26,10 +33,15 @@ bearer_scheme = HTTPBearer(auto_error=False)
 
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
     db: AsyncSession = Depends(get_db),
 ) -> User:
-    """Extract and validate the current user from JWT."""
+    """Extract and validate the current user from JWT.
+
+    The relationships are joined in the same round-trip. The token's cache
+    key is kept on ``request.state`` for ``get_request_principal``.
+    """
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,7 +72,7 @@ async def get_current_user(
 
     result = await db.execute(
         select(User)
-        .options(selectinload(User.job_position), selectinload(User.business_unit))
+        .options(joinedload(User.job_position), joinedload(User.business_unit))
         .where(User.id == UUID(user_id))
     )
     user = result.scalar_one_or_none()
@@ -71,10 +83,14 @@ async def get_current_user(
             detail="User not found or inactive",
         )
 
+    state = getattr(request, "state", None)
+    if state is not None:
+        state.auth_token_key = token_cache_key(payload, credentials.credentials)
     return user
 
 
 async def get_optional_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
     db: AsyncSession = Depends(get_db),
 ) -> User | None:
@@ -86,7 +102,56 @@ async def get_optional_current_user(
     """
     if not credentials:
         return None
-    return await get_current_user(credentials=credentials, db=db)
+    return await get_current_user(request=request, credentials=credentials, db=db)
+
+
+async def _load_entity_memberships(user_id: UUID, db: AsyncSession) -> frozenset[UUID]:
+    """Entities where the user belongs to at least one active group."""
+    result = await db.execute(
+        select(UserGroup.entity_id)
+        .join(UserGroupMember, UserGroupMember.group_id == UserGroup.id)
+        .where(
+            UserGroupMember.user_id == user_id,
+            UserGroup.active == True,  # noqa: E712
+        )
+        .distinct()
+    )
+    return frozenset(result.scalars().all())
+
+
+async def get_request_principal(
+    request: Request,
+    current_user: User,
+    db: AsyncSession,
+) -> AuthPrincipal | None:
+    """Cached principal of the authenticated request, or None when unavailable.
+
+    Resolved once per request (kept on ``request.state``); on a cache miss
+    the memberships are loaded with one query and shared with later
+    requests carrying the same token.
+    """
+    state = getattr(request, "state", None)
+    token_key = getattr(state, "auth_token_key", None) if state is not None else None
+    if token_key is None:
+        return None
+    principal = getattr(state, "auth_principal", None)
+    if principal is not None:
+        return principal
+
+    async def _load() -> AuthPrincipal:
+        return AuthPrincipal(
+            user_id=current_user.id,
+            active=bool(current_user.active),
+            mfa_enabled=bool(current_user.mfa_enabled),
+            language=current_user.language,
+            default_entity_id=current_user.default_entity_id,
+            entity_ids=await _load_entity_memberships(current_user.id, db),
+        )
+
+    principal = await get_principal(token_key, current_user.id, _load)
+    state.auth_principal = principal
+    state.auth_principal_cached = last_lookup_hit()
+    return principal
 
 
 async def get_current_entity(
@@ -124,8 +189,19 @@ async def get_current_entity(
             return claimed
 
         # Second path: user is member of an active group in that entity.
-        # One lightweight EXISTS query per request; cheap and short-circuits
-        # cross-tenant probing at the earliest possible layer.
+        # Answered from the cached principal when the request carries one;
+        # otherwise one lightweight EXISTS query.
+        principal = await get_request_principal(request, current_user, db)
+        if principal is not None:
+            if claimed not in principal.entity_ids:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Access denied for the requested entity",
+                )
+            if request.state.auth_principal_cached:
+                record_saved_queries(request)
+            return claimed
+
         from sqlalchemy import exists, select
         from app.models.common import UserGroup, UserGroupMember
 
@@ -300,7 +376,10 @@ def require_module_enabled(module_slug: str):
                 detail="No entity context for module check",
             )
 
-        if not await is_module_enabled(db, entity_id, module_slug):
+        enabled = await is_module_enabled(db, entity_id, module_slug)
+        if last_lookup_hit():
+            record_saved_queries(request)
+        if not enabled:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Module unavailable: {module_slug}",
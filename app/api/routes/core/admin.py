@@ -21,7 +21,7 @@ from app.services.core.delete_service import (
     _ensure_registry,
     get_archived_counts,
     get_delete_policy,
-    purge_archived,
+    purge_archived_report,
     upsert_delete_policy,
 )
 from app.core.errors import StructuredHTTPException
@@ -162,6 +162,9 @@ async def system_health(
 
     overall = "healthy" if (db_ok and redis_ok) else "degraded"
 
+    from app.core.auth_context import get_auth_context_stats
+    from app.core.startup import get_startup_report
+
     return {
         "status": overall,
         "database": {
@@ -190,6 +193,8 @@ async def system_health(
             "total": user_count,
             "active": active_user_count,
         },
+        "auth_context_cache": get_auth_context_stats(),
+        "startup": get_startup_report(),
     }
 
 
@@ -208,12 +213,13 @@ class DeletePolicyUpdate(BaseModel):
     dependencies=[require_permission("system.platform.admin")],
 )
 async def list_delete_policies(
+    exact: bool = Query(False, description="Exact COUNT(*) instead of planner estimates"),
     current_user: User = Depends(get_current_user),
     entity_id: UUID = Depends(get_current_entity),
     db: AsyncSession = Depends(get_db),
 ):
     """List all entity types with their current delete policy and archived counts."""
-    counts = await get_archived_counts(db)
+    counts = await get_archived_counts(db, exact=exact)
     policies = []
 
     registry = _ensure_registry()
@@ -317,7 +323,8 @@ async def manual_purge(
     if retention_days <= 0:
         retention_days = 0
 
-    count = await purge_archived(entity_type, retention_days, db)
+    report = await purge_archived_report(entity_type, retention_days, db)
+    count = report.purged if report else 0
 
     from app.core.audit import record_audit
     await record_audit(
@@ -327,11 +334,20 @@ async def manual_purge(
         resource_id=entity_type,
         user_id=current_user.id,
         entity_id=entity_id,
-        details={"purged_count": count, "retention_days": retention_days},
+        details={
+            "purged_count": count,
+            "retention_days": retention_days,
+            "blocked_count": report.blocked if report else 0,
+        },
     )
     await db.commit()
 
-    return {"detail": f"{count} records purged", "entity_type": entity_type, "purged_count": count}
+    return {
+        "detail": f"{count} records purged",
+        "entity_type": entity_type,
+        "purged_count": count,
+        "report": report.to_dict() if report else None,
+    }
 
 
 @router.get(
@@ -339,11 +355,12 @@ async def manual_purge(
     dependencies=[require_permission("system.platform.admin")],
 )
 async def delete_policy_stats(
+    exact: bool = Query(False, description="Exact COUNT(*) instead of planner estimates"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get archived record counts per entity type."""
-    counts = await get_archived_counts(db)
+    """Get archived record counts per entity type (estimated unless ``exact``)."""
+    counts = await get_archived_counts(db, exact=exact)
     return counts
 
 
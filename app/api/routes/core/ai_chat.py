@@ -24,6 +24,7 @@ from app.core.audit import record_audit
 from app.core.rbac import get_user_permissions
 from app.core.database import get_db
 from app.mcp.mcp_native import NativeToolContext, get_or_create_backend
+from app.services.core import ai_tool_index
 from app.models.common import (
     IntegrationConnection,
     Project,
@@ -305,17 +306,6 @@ def _tool_preview(tool: dict) -> dict:
     }
 
 
-def _score_tool(question: str, tool: dict) -> int:
-    haystack = f"{tool.get('name', '')} {tool.get('description', '')}".lower()
-    words = {w for w in re.findall(r"[a-zA-Z0-9_:-]{3,}", question.lower())}
-    if not words:
-        return 0
-    score = sum(1 for word in words if word in haystack)
-    if tool.get("name", "").lower() in question.lower():
-        score += 3
-    return score
-
-
 def _has_explicit_write_intent(question: str) -> bool:
     q = question.lower()
     markers = (
@@ -364,10 +354,10 @@ async def _select_candidate_tools(context: NativeToolContext, question: str) ->
     tools = await backend.list_tools(context)
     allowed_tools = _allowed_tools_for_question(question)
     tools = [tool for tool in tools if tool.get("name") in allowed_tools]
-    ranked = sorted(tools, key=lambda t: _score_tool(question, t), reverse=True)
-    chosen = [t for t in ranked if _score_tool(question, t) > 0][:12]
-    if not chosen:
-        chosen = ranked[:8]
+    # Embeddings cover the backend's full tool list (built once per list);
+    # the per-user visibility + allowlist filter above only picks rows.
+    index = await ai_tool_index.get_tool_index(backend.tools_list)
+    chosen = ai_tool_index.select_tools(question, tools, index)
     return [_tool_preview(t) for t in chosen]
 
 
@@ -390,6 +380,13 @@ def _extract_json_object(text: str) -> dict | None:
             return None
 
 
+async def _acompletion(**kwargs):
+    """Single entry point to the LLM provider (swapped for a fake in tests)."""
+    import litellm
+
+    return await litellm.acompletion(**kwargs)
+
+
 async def _run_opsflux_tool_if_needed(
     *,
     ai_cfg: dict,
@@ -399,8 +396,6 @@ async def _run_opsflux_tool_if_needed(
     db: AsyncSession,
     body: ChatRequest,
 ) -> dict:
-    import litellm
-
     result: dict = {
         "tool_output": None,
         "executed_tool": None,
@@ -423,7 +418,7 @@ async def _run_opsflux_tool_if_needed(
             }, ensure_ascii=False),
         },
     ]
-    response = await litellm.acompletion(
+    response = await _acompletion(
         messages=planner_messages,
         **llm_kwargs,
     )
@@ -534,16 +529,18 @@ async def _run_opsflux_tool_if_needed(
     return result
 
 
-async def _generate_chat_response(
+async def _prepare_chat(
     *,
     body: ChatRequest,
     current_user: User,
     entity_id: UUID,
     request: Request,
     db: AsyncSession,
-) -> tuple[str, str]:
-    import litellm
-
+) -> tuple[list[dict], dict, dict]:
+    """Resolve provider config, run the tool planner and build the final
+    prompt. Returns ``(messages, llm_kwargs, tool_result)``; every DB access
+    of a chat turn happens here, before any streaming starts.
+    """
     ai_cfg = await get_ai_config(entity_id=entity_id, db=db)
     if not ai_cfg.get("api_key") and ai_cfg.get("provider") != "ollama":
         raise HTTPException(
@@ -551,7 +548,7 @@ async def _generate_chat_response(
             detail="AI provider not configured. Please set an API key in Settings > Integrations.",
         )
 
-    provider, llm_kwargs = _normalize_model_config(ai_cfg)
+    _, llm_kwargs = _normalize_model_config(ai_cfg)
     system_prompt = build_system_prompt(current_user, body.context_module)
     tool_result = await _run_opsflux_tool_if_needed(
         ai_cfg=ai_cfg,
@@ -584,8 +581,21 @@ async def _generate_chat_response(
             ),
         })
     messages.extend(_compact_history(body.messages))
+    return messages, llm_kwargs, tool_result
 
-    response = await litellm.acompletion(
+
+async def _generate_chat_response(
+    *,
+    body: ChatRequest,
+    current_user: User,
+    entity_id: UUID,
+    request: Request,
+    db: AsyncSession,
+) -> tuple[str, str]:
+    messages, llm_kwargs, tool_result = await _prepare_chat(
+        body=body, current_user=current_user, entity_id=entity_id, request=request, db=db,
+    )
+    response = await _acompletion(
         messages=messages,
         **llm_kwargs,
     )
@@ -602,15 +612,78 @@ async def _generate_chat_response(
 
 # ── Streaming SSE generator ─────────────────────────────────────
 
-async def _stream_text(text: str):
+class _ActionTokenStream:
+    """Incremental ``_sanitize_action_tokens`` over provider deltas.
+
+    Text is released as it arrives, except from the first unclosed ``[[``
+    (or a trailing ``[``) on: an action token split across deltas is held
+    back until its ``]]`` arrives, then sanitised whole. A held fragment
+    that grows past ``HOLD_MAX`` is dropped up to its ``]]`` instead of
+    being released unsanitised.
+    """
+
+    HOLD_MAX = 512
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._started = False
+        self._dropping = False
+
+    def feed(self, delta: str) -> str:
+        if self._dropping:
+            # Keep the last "]" so a "]]" split across deltas is still seen.
+            self._pending += delta
+            end = self._pending.find("]]")
+            if end == -1:
+                self._pending = self._pending[-1:]
+                return ""
+            self._pending, self._dropping = self._pending[end + 2:], False
+        else:
+            self._pending += delta
+        closed = self._pending.rfind("]]")
+        cut = self._pending.find("[[", closed + 2 if closed != -1 else 0)
+        if cut != -1 and len(self._pending) - cut > self.HOLD_MAX:
+            out, self._pending, self._dropping = self._pending[:cut], self._pending[cut:][-1:], True
+            return self._emit(out)
+        if cut == -1:
+            cut = len(self._pending) - 1 if self._pending.endswith("[") else len(self._pending)
+        out, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._emit(out)
+
+    def flush(self) -> str:
+        out, self._pending = ("" if self._dropping else self._pending), ""
+        return self._emit(out)
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return _sanitize_action_tokens(text) if text else ""
+
+
+def _sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def _stream_completion(messages: list[dict], llm_kwargs: dict, log_context: str = ""):
+    """Forward provider tokens as SSE ``content`` events as they arrive."""
     try:
-        chunk_size = 120
-        for i in range(0, len(text), chunk_size):
-            yield f"data: {json.dumps({'type': 'content', 'text': text[i:i + chunk_size]})}\n\n"
-        yield f"data: {json.dumps({'type': 'done'})}\n\n"
+        response = await _acompletion(messages=messages, stream=True, **llm_kwargs)
+        tokens = _ActionTokenStream()
+        async for chunk in response:
+            choices = getattr(chunk, "choices", None) or []
+            delta = getattr(choices[0], "delta", None) if choices else None
+            text = tokens.feed(getattr(delta, "content", None) or "")
+            if text:
+                yield _sse({"type": "content", "text": text})
+        tail = tokens.flush().rstrip()
+        if tail:
+            yield _sse({"type": "content", "text": tail})
+        logger.info("AI chat streamed response %s", log_context)
+        yield _sse({"type": "done"})
     except Exception as e:
         logger.exception("AI chat streaming error")
-        yield f"data: {json.dumps({'type': 'error', 'message': str(e)[:300]})}\n\n"
+        yield _sse({"type": "error", "message": str(e)[:300]})
 
 
 # ── Endpoints ────────────────────────────────────────────────────
@@ -795,8 +868,6 @@ async def module_ai_insight(
     db: AsyncSession = Depends(get_db),
 ):
     """Generate a read-only business insight for Tiers or Projets."""
-    import litellm
-
     await _require_module_ai_permission(current_user, entity_id, db, body.module)
     if body.module == "tiers" and body.owner_type not in {"tier", "tier_contact"}:
         raise HTTPException(status_code=422, detail="Invalid owner_type for tiers")
@@ -836,7 +907,7 @@ async def module_ai_insight(
             ),
         },
     ]
-    response = await litellm.acompletion(messages=messages, **llm_kwargs)
+    response = await _acompletion(messages=messages, **llm_kwargs)
     text = (response.choices[0].message.content or "").strip()
     await record_audit(
         db,
@@ -871,17 +942,21 @@ async def chat_stream(
     entity_id: UUID = Depends(get_current_entity),
     db: AsyncSession = Depends(get_db),
 ):
-    """Stream an AI chat response via SSE."""
-    text, _model = await _generate_chat_response(
+    """Stream an AI chat response via SSE, token by token."""
+    messages, llm_kwargs, tool_result = await _prepare_chat(
         body=body,
         current_user=current_user,
         entity_id=entity_id,
         request=request,
         db=db,
     )
+    log_context = (
+        f"user={current_user.id} entity={entity_id} module={body.context_module or ''} "
+        f"used_tool={bool(tool_result.get('executed_tool'))}"
+    )
 
     return StreamingResponse(
-        _stream_text(text),
+        _stream_completion(messages, llm_kwargs, log_context),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -3,21 +3,36 @@
 Query by owner_type + owner_id to list files for any entity.
 Upload via multipart/form-data, download via GET /:id/download.
 Storage backend (local/S3) is determined by STORAGE_BACKEND setting.
+
+Uploads are streamed to storage (hashed on the fly) and deduplicated by
+content: an upload identical to a live attachment of the same entity
+reuses its stored object, and an object is only deleted once no live
+attachment references it. Downloads honour HTTP Range.
 """
 
-import hashlib
+from urllib.parse import quote
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
-from fastapi.responses import FileResponse, RedirectResponse
-from sqlalchemy import select
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.requests import Request
 
 from app.api.deps import get_current_entity, get_current_user, check_polymorphic_owner_access
 from app.core.config import settings
 from app.core.database import get_db
-from app.core.storage_service import store_file, get_file_path, get_file_bytes, get_download_url, delete_stored_file
+from app.core.storage_service import (
+    UploadTooLarge,
+    delete_stored_file,
+    get_download_url,
+    get_file_path,
+    get_file_size,
+    hash_stored_file,
+    iter_file,
+    parse_byte_range,
+    store_stream,
+)
 from app.models.common import Attachment, User
 from app.schemas.common import AttachmentRead
 from app.services.core.delete_service import delete_entity
@@ -50,8 +65,19 @@ _BLOCKED_EXTENSIONS = {
 }
 
 
-def _attachment_hash(content: bytes) -> str:
-    return hashlib.sha256(content).hexdigest()
+async def _release_stored_object(db: AsyncSession, storage_path: str) -> None:
+    """Delete a stored object unless a live attachment still references it."""
+    references = (
+        await db.execute(
+            select(func.count()).select_from(Attachment).where(
+                Attachment.storage_path == storage_path,
+                Attachment.archived.is_(False),
+                Attachment.deleted_at.is_(None),
+            )
+        )
+    ).scalar_one()
+    if not references:
+        await delete_stored_file(storage_path)
 
 
 def _normalize_attachment_category(category: str | None) -> str | None:
@@ -153,15 +179,24 @@ async def upload_attachment(
     # Bug #126 : valider l'extension avant tout (early reject sans I/O).
     _validate_extension(file.filename or "")
 
-    content = await file.read()
-
-    # Validate file size
+    # Stream to storage (local or S3) in chunks; size limit and SHA-256
+    # are enforced/computed while streaming.
+    original_name = file.filename or "file"
+    content_type = file.content_type or "application/octet-stream"
     max_size = getattr(settings, 'STORAGE_MAX_FILE_SIZE_MB', 50) * 1024 * 1024
-    if len(content) > max_size:
+    try:
+        stored = await store_stream(
+            file,
+            owner_type=owner_type,
+            owner_id=owner_id,
+            original_filename=original_name,
+            content_type=content_type,
+            max_bytes=max_size,
+        )
+    except UploadTooLarge:
         raise HTTPException(status_code=413, detail=f"File too large. Maximum: {getattr(settings, 'STORAGE_MAX_FILE_SIZE_MB', 50)} MB")
 
-    original_name = file.filename or "file"
-    file_hash_sha256 = _attachment_hash(content)
+    file_hash_sha256 = stored.sha256
     normalized_category = _normalize_attachment_category(category)
     category_filter = Attachment.category.is_(None) if normalized_category is None else Attachment.category == normalized_category
     duplicate_result = await db.execute(
@@ -180,9 +215,7 @@ async def upload_attachment(
     duplicate = None
     for candidate in duplicate_result.scalars().all():
         if not candidate.file_hash_sha256:
-            existing_content = await get_file_bytes(candidate.storage_path)
-            if existing_content:
-                candidate.file_hash_sha256 = _attachment_hash(existing_content)
+            candidate.file_hash_sha256 = await hash_stored_file(candidate.storage_path)
         if _is_duplicate_attachment_candidate(
             candidate,
             original_name=original_name,
@@ -192,6 +225,7 @@ async def upload_attachment(
             duplicate = candidate
             break
     if duplicate and not overwrite_existing:
+        await delete_stored_file(stored.storage_path)
         raise StructuredHTTPException(
             status.HTTP_409_CONFLICT,
             code="ATTACHMENT_DUPLICATE",
@@ -206,17 +240,27 @@ async def upload_attachment(
             },
         )
 
-    # Store via abstracted storage service (local or S3)
-    storage_path, unique_name = await store_file(
-        content=content,
-        owner_type=owner_type,
-        owner_id=owner_id,
-        original_filename=original_name,
-        content_type=file.content_type or "application/octet-stream",
-    )
+    # Content-addressed dedup: reuse the object of an identical live
+    # attachment of this entity and drop the copy just written.
+    storage_path, unique_name = stored.storage_path, stored.filename
+    same_content = (
+        await db.execute(
+            select(Attachment)
+            .where(
+                Attachment.entity_id == entity_id,
+                Attachment.file_hash_sha256 == file_hash_sha256,
+                Attachment.size_bytes == stored.size_bytes,
+                Attachment.archived.is_(False),
+                Attachment.deleted_at.is_(None),
+            )
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+    if same_content is not None and same_content.storage_path != storage_path:
+        await delete_stored_file(storage_path)
+        storage_path, unique_name = same_content.storage_path, same_content.filename
 
     if duplicate and overwrite_existing:
-        await delete_stored_file(duplicate.storage_path)
         await delete_entity(duplicate, db, "attachment", entity_id=duplicate.id, user_id=current_user.id)
 
     attachment = Attachment(
@@ -224,8 +268,8 @@ async def upload_attachment(
         owner_id=parsed_owner_id,
         filename=unique_name,
         original_name=original_name,
-        content_type=file.content_type or "application/octet-stream",
-        size_bytes=len(content),
+        content_type=content_type,
+        size_bytes=stored.size_bytes,
         storage_path=storage_path,
         description=description,
         category=normalized_category,
@@ -236,6 +280,8 @@ async def upload_attachment(
     db.add(attachment)
     await db.commit()
     await db.refresh(attachment)
+    if duplicate and overwrite_existing and duplicate.storage_path != storage_path:
+        await _release_stored_object(db, duplicate.storage_path)
     return attachment
 
 
@@ -271,19 +317,47 @@ async def download_attachment(
     if presigned:
         return RedirectResponse(presigned)
 
-    # Local: serve file directly
+    # Local: serve file directly (FileResponse handles Range itself)
     local_path = await get_file_path(attachment.storage_path)
-    if not local_path:
+    if local_path:
+        return FileResponse(
+            local_path,
+            media_type=attachment.content_type,
+            filename=attachment.original_name,
+        )
+
+    # Object storage without presigned URLs: proxy the (ranged) stream
+    size = await get_file_size(attachment.storage_path)
+    if size is None:
         raise StructuredHTTPException(
             404,
             code="FILE_NOT_FOUND_DISK",
             message="File not found on disk",
         )
-
-    return FileResponse(
-        local_path,
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename*=utf-8''{quote(attachment.original_name)}",
+    }
+    try:
+        byte_range = parse_byte_range(request.headers.get("range"), size)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            iter_file(attachment.storage_path), media_type=attachment.content_type, headers=headers,
+        )
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_file(attachment.storage_path, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
         media_type=attachment.content_type,
-        filename=attachment.original_name,
+        headers=headers,
     )
 
 
@@ -314,8 +388,8 @@ async def delete_attachment(
 
     await check_polymorphic_owner_access(attachment.owner_type, attachment.owner_id, current_user, db, request, write=True)
 
-    # Delete from storage (local or S3)
-    await delete_stored_file(attachment.storage_path)
-
     await delete_entity(attachment, db, "attachment", entity_id=attachment_id, user_id=current_user.id)
     await db.commit()
+
+    # Delete from storage (local or S3) unless another attachment shares the object
+    await _release_stored_object(db, attachment.storage_path)
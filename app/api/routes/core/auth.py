@@ -46,9 +46,8 @@ from app.core.security import (
     create_refresh_token,
     create_sso_state_token,
     decode_token,
-    hash_password,
-    verify_password,
 )
+from app.core.password_hashing import hash_password, verify_and_rehash, verify_password
 from app.models.common import (
     Entity,
     MFATrustedDevice,
@@ -416,7 +415,8 @@ async def login(body: LoginRequest, request: Request, db: AsyncSession = Depends
         )
 
     # ── Password verification ────────────────────────────────────
-    if not verify_password(body.password, user.hashed_password):
+    password_ok, rehashed = await verify_and_rehash(body.password, user.hashed_password)
+    if not password_ok:
         user.failed_login_count = (user.failed_login_count or 0) + 1
 
         await record_audit(
@@ -482,6 +482,10 @@ async def login(body: LoginRequest, request: Request, db: AsyncSession = Depends
         user.failed_login_count = 0
         user.locked_until = None
     user.last_login_ip = request.client.host if request.client else None
+    if rehashed:
+        # BCRYPT_ROUNDS changed since this hash was made — upgrade it now
+        # that we hold the plaintext.
+        user.hashed_password = rehashed
 
     # ── MFA gate ─────────────────────────────────────────────────
     if user.mfa_enabled and user.totp_secret:
@@ -509,6 +513,8 @@ async def login(body: LoginRequest, request: Request, db: AsyncSession = Depends
                 logger.info("MFA skipped via trust cookie for %s", user.email)
                 return await _issue_tokens(user, request, db)
 
+        if rehashed:
+            await db.commit()
         mfa_token = create_mfa_token(user_id=user.id)
         logger.info("MFA challenge issued for user %s", user.email)
         return LoginResponse(mfa_required=True, mfa_token=mfa_token)
@@ -1075,7 +1081,7 @@ async def reset_password(body: ResetPasswordRequest, db: AsyncSession = Depends(
     except PasswordPolicyError as e:
         raise StructuredHTTPException(400, code=e.code, message=e.message) from None
 
-    user.hashed_password = hash_password(body.new_password)
+    user.hashed_password = await hash_password(body.new_password)
     user.password_changed_at = datetime.now(UTC)
     # Reset lockout on password change
     user.failed_login_count = 0
@@ -1102,7 +1108,7 @@ async def change_password(
     db: AsyncSession = Depends(get_db),
 ):
     """Change password for the authenticated user. Requires current password."""
-    if not current_user.hashed_password or not verify_password(body.current_password, current_user.hashed_password):
+    if not current_user.hashed_password or not await verify_password(body.current_password, current_user.hashed_password):
         raise StructuredHTTPException(
             400, code="CURRENT_PASSWORD_INCORRECT",
             message="Current password is incorrect",
@@ -1125,7 +1131,7 @@ async def change_password(
     except PasswordPolicyError as e:
         raise StructuredHTTPException(400, code=e.code, message=e.message) from None
 
-    current_user.hashed_password = hash_password(body.new_password)
+    current_user.hashed_password = await hash_password(body.new_password)
     current_user.password_changed_at = datetime.now(UTC)
     await record_password_change(body.new_password, current_user, db, auth_cfg)
     await db.commit()
@@ -27,7 +27,7 @@ from app.api.deps import get_current_user, get_current_entity
 from app.core.database import get_db
 from app.core.audit import record_audit
 from app.core.config import settings
-from app.core.security import hash_password
+from app.core.password_hashing import hash_password
 from app.models.common import User
 
 logger = logging.getLogger(__name__)
@@ -654,7 +654,7 @@ async def anonymize_account(
     current_user.vantage_number = None
     current_user.extension_number = None
     current_user.badge_number = None
-    current_user.hashed_password = hash_password("ACCOUNT_ANONYMIZED_" + anon_id)
+    current_user.hashed_password = await hash_password("ACCOUNT_ANONYMIZED_" + anon_id)
     current_user.totp_secret = None
     current_user.mfa_backup_codes = None
     current_user.last_login_ip = None
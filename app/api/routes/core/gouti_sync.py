@@ -1,18 +1,25 @@
 """Gouti sync routes — synchronize project data from external Gouti API into local Projets module."""
 
+import json
 import logging
 from datetime import datetime, timezone
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy import select, func as sqla_func
+from sqlalchemy import insert, select, text, update, func as sqla_func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_entity, get_current_user, require_permission
 from app.core.database import get_db
 from app.models.common import Project, Setting, User
-from app.services.connectors.gouti_connector import GoutiConnector, create_gouti_connector
+from app.services.connectors.gouti_connector import (
+    GoutiConnector,
+    SyncProgress,
+    content_hash,
+    create_gouti_connector,
+)
 from app.core.errors import StructuredHTTPException
 
 logger = logging.getLogger(__name__)
@@ -20,6 +27,10 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/gouti", tags=["gouti-sync"])
 
 GOUTI_SETTINGS_PREFIX = "integration.gouti"
+SYNC_HASHES_KEY = f"{GOUTI_SETTINGS_PREFIX}.sync_hashes"  # gouti_id -> content hash of last apply
+SYNC_PROGRESS_KEY = "gouti:sync:progress"
+SYNC_PROGRESS_TTL_SECONDS = 3600
+SYNC_APPLY_BATCH_SIZE = 50  # projects per INSERT … ON CONFLICT + commit
 
 
 # ── Response schemas ──────────────────────────────────────────────────────
@@ -30,6 +41,12 @@ class SyncResult(BaseModel):
     created: int
     updated: int
     errors: list[str]
+    # Projects whose Gouti content hash is unchanged since the last sync.
+    skipped: int = 0
+    tasks_synced: int = 0
+    duration_ms: float = 0
+    projects_per_second: float = 0
+    requests: int = 0
 
 
 class SyncStatus(BaseModel):
@@ -220,12 +237,8 @@ def _parse_gouti_date(value: str | None) -> datetime | None:
     return None
 
 
-async def _upsert_project_from_gouti(
-    db: AsyncSession,
-    entity_id: UUID,
-    gouti_data: dict,
-) -> tuple[Project, str]:
-    """Upsert a single project from Gouti data. Returns (project, action) where action is 'created' or 'updated'."""
+def _gouti_project_id(gouti_data: dict) -> str:
+    """Gouti identifier of a raw project record ("" when missing)."""
     # Gouti identifiers. Gouti's /projects returns PascalCase keys (Ref,
     # Name, Status, ...) with no "id" field — the dict key is the ID, and
     # ``_extract_items`` surfaces it as ``_id``. Fall back to other casings
@@ -241,19 +254,18 @@ async def _upsert_project_from_gouti(
         or gouti_data.get("projectId")
         or ""
     )
-    if not gouti_id:
-        raise ValueError("Projet Gouti sans identifiant")
+    return gouti_id
 
-    external_ref = _make_external_ref(gouti_id)
 
-    # Look up existing project by external_ref within the entity
-    result = await db.execute(
-        select(Project).where(
-            Project.entity_id == entity_id,
-            Project.external_ref == external_ref,
-        )
-    )
-    existing = result.scalars().first()
+def _project_values(gouti_data: dict) -> tuple[str, dict]:
+    """Map a raw Gouti project to ``(gouti_id, Project column values)``.
+
+    The values cover every field owned by the sync (``_PROJECT_SYNC_FIELDS``)
+    plus ``external_ref``. Raises ValueError when the record has no id.
+    """
+    gouti_id = _gouti_project_id(gouti_data)
+    if not gouti_id:
+        raise ValueError("Projet Gouti sans identifiant")
 
     # ── Field extraction — Gouti /projects returns PascalCase English keys ─
     # Verified empirically via /gouti/debug/raw-projects against a real entity:
@@ -354,37 +366,52 @@ async def _upsert_project_from_gouti(
     }
     weather = weather_map.get(weather_raw, "sunny")
 
+    return gouti_id, {
+        "code": code,
+        "name": name,
+        "description": description,
+        "status": status,
+        "priority": priority,
+        "progress": progress,
+        "weather": weather,
+        "start_date": start_date,
+        "end_date": end_date,
+        "budget": budget,
+        "external_ref": _make_external_ref(gouti_id),
+    }
+
+
+# Columns overwritten on every sync of an already-imported project.
+_PROJECT_SYNC_FIELDS = (
+    "code", "name", "description", "status", "priority", "progress",
+    "weather", "start_date", "end_date", "budget",
+)
+
+
+async def _upsert_project_from_gouti(
+    db: AsyncSession,
+    entity_id: UUID,
+    gouti_data: dict,
+) -> tuple[Project, str]:
+    """Upsert a single project from Gouti data. Returns (project, action) where action is 'created' or 'updated'."""
+    _gouti_id, values = _project_values(gouti_data)
+
+    # Look up existing project by external_ref within the entity
+    result = await db.execute(
+        select(Project).where(
+            Project.entity_id == entity_id,
+            Project.external_ref == values["external_ref"],
+        )
+    )
+    existing = result.scalars().first()
+
     if existing:
-        # Update existing project
-        existing.name = name
-        existing.code = code
-        existing.description = description
-        existing.status = status
-        existing.priority = priority
-        existing.progress = progress
-        existing.weather = weather
-        existing.start_date = start_date
-        existing.end_date = end_date
-        existing.budget = budget
+        for field in _PROJECT_SYNC_FIELDS:
+            setattr(existing, field, values[field])
         return existing, "updated"
-    else:
-        # Create new project
-        project = Project(
-            entity_id=entity_id,
-            code=code,
-            name=name,
-            description=description,
-            status=status,
-            priority=priority,
-            progress=progress,
-            weather=weather,
-            start_date=start_date,
-            end_date=end_date,
-            budget=budget,
-            external_ref=external_ref,
-        )
-        db.add(project)
-        return project, "created"
+    project = Project(entity_id=entity_id, **values)
+    db.add(project)
+    return project, "created"
 
 
 async def _save_setting(db: AsyncSession, entity_id: UUID, key: str, value: str) -> None:
@@ -408,6 +435,7 @@ async def _save_setting(db: AsyncSession, entity_id: UUID, key: str, value: str)
 
 @router.post("/sync", response_model=SyncResult)
 async def sync_all_projects(
+    force: bool = False,
     entity_id: UUID = Depends(get_current_entity),
     _: None = require_permission("core.integrations.manage"),
     current_user: User = Depends(get_current_user),
@@ -416,66 +444,57 @@ async def sync_all_projects(
     """Trigger a full sync of all projects from Gouti into the local Projets table.
 
     Reads Gouti credentials from integration.gouti.* settings, fetches all projects,
-    and upserts them locally using external_ref to track origin.
+    and upserts them locally using external_ref to track origin. Projects
+    unchanged since the last sync are skipped unless ``force`` is set.
     """
     gouti_settings = await _get_gouti_settings(db, entity_id)
-    connector = _build_connector(gouti_settings)
-
-    # Fetch projects from Gouti
-    try:
-        gouti_projects = await connector.get_projects()
-    except Exception as exc:
-        logger.exception("Gouti sync — failed to fetch projects: %s", exc)
-        raise HTTPException(
-            status_code=502,
-            detail=f"Impossible de récupérer les projets depuis Gouti : {str(exc)[:300]}",
-        )
-
-    created = 0
-    updated = 0
-    errors: list[str] = []
-
-    for gp in gouti_projects:
+    async with _build_connector(gouti_settings) as connector:
+        # Fetch projects from Gouti
         try:
-            _project, action = await _upsert_project_from_gouti(db, entity_id, gp)
-            if action == "created":
-                created += 1
-            else:
-                updated += 1
+            gouti_projects = await connector.get_projects()
         except Exception as exc:
-            gouti_id = gp.get("id") or gp.get("project_id") or "?"
-            msg = f"Erreur projet Gouti {gouti_id}: {str(exc)[:200]}"
-            logger.warning("Gouti sync — %s", msg)
-            errors.append(msg)
+            logger.exception("Gouti sync — failed to fetch projects: %s", exc)
+            raise HTTPException(
+                status_code=502,
+                detail=f"Impossible de récupérer les projets depuis Gouti : {str(exc)[:300]}",
+            )
 
-    # Commit all changes in a single transaction
-    try:
-        await db.commit()
-    except Exception as exc:
-        await db.rollback()
-        logger.error("Gouti sync — commit failed: %s", exc)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Erreur lors de la sauvegarde : {str(exc)[:300]}",
-        )
+        try:
+            result = await _sync_gouti_projects(db, entity_id, connector, gouti_projects, force=force)
+        except Exception as exc:
+            await db.rollback()
+            logger.error("Gouti sync — commit failed: %s", exc)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Erreur lors de la sauvegarde : {str(exc)[:300]}",
+            )
 
     # Record last sync timestamp
     now_iso = datetime.now(timezone.utc).isoformat()
     await _save_setting(db, entity_id, f"{GOUTI_SETTINGS_PREFIX}.last_sync_at", now_iso)
-    await _save_setting(db, entity_id, f"{GOUTI_SETTINGS_PREFIX}.last_sync_count", str(created + updated))
+    await _save_setting(db, entity_id, f"{GOUTI_SETTINGS_PREFIX}.last_sync_count", str(result.synced))
     await db.commit()
 
     logger.info(
-        "Gouti sync completed — created=%d, updated=%d, errors=%d (user=%s)",
-        created, updated, len(errors), current_user.id,
+        "Gouti sync completed — created=%d, updated=%d, skipped=%d, errors=%d in %.0f ms (user=%s)",
+        result.created, result.updated, result.skipped, len(result.errors), result.duration_ms, current_user.id,
     )
+    return result
 
-    return SyncResult(
-        synced=created + updated,
-        created=created,
-        updated=updated,
-        errors=errors,
-    )
+
+@router.get("/sync/progress")
+async def get_sync_progress(
+    entity_id: UUID = Depends(get_current_entity),
+    _: None = require_permission("core.integrations.manage"),
+):
+    """Progress / throughput snapshot of the running (or last) Gouti sync."""
+    try:
+        from app.core.redis_client import get_redis
+
+        raw = await get_redis().get(f"{SYNC_PROGRESS_KEY}:{entity_id}")
+    except Exception:
+        raw = None
+    return json.loads(raw) if raw else None
 
 
 @router.get("/status", response_model=SyncStatus)
@@ -687,8 +706,8 @@ async def get_catalog_facets(
     filter controls without the frontend parsing the full catalog itself.
     """
     gouti_settings = await _get_gouti_settings(db, entity_id)
-    connector = _build_connector(gouti_settings)
-    projects = await connector.get_projects()
+    async with _build_connector(gouti_settings) as connector:
+        projects = await connector.get_projects()
 
     years: set[int] = set()
     categories: dict[str, str] = {}  # id -> name
@@ -755,6 +774,27 @@ async def get_catalog(
     """
     gouti_settings = await _get_gouti_settings(db, entity_id)
     connector = _build_connector(gouti_settings)
+    try:
+        return await _build_catalog(
+            db, entity_id, connector, year, category_ids, status, manager_id,
+            criticality, search, include_tasks,
+        )
+    finally:
+        await connector.aclose()
+
+
+async def _build_catalog(
+    db: AsyncSession,
+    entity_id: UUID,
+    connector: GoutiConnector,
+    year: int | None,
+    category_ids: str | None,
+    status: str | None,
+    manager_id: str | None,
+    criticality: str | None,
+    search: str | None,
+    include_tasks: bool,
+) -> dict:
     all_projects = await connector.get_projects()
 
     # Admin permanent filters
@@ -780,6 +820,13 @@ async def get_catalog(
 
     filtered = [gp for gp in all_projects if _project_matches_filters(gp, filters)]
 
+    # Per-project task lists are fetched in parallel (bounded by the connector).
+    tasks_by_project: dict[str, list[dict] | Exception] = {}
+    if include_tasks:
+        ids = [str(gp.get("_id") or gp.get("Ref") or "") for gp in filtered]
+        async for gouti_id, raw in connector.iter_project_tasks([i for i in ids if i]):
+            tasks_by_project[gouti_id] = raw
+
     # Build catalog entries
     catalog: list[dict] = []
     for gp in filtered:
@@ -811,10 +858,9 @@ async def get_catalog(
             "tasks": [],
         }
         if include_tasks:
-            try:
-                raw_tasks = await connector.get_project_tasks(gouti_id)
-            except Exception:
-                logger.exception("Gouti get_project_tasks failed for project %s", gouti_id)
+            raw_tasks = tasks_by_project.get(gouti_id) or []
+            if isinstance(raw_tasks, Exception):
+                logger.warning("Gouti get_project_tasks failed for project %s: %s", gouti_id, raw_tasks)
                 raw_tasks = []
             # Normalise to the shape the frontend expects. Keep it minimal —
             # the catalog view is a dropdown list, full detail comes from the
@@ -1002,7 +1048,8 @@ async def get_catalog_project_tasks(
     gouti_settings = await _get_gouti_settings(db, entity_id)
     connector = _build_connector(gouti_settings)
     try:
-        raw_tasks = await connector.get_project_tasks(gouti_project_id)
+        async with connector:
+            raw_tasks = await connector.get_project_tasks(gouti_project_id)
     except Exception as exc:
         logger.warning("Gouti catalog task fetch failed for %s: %s", gouti_project_id, exc)
         raise HTTPException(502, f"Erreur récupération tâches Gouti: {str(exc)[:200]}")
@@ -1144,35 +1191,19 @@ async def delete_selection(
         await db.commit()
 
 
-async def _import_project_tasks(
-    db: AsyncSession,
-    entity_id: UUID,
-    local_project_id: UUID,
-    gouti_project_id: str,
-    connector,
-    task_selection: dict,
-    current_user_id: UUID,
-) -> int:
-    """Fetch and import tasks for a project preserving Gouti's hierarchy.
-
-    - Rebuilds the parent/child tree from ``level_ta`` + ``order_ta``.
-    - Upserts each task by ``(project_id, code)`` and stores the
-      parent_id FK pointing to the local parent task that was upserted
-      earlier in the same pass (walking in order).
-    - Gouti tasks flagged with ``milestone_ta == 1`` are imported as
-      ``ProjectMilestone`` rows instead of tasks.
+def _plan_project_tasks(raw_tasks: list[dict], task_selection: dict) -> tuple[list[dict], list[dict]]:
+    """Turn a raw Gouti task list into ``(tasks, milestones)`` row values.
+
+    - Rebuilds the parent/child tree from ``level_ta`` + ``order_ta``;
+      each task row carries its Gouti ``code`` and ``parent_ref``.
+    - Gouti tasks flagged with ``milestone_ta == 1`` become milestone
+      rows instead of tasks.
     - Task selection ``mode`` drives filtering: "all" / "none" /
-      "some" (task_ids subset).
+      "some" (task_ids subset, plus their ancestors).
     """
     mode = str(task_selection.get("mode") or "all").lower()
     if mode == "none":
-        return 0
-
-    try:
-        raw_tasks = await connector.get_project_tasks(gouti_project_id)
-    except Exception as exc:
-        logger.warning("Gouti tasks fetch failed for %s: %s", gouti_project_id, exc)
-        return 0
+        return [], []
 
     # Enrich with level/order/parent_ref
     tree_tasks = _build_task_tree_metadata(raw_tasks)
@@ -1197,12 +1228,8 @@ async def _import_project_tasks(
             logger.info("Gouti sync: auto-including %d ancestor tasks for %d selected", len(ancestors_to_add - wanted_ids), len(wanted_ids))
             wanted_ids |= ancestors_to_add
 
-    from app.models.common import ProjectTask, ProjectMilestone
-
-    # Map Gouti ref → local ProjectTask.id so children can point to parents
-    gouti_to_local_id: dict[str, UUID] = {}
-    touched = 0
-
+    tasks: list[dict] = []
+    milestones: list[dict] = []
     for gt in tree_tasks:
         tid = str(gt.get("ref_ta") or gt.get("_id") or "")
         if not tid:
@@ -1226,7 +1253,6 @@ async def _import_project_tasks(
 
         title = _gouti_task_name(gt)
         description = _html_to_text(gt.get("description_ta") or gt.get("description"))
-        progress = max(0, min(100, _as_int(gt.get("progress_ta"), 0)))
         status = _parse_gouti_status_task(gt.get("status_ta"))
         start_date = _parse_gouti_date(
             gt.get("initial_start_date_ta") or gt.get("actual_start_date_ta")
@@ -1234,92 +1260,342 @@ async def _import_project_tasks(
         end_date = _parse_gouti_date(
             gt.get("initial_end_date_ta") or gt.get("actual_end_date_ta")
         )
-        code = tid
-        order_val = gt.get("_order", 0)
 
-        # ── Milestones: import as ProjectMilestone, not ProjectTask ──
         if is_milestone:
-            try:
-                existing_ms = (await db.execute(
-                    select(ProjectMilestone).where(
-                        ProjectMilestone.project_id == local_project_id,
-                        ProjectMilestone.name == title,
-                    )
-                )).scalar_one_or_none()
-                if existing_ms:
-                    existing_ms.description = description
-                    existing_ms.due_date = end_date or start_date
-                    existing_ms.status = "completed" if status == "done" else "pending"
-                else:
-                    db.add(ProjectMilestone(
-                        project_id=local_project_id,
-                        name=title,
-                        description=description,
-                        due_date=end_date or start_date,
-                        status="completed" if status == "done" else "pending",
-                    ))
-                touched += 1
-            except Exception as exc:
-                logger.warning("Milestone upsert failed for %s: %s", tid, exc)
+            milestones.append({
+                "name": title,
+                "description": description,
+                "due_date": end_date or start_date,
+                "status": "completed" if status == "done" else "pending",
+            })
             continue
 
-        # ── Regular task upsert ──
-        workload = _as_float(gt.get("workload_ta"))
-        actual_workload = _as_float(gt.get("actual_workload_ta"))
+        tasks.append({
+            "code": tid,
+            "parent_ref": gt.get("_parent_ref"),
+            "title": title,
+            "description": description,
+            "status": status,
+            "progress": max(0, min(100, _as_int(gt.get("progress_ta"), 0))),
+            "estimated_hours": _as_float(gt.get("workload_ta")),
+            "actual_hours": _as_float(gt.get("actual_workload_ta")),
+            "start_date": start_date,
+            "due_date": end_date,
+            "order": gt.get("_order", 0),
+        })
+    return tasks, milestones
 
-        # Resolve parent_id locally using the parent_ref surfaced by the
-        # tree builder. The parent must have been upserted earlier (we
-        # iterate in order), except in partial-import mode where the
-        # parent might be skipped — in that case we leave parent_id=None
-        # so the task becomes a root.
-        parent_ref = gt.get("_parent_ref")
-        parent_id: UUID | None = gouti_to_local_id.get(parent_ref) if parent_ref else None
 
-        existing = (await db.execute(
-            select(ProjectTask).where(
+async def _apply_project_tasks(
+    db: AsyncSession,
+    local_project_id: UUID,
+    raw_tasks: list[dict],
+    task_selection: dict,
+) -> int:
+    """Upsert a project's Gouti tasks and milestones in a few set-based statements.
+
+    Tasks are matched by ``(project_id, code)`` and milestones by
+    ``(project_id, name)`` with one SELECT each; new rows are inserted in
+    one executemany with client-side ids, so ``parent_id`` can point to a
+    parent inserted in the same statement, and existing rows are updated
+    in one bulk UPDATE by primary key. ``(project_id, code)`` is not
+    unique for hand-made tasks, which is why this is not an ON CONFLICT.
+    In partial-import mode a skipped parent leaves ``parent_id`` NULL so
+    the task becomes a root.
+    """
+    from app.models.common import ProjectTask, ProjectMilestone
+
+    tasks, milestones = _plan_project_tasks(raw_tasks, task_selection)
+    if not tasks and not milestones:
+        return 0
+
+    existing_tasks: dict[str, UUID] = {}
+    if tasks:
+        for code, task_id in (await db.execute(
+            select(ProjectTask.code, ProjectTask.id).where(
                 ProjectTask.project_id == local_project_id,
-                ProjectTask.code == code,
+                ProjectTask.code.in_([t["code"] for t in tasks]),
             )
-        )).scalar_one_or_none()
-
-        if existing:
-            existing.title = title
-            existing.description = description
-            existing.status = status
-            existing.progress = progress
-            existing.estimated_hours = workload
-            existing.actual_hours = actual_workload
-            existing.start_date = start_date
-            existing.due_date = end_date
-            existing.order = order_val
-            existing.parent_id = parent_id
-            gouti_to_local_id[tid] = existing.id
+        )).all():
+            existing_tasks.setdefault(code, task_id)
+
+    # Map Gouti ref → local ProjectTask.id so children can point to parents
+    gouti_to_local_id = {t["code"]: existing_tasks.get(t["code"]) or uuid4() for t in tasks}
+    task_inserts: list[dict] = []
+    task_updates: list[dict] = []
+    for t in tasks:
+        parent_ref = t.pop("parent_ref")
+        row = {
+            **t,
+            "id": gouti_to_local_id[t["code"]],
+            "parent_id": gouti_to_local_id.get(parent_ref) if parent_ref else None,
+        }
+        if t["code"] in existing_tasks:
+            task_updates.append(row)
         else:
-            task = ProjectTask(
-                project_id=local_project_id,
-                parent_id=parent_id,
-                code=code,
-                title=title,
-                description=description,
-                status=status,
-                progress=progress,
-                estimated_hours=workload,
-                actual_hours=actual_workload,
-                start_date=start_date,
-                due_date=end_date,
-                order=order_val,
+            task_inserts.append({**row, "project_id": local_project_id})
+    if task_inserts:
+        await db.execute(insert(ProjectTask), task_inserts)
+    if task_updates:
+        await db.execute(update(ProjectTask), task_updates)
+
+    if milestones:
+        existing_ms: dict[str, UUID] = {}
+        for name, ms_id in (await db.execute(
+            select(ProjectMilestone.name, ProjectMilestone.id).where(
+                ProjectMilestone.project_id == local_project_id,
+                ProjectMilestone.name.in_([m["name"] for m in milestones]),
             )
-            db.add(task)
-            # Flush so task.id is populated and children can reference it
-            await db.flush()
-            gouti_to_local_id[tid] = task.id
-        touched += 1
+        )).all():
+            existing_ms.setdefault(name, ms_id)
+        ms_updates = [{**m, "id": existing_ms[m["name"]]} for m in milestones if m["name"] in existing_ms]
+        ms_inserts = [
+            {**m, "project_id": local_project_id}
+            for m in {m["name"]: m for m in milestones if m["name"] not in existing_ms}.values()
+        ]
+        if ms_inserts:
+            await db.execute(insert(ProjectMilestone), ms_inserts)
+        if ms_updates:
+            await db.execute(update(ProjectMilestone), ms_updates)
+
+    return len(tasks) + len(milestones)
+
+
+async def _import_project_tasks(
+    db: AsyncSession,
+    entity_id: UUID,
+    local_project_id: UUID,
+    gouti_project_id: str,
+    connector,
+    task_selection: dict,
+    current_user_id: UUID,
+) -> int:
+    """Fetch and import tasks for one project preserving Gouti's hierarchy."""
+    if str(task_selection.get("mode") or "all").lower() == "none":
+        return 0
+    try:
+        raw_tasks = await connector.get_project_tasks(gouti_project_id)
+    except Exception as exc:
+        logger.warning("Gouti tasks fetch failed for %s: %s", gouti_project_id, exc)
+        return 0
+    return await _apply_project_tasks(db, local_project_id, raw_tasks, task_selection)
+
+
+# ── Sync engine ───────────────────────────────────────────────────────────
+
+
+async def _load_sync_hashes(db: AsyncSession, entity_id: UUID) -> dict[str, str]:
+    result = await db.execute(
+        select(Setting).where(
+            Setting.key == SYNC_HASHES_KEY,
+            Setting.scope == "entity",
+            Setting.scope_id == str(entity_id),
+        )
+    )
+    row = result.scalar_one_or_none()
+    return dict(row.value) if row and isinstance(row.value, dict) else {}
+
+
+async def _save_sync_hashes(db: AsyncSession, entity_id: UUID, hashes: dict[str, str]) -> None:
+    result = await db.execute(
+        select(Setting).where(
+            Setting.key == SYNC_HASHES_KEY,
+            Setting.scope == "entity",
+            Setting.scope_id == str(entity_id),
+        )
+    )
+    existing = result.scalar_one_or_none()
+    if existing:
+        existing.value = dict(hashes)
+    else:
+        db.add(Setting(key=SYNC_HASHES_KEY, value=dict(hashes), scope="entity", scope_id=str(entity_id)))
+
+
+async def _bulk_upsert_projects(
+    db: AsyncSession, entity_id: UUID, rows: list[dict],
+) -> dict[str, UUID]:
+    """INSERT … ON CONFLICT (entity_id, external_ref) for Gouti projects.
+
+    Returns ``external_ref -> local project id``. Relies on the partial
+    unique index ``uq_projects_entity_gouti_ref``.
+    """
+    stmt = pg_insert(Project)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Project.entity_id, Project.external_ref],
+        # Literal predicate: PostgreSQL must prove it implies the index's.
+        index_where=text("external_ref LIKE 'gouti:%'"),
+        set_={
+            **{field: getattr(stmt.excluded, field) for field in _PROJECT_SYNC_FIELDS},
+            "updated_at": sqla_func.now(),
+        },
+    ).returning(Project.external_ref, Project.id)
+    result = await db.execute(
+        stmt, [{"id": uuid4(), "entity_id": entity_id, **row} for row in rows],
+    )
+    return {ref: project_id for ref, project_id in result.all()}
+
+
+async def _publish_progress(entity_id: UUID, snapshot: dict) -> None:
+    """Best-effort progress snapshot in Redis for GET /gouti/sync/progress."""
+    try:
+        from app.core.redis_client import get_redis
+
+        await get_redis().set(
+            f"{SYNC_PROGRESS_KEY}:{entity_id}", json.dumps(snapshot), ex=SYNC_PROGRESS_TTL_SECONDS,
+        )
+    except Exception:
+        logger.debug("Gouti sync progress not published", exc_info=True)
+
+
+async def _sync_gouti_projects(
+    db: AsyncSession,
+    entity_id: UUID,
+    connector: GoutiConnector,
+    gouti_projects: list[dict],
+    *,
+    task_selections: dict[str, dict] | None = None,
+    force: bool = False,
+) -> SyncResult:
+    """Apply a list of Gouti projects (and their tasks) to the local tables.
+
+    - Task lists of projects whose selection imports tasks are fetched in
+      parallel through the connector's pooled client.
+    - Each project gets a content hash of its Gouti record, task list and
+      task selection; projects whose hash matches the last applied one
+      (``integration.gouti.sync_hashes``) are skipped unless ``force``.
+    - Changed projects are applied ``SYNC_APPLY_BATCH_SIZE`` at a time:
+      one INSERT … ON CONFLICT for the projects, set-based task upserts,
+      then a commit — so a failing batch only loses that batch.
+    - Progress and throughput are logged and published after each batch.
+
+    ``task_selections`` maps gouti_id → task selection; projects without
+    an entry import no tasks.
+    """
+    task_selections = task_selections or {}
+    errors: list[str] = []
+    projects: dict[str, dict] = {}
+    for gp in gouti_projects:
+        gid = _gouti_project_id(gp)
+        if not gid:
+            errors.append("Erreur projet Gouti ?: Projet Gouti sans identifiant")
+            continue
+        projects.setdefault(gid, gp)
+
+    progress = SyncProgress(total=len(projects), failed=len(errors))
+    hashes = await _load_sync_hashes(db, entity_id)
+    refs = [_make_external_ref(gid) for gid in projects]
+    existing_refs = set((await db.execute(
+        select(Project.external_ref).where(
+            Project.entity_id == entity_id,
+            Project.external_ref.in_(refs),
+        )
+    )).scalars().all()) if refs else set()
 
-    return touched
+    created = 0
+    updated = 0
+    batch: list[tuple[str, dict, list[dict] | None, str]] = []
+
+    async def apply_batch() -> None:
+        nonlocal created, updated
+        if not batch:
+            return
+        items = list(batch)
+        batch.clear()
+        try:
+            rows = []
+            for gid, gp, _tasks, _digest in items:
+                _gid, values = _project_values(gp)
+                rows.append(values)
+            local_ids = await _bulk_upsert_projects(db, entity_id, rows)
+            # Bookkeeping is staged and only merged once the commit succeeds,
+            # so a failed batch is neither counted nor hashed as applied.
+            batch_hashes: dict[str, str] = {}
+            new_refs: set[str] = set()
+            task_count = 0
+            for gid, _gp, tasks, digest in items:
+                ref = _make_external_ref(gid)
+                if tasks is not None:
+                    task_count += await _apply_project_tasks(
+                        db, local_ids[ref], tasks, task_selections.get(gid) or {"mode": "none"},
+                    )
+                if digest:
+                    batch_hashes[gid] = digest
+                if ref not in existing_refs:
+                    new_refs.add(ref)
+            await _save_sync_hashes(db, entity_id, {**hashes, **batch_hashes})
+            await db.commit()
+            hashes.update(batch_hashes)
+            existing_refs.update(new_refs)
+            created += len(new_refs)
+            updated += len(items) - len(new_refs)
+            progress.tasks += task_count
+            progress.applied += len(items)
+        except Exception as exc:
+            await db.rollback()
+            logger.warning("Gouti sync — batch of %d projects failed: %s", len(items), exc)
+            errors.extend(f"Erreur projet Gouti {gid}: {str(exc)[:200]}" for gid, *_ in items)
+            progress.failed += len(items)
+        snapshot = progress.snapshot(connector.request_count)
+        logger.info(
+            "Gouti sync progress — entity=%s %d/%d (applied=%d skipped=%d failed=%d) %.1f projects/s",
+            entity_id, progress.done, progress.total, progress.applied, progress.skipped,
+            progress.failed, snapshot["projects_per_second"],
+        )
+        await _publish_progress(entity_id, snapshot)
+
+    async def consider(gid: str, tasks: list[dict] | Exception | None) -> None:
+        gp = projects[gid]
+        selection = task_selections.get(gid) or {"mode": "none"}
+        digest = ""
+        if isinstance(tasks, Exception):
+            # Keep the project update, retry the tasks next run (no hash).
+            errors.append(f"Tâches {gid}: {str(tasks)[:200]}")
+            tasks = None
+        else:
+            digest = content_hash(gp, tasks, selection)
+            if (
+                not force
+                and hashes.get(gid) == digest
+                and _make_external_ref(gid) in existing_refs
+            ):
+                progress.skipped += 1
+                return
+        batch.append((gid, gp, tasks, digest))
+        if len(batch) >= SYNC_APPLY_BATCH_SIZE:
+            await apply_batch()
+
+    with_tasks = [
+        gid for gid in projects
+        if str((task_selections.get(gid) or {}).get("mode") or "none").lower() != "none"
+    ]
+    wanted = set(with_tasks)
+    for gid in projects:
+        if gid not in wanted:
+            await consider(gid, None)
+    async for gid, tasks in connector.iter_project_tasks(with_tasks):
+        progress.fetched += 1
+        await consider(gid, tasks)
+    await apply_batch()
+    if not progress.applied and progress.skipped:
+        await _publish_progress(entity_id, progress.snapshot(connector.request_count))
+
+    snapshot = progress.snapshot(connector.request_count)
+    return SyncResult(
+        synced=created + updated,
+        created=created,
+        updated=updated,
+        skipped=progress.skipped,
+        tasks_synced=progress.tasks,
+        errors=errors,
+        duration_ms=snapshot["elapsed_ms"],
+        projects_per_second=snapshot["projects_per_second"],
+        requests=snapshot["requests"],
+    )
 
 
 @router.post("/sync-selected", response_model=SyncResult)
 async def sync_selected(
+    force: bool = False,
     entity_id: UUID = Depends(get_current_entity),
     current_user: User = Depends(get_current_user),
     _: None = require_permission("core.integrations.manage"),
@@ -1332,6 +1608,9 @@ async def sync_selected(
       - Its ``tasks.mode`` drives task import: "all" fetches & upserts
         every Gouti task, "some" only the task_ids listed, "none" skips
         task import for that project.
+
+    Task lists are fetched in parallel; projects unchanged since the last
+    sync are skipped unless ``force`` is set.
     """
     selection = await _load_selection(db, entity_id)
     if not selection or not selection.get("projects"):
@@ -1342,63 +1621,38 @@ async def sync_selected(
         )
 
     gouti_settings = await _get_gouti_settings(db, entity_id)
-    connector = _build_connector(gouti_settings)
-    all_projects = await connector.get_projects()
-
     selection_projects = selection.get("projects") or {}
-    selected_ids = {
-        str(gid) for gid, entry in selection_projects.items()
+    selected = {
+        str(gid): (entry.get("tasks") or {"mode": "all", "task_ids": []})
+        for gid, entry in selection_projects.items()
         if isinstance(entry, dict) and entry.get("include", True)
     }
-    to_import = [
-        gp for gp in all_projects
-        if str(gp.get("_id") or gp.get("Ref") or "") in selected_ids
-    ]
-
-    created = 0
-    updated = 0
-    tasks_touched = 0
-    errors: list[str] = []
-    for gp in to_import:
+    async with _build_connector(gouti_settings) as connector:
+        all_projects = await connector.get_projects()
+        to_import = [
+            gp for gp in all_projects
+            if str(gp.get("_id") or gp.get("Ref") or "") in selected
+        ]
         try:
-            local_project, action = await _upsert_project_from_gouti(db, entity_id, gp)
-            if action == "created":
-                created += 1
-            else:
-                updated += 1
-
-            # Flush so local_project has an id for task FK
-            await db.flush()
-
-            gid = str(gp.get("_id") or gp.get("Ref") or "")
-            entry = selection_projects.get(gid) or {}
-            task_sel = entry.get("tasks") or {"mode": "all", "task_ids": []}
-            try:
-                tasks_touched += await _import_project_tasks(
-                    db, entity_id, local_project.id, gid, connector, task_sel, current_user.id,
-                )
-            except Exception as exc:
-                errors.append(f"Tâches {gid}: {str(exc)[:200]}")
+            result = await _sync_gouti_projects(
+                db, entity_id, connector, to_import, task_selections=selected, force=force,
+            )
         except Exception as exc:
-            gid = gp.get("_id") or gp.get("Ref") or "?"
-            errors.append(f"Erreur projet {gid}: {str(exc)[:200]}")
-
-    try:
-        await db.commit()
-    except Exception as exc:
-        await db.rollback()
-        raise HTTPException(500, f"Erreur sauvegarde: {str(exc)[:300]}")
+            await db.rollback()
+            raise HTTPException(500, f"Erreur sauvegarde: {str(exc)[:300]}")
 
     now_iso = datetime.now(timezone.utc).isoformat()
     await _save_setting(db, entity_id, f"{GOUTI_SETTINGS_PREFIX}.last_sync_at", now_iso)
-    await _save_setting(db, entity_id, f"{GOUTI_SETTINGS_PREFIX}.last_sync_count", str(created + updated))
+    await _save_setting(db, entity_id, f"{GOUTI_SETTINGS_PREFIX}.last_sync_count", str(result.synced))
     await db.commit()
 
     logger.info(
-        "Gouti sync-selected: projects created=%d updated=%d tasks=%d errors=%d (user=%s)",
-        created, updated, tasks_touched, len(errors), current_user.id,
+        "Gouti sync-selected: projects created=%d updated=%d skipped=%d tasks=%d errors=%d "
+        "in %.0f ms, %d requests (user=%s)",
+        result.created, result.updated, result.skipped, result.tasks_synced, len(result.errors),
+        result.duration_ms, result.requests, current_user.id,
     )
-    return SyncResult(synced=created + updated, created=created, updated=updated, errors=errors)
+    return result
 
 
 @router.get("/debug/raw-tasks/{gouti_project_id}")
@@ -1452,8 +1706,8 @@ async def debug_raw_projects(
     alongside the first 3 keys/items so we can see exactly what shape and
     field names Gouti returns for this entity."""
     gouti_settings = await _get_gouti_settings(db, entity_id)
-    connector = _build_connector(gouti_settings)
-    raw = await connector.get_raw_projects_response()
+    async with _build_connector(gouti_settings) as connector:
+        raw = await connector.get_raw_projects_response()
     # Also do a parsed extract to show the first item's full keys
     import httpx
     base = gouti_settings.get("base_url", "https://apiprd.gouti.net/v1/client").rstrip("/")
@@ -1502,8 +1756,17 @@ async def sync_single_project(
     (appended as a summary section).
     """
     gouti_settings = await _get_gouti_settings(db, entity_id)
-    connector = _build_connector(gouti_settings)
+    async with _build_connector(gouti_settings) as connector:
+        return await _sync_single_project(db, entity_id, project_id, connector, current_user)
+
 
+async def _sync_single_project(
+    db: AsyncSession,
+    entity_id: UUID,
+    project_id: str,
+    connector: GoutiConnector,
+    current_user: User,
+) -> SingleProjectSyncResult:
     errors: list[str] = []
 
     # Fetch the single project from Gouti
@@ -1524,6 +1787,8 @@ async def sync_single_project(
             status_code=422,
             detail=f"Erreur lors du mapping du projet Gouti : {str(exc)[:300]}",
         )
+    # Flush so a newly created project has an id for the task FK
+    await db.flush()
 
     # Fetch and attach reports
     reports_synced = 0
@@ -567,7 +567,12 @@ async def delete_imputation_assignment(
 from datetime import date as _date
 from pydantic import BaseModel, Field
 from app.models.common import CurrencyRate
-from app.services.core.currency_service import convert as _convert_currency, RateNotFoundError
+from app.services.core.currency_service import (
+    RateNotFoundError,
+    convert as _convert_currency,
+    convert_many as _convert_many,
+    invalidate_rate_table as _invalidate_rate_table,
+)
 
 
 class CurrencyRateCreate(BaseModel):
@@ -579,6 +584,17 @@ class CurrencyRateCreate(BaseModel):
     notes: str | None = None
 
 
+class CurrencyConvertLine(BaseModel):
+    amount: float
+    currency: str = Field(..., min_length=3, max_length=10)
+    on_date: _date
+
+
+class CurrencyConvertBatch(BaseModel):
+    to_currency: str = Field(..., min_length=3, max_length=10)
+    lines: list[CurrencyConvertLine] = Field(..., max_length=10000)
+
+
 class CurrencyRateRead(BaseModel):
     id: UUID
     entity_id: UUID
@@ -625,6 +641,7 @@ async def create_currency_rate(
         await db.rollback()
         raise HTTPException(status_code=409, detail=f"Rate already exists for that date: {e}")
     await db.refresh(obj)
+    await _invalidate_rate_table(entity_id)
     return obj
 
 
@@ -644,6 +661,7 @@ async def delete_currency_rate(
         raise HTTPException(status_code=404, detail="Currency rate not found")
     await db.delete(obj)
     await db.commit()
+    await _invalidate_rate_table(entity_id)
     return None
 
 
@@ -669,3 +687,39 @@ async def convert_currency(
         "on_date": on_date.isoformat(),
         "converted": converted,
     }
+
+
+@router.post("/currency-rates/convert-batch")
+async def convert_currency_batch(
+    body: CurrencyConvertBatch,
+    entity_id: UUID = Depends(get_current_entity),
+    _: None = require_permission("imputation.read"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Convert many amounts, each at its own date, in one call.
+
+    Lines without an applicable rate come back with ``converted: null``.
+    """
+    converted = await _convert_many(
+        db,
+        entity_id,
+        [line.amount for line in body.lines],
+        [line.currency for line in body.lines],
+        [line.on_date for line in body.lines],
+        body.to_currency,
+        strict=False,
+    )
+    return {
+        "to_currency": body.to_currency,
+        "lines": [
+            {
+                "amount": line.amount,
+                "currency": line.currency,
+                "on_date": line.on_date.isoformat(),
+                "converted": value,
+            }
+            for line, value in zip(body.lines, converted)
+        ],
+        "total": sum(v for v in converted if v is not None),
+        "missing_rates": sum(1 for v in converted if v is None),
+    }
@@ -41,6 +41,7 @@ from app.models.common import (
     User,
 )
 from app.models.asset_registry import OilField, OilSite
+from app.services.modules.asset_hierarchy_service import invalidate_asset_hierarchy
 
 logger = logging.getLogger(__name__)
 
@@ -90,6 +91,8 @@ SCOPES: dict[str, dict[str, Any]] = {
             "DELETE FROM ticket_todos WHERE ticket_id IN (SELECT id FROM support_tickets WHERE entity_id = :entity_id)",
             "DELETE FROM ticket_comments WHERE ticket_id IN (SELECT id FROM support_tickets WHERE entity_id = :entity_id)",
             "DELETE FROM support_tickets WHERE entity_id = :entity_id",
+            # Raw deletes skip the mapper events that maintain the counters.
+            "DELETE FROM support_ticket_counters WHERE entity_id = :entity_id",
         ],
         "count_table": "support_tickets",
     },
@@ -648,7 +651,8 @@ async def generate_demo(
 
     # ── 5. Users (test accounts inside the entity) ────────────────────────
     if counts.users > 0:
-        from app.core.security import hash_password
+        from app.core.password_hashing import hash_password
+        demo_hash = await hash_password(f"Demo{suffix}!2026")
         for idx in range(counts.users):
             first = random.choice(_DEMO_FIRST_NAMES)
             last = random.choice(_DEMO_LAST_NAMES)
@@ -660,7 +664,7 @@ async def generate_demo(
                 email=email,
                 first_name=first,
                 last_name=last,
-                hashed_password=hash_password(f"Demo{suffix}!2026"),
+                hashed_password=demo_hash,
                 default_entity_id=entity_id,
                 language="fr",
                 active=True,
@@ -679,6 +683,8 @@ async def generate_demo(
         details={"counts": counts.model_dump(), "suffix": suffix, "generated": generated},
     )
     await db.commit()
+    if counts.sites > 0:
+        await invalidate_asset_hierarchy(entity_id)
 
     logger.info(
         "Demo data generated for entity %s by user %s — suffix=%s counts=%s",
@@ -780,6 +786,8 @@ async def reset_tenant(
             code="MAINTENANCE_RESET_FAILED",
             message="La réinitialisation a échoué — aucune donnée n'a été supprimée (rollback).",
         )
+    if "assets" in run_list:
+        await invalidate_asset_hierarchy(entity_id)
 
     # Final audit (best-effort — if the audit_log scope ran, this is the
     # first row of the new clean trail).
@@ -14,7 +14,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.deps import get_current_user
 from app.core.audit import record_audit
 from app.core.database import get_db
-from app.core.security import verify_password
+from app.core.password_hashing import verify_password
 from app.models.common import MFATrustedDevice, User
 
 router = APIRouter(prefix="/api/v1/mfa", tags=["mfa"])
@@ -267,7 +267,7 @@ async def mfa_disable(
             detail="L'authentification à deux facteurs n'est pas activée.",
         )
 
-    if not current_user.hashed_password or not verify_password(
+    if not current_user.hashed_password or not await verify_password(
         body.password, current_user.hashed_password
     ):
         raise HTTPException(
@@ -439,7 +439,7 @@ async def mfa_regenerate_codes(
             detail="L'authentification à deux facteurs n'est pas activée.",
         )
 
-    if not current_user.hashed_password or not verify_password(
+    if not current_user.hashed_password or not await verify_password(
         body.password, current_user.hashed_password
     ):
         raise HTTPException(
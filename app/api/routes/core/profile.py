@@ -12,7 +12,7 @@ from app.api.deps import get_current_entity, get_current_user
 from app.core.audit import record_audit
 from app.core.config import settings
 from app.core.database import get_db
-from app.core.security import hash_password, verify_password
+from app.core.password_hashing import hash_password, verify_password
 from app.models.common import User
 from app.schemas.common import ChangePasswordRequest, ProfileUpdate, UserRead
 
@@ -89,13 +89,13 @@ async def change_password(
             detail="Account does not have a password set",
         )
 
-    if not verify_password(body.current_password, current_user.hashed_password):
+    if not await verify_password(body.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect",
         )
 
-    current_user.hashed_password = hash_password(body.new_password)
+    current_user.hashed_password = await hash_password(body.new_password)
     await db.commit()
 
     await record_audit(
@@ -1,4 +1,4 @@
-"""RBAC PDF export routes — 10 endpoints + async polling.
+"""RBAC PDF export routes — 10 endpoints + async polling, plus an XLSX user matrix.
 
 All endpoints:
 - Require permission `core.rbac.export` (or `core.user.audit_export` for user-related)
@@ -24,12 +24,14 @@ Two distinct hashes are computed:
 import hashlib
 import io
 import json
+import os
+import tempfile
 from datetime import datetime, timezone
 from typing import Awaitable, Callable
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query, Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_entity, get_current_user, require_permission
@@ -48,6 +50,7 @@ from app.services.core.rbac_export_service import (
     build_role_modules_variables,
     build_sod_matrix_variables,
     build_user_detail_variables,
+    write_matrix_user_permissions_xlsx,
 )
 
 router = APIRouter(prefix="/api/v1/rbac/exports", tags=["rbac-export"])
@@ -273,6 +276,96 @@ async def export_matrix_user_permissions(
     )
 
 
+# 3b. Matrix Users × Permissions as XLSX (sensitive RGPD)
+#
+# Resolved in bulk and written row by row in constant memory, so it has no
+# async threshold: the file is built on disk and streamed back from there.
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@router.get("/matrix/user-permissions.xlsx")
+async def export_matrix_user_permissions_xlsx(
+    request: Request,
+    lang: str = Query("fr", regex=r"^(fr|en)$"),
+    user_id: list[UUID] | None = Query(None),
+    role_code: str | None = Query(None),
+    current_user: User = Depends(get_current_user),
+    entity_id: UUID = Depends(get_current_entity),
+    _: None = require_permission("core.user.audit_export"),
+    db: AsyncSession = Depends(get_db),
+):
+    from starlette.background import BackgroundTask
+
+    from app.core.storage_service import run_blocking
+
+    start = datetime.now(timezone.utc)
+    audit = RbacAuditEvent(
+        tenant_id=entity_id,
+        event_type="export.matrix_user",
+        target="matrix_user_permissions",
+        params={
+            "lang": lang, "format": "xlsx",
+            "user_ids": [str(u) for u in (user_id or [])], "role_code": role_code,
+        },
+        actor_user_id=current_user.id,
+        client_ip=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent"),
+        status="pending",
+    )
+    db.add(audit)
+    await db.flush()
+
+    fd, path = tempfile.mkstemp(prefix="rbac_matrix_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        summary = await write_matrix_user_permissions_xlsx(
+            db, entity_id, current_user, lang, path,
+            user_ids=user_id, role_code=role_code, audit_event_id=str(audit.id),
+        )
+        file_hash = await run_blocking(_sha256_file, path)
+    except Exception as e:
+        os.unlink(path)
+        audit.status = "failure"
+        audit.error_code = "BUILDER_FAILED"
+        audit.error_detail = str(e)[:1000]
+        audit.completed_at = datetime.now(timezone.utc)
+        await db.commit()
+        raise
+
+    audit.file_hash_sha256 = file_hash
+    audit.status = "success"
+    audit.completed_at = datetime.now(timezone.utc)
+    audit.duration_ms = int((audit.completed_at - start).total_seconds() * 1000)
+    audit.result_summary = {
+        "size_bytes": os.path.getsize(path),
+        "data_hash_sha256": summary["data_hash"],
+        "users": summary["users"],
+        "grants": summary["grants"],
+    }
+    await db.commit()
+
+    return FileResponse(
+        path,
+        media_type=XLSX_MEDIA_TYPE,
+        filename=f"rbac_matrix_user_permissions_{_date_suffix()}.xlsx",
+        headers={
+            "X-Audit-Event-Id": str(audit.id),
+            "X-Content-Hash": file_hash,
+            "X-Data-Hash": summary["data_hash"],
+        },
+        background=BackgroundTask(os.unlink, path),
+    )
+
+
 # 4. Role detail
 
 @router.get("/role/{role_code}.pdf")
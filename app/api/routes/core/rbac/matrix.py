@@ -51,3 +51,38 @@ async def matrix_sod_json(
     db: AsyncSession = Depends(get_db),
 ):
     return await build_sod_matrix_variables(db, entity_id, current_user, lang="fr")
+
+
+@router.get("/permission-holders")
+async def permission_holders_json(
+    code: str = Query(..., min_length=1),
+    current_user: User = Depends(get_current_user),
+    entity_id: UUID = Depends(get_current_entity),
+    _: None = require_permission("core.rbac.read"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Who has permission `code` in the current entity, with the granting layer."""
+    from sqlalchemy import select
+
+    from app.core.rbac import get_permission_holders
+
+    holders = await get_permission_holders(entity_id, code, db)
+    users = {}
+    if holders:
+        rows = await db.execute(
+            select(User.id, User.first_name, User.last_name, User.email).where(User.id.in_(holders))
+        )
+        users = {row.id: row for row in rows.all()}
+    return {
+        "permission_code": code,
+        "holders": [
+            {
+                "user_id": str(uid),
+                "full_name": f"{users[uid].first_name} {users[uid].last_name}",
+                "email": users[uid].email,
+                "source": source,
+            }
+            for uid, source in holders.items()
+            if uid in users
+        ],
+    }
@@ -10,6 +10,7 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime, timezone
+from uuid import UUID
 
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
@@ -18,13 +19,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, get_current_user, require_permission
 from app.core.audit import record_audit
-from app.core.security import hash_password
-from app.models.common import User, Setting, UserGroup, UserGroupMember
+from app.models.common import User, Setting
 from app.services.connectors.user_sync_service import (
+    PROVIDER_REF_PREFIX,
     PROVIDER_REGISTRY,
     PROVIDER_SETTINGS_PREFIX,
     get_provider,
 )
+from app.services.core.user_sync_engine import UserSyncOptions, existing_emails, run_user_sync
 from app.core.errors import StructuredHTTPException
 
 logger = logging.getLogger(__name__)
@@ -77,6 +79,8 @@ class ExecuteRequest(BaseModel):
     group_mapping: list[GroupMappingEntry] = []
     duplicate_strategy: str = "skip"  # skip | update
     default_password: str = "Changeme123!"  # temporary password
+    # Deactivate accounts of this provider that are no longer in the directory
+    deactivate_missing: bool = False
 
 
 class ExecuteResponse(BaseModel):
@@ -84,6 +88,13 @@ class ExecuteResponse(BaseModel):
     updated: int
     skipped: int
     errors: list[str]
+    deactivated: int = 0
+    memberships_added: int = 0
+    memberships_removed: int = 0
+    # > 0 when this run picked up an interrupted one at that chunk
+    resumed_from_chunk: int = 0
+    # False when a chunk failed; re-running the same request resumes there
+    completed: bool = True
 
 
 # ── Helper: read provider settings from DB ────────────────────
@@ -156,16 +167,15 @@ async def preview_sync(
     # Fetch from external system
     ext_users = await provider.fetch_users()
 
-    # Check which emails already exist in DB
-    existing_emails_result = await db.execute(select(User.email))
-    existing_emails = {row[0].lower() for row in existing_emails_result}
+    # Check which of the fetched emails already exist in DB
+    known = await existing_emails(db, [u.email for u in ext_users])
 
     preview_users: list[PreviewUser] = []
     new_count = 0
     existing_count = 0
 
     for u in ext_users:
-        exists = u.email.lower() in existing_emails
+        exists = u.email.lower() in known
         if exists:
             existing_count += 1
         else:
@@ -199,7 +209,7 @@ async def execute_sync(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Import selected users from external provider."""
+    """Import selected users from external provider (chunked, resumable)."""
     prefix = PROVIDER_SETTINGS_PREFIX.get(body.provider)
     if not prefix:
         from fastapi import HTTPException
@@ -218,77 +228,30 @@ async def execute_sync(
     # Fetch from external system
     ext_users = await provider.fetch_users()
 
-    # Filter to selected emails
-    selected = {e.lower() for e in body.selected_emails}
-    to_import = [u for u in ext_users if u.email.lower() in selected]
-
     # Build group mapping: source group name → target group id
-    group_map: dict[str, str] = {}
+    group_map: dict[str, UUID] = {}
     for gm in body.group_mapping:
-        if gm.target_group_id:
-            group_map[gm.source_group] = gm.target_group_id
-
-    created = 0
-    updated = 0
-    skipped = 0
-    errors: list[str] = []
-
-    for ext_user in to_import:
+        if not gm.target_group_id:
+            continue
         try:
-            # Check if user already exists
-            result = await db.execute(
-                select(User).where(User.email == ext_user.email)
-            )
-            existing = result.scalar_one_or_none()
-
-            if existing:
-                if body.duplicate_strategy == "skip":
-                    skipped += 1
-                    continue
-                elif body.duplicate_strategy == "update":
-                    existing.first_name = ext_user.first_name or existing.first_name
-                    existing.last_name = ext_user.last_name or existing.last_name
-                    existing.external_ref = ext_user.external_ref
-                    existing.active = ext_user.active
-                    updated += 1
-                else:
-                    skipped += 1
-                    continue
-            else:
-                # Create new user
-                new_user = User(
-                    email=ext_user.email,
-                    first_name=ext_user.first_name,
-                    last_name=ext_user.last_name,
-                    hashed_password=hash_password(body.default_password),
-                    active=ext_user.active,
-                    language="fr",
-                    external_ref=ext_user.external_ref,
-                )
-                db.add(new_user)
-                await db.flush()  # get new_user.id
-                created += 1
-
-                # Assign to groups
-                target_user = new_user
-                for src_group in ext_user.groups:
-                    target_group_id = group_map.get(src_group)
-                    if target_group_id:
-                        # Check group exists
-                        grp = await db.execute(
-                            select(UserGroup).where(UserGroup.id == target_group_id)
-                        )
-                        if grp.scalar_one_or_none():
-                            db.add(UserGroupMember(
-                                group_id=target_group_id,
-                                user_id=str(target_user.id),
-                            ))
-
-        except Exception as exc:
-            errors.append(f"{ext_user.email}: {exc}")
-            logger.warning("Failed to import user %s: %s", ext_user.email, exc)
+            group_map[gm.source_group] = UUID(gm.target_group_id)
+        except ValueError:
+            logger.warning("User sync: ignoring invalid group id %r", gm.target_group_id)
 
-    await db.commit()
+    result = await run_user_sync(
+        db,
+        provider_id=body.provider,
+        settings_prefix=prefix,
+        ref_prefix=PROVIDER_REF_PREFIX.get(body.provider, body.provider),
+        directory=ext_users,
+        selected_emails=set(body.selected_emails),
+        options=UserSyncOptions(
+            default_password=body.default_password,
+            duplicate_strategy=body.duplicate_strategy,
+            group_map=group_map,
+            deactivate_missing=body.deactivate_missing,
+        ),
+    )
 
     # Record audit
     await record_audit(
@@ -299,10 +262,12 @@ async def execute_sync(
         user_id=str(current_user.id),
         details={
             "provider": body.provider,
-            "created": created,
-            "updated": updated,
-            "skipped": skipped,
-            "error_count": len(errors),
+            "created": result.created,
+            "updated": result.updated,
+            "skipped": result.skipped,
+            "deactivated": result.deactivated,
+            "completed": result.completed,
+            "error_count": len(result.errors),
         },
     )
 
@@ -319,8 +284,13 @@ async def execute_sync(
     await db.commit()
 
     return ExecuteResponse(
-        created=created,
-        updated=updated,
-        skipped=skipped,
-        errors=errors,
+        created=result.created,
+        updated=result.updated,
+        skipped=result.skipped,
+        errors=result.errors,
+        deactivated=result.deactivated,
+        memberships_added=result.memberships_added,
+        memberships_removed=result.memberships_removed,
+        resumed_from_chunk=result.resumed_from_chunk,
+        completed=result.completed,
     )
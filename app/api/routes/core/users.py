@@ -18,7 +18,7 @@ from app.api.deps import get_current_entity, get_current_user, require_permissio
 from app.core.database import get_db
 from app.core.pagination import PaginationParams, paginate
 from app.core.rbac import invalidate_rbac_cache
-from app.core.security import hash_password
+from app.core.password_hashing import hash_password
 from app.models.common import (
     Entity,
     Permission,
@@ -333,7 +333,7 @@ async def create_user(
             email=body.email,
             first_name=body.first_name,
             last_name=body.last_name,
-            hashed_password=hash_password(body.password) if body.password else None,
+            hashed_password=await hash_password(body.password) if body.password else None,
             default_entity_id=body.default_entity_id or entity_id,
             language=body.language,
         )
@@ -745,7 +745,7 @@ async def update_user(
     if "password" in update_data:
         new_password = update_data.pop("password")
         if new_password:
-            update_data["hashed_password"] = hash_password(new_password)
+            update_data["hashed_password"] = await hash_password(new_password)
             update_data["password_changed_at"] = datetime.now(UTC)
 
     # Identity lock: if identity is verified, changing identity fields requires conformite.verify
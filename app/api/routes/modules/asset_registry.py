@@ -8,7 +8,8 @@ from datetime import date, datetime, timezone
 from decimal import Decimal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import JSONResponse
 from sqlalchemy import select, func as sqla_func, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -74,6 +75,13 @@ from app.schemas.asset_registry import (
     AssetChangeLogRead,
 )
 from app.core.errors import StructuredHTTPException
+from app.services.modules.asset_hierarchy_service import (
+    equipment_patch,
+    get_asset_hierarchy,
+    invalidate_asset_hierarchy,
+    node_patch,
+    publish_asset_change,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -391,6 +399,7 @@ async def create_field(
     db.add(obj)
     await db.commit()
     await db.refresh(obj)
+    await publish_asset_change(entity_id, node_patch(obj))
     return obj
 
 
@@ -410,6 +419,7 @@ async def update_field(
     await _log_ar_changes(db, "ar_field", field_id, obj.code, old_data, updates, current_user.id, entity_id)
     await db.commit()
     await db.refresh(obj)
+    await publish_asset_change(entity_id, node_patch(obj))
     return obj
 
 
@@ -437,6 +447,7 @@ async def delete_field(
     obj.archived = True
     await _log_ar_changes(db, "ar_field", field_id, obj.code, {"archived": False}, {"archived": True}, current_user.id, entity_id, "archive")
     await db.commit()
+    await publish_asset_change(entity_id, node_patch(obj))
     return {"detail": "Field archived"}
 
 
@@ -586,6 +597,7 @@ async def create_site(
     db.add(obj)
     await db.commit()
     await db.refresh(obj)
+    await publish_asset_change(entity_id, node_patch(obj))
     return obj
 
 
@@ -610,6 +622,7 @@ async def update_site(
     await _log_ar_changes(db, "ar_site", site_id, obj.code, old_data, updates, current_user.id, entity_id)
     await db.commit()
     await db.refresh(obj)
+    await publish_asset_change(entity_id, node_patch(obj))
     return obj
 
 
@@ -637,6 +650,7 @@ async def delete_site(
     obj.archived = True
     await _log_ar_changes(db, "ar_site", site_id, obj.code, {"archived": False}, {"archived": True}, current_user.id, entity_id, "archive")
     await db.commit()
+    await publish_asset_change(entity_id, node_patch(obj))
     return {"detail": "Site archived"}
 
 
@@ -748,6 +762,7 @@ async def create_installation(
     db.add(obj)
     await db.commit()
     await db.refresh(obj)
+    await publish_asset_change(entity_id, node_patch(obj))
     return obj
 
 
@@ -776,6 +791,7 @@ async def update_installation(
     await _log_ar_changes(db, "ar_installation", installation_id, obj.code, old_data, updates, current_user.id, entity_id)
     await db.commit()
     await db.refresh(obj)
+    await publish_asset_change(entity_id, node_patch(obj))
 
     # ── Re-run Planner conflict detection for the whole asset ──
     # Lowering pob_capacity (or raising it back up) directly changes
@@ -832,6 +848,7 @@ async def delete_installation(
     obj.archived = True
     await _log_ar_changes(db, "ar_installation", installation_id, obj.code, {"archived": False}, {"archived": True}, current_user.id, entity_id, "archive")
     await db.commit()
+    await publish_asset_change(entity_id, node_patch(obj))
     return {"detail": "Installation archived"}
 
 
@@ -1103,6 +1120,7 @@ async def create_equipment(
     db.add(obj)
     await db.commit()
     await db.refresh(obj)
+    await publish_asset_change(entity_id, equipment_patch(None, obj.installation_id))
     return obj
 
 
@@ -1117,6 +1135,7 @@ async def update_equipment(
     obj = await _get_or_404(db, RegistryEquipment, equipment_id, entity_id, "Equipment")
     updates = body.model_dump(exclude_unset=True)
     old_data = _snapshot_fields(obj, list(updates.keys()))
+    counted_before = None if obj.archived else obj.installation_id
 
     # Validate parent change if installation_id is being updated
     if "installation_id" in updates and updates["installation_id"] is not None:
@@ -1127,6 +1146,9 @@ async def update_equipment(
     await _log_ar_changes(db, "ar_equipment", equipment_id, obj.tag_number, old_data, updates, current_user.id, entity_id)
     await db.commit()
     await db.refresh(obj)
+    await publish_asset_change(
+        entity_id, equipment_patch(counted_before, None if obj.archived else obj.installation_id),
+    )
     return obj
 
 
@@ -1138,9 +1160,11 @@ async def delete_equipment(
     db: AsyncSession = Depends(get_db),
 ):
     obj = await _get_or_404(db, RegistryEquipment, equipment_id, entity_id, "Equipment")
+    counted_before = None if obj.archived else obj.installation_id
     obj.archived = True
     await _log_ar_changes(db, "ar_equipment", equipment_id, obj.tag_number, {"archived": False}, {"archived": True}, current_user.id, entity_id, "archive")
     await db.commit()
+    await publish_asset_change(entity_id, equipment_patch(counted_before, None))
     return {"detail": "Equipment archived"}
 
 
@@ -1279,86 +1303,44 @@ async def delete_pipeline(
 
 @router.get("/hierarchy", dependencies=[require_permission("asset.asset.read")])
 async def get_hierarchy(
+    request: Request,
+    root_id: UUID | None = Query(None, description="Only the branch through this field/site/installation"),
     entity_id: UUID = Depends(get_current_entity),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Full hierarchy tree: fields -> sites -> installations with counts."""
-    # Fetch all active fields
-    fields_result = await db.execute(
-        select(OilField)
-        .where(OilField.entity_id == entity_id, OilField.archived == False)
-        .order_by(OilField.code)
-    )
-    fields = fields_result.scalars().all()
+    """Full hierarchy tree: fields -> sites -> installations with counts.
 
-    # Fetch all active sites
-    sites_result = await db.execute(
-        select(OilSite)
-        .where(OilSite.entity_id == entity_id, OilSite.archived == False)
-        .order_by(OilSite.code)
-    )
-    sites = sites_result.scalars().all()
+    Served from the cached per-entity hierarchy; honours If-None-Match.
+    """
+    hierarchy = await get_asset_hierarchy(db, entity_id)
+    # Without a shared version the ETag is a digest of the body itself.
+    body = hierarchy.render(root_id) if hierarchy.version is None else None
+    etag = hierarchy.etag(root_id, body)
+    headers = {"ETag": etag, "Cache-Control": "private, must-revalidate"}
+    inm = (request.headers.get("if-none-match") or "").strip()
+    if inm and inm == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=body if body is not None else hierarchy.render(root_id), headers=headers)
 
-    # Fetch all active installations
-    installations_result = await db.execute(
-        select(Installation)
-        .where(Installation.entity_id == entity_id, Installation.archived == False)
-        .order_by(Installation.code)
-    )
-    installations = installations_result.scalars().all()
 
-    # Equipment counts per installation
-    equip_counts_result = await db.execute(
-        select(
-            RegistryEquipment.installation_id,
-            sqla_func.count(RegistryEquipment.id).label("count"),
-        )
-        .where(
-            RegistryEquipment.entity_id == entity_id,
-            RegistryEquipment.archived == False,
+@router.get("/hierarchy/{asset_id}/ancestors", dependencies=[require_permission("asset.asset.read")])
+async def get_asset_ancestors(
+    asset_id: UUID,
+    entity_id: UUID = Depends(get_current_entity),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Ancestor chain of a field, site or installation (itself first)."""
+    hierarchy = await get_asset_hierarchy(db, entity_id)
+    if asset_id not in hierarchy:
+        raise StructuredHTTPException(
+            404,
+            code="NOT_FOUND",
+            message="{label} not found",
+            params={"label": "Asset"},
         )
-        .group_by(RegistryEquipment.installation_id)
-    )
-    equip_counts = {row.installation_id: row.count for row in equip_counts_result.all()}
-
-    # Build tree
-    installations_by_site: dict[UUID, list] = {}
-    for inst in installations:
-        installations_by_site.setdefault(inst.site_id, []).append({
-            "id": str(inst.id),
-            "code": inst.code,
-            "name": inst.name,
-            "installation_type": inst.installation_type,
-            "status": inst.status,
-            "equipment_count": equip_counts.get(inst.id, 0),
-        })
-
-    sites_by_field: dict[UUID, list] = {}
-    for site in sites:
-        sites_by_field.setdefault(site.field_id, []).append({
-            "id": str(site.id),
-            "code": site.code,
-            "name": site.name,
-            "site_type": site.site_type,
-            "status": site.status,
-            "installation_count": len(installations_by_site.get(site.id, [])),
-            "installations": installations_by_site.get(site.id, []),
-        })
-
-    tree = []
-    for field in fields:
-        tree.append({
-            "id": str(field.id),
-            "code": field.code,
-            "name": field.name,
-            "country": field.country,
-            "status": field.status,
-            "site_count": len(sites_by_field.get(field.id, [])),
-            "sites": sites_by_field.get(field.id, []),
-        })
-
-    return tree
+    return [str(a) for a in hierarchy.ancestors(asset_id)]
 
 
 @router.get("/stats", dependencies=[require_permission("asset.asset.read")])
@@ -2123,15 +2105,15 @@ async def kmz_preview(
             code="FILE_MUST_KMZ_ARCHIVE",
             message="File must be a .kmz archive",
         )
-    content = await file.read()
-    if len(content) > 100 * 1024 * 1024:
+    if (file.size or 0) > 100 * 1024 * 1024:
         raise StructuredHTTPException(
             400,
             code="KMZ_TOO_LARGE_MAX_100_MB",
             message="KMZ too large (max 100 MB)",
         )
     try:
-        preview = parse_kmz_preview(content)
+        # Streamed from the spooled upload — the KML is never held as a tree.
+        preview = parse_kmz_preview(file.file)
     except ValueError as exc:
         raise StructuredHTTPException(
             400,
@@ -2212,8 +2194,7 @@ async def kmz_import(
             code="FILE_MUST_KMZ_ARCHIVE",
             message="File must be a .kmz archive",
         )
-    content = await file.read()
-    if len(content) > 100 * 1024 * 1024:
+    if (file.size or 0) > 100 * 1024 * 1024:
         raise StructuredHTTPException(
             400,
             code="KMZ_TOO_LARGE_MAX_100_MB",
@@ -2225,7 +2206,7 @@ async def kmz_import(
             entity_id=entity_id,
             field_id=field_id,
             user_id=current_user.id,
-            kmz_bytes=content,
+            kmz_bytes=file.file,
             filename=file.filename,
         )
     except ValueError as exc:
@@ -2243,6 +2224,7 @@ async def kmz_import(
         ) from exc
 
     await db.commit()
+    await invalidate_asset_hierarchy(entity_id)
     return report.to_dict()
 
 
@@ -2303,6 +2285,7 @@ async def kmz_import_rollback(
 
     run.rolled_back_at = datetime.now(timezone.utc)
     await db.commit()
+    await invalidate_asset_hierarchy(entity_id)
     return {"detail": "Rollback completed", "soft_deleted": soft_deleted, "run_id": str(run.id)}
 
 
@@ -485,83 +485,22 @@ async def list_login_events(
 )
 async def login_event_stats(
     days: int = Query(7, ge=1, le=90),
+    exact: bool = Query(False, description="Recount raw events instead of the hourly rollups"),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get login event statistics for the admin dashboard."""
-    from datetime import timedelta
-
-    since = datetime.now(UTC) - timedelta(days=days)
-    base = select(LoginEvent).where(LoginEvent.created_at >= since)
-
-    # Total
-    total = (await db.execute(
-        select(func.count()).select_from(base.subquery())
-    )).scalar() or 0
-
-    # Successful
-    successful = (await db.execute(
-        select(func.count()).where(
-            LoginEvent.created_at >= since, LoginEvent.success == True
-        )
-    )).scalar() or 0
-
-    # Failed
-    failed = (await db.execute(
-        select(func.count()).where(
-            LoginEvent.created_at >= since, LoginEvent.success == False
-        )
-    )).scalar() or 0
-
-    # Blocked
-    blocked = (await db.execute(
-        select(func.count()).where(
-            LoginEvent.created_at >= since, LoginEvent.blocked == True
-        )
-    )).scalar() or 0
-
-    # Suspicious
-    suspicious = (await db.execute(
-        select(func.count()).where(
-            LoginEvent.created_at >= since, LoginEvent.suspicious == True
-        )
-    )).scalar() or 0
+    """Get login event statistics for the admin dashboard.
 
-    # Unique IPs
-    unique_ips = (await db.execute(
-        select(func.count(func.distinct(LoginEvent.ip_address))).where(
-            LoginEvent.created_at >= since
-        )
-    )).scalar() or 0
+    Served from the hourly rollups (``unique_ips`` is then an estimate);
+    ``exact=true`` recounts the raw events.
+    """
+    from datetime import timedelta
 
-    # Top failure reasons
-    reason_result = await db.execute(
-        select(
-            LoginEvent.failure_reason,
-            func.count().label("count"),
-        )
-        .where(
-            LoginEvent.created_at >= since,
-            LoginEvent.success == False,
-            LoginEvent.failure_reason.isnot(None),
-        )
-        .group_by(LoginEvent.failure_reason)
-        .order_by(func.count().desc())
-        .limit(10)
-    )
-    top_failure_reasons = [
-        {"reason": r[0], "count": r[1]} for r in reason_result.all()
-    ]
+    from app.services.core.stats_rollup import login_event_stats as compute_login_event_stats
 
-    return LoginEventStats(
-        total=total,
-        successful=successful,
-        failed=failed,
-        blocked=blocked,
-        suspicious=suspicious,
-        unique_ips=unique_ips,
-        top_failure_reasons=top_failure_reasons,
-        attempts_by_hour=[],  # Can be enriched later
-    )
+    now = datetime.now(UTC)
+    return LoginEventStats(**await compute_login_event_stats(
+        db, since=now - timedelta(days=days), now=now, exact=exact,
+    ))
 
 
 @router.get(
@@ -648,6 +648,28 @@ async def list_papyrus_versions(
     return await svc_list(doc_id=doc_id, entity_id=entity_id, db=db)
 
 
+@router.get(
+    "/{doc_id}/papyrus/versions/diff",
+    dependencies=[require_permission("papyrus.document.read")],
+    summary="Compare two Papyrus technical versions",
+)
+async def diff_papyrus_versions(
+    doc_id: UUID,
+    from_version: int = Query(..., ge=1),
+    to_version: int = Query(..., ge=1),
+    entity_id: UUID = Depends(get_current_entity),
+    db: AsyncSession = Depends(get_db),
+):
+    from app.services.modules.papyrus_document_service import diff_papyrus_versions as svc_diff
+    return await svc_diff(
+        doc_id=doc_id,
+        entity_id=entity_id,
+        db=db,
+        from_version=from_version,
+        to_version=to_version,
+    )
+
+
 @router.get(
     "/{doc_id}/papyrus/render",
     dependencies=[require_permission("papyrus.document.read")],
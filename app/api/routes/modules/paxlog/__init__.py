@@ -870,11 +870,11 @@ async def _apply_ads_planner_waitlist_if_needed(
             "remaining_capacity": remaining_capacity,
         }
 
-    from app.services.modules.paxlog_service import compute_pax_priority
+    from app.services.modules.paxlog_service import compute_pax_priorities
 
     for entry in candidate_entries:
         entry.status = "waitlisted"
-        await compute_pax_priority(db, entry.id)
+    await compute_pax_priorities(db, [entry.id for entry in candidate_entries])
 
     return {
         "waitlist_applied": True,
@@ -952,7 +952,7 @@ async def _apply_ads_site_waitlist_if_needed(
             "remaining_capacity": None,
         }
 
-    from app.services.modules.paxlog_service import compute_pax_priority
+    from app.services.modules.paxlog_service import compute_pax_priorities
     from app.services.modules.planner_service import get_effective_capacity
 
     candidate_entries = [
@@ -1022,7 +1022,7 @@ async def _apply_ads_site_waitlist_if_needed(
 
     for entry in candidate_entries:
         entry.status = "waitlisted"
-        await compute_pax_priority(db, entry.id)
+    await compute_pax_priorities(db, [entry.id for entry in candidate_entries])
 
     return {
         "waitlist_applied": True,
@@ -199,11 +199,47 @@ async def equipment_appearances_early(
     db: AsyncSession = Depends(get_db),
 ):
     """List PIDs where this equipment appears."""
-    from app.services.modules.pid_service import equipment_appearances as svc_app
+    from app.services.modules.pid_service import get_equipment_appearances as svc_app
 
     return await svc_app(eq_id=eq_id, entity_id=entity_id, db=db)
 
 
+@router.get(
+    "/equipment/{eq_id}/trace",
+    dependencies=[require_permission("pid.equipment.read")],
+    summary="Multi-hop upstream/downstream trace from equipment",
+)
+async def equipment_trace_early(
+    eq_id: str,
+    direction: str = Query("both"),
+    max_hops: Optional[int] = Query(None, ge=1, le=500),
+    entity_id: UUID = Depends(get_current_entity),
+    db: AsyncSession = Depends(get_db),
+):
+    """Walk the project connectivity graph from this equipment."""
+    from app.services.modules.pid_service import trace_equipment as svc_trace
+
+    return await svc_trace(
+        eq_id=eq_id, entity_id=entity_id, direction=direction, max_hops=max_hops, db=db,
+    )
+
+
+@router.get(
+    "/equipment/{eq_id}/isolation",
+    dependencies=[require_permission("pid.equipment.read")],
+    summary="Isolation points around equipment",
+)
+async def equipment_isolation_early(
+    eq_id: str,
+    entity_id: UUID = Depends(get_current_entity),
+    db: AsyncSession = Depends(get_db),
+):
+    """Nearest upstream and downstream isolation devices."""
+    from app.services.modules.pid_service import get_isolation_points as svc_isolation
+
+    return await svc_isolation(eq_id=eq_id, entity_id=entity_id, db=db)
+
+
 # ── Process Lines (before /{pid_id}) ─────────────────────────────────────────
 
 
@@ -260,9 +296,15 @@ async def trace_line_early(
     db: AsyncSession = Depends(get_db),
 ):
     """Trace a process line across multiple PID documents."""
-    from app.services.modules.pid_service import trace_line as svc_trace
+    from app.services.modules.pid_service import trace_process_line as svc_trace
 
-    return await svc_trace(line_number=body.get("line_number", ""), entity_id=entity_id, db=db)
+    return await svc_trace(
+        line_number=body.get("line_number", ""),
+        entity_id=entity_id,
+        project_id=body.get("project_id"),
+        max_hops=body.get("max_hops"),
+        db=db,
+    )
 
 
 @router.patch(
@@ -405,14 +447,33 @@ async def import_tags_early(
 
 @router.post("/tags/bulk-rename/preview", dependencies=[require_permission("pid.tag.update")], summary="Preview bulk rename")
 async def bulk_rename_preview_early(body: dict, entity_id: UUID = Depends(get_current_entity), db: AsyncSession = Depends(get_db)):
-    from app.services.modules.tag_service import bulk_rename_preview as svc
-    return await svc(entity_id=entity_id, find=body.get("find", ""), replace=body.get("replace", ""), db=db)
+    from app.services.modules.tag_service import preview_bulk_rename as svc
+    return await svc(
+        entity_id=entity_id, project_id=body.get("project_id", ""),
+        filter_area=body.get("filter_area"), filter_type=body.get("filter_type"),
+        filter_pattern=body.get("filter_pattern"), rename_pattern=body.get("rename_pattern", ""), db=db,
+    )
 
 
 @router.post("/tags/bulk-rename/execute", dependencies=[require_permission("pid.tag.update")], summary="Execute bulk rename")
-async def bulk_rename_execute_early(body: dict, entity_id: UUID = Depends(get_current_entity), db: AsyncSession = Depends(get_db)):
-    from app.services.modules.tag_service import bulk_rename_execute as svc
-    return await svc(entity_id=entity_id, find=body.get("find", ""), replace=body.get("replace", ""), db=db)
+async def bulk_rename_execute_early(
+    body: dict, entity_id: UUID = Depends(get_current_entity), current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    from app.services.modules.tag_service import execute_bulk_rename as svc
+    return await svc(
+        entity_id=entity_id, project_id=body.get("project_id", ""), renames=body.get("renames") or [],
+        user_id=current_user.id, allow_cycles=bool(body.get("allow_cycles")), db=db,
+    )
+
+
+@router.post("/tags/bulk-rename/{journal_id}/revert", dependencies=[require_permission("pid.tag.update")], summary="Revert bulk rename")
+async def bulk_rename_revert_early(
+    journal_id: UUID, entity_id: UUID = Depends(get_current_entity), current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    from app.services.modules.tag_service import revert_bulk_rename as svc
+    return await svc(entity_id=entity_id, journal_id=journal_id, user_id=current_user.id, db=db)
 
 
 # ── Naming Rules (before /{pid_id}) ──────────────────────────────────────────
@@ -1192,6 +1253,10 @@ async def sync_xml_to_db(
 
     await db.commit()
 
+    from app.services.modules.pid_graph_service import invalidate_project_graph
+
+    await invalidate_project_graph(entity_id, project_id)
+
     return {
         "status": "synced",
         "pid_id": pid_id,
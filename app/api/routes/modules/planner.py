@@ -2520,6 +2520,7 @@ async def _apply_accepted_revision_request(
                             "proposed_status": str(proposed_status) if proposed_status else None,
                             "resolved": False,
                         },
+                        buffered=True,
                     )
             else:
                 if proposed_start_date:
@@ -3604,6 +3605,10 @@ async def create_asset_capacity(
     asset.pob_capacity = max_pax_total
     await db.commit()
 
+    from app.services.modules.asset_hierarchy_service import node_patch, publish_asset_change
+
+    await publish_asset_change(entity_id, node_patch(asset))
+
     # Emit capacity changed event
     await event_bus.publish(OpsFluxEvent(
         event_type="planner.capacity.changed",
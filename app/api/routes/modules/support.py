@@ -128,25 +128,15 @@ async def _notify_ticket_event(
 
         if event == "created":
             # Notify every active user holding `support.ticket.manage` on this
-            # entity. Resolution is the same 3-layer RBAC used elsewhere; we
-            # iterate active users and filter — fine for realistic tenant
-            # sizes (admin groups are small).
-            from app.api.deps import has_user_permission
-            active_users = await db.execute(
-                select(User).where(User.active == True, User.id != actor_id)
-            )
+            # entity, looked up in the RBAC reverse index.
+            from app.core.rbac import users_with_permission
+            holder_ids = await users_with_permission(entity_id, "support.ticket.manage", db)
+            holder_ids.discard(actor_id)
             admin_ids: list[UUID] = []
-            for user in active_users.scalars().all():
-                try:
-                    if await has_user_permission(
-                        user, entity_id, "support.ticket.manage", db
-                    ):
-                        admin_ids.append(user.id)
-                except Exception:
-                    logger.debug(
-                        "Perm check failed for user %s on support.ticket.manage",
-                        user.id, exc_info=True,
-                    )
+            if holder_ids:
+                admin_ids = list((await db.execute(
+                    select(User.id).where(User.id.in_(holder_ids), User.active == True)
+                )).scalars().all())
             if admin_ids:
                 await send_in_app_bulk(
                     db, user_ids=admin_ids, entity_id=entity_id,
@@ -938,42 +928,18 @@ async def get_ticket_stats(
     entity_id: UUID = Depends(get_current_entity),
     current_user: User = Depends(get_current_user),
     _: None = require_permission("support.stats.read"),
+    exact: bool = Query(False, description="Recount tickets instead of the live counters"),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get ticket statistics for the entity."""
-    base = select(SupportTicket).where(
-        SupportTicket.entity_id == entity_id, SupportTicket.archived == False,
-    )
-
-    # Total
-    total = (await db.execute(select(func.count()).select_from(base.subquery()))).scalar() or 0
-
-    # By status
-    status_counts = {}
-    for st in ("open", "in_progress", "waiting_info", "resolved", "closed", "rejected"):
-        c = (await db.execute(
-            select(func.count()).where(
-                SupportTicket.entity_id == entity_id, SupportTicket.archived == False,
-                SupportTicket.status == st,
-            )
-        )).scalar() or 0
-        status_counts[st] = c
+    """Get ticket statistics for the entity.
 
-    # By type
-    type_result = await db.execute(
-        select(SupportTicket.ticket_type, func.count())
-        .where(SupportTicket.entity_id == entity_id, SupportTicket.archived == False)
-        .group_by(SupportTicket.ticket_type)
-    )
-    by_type = {r[0]: r[1] for r in type_result.all()}
+    Counts come from ``support_ticket_counters``; ``exact=true`` recounts
+    the tickets.
+    """
+    from app.services.core.stats_rollup import ticket_counts
 
-    # By priority
-    prio_result = await db.execute(
-        select(SupportTicket.priority, func.count())
-        .where(SupportTicket.entity_id == entity_id, SupportTicket.archived == False)
-        .group_by(SupportTicket.priority)
-    )
-    by_priority = {r[0]: r[1] for r in prio_result.all()}
+    counts = await ticket_counts(db, entity_id, exact=exact)
+    status_counts = counts["by_status"]
 
     # Avg resolution time
     avg_result = await db.execute(
@@ -996,13 +962,13 @@ async def get_ticket_stats(
     )).scalar() or 0
 
     return TicketStats(
-        total=total,
+        total=counts["total"],
         open=status_counts.get("open", 0),
         in_progress=status_counts.get("in_progress", 0),
         resolved=status_counts.get("resolved", 0),
         closed=status_counts.get("closed", 0),
-        by_type=by_type,
-        by_priority=by_priority,
+        by_type=counts["by_type"],
+        by_priority=counts["by_priority"],
         avg_resolution_hours=round(avg_hours, 1) if avg_hours else None,
         resolved_this_week=resolved_week,
     )
@@ -3148,6 +3148,7 @@ async def list_deck_layouts(
 async def suggest_layout(
     voyage_id: UUID,
     deck_surface_id: UUID,
+    time_budget_s: float = Query(0.0, ge=0, le=10, description="Seconds of local-search improvement"),
     entity_id: UUID = Depends(get_current_entity),
     current_user: User = Depends(get_current_user),
     _: None = require_permission("travelwiz.deck.manage"),
@@ -3160,7 +3161,13 @@ async def suggest_layout(
 
     await _get_voyage_or_404(db, voyage_id, entity_id)
     try:
-        return await _suggest(db, trip_id=voyage_id, deck_surface_id=deck_surface_id, entity_id=entity_id)
+        return await _suggest(
+            db,
+            trip_id=voyage_id,
+            deck_surface_id=deck_surface_id,
+            entity_id=entity_id,
+            time_budget_s=time_budget_s,
+        )
     except ValueError as e:
         raise HTTPException(400, str(e))
 
@@ -1,9 +1,52 @@
-"""Audit logging service — append-only audit_log records."""
+"""Audit logging service — append-only audit_log records.
 
-from uuid import UUID
+``audit_log`` is range-partitioned by month on ``created_at`` (alembic
+201_audit_log_partitioning). Partitions are named ``audit_log_pYYYYMM``;
+``ensure_audit_partitions`` creates the upcoming ones and
+``purge_audit_log_before`` enforces retention by detaching and dropping
+whole partitions instead of deleting row by row.
 
-from sqlalchemy import text
+``record_audit`` can buffer entries on the session (``buffered=True`` or
+``enable_audit_buffering(db)``): they are written with one multi-row INSERT
+right before the session commits, in the same transaction.
+"""
+
+import json
+import logging
+import re
+from datetime import UTC, date, datetime
+from uuid import UUID, uuid4
+
+from sqlalchemy import column, event, insert, table, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Session.info keys
+_BUFFER_KEY = "audit_buffer"
+_BUFFERED_FLAG = "audit_buffered"
+
+# asyncpg caps a statement at 32767 bind parameters (10 per row).
+INSERT_CHUNK_SIZE = 1000
+PARTITIONS_AHEAD = 3
+DEFAULT_PARTITION = "audit_log_default"
+_PARTITION_RE = re.compile(r"^audit_log_p(\d{4})(\d{2})$")
+
+_audit_table = table(
+    "audit_log",
+    column("id"),
+    column("entity_id"),
+    column("user_id"),
+    column("action"),
+    column("resource_type"),
+    column("resource_id"),
+    column("details", JSONB),
+    column("ip_address"),
+    column("user_agent"),
+    column("created_at"),
+)
 
 
 async def record_audit(
@@ -17,8 +60,31 @@ async def record_audit(
     details: dict | None = None,
     ip_address: str | None = None,
     user_agent: str | None = None,
+    buffered: bool | None = None,
 ) -> None:
-    """Record an immutable audit log entry."""
+    """Record an immutable audit log entry.
+
+    With ``buffered`` (default: the session's ``enable_audit_buffering``
+    flag) the entry is only written when the session commits, so it is not
+    visible to queries issued earlier in the same transaction.
+    """
+    if buffered is None:
+        buffered = bool(db.info.get(_BUFFERED_FLAG))
+    if buffered:
+        db.info.setdefault(_BUFFER_KEY, []).append({
+            "id": uuid4(),
+            "entity_id": str(entity_id) if entity_id else None,
+            "user_id": str(user_id) if user_id else None,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "details": details or None,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "created_at": datetime.now(UTC),
+        })
+        return
+
     await db.execute(
         text(
             "INSERT INTO audit_log "
@@ -33,8 +99,153 @@ async def record_audit(
             "action": action,
             "resource_type": resource_type,
             "resource_id": resource_id,
-            "details": __import__("json").dumps(details) if details else None,
+            "details": json.dumps(details) if details else None,
             "ip_address": ip_address,
             "user_agent": user_agent,
         },
     )
+
+
+def enable_audit_buffering(db: AsyncSession) -> None:
+    """Buffer every ``record_audit`` call on this session until commit."""
+    db.info[_BUFFERED_FLAG] = True
+
+
+def pending_audit_entries(db: AsyncSession) -> int:
+    return len(db.info.get(_BUFFER_KEY) or ())
+
+
+@event.listens_for(Session, "before_commit")
+def _flush_audit_buffer(session: Session) -> None:
+    rows = session.info.pop(_BUFFER_KEY, None)
+    for start in range(0, len(rows or ()), INSERT_CHUNK_SIZE):
+        session.execute(insert(_audit_table).values(rows[start:start + INSERT_CHUNK_SIZE]))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_audit_buffer(session: Session, previous_transaction) -> None:
+    # A rolled-back savepoint keeps the outer transaction (and its entries).
+    if not previous_transaction.nested:
+        session.info.pop(_BUFFER_KEY, None)
+
+
+# ── Partition maintenance ────────────────────────────────────────────────────
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"audit_log_p{month.year:04d}{month.month:02d}"
+
+
+async def _audit_partition_names(db: AsyncSession) -> list[str]:
+    return list(
+        (await db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'audit_log'::regclass"
+        ))).scalars().all()
+    )
+
+
+def _monthly_partitions(names: list[str]) -> dict[date, str]:
+    months: dict[date, str] = {}
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        if match:
+            months[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return months
+
+
+async def list_audit_partitions(db: AsyncSession) -> dict[date, str]:
+    """Monthly partitions currently attached to ``audit_log``, by month."""
+    return _monthly_partitions(await _audit_partition_names(db))
+
+
+async def ensure_audit_partitions(
+    db: AsyncSession, *, ahead: int = PARTITIONS_AHEAD, today: date | None = None,
+) -> list[str]:
+    """Create the current and next ``ahead`` monthly partitions if missing.
+
+    PostgreSQL refuses ``PARTITION OF … FOR VALUES`` while the DEFAULT
+    partition holds rows in that range (a ``create_all`` database, or a job
+    that fell behind the migration's partitions). The default partition is
+    then detached, the months created, their rows moved out of it, and the
+    default attached back — in one transaction.
+    """
+    today = today or datetime.now(UTC).date()
+    names = await _audit_partition_names(db)
+    existing = _monthly_partitions(names)
+    missing = [
+        month for month in (_month_start(today, offset) for offset in range(ahead + 1))
+        if month not in existing
+    ]
+    if not missing:
+        return []
+
+    moving: list[date] = []
+    if DEFAULT_PARTITION in names:
+        for month in missing:
+            held = (await db.execute(
+                text(
+                    f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+                    "WHERE created_at >= :start AND created_at < :end)"
+                ),
+                {"start": month, "end": _month_start(month, 1)},
+            )).scalar()
+            if held:
+                moving.append(month)
+    if moving:
+        await db.execute(text(f"ALTER TABLE audit_log DETACH PARTITION {DEFAULT_PARTITION}"))
+
+    created: list[str] = []
+    for month in missing:
+        name = partition_name(month)
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_log "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_month_start(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+
+    if moving:
+        for month in moving:
+            bounds = {"start": month, "end": _month_start(month, 1)}
+            where = "WHERE created_at >= :start AND created_at < :end"
+            await db.execute(
+                text(f"INSERT INTO {partition_name(month)} SELECT * FROM {DEFAULT_PARTITION} {where}"),
+                bounds,
+            )
+            await db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} {where}"), bounds)
+        await db.execute(text(f"ALTER TABLE audit_log ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    await db.commit()
+    return created
+
+
+async def purge_audit_log_before(db: AsyncSession, cutoff: datetime) -> tuple[list[str], int]:
+    """Remove audit entries older than ``cutoff``.
+
+    Partitions entirely before the cutoff are detached and dropped. Rows
+    left in the partition straddling the cutoff (and in the default
+    partition) are removed with a single DELETE that partition pruning
+    confines to those two tables. Nothing is committed: the caller commits,
+    so a purge that is part of a larger job stays atomic with it. Returns
+    the dropped partition names and the number of rows deleted by that
+    final statement.
+    """
+    boundary = _month_start(cutoff.date())
+    dropped: list[str] = []
+    for month, name in sorted((await list_audit_partitions(db)).items()):
+        if month >= boundary:
+            break
+        await db.execute(text(f"ALTER TABLE audit_log DETACH PARTITION {name}"))
+        await db.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+
+    result = await db.execute(
+        text("DELETE FROM audit_log WHERE created_at < :cutoff"),
+        {"cutoff": cutoff},
+    )
+    return dropped, result.rowcount or 0
@@ -0,0 +1,304 @@
+"""Authenticated request context cache.
+
+Every authenticated request needs the same few facts before business logic
+runs: is the user active, which entities may they act in, and which modules
+are disabled there. ``AuthPrincipal`` holds the per-user facts; the disabled
+module set is cached per entity. Both live in a two-level cache:
+
+* a per-worker LRU (no I/O on hit),
+* Redis hashes ``auth:ctx:{jti}`` and ``auth:modules:{entity}`` shared by
+  workers.
+
+Each entry records the version counters it was built at
+(``auth:ver:user:{id}`` / ``auth:ver:entity:{id}`` plus a global one).
+``invalidate_auth_user`` / ``invalidate_auth_entity`` bump the counter, which
+makes stale Redis entries fail validation, and publish on
+``auth:invalidate`` so every worker's listener drops its local copies.
+
+``get_auth_context_stats`` reports hit rates and the DB queries avoided.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+from uuid import UUID
+
+from app.core.redis_client import get_redis_or_none
+
+logger = logging.getLogger(__name__)
+
+LOCAL_CACHE_SIZE = 10_000
+# Safety net for missed pub/sub messages — local entries are re-checked after this.
+LOCAL_TTL_SECONDS = 60
+REDIS_TTL_SECONDS = 900
+INVALIDATION_CHANNEL = "auth:invalidate"
+_GLOBAL_VERSION_KEY = "auth:ver:all"
+
+
+@dataclass(frozen=True, slots=True)
+class AuthPrincipal:
+    """Compact, immutable view of the authenticated user."""
+
+    user_id: UUID
+    active: bool
+    mfa_enabled: bool
+    language: str | None
+    default_entity_id: UUID | None
+    entity_ids: frozenset[UUID]  # entities with an active group membership
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "user_id": str(self.user_id),
+            "active": self.active,
+            "mfa_enabled": self.mfa_enabled,
+            "language": self.language,
+            "default_entity_id": str(self.default_entity_id) if self.default_entity_id else None,
+            "entity_ids": sorted(str(e) for e in self.entity_ids),
+        })
+
+    @classmethod
+    def from_json(cls, raw: str) -> "AuthPrincipal":
+        data = json.loads(raw)
+        return cls(
+            user_id=UUID(data["user_id"]),
+            active=data["active"],
+            mfa_enabled=data["mfa_enabled"],
+            language=data["language"],
+            default_entity_id=UUID(data["default_entity_id"]) if data["default_entity_id"] else None,
+            entity_ids=frozenset(UUID(e) for e in data["entity_ids"]),
+        )
+
+
+# ── Instrumentation ──────────────────────────────────────────────────────────
+
+_stats = {
+    "lookups": 0,
+    "local_hits": 0,
+    "redis_hits": 0,
+    "misses": 0,
+    "invalidations": 0,
+    "db_queries_saved": 0,
+}
+
+
+# Whether the latest lookup in the current task was served from cache.
+_last_hit: ContextVar[bool] = ContextVar("auth_context_last_hit", default=False)
+
+
+def last_lookup_hit() -> bool:
+    return _last_hit.get()
+
+
+def record_saved_queries(request: Any, count: int = 1) -> None:
+    """Count DB queries avoided by a cache hit (per worker and per request)."""
+    _stats["db_queries_saved"] += count
+    state = getattr(request, "state", None)
+    if state is not None:
+        state.auth_db_queries_saved = getattr(state, "auth_db_queries_saved", 0) + count
+
+
+def get_auth_context_stats() -> dict[str, Any]:
+    lookups = _stats["lookups"] or 1
+    return {
+        **_stats,
+        "hit_rate": round((_stats["local_hits"] + _stats["redis_hits"]) / lookups, 4),
+        "local_entries": len(_local),
+    }
+
+
+# ── Local LRU ────────────────────────────────────────────────────────────────
+
+# key -> (value, scope ids for invalidation, stored_at)
+_local: OrderedDict[str, tuple[Any, tuple[str, ...], float]] = OrderedDict()
+
+
+def _local_get(key: str) -> Any | None:
+    entry = _local.get(key)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[2] > LOCAL_TTL_SECONDS:
+        _local.pop(key, None)
+        return None
+    _local.move_to_end(key)
+    return entry[0]
+
+
+def _local_put(key: str, value: Any, scopes: tuple[str, ...]) -> None:
+    _local[key] = (value, scopes, time.monotonic())
+    _local.move_to_end(key)
+    while len(_local) > LOCAL_CACHE_SIZE:
+        _local.popitem(last=False)
+
+
+def _local_drop(scope: str | None) -> None:
+    if scope is None:
+        _local.clear()
+        return
+    for key in [k for k, (_, scopes, _) in _local.items() if scope in scopes]:
+        _local.pop(key, None)
+
+
+# ── Shared (Redis) level ─────────────────────────────────────────────────────
+
+
+def token_cache_key(payload: dict[str, Any], raw_token: str) -> str:
+    """Cache key of an access token: its ``jti``, else a digest of the token."""
+    jti = payload.get("jti")
+    if jti:
+        return str(jti)
+    return hashlib.sha256(raw_token.encode()).hexdigest()[:32]
+
+
+async def _versions(r: Any, scope_key: str) -> tuple[str, str]:
+    scoped, global_ = await r.mget(scope_key, _GLOBAL_VERSION_KEY)
+    return scoped or "0", global_ or "0"
+
+
+async def _cached(
+    local_key: str,
+    redis_key: str,
+    version_key: str,
+    scopes: tuple[str, ...],
+    load: Callable[[], Awaitable[str]],
+    decode: Callable[[str], Any],
+) -> Any:
+    """Two-level read-through cache of a JSON payload."""
+    _stats["lookups"] += 1
+    value = _local_get(local_key)
+    if value is not None:
+        _stats["local_hits"] += 1
+        _last_hit.set(True)
+        return value
+
+    r = get_redis_or_none()
+    versions: tuple[str, str] | None = None
+    if r is not None:
+        try:
+            versions = await _versions(r, version_key)
+            stored = await r.hgetall(redis_key)
+            if stored and (stored.get("v"), stored.get("g")) == versions:
+                value = decode(stored["data"])
+                _stats["redis_hits"] += 1
+                _last_hit.set(True)
+                _local_put(local_key, value, scopes)
+                return value
+        except Exception:
+            logger.debug("Auth context cache read failed for %s", redis_key, exc_info=True)
+            versions = None
+
+    _stats["misses"] += 1
+    _last_hit.set(False)
+    raw = await load()
+    value = decode(raw)
+    _local_put(local_key, value, scopes)
+    if r is not None and versions is not None:
+        try:
+            await r.hset(redis_key, mapping={"data": raw, "v": versions[0], "g": versions[1]})
+            await r.expire(redis_key, REDIS_TTL_SECONDS)
+        except Exception:
+            logger.debug("Auth context cache write failed for %s", redis_key, exc_info=True)
+    return value
+
+
+async def get_principal(
+    token_key: str,
+    user_id: UUID,
+    load: Callable[[], Awaitable[AuthPrincipal | None]],
+) -> AuthPrincipal | None:
+    """Principal for an access token; ``load`` builds it on a miss."""
+    missing = "null"
+
+    async def _load() -> str:
+        principal = await load()
+        return principal.to_json() if principal is not None else missing
+
+    return await _cached(
+        local_key=f"p:{token_key}",
+        redis_key=f"auth:ctx:{token_key}",
+        version_key=f"auth:ver:user:{user_id}",
+        scopes=(f"user:{user_id}",),
+        load=_load,
+        decode=lambda raw: None if raw == missing else AuthPrincipal.from_json(raw),
+    )
+
+
+async def get_disabled_modules(
+    entity_id: UUID,
+    load: Callable[[], Awaitable[set[str]]],
+) -> frozenset[str]:
+    """Disabled module slugs of an entity; ``load`` reads settings on a miss."""
+
+    async def _load() -> str:
+        return json.dumps(sorted(await load()))
+
+    return await _cached(
+        local_key=f"m:{entity_id}",
+        redis_key=f"auth:modules:{entity_id}",
+        version_key=f"auth:ver:entity:{entity_id}",
+        scopes=(f"entity:{entity_id}",),
+        load=_load,
+        decode=lambda raw: frozenset(json.loads(raw)),
+    )
+
+
+# ── Invalidation ─────────────────────────────────────────────────────────────
+
+
+async def _invalidate(scope: str | None, version_key: str) -> None:
+    _stats["invalidations"] += 1
+    _local_drop(scope)
+    r = get_redis_or_none()
+    if r is None:
+        return
+    try:
+        await r.incr(version_key)
+        await r.publish(INVALIDATION_CHANNEL, scope or "all")
+    except Exception:
+        logger.warning("Failed to publish auth context invalidation for %s", scope or "all")
+
+
+async def invalidate_auth_user(user_id: UUID | None = None) -> None:
+    """Role, group membership or account change — one user, or everyone."""
+    if user_id is None:
+        await _invalidate(None, _GLOBAL_VERSION_KEY)
+    else:
+        await _invalidate(f"user:{user_id}", f"auth:ver:user:{user_id}")
+
+
+async def invalidate_auth_entity(entity_id: UUID) -> None:
+    """Module toggled for an entity."""
+    await _invalidate(f"entity:{entity_id}", f"auth:ver:entity:{entity_id}")
+
+
+async def run_invalidation_listener() -> None:
+    """Drop local entries when another worker invalidates (runs until cancelled)."""
+    r = get_redis_or_none()
+    if r is None:
+        return
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(INVALIDATION_CHANNEL)
+        async for message in pubsub.listen():
+            if not message or message.get("type") != "message":
+                continue
+            scope = message.get("data")
+            _local_drop(None if scope in (None, "all") else scope)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.warning("Auth context invalidation listener stopped", exc_info=True)
+        _local_drop(None)
+    finally:
+        try:
+            await pubsub.unsubscribe(INVALIDATION_CHANNEL)
+            await pubsub.aclose()
+        except Exception:
+            pass
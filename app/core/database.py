@@ -7,6 +7,7 @@ from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.core.db_instrumentation import instrument_engine
 from app.core.tenant_context import get_tenant_schema
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,9 @@ engine = create_async_engine(
     pool_pre_ping=True,
 )
 
+# Per-request statement count / DB time / N+1 detection (DbQueryStatsMiddleware).
+instrument_engine(engine.sync_engine)
+
 async_session_factory = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -0,0 +1,178 @@
+"""Per-request SQL instrumentation — statement count, DB time, N+1 detection.
+
+``instrument_engine`` hooks SQLAlchemy ``before/after_cursor_execute`` on an
+engine. Every statement executed while a ``QueryCollector`` is active (see
+``collect_queries``) is timed and recorded under a normalised fingerprint:
+literals and bind parameters become ``?`` and ``IN (...)`` / multi-row
+``VALUES`` lists collapse, so ``db.get(Model, id)`` in a loop shows up as
+one fingerprint repeated N times — the N+1 signature.
+
+Collectors live in a ContextVar and nest: a collector opened by a test
+(query budgets) still sees the statements counted by the request
+middleware's own collector underneath it.
+
+Prometheus histograms are registered when ``prometheus_client`` is
+installed and ``PROMETHEUS_ENABLED`` is set; otherwise metrics are a no-op.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover - metrics disabled until dependency is installed
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+# Same fingerprint executed more than this many times in one request = suspected N+1.
+N_PLUS_ONE_THRESHOLD = settings.DB_N_PLUS_ONE_THRESHOLD
+# Response header carrying the per-request stats (dev, or DB_QUERY_DEBUG_HEADER).
+DEBUG_HEADER = "X-DB-Query-Stats"
+
+_QUERIES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_current: ContextVar["QueryCollector | None"] = ContextVar("db_query_collector", default=None)
+
+
+@dataclass
+class QueryCollector:
+    """Statements recorded for one scope (a request, a test block...)."""
+
+    label: str
+    parent: "QueryCollector | None" = None
+    count: int = 0
+    total_seconds: float = 0.0
+    fingerprints: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, seconds: float) -> None:
+        fp = fingerprint(statement)
+        collector: QueryCollector | None = self
+        while collector is not None:
+            collector.count += 1
+            collector.total_seconds += seconds
+            collector.fingerprints[fp] += 1
+            collector = collector.parent
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_seconds * 1000
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        """Fingerprints executed more than ``threshold`` times, most repeated first."""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n > threshold]
+
+    def header_value(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> str:
+        return f"count={self.count}; time_ms={self.total_ms:.1f}; n_plus_one={len(self.repeated(threshold))}"
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PARAM_RE = re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+\b|\?")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_RE = re.compile(r"(VALUES\s*\(\?\))(?:\s*,\s*\(\?\))+", re.I)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Normalise a SQL statement so repeated executions share one key."""
+    sql = _WHITESPACE_RE.sub(" ", statement).strip()
+    sql = _STRING_RE.sub("?", sql)
+    sql = _PARAM_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _LIST_RE.sub("(?)", sql)
+    sql = _VALUES_RE.sub(r"\1", sql)
+    return sql
+
+
+def current_collector() -> QueryCollector | None:
+    return _current.get()
+
+
+@contextmanager
+def collect_queries(label: str) -> Iterator[QueryCollector]:
+    """Record every statement executed in this context (and its child tasks)."""
+    collector = QueryCollector(label=label, parent=_current.get())
+    token = _current.set(collector)
+    try:
+        yield collector
+    finally:
+        _current.reset(token)
+
+
+# The start time rides on the statement's execution context rather than on
+# the pooled connection, so a statement that raises leaves nothing behind.
+_START_ATTR = "_opsflux_query_start"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None and context is not None:
+        setattr(context, _START_ATTR, time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collector = _current.get()
+    start = getattr(context, _START_ATTR, None)
+    if collector is None or start is None:
+        return
+    collector.record(statement, time.perf_counter() - start)
+
+
+def instrument_engine(sync_engine) -> None:
+    """Attach the cursor hooks to a (sync) engine; idempotent."""
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ── Prometheus ─────────────────────────────────────────────────────────────
+
+_metrics = None
+
+
+def _get_metrics():
+    global _metrics
+    if _metrics is None and prometheus_client is not None and settings.PROMETHEUS_ENABLED:
+        _metrics = (
+            prometheus_client.Histogram(
+                "opsflux_db_queries_per_request", "SQL statements per request",
+                ["route"], buckets=_QUERIES_BUCKETS,
+            ),
+            prometheus_client.Histogram(
+                "opsflux_db_seconds_per_request", "Time spent in SQL per request",
+                ["route"], buckets=_TIME_BUCKETS,
+            ),
+            prometheus_client.Counter(
+                "opsflux_db_n_plus_one_suspected_total",
+                "Requests with a statement repeated above the N+1 threshold",
+                ["route"],
+            ),
+        )
+    return _metrics
+
+
+def observe_request(route: str, collector: QueryCollector, threshold: int = N_PLUS_ONE_THRESHOLD) -> None:
+    """Export one request's stats (metrics + N+1 warning log)."""
+    repeated = collector.repeated(threshold)
+    metrics = _get_metrics()
+    if metrics is not None:
+        queries, seconds, n_plus_one = metrics
+        queries.labels(route).observe(collector.count)
+        seconds.labels(route).observe(collector.total_seconds)
+        if repeated:
+            n_plus_one.labels(route).inc()
+    for fp, n in repeated[:3]:
+        logger.warning("Suspected N+1 on %s: %d× %s", route, n, fp[:300])
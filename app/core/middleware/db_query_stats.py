@@ -0,0 +1,30 @@
+"""DbQueryStatsMiddleware — per-request SQL statement count, DB time and N+1 flags.
+
+Opens a ``QueryCollector`` around the request (see
+``app.core.db_instrumentation``), exports it per route template to the
+Prometheus histograms, logs suspected N+1 fingerprints and, in development
+or when ``DB_QUERY_DEBUG_HEADER`` is set, returns the stats in the
+``X-DB-Query-Stats`` response header.
+"""
+
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.db_instrumentation import DEBUG_HEADER, collect_queries, observe_request
+
+
+class DbQueryStatsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        with collect_queries(request.url.path) as collector:
+            response = await call_next(request)
+
+        # Route template (/api/v1/users/{user_id}), never the raw path: keeps
+        # the metric label cardinality bounded.
+        route = request.scope.get("route")
+        label = getattr(route, "path", None) or "unmatched"
+        observe_request(label, collector)
+        if settings.is_dev or settings.DB_QUERY_DEBUG_HEADER:
+            response.headers[DEBUG_HEADER] = collector.header_value()
+        return response
@@ -0,0 +1,146 @@
+"""Awaitable bcrypt hashing on a bounded worker pool.
+
+bcrypt is deliberately slow (~250 ms at cost 12). Called inline from an
+async handler it blocks the worker's event loop for that long, so a burst
+of logins at shift change stalls every other request on the worker. Every
+async caller goes through this module instead of the sync helpers in
+``app.core.security`` (kept for scripts and sync code).
+
+bcrypt releases the GIL while hashing, so a thread pool runs hashes truly
+in parallel without the pickling / fork cost of a process pool. The pool
+is bounded (``PASSWORD_HASH_WORKERS``): a login storm queues behind it
+instead of starving the loop or the CPU, and the queue depth is exposed
+via ``pool_stats()`` and the ``opsflux_password_hash_queue_depth`` gauge.
+
+``verify_and_rehash`` upgrades hashes transparently when
+``BCRYPT_ROUNDS`` changes: the caller stores the returned hash on a
+successful login.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from app.core.config import settings
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover - metrics disabled until dependency is installed
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+# Submitted but not finished (running + waiting for a worker).
+_in_flight = 0
+_gauge = None
+
+
+def _workers() -> int:
+    configured = settings.PASSWORD_HASH_WORKERS
+    return max(1, configured or min(4, os.cpu_count() or 1))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="password-hash")
+    return _executor
+
+
+def _get_gauge():
+    global _gauge
+    if _gauge is None and prometheus_client is not None and settings.PROMETHEUS_ENABLED:
+        _gauge = prometheus_client.Gauge(
+            "opsflux_password_hash_queue_depth",
+            "bcrypt operations submitted to the hashing pool and not finished yet",
+        )
+    return _gauge
+
+
+def _track(delta: int) -> None:
+    global _in_flight
+    with _lock:
+        _in_flight += delta
+    gauge = _get_gauge()
+    if gauge is not None:
+        gauge.inc(delta)
+
+
+async def _run(fn, *args):
+    _track(1)
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args))
+    finally:
+        _track(-1)
+
+
+def pool_stats() -> dict[str, int]:
+    """Pool size, operations in flight and how many wait for a worker."""
+    workers = _workers()
+    return {"workers": workers, "in_flight": _in_flight, "queued": max(0, _in_flight - workers)}
+
+
+# ── Sync primitives (run inside the pool) ─────────────────────────────────
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(plain: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError:
+        # Malformed / non-bcrypt hash (e.g. anonymised or SSO-only account).
+        return False
+
+
+def hash_rounds(hashed: str) -> int | None:
+    """Cost factor of a ``$2b$12$...`` hash, None when it is not bcrypt."""
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed: str) -> bool:
+    return hash_rounds(hashed) != settings.BCRYPT_ROUNDS
+
+
+# ── Async API ─────────────────────────────────────────────────────────────
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password, settings.BCRYPT_ROUNDS)
+
+
+async def verify_password(plain: str, hashed: str | None) -> bool:
+    if not hashed:
+        return False
+    return await _run(_check, plain, hashed)
+
+
+async def verify_and_rehash(plain: str, hashed: str | None) -> tuple[bool, str | None]:
+    """Verify, and return a fresh hash when the stored cost is outdated.
+
+    Returns ``(ok, new_hash)``; ``new_hash`` is None unless ``ok`` and the
+    stored hash was made with a different ``BCRYPT_ROUNDS``.
+    """
+    if not await verify_password(plain, hashed):
+        return False, None
+    if not needs_rehash(hashed):
+        return True, None
+    return True, await hash_password(plain)
+
+
+async def verify_many(plain: str, hashes: list[str]) -> list[bool]:
+    """Check one password against several hashes in parallel (history)."""
+    return list(await asyncio.gather(*(verify_password(plain, h) for h in hashes)))
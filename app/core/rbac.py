@@ -11,11 +11,13 @@ Permission mode (configurable per entity via setting `rbac.permission_mode`):
   - "additive": all `granted=True` across layers are unioned; `granted=False` is ignored
 """
 
+import json
+from collections.abc import AsyncIterator, Iterable
 from datetime import datetime, timezone
 from typing import Literal
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import String, cast, literal, select, true, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.redis_client import get_redis
@@ -34,6 +36,16 @@ from app.models.common import (
 PermissionSource = Literal["user", "role", "group", "delegation"]
 PermissionMode = Literal["additive", "restrictive"]
 
+# Users resolved per round of set-based queries by the bulk resolver. Bounds
+# both the IN-list size and the rows held in memory while streaming exports.
+BULK_RESOLVE_CHUNK_SIZE = 500
+
+# Cached holder sets of `users_with_permission` live this long, like the
+# per-user permission cache. Their keys embed a version bumped by every
+# RBAC invalidation, so any change retires all holder sets at once.
+HOLDERS_CACHE_TTL = 300
+_HOLDERS_VERSION_KEY = "rbac:holders:version"
+
 
 async def _get_permission_mode(entity_id: UUID, db: AsyncSession) -> PermissionMode:
     """Read the permission resolution mode for an entity.
@@ -225,6 +237,296 @@ def _merge_restrictive(
     return effective
 
 
+# ── Bulk (set-based) resolution ─────────────────────────────────────────
+#
+# Same four layers and merge rules as `_resolve_permissions`, but each layer
+# is fetched for a whole chunk of users in one query keyed by user_id, then
+# merged per user with `_merge_additive` / `_merge_restrictive`. Used by the
+# matrix exports and the "who has permission X" admin views, where resolving
+# user by user costs one round-trip per layer per user.
+
+
+def _entity_population_stmt(entity_id: UUID):
+    """Users the entity resolves permissions for: group members + active delegates."""
+    now = datetime.now(timezone.utc)
+    members = (
+        select(UserGroupMember.user_id.label("user_id"))
+        .join(UserGroup, UserGroup.id == UserGroupMember.group_id)
+        .where(UserGroup.entity_id == entity_id)
+    )
+    delegates = select(UserDelegation.delegate_id.label("user_id")).where(
+        UserDelegation.entity_id == entity_id,
+        UserDelegation.active == True,
+        UserDelegation.start_date <= now,
+        UserDelegation.end_date > now,
+    )
+    return members.union(delegates)
+
+
+async def _list_entity_population(entity_id: UUID, db: AsyncSession) -> list[UUID]:
+    population = _entity_population_stmt(entity_id).subquery()
+    result = await db.execute(select(population.c.user_id).order_by(population.c.user_id))
+    return [row[0] for row in result.all()]
+
+
+async def _resolve_chunk(
+    user_ids: list[UUID],
+    entity_id: UUID,
+    mode: PermissionMode,
+    db: AsyncSession,
+    permission_codes: set[str] | None = None,
+) -> dict[UUID, dict[str, PermissionSource]]:
+    """Resolve every user of ``user_ids`` with one query per layer.
+
+    ``permission_codes`` restricts the rows fetched. Merging is per code, so
+    filtering rows never changes the outcome for the codes that are kept.
+    """
+    group_overrides: dict[UUID, list[tuple[str, bool]]] = {u: [] for u in user_ids}
+    role_codes: dict[UUID, list[str]] = {u: [] for u in user_ids}
+    delegation_codes: dict[UUID, list[str]] = {u: [] for u in user_ids}
+    user_overrides: dict[UUID, list[tuple[str, bool]]] = {u: [] for u in user_ids}
+
+    # Layer 1: Group permission overrides
+    group_stmt = (
+        select(
+            UserGroupMember.user_id,
+            GroupPermissionOverride.permission_code,
+            GroupPermissionOverride.granted,
+        )
+        .join(UserGroup, UserGroup.id == GroupPermissionOverride.group_id)
+        .join(UserGroupMember, UserGroupMember.group_id == UserGroup.id)
+        .where(
+            UserGroupMember.user_id.in_(user_ids),
+            UserGroup.entity_id == entity_id,
+            UserGroup.active == True,
+        )
+    )
+    if permission_codes is not None:
+        group_stmt = group_stmt.where(GroupPermissionOverride.permission_code.in_(permission_codes))
+    for uid, code, granted in (await db.execute(group_stmt)).all():
+        group_overrides[uid].append((code, granted))
+
+    # Layer 2: Role permissions
+    role_stmt = (
+        select(UserGroupMember.user_id, Permission.code)
+        .join(RolePermission, RolePermission.permission_code == Permission.code)
+        .join(UserGroupRole, UserGroupRole.role_code == RolePermission.role_code)
+        .join(UserGroup, UserGroup.id == UserGroupRole.group_id)
+        .join(UserGroupMember, UserGroupMember.group_id == UserGroup.id)
+        .where(
+            UserGroupMember.user_id.in_(user_ids),
+            UserGroup.entity_id == entity_id,
+            UserGroup.active == True,
+        )
+    )
+    if permission_codes is not None:
+        role_stmt = role_stmt.where(Permission.code.in_(permission_codes))
+    for uid, code in (await db.execute(role_stmt)).all():
+        role_codes[uid].append(code)
+
+    # Layer 3: Active delegations received
+    now = datetime.now(timezone.utc)
+    delegations_stmt = select(UserDelegation.delegate_id, UserDelegation.permissions).where(
+        UserDelegation.delegate_id.in_(user_ids),
+        UserDelegation.entity_id == entity_id,
+        UserDelegation.active == True,
+        UserDelegation.start_date <= now,
+        UserDelegation.end_date > now,
+    )
+    for uid, codes in (await db.execute(delegations_stmt)).all():
+        if isinstance(codes, list):
+            if permission_codes is not None:
+                codes = [c for c in codes if c in permission_codes]
+            delegation_codes[uid].extend(codes)
+
+    # Layer 4: User permission overrides
+    user_stmt = select(
+        UserPermissionOverride.user_id,
+        UserPermissionOverride.permission_code,
+        UserPermissionOverride.granted,
+    ).where(UserPermissionOverride.user_id.in_(user_ids))
+    if permission_codes is not None:
+        user_stmt = user_stmt.where(UserPermissionOverride.permission_code.in_(permission_codes))
+    for uid, code, granted in (await db.execute(user_stmt)).all():
+        user_overrides[uid].append((code, granted))
+
+    merge = _merge_additive if mode == "additive" else _merge_restrictive
+    return {
+        uid: merge(group_overrides[uid], role_codes[uid], delegation_codes[uid], user_overrides[uid])
+        for uid in user_ids
+    }
+
+
+async def iter_entity_permissions(
+    entity_id: UUID,
+    db: AsyncSession,
+    user_ids: Iterable[UUID] | None = None,
+    *,
+    permission_codes: Iterable[str] | None = None,
+    chunk_size: int = BULK_RESOLVE_CHUNK_SIZE,
+) -> AsyncIterator[tuple[UUID, dict[str, PermissionSource]]]:
+    """Yield ``(user_id, {code: source})`` for each user, resolved chunk by chunk.
+
+    Results match `get_user_permissions_with_sources` for every user. When
+    ``user_ids`` is omitted the entity's group members and active delegates
+    are resolved, in user_id order. Only one chunk is held in memory at a time.
+    """
+    mode = await _get_permission_mode(entity_id, db)
+    if user_ids is None:
+        ids = await _list_entity_population(entity_id, db)
+    else:
+        ids = list(dict.fromkeys(user_ids))
+    codes = set(permission_codes) if permission_codes is not None else None
+
+    for offset in range(0, len(ids), chunk_size):
+        chunk = ids[offset: offset + chunk_size]
+        resolved = await _resolve_chunk(chunk, entity_id, mode, db, codes)
+        for uid in chunk:
+            yield uid, resolved[uid]
+
+
+async def resolve_entity_permissions(
+    entity_id: UUID,
+    db: AsyncSession,
+    user_ids: Iterable[UUID] | None = None,
+    *,
+    permission_codes: Iterable[str] | None = None,
+) -> dict[UUID, dict[str, PermissionSource]]:
+    """Bulk equivalent of `get_user_permissions_with_sources` for many users."""
+    return {
+        uid: effective
+        async for uid, effective in iter_entity_permissions(
+            entity_id, db, user_ids, permission_codes=permission_codes
+        )
+    }
+
+
+async def get_permission_holders(
+    entity_id: UUID, permission_code: str, db: AsyncSession
+) -> dict[UUID, PermissionSource]:
+    """Users of the entity holding ``permission_code`` (directly or via ``*``).
+
+    Maps user_id → the source layer that grants it. Only rows for the code
+    and the wildcard are fetched, so this stays cheap on large entities.
+    """
+    holders: dict[UUID, PermissionSource] = {}
+    async for uid, effective in iter_entity_permissions(
+        entity_id, db, permission_codes={permission_code, "*"}
+    ):
+        source = effective.get(permission_code) or effective.get("*")
+        if source:
+            holders[uid] = source
+    return holders
+
+
+# ── Reverse index: (entity, permission) → holders ───────────────────────
+#
+# Notification fan-out asks the opposite question of `check_permission`:
+# not "may this user do P" but "who may do P on this entity". Resolving it
+# user by user costs four queries per active user; here every layer row
+# that mentions P (or ``*``) on the entity is fetched in one UNION ALL and
+# merged per user with the same rules.
+
+
+def _holder_layers_stmt(entity_id: UUID, codes: set[str]):
+    """Rows ``(user_id, layer, code, granted)`` of the four layers for ``codes``.
+
+    Delegation rows carry the delegated permission list (as JSON text) in
+    ``code``; they are filtered in Python.
+    """
+    now = datetime.now(timezone.utc)
+    group_rows = (
+        select(
+            UserGroupMember.user_id.label("user_id"),
+            literal("group").label("layer"),
+            GroupPermissionOverride.permission_code.label("code"),
+            GroupPermissionOverride.granted.label("granted"),
+        )
+        .join(UserGroup, UserGroup.id == GroupPermissionOverride.group_id)
+        .join(UserGroupMember, UserGroupMember.group_id == UserGroup.id)
+        .where(
+            UserGroup.entity_id == entity_id,
+            UserGroup.active == True,
+            GroupPermissionOverride.permission_code.in_(codes),
+        )
+    )
+    role_rows = (
+        select(UserGroupMember.user_id, literal("role"), Permission.code, true())
+        .join(RolePermission, RolePermission.permission_code == Permission.code)
+        .join(UserGroupRole, UserGroupRole.role_code == RolePermission.role_code)
+        .join(UserGroup, UserGroup.id == UserGroupRole.group_id)
+        .join(UserGroupMember, UserGroupMember.group_id == UserGroup.id)
+        .where(
+            UserGroup.entity_id == entity_id,
+            UserGroup.active == True,
+            Permission.code.in_(codes),
+        )
+    )
+    delegation_rows = select(
+        UserDelegation.delegate_id, literal("delegation"), cast(UserDelegation.permissions, String), true(),
+    ).where(
+        UserDelegation.entity_id == entity_id,
+        UserDelegation.active == True,
+        UserDelegation.start_date <= now,
+        UserDelegation.end_date > now,
+    )
+    user_rows = select(
+        UserPermissionOverride.user_id,
+        literal("user"),
+        UserPermissionOverride.permission_code,
+        UserPermissionOverride.granted,
+    ).where(UserPermissionOverride.permission_code.in_(codes))
+    return union_all(group_rows, role_rows, delegation_rows, user_rows)
+
+
+def _delegated_codes(value) -> list[str]:
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value if isinstance(value, list) else []
+
+
+async def _resolve_holders(entity_id: UUID, permission_code: str, db: AsyncSession) -> set[UUID]:
+    mode = await _get_permission_mode(entity_id, db)
+    codes = {permission_code, "*"}
+    layers: dict[UUID, tuple[list, list, list, list]] = {}
+    for uid, layer, code, granted in (await db.execute(_holder_layers_stmt(entity_id, codes))).all():
+        group_overrides, role_codes, delegation_codes, user_overrides = layers.setdefault(uid, ([], [], [], []))
+        if layer == "group":
+            group_overrides.append((code, granted))
+        elif layer == "role":
+            role_codes.append(code)
+        elif layer == "delegation":
+            delegation_codes.extend(c for c in _delegated_codes(code) if c in codes)
+        else:
+            user_overrides.append((code, granted))
+
+    merge = _merge_additive if mode == "additive" else _merge_restrictive
+    return {uid for uid, parts in layers.items() if codes & merge(*parts).keys()}
+
+
+async def users_with_permission(
+    entity_id: UUID, permission_code: str, db: AsyncSession
+) -> set[UUID]:
+    """Users for whom `check_permission` holds on the entity, with Redis cache.
+
+    Unlike `get_permission_holders` this also counts users outside the
+    entity's groups who hold the code through a user override, exactly as
+    the per-user check does. Account status is not considered: callers
+    filter inactive users themselves.
+    """
+    redis = get_redis()
+    version = await redis.get(_HOLDERS_VERSION_KEY) or "0"
+    cache_key = f"rbac:holders:{version}:{entity_id}:{permission_code}"
+
+    cached = await redis.get(cache_key)
+    if cached is not None:
+        return {UUID(uid) for uid in json.loads(cached)}
+
+    holders = await _resolve_holders(entity_id, permission_code, db)
+    await redis.set(cache_key, json.dumps(sorted(str(uid) for uid in holders)), ex=HOLDERS_CACHE_TTL)
+    return holders
+
+
 async def get_user_permissions(
     user_id: UUID, entity_id: UUID, db: AsyncSession
 ) -> set[str]:
@@ -285,6 +587,10 @@ async def invalidate_rbac_cache(user_id: UUID | None = None) -> None:
 
     if keys:
         await redis.delete(*keys)
+    await redis.incr(_HOLDERS_VERSION_KEY)
+
+    from app.core.auth_context import invalidate_auth_user
+    await invalidate_auth_user(user_id)
 
 
 async def invalidate_permission_mode_cache(entity_id: UUID | None = None) -> None:
@@ -296,3 +602,4 @@ async def invalidate_permission_mode_cache(entity_id: UUID | None = None) -> Non
         keys = await redis.keys("rbac:mode:*")
         if keys:
             await redis.delete(*keys)
+    await redis.incr(_HOLDERS_VERSION_KEY)
@@ -1,9 +1,13 @@
 """Redis async client for cache, pub/sub, OTP, rate limiting."""
 
+import logging
+
 import redis.asyncio as aioredis
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 redis_client: aioredis.Redis | None = None
 
 
@@ -32,3 +36,38 @@ def get_redis() -> aioredis.Redis:
     if redis_client is None:
         raise RuntimeError("Redis not initialized. Call init_redis() first.")
     return redis_client
+
+
+def get_redis_or_none() -> aioredis.Redis | None:
+    """The client, or None when Redis is not initialised.
+
+    For caches that keep working without Redis: they fall back to a
+    worker-local copy with a short TTL instead of failing the request.
+    """
+    return redis_client
+
+
+async def read_version(key: str) -> str | None:
+    """Shared cache version counter: ``"0"`` if never bumped, None if Redis is unreachable."""
+    r = get_redis_or_none()
+    if r is None:
+        return None
+    try:
+        value = await r.get(key)
+    except Exception:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode()
+    return value or "0"
+
+
+async def bump_version(key: str) -> int | None:
+    """Increment a shared cache version counter; None if Redis is unreachable."""
+    r = get_redis_or_none()
+    if r is None:
+        return None
+    try:
+        return int(await r.incr(key))
+    except Exception:
+        logger.warning("Could not bump cache version %s", key)
+        return None
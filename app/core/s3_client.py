@@ -1,35 +1,131 @@
-"""S3-compatible storage client (MinIO / AWS S3)."""
+"""S3-compatible storage client (MinIO / AWS S3).
+
+boto3 is synchronous: every call goes through ``run_blocking`` so it runs
+in the bounded storage I/O pool instead of on the event loop.
+
+``S3_ENDPOINT=memory://`` selects ``StubS3Client``, an in-process,
+MinIO-compatible stand-in (single bucket, multipart uploads, ranged GETs)
+used for offline tests and local runs without MinIO.
+"""
 
 import logging
+import threading
 from io import BytesIO
 from uuid import uuid4
 
-import boto3
-from botocore.config import Config as BotoConfig
-from botocore.exceptions import ClientError
-
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 _s3_client = None
+STUB_ENDPOINT = "memory://"
+
+
+class StubClientError(Exception):
+    """Shape-compatible with ``botocore.exceptions.ClientError`` for callers."""
+
+    def __init__(self, code: str, operation: str):
+        super().__init__(f"{code} ({operation})")
+        self.response = {"Error": {"Code": code}}
+
+
+class StubS3Client:
+    """In-memory subset of the boto3 S3 client API."""
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], dict] = {}
+        self.uploads: dict[str, dict] = {}
+        self.buckets: set[str] = set()
+        self._lock = threading.Lock()
+
+    def head_bucket(self, Bucket):
+        if Bucket not in self.buckets:
+            raise StubClientError("404", "HeadBucket")
+
+    def create_bucket(self, Bucket):
+        self.buckets.add(Bucket)
+
+    def put_object(self, Bucket, Key, Body, ContentType="application/octet-stream"):
+        data = Body.read() if hasattr(Body, "read") else bytes(Body)
+        with self._lock:
+            self.objects[(Bucket, Key)] = {"data": data, "ContentType": ContentType}
+        return {}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType="application/octet-stream"):
+        upload_id = uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = {"key": (Bucket, Key), "parts": {}, "ContentType": ContentType}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        data = Body.read() if hasattr(Body, "read") else bytes(Body)
+        with self._lock:
+            self.uploads[UploadId]["parts"][PartNumber] = data
+        return {"ETag": f'"{PartNumber}-{len(data)}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        with self._lock:
+            upload = self.uploads.pop(UploadId)
+            numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+            data = b"".join(upload["parts"][n] for n in numbers)
+            self.objects[(Bucket, Key)] = {"data": data, "ContentType": upload["ContentType"]}
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+
+    def head_object(self, Bucket, Key):
+        obj = self.objects.get((Bucket, Key))
+        if obj is None:
+            raise StubClientError("404", "HeadObject")
+        return {"ContentLength": len(obj["data"]), "ContentType": obj["ContentType"]}
+
+    def get_object(self, Bucket, Key, Range=None):
+        obj = self.objects.get((Bucket, Key))
+        if obj is None:
+            raise StubClientError("NoSuchKey", "GetObject")
+        data = obj["data"]
+        if Range:
+            start, _, end = Range.removeprefix("bytes=").partition("-")
+            data = data[int(start): int(end) + 1 if end else None]
+        return {"Body": BytesIO(data), "ContentLength": len(data), "ContentType": obj["ContentType"]}
+
+    def delete_object(self, Bucket, Key):
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+
+    def generate_presigned_url(self, *args, **kwargs):
+        return None  # not reachable over HTTP: downloads are proxied
 
 
 def get_s3_client():
     """Get or create the S3 client."""
     global _s3_client
     if _s3_client is None:
+        if settings.S3_ENDPOINT.startswith(STUB_ENDPOINT):
+            _s3_client = StubS3Client()
+            _s3_client.create_bucket(Bucket=settings.S3_BUCKET)
+            return _s3_client
+        import boto3
+        from botocore.config import Config as BotoConfig
+
         _s3_client = boto3.client(
             "s3",
             endpoint_url=settings.S3_ENDPOINT if settings.STORAGE_BACKEND != "s3" else None,
             aws_access_key_id=settings.S3_ACCESS_KEY,
             aws_secret_access_key=settings.S3_SECRET_KEY,
             region_name=settings.S3_REGION,
-            config=BotoConfig(signature_version="s3v4"),
+            config=BotoConfig(signature_version="s3v4", max_pool_connections=settings.STORAGE_IO_THREADS),
         )
     return _s3_client
 
 
+def _is_missing(exc: Exception) -> bool:
+    code = str(getattr(exc, "response", {}).get("Error", {}).get("Code", ""))
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
 async def upload_file(
     file_data: bytes,
     filename: str,
@@ -37,11 +133,14 @@ async def upload_file(
     folder: str = "uploads",
 ) -> str:
     """Upload a file to S3 and return the object key."""
+    from app.core.storage_service import run_blocking
+
     ext = filename.rsplit(".", 1)[-1] if "." in filename else ""
     object_key = f"{folder}/{uuid4().hex}.{ext}" if ext else f"{folder}/{uuid4().hex}"
 
     client = get_s3_client()
-    client.put_object(
+    await run_blocking(
+        client.put_object,
         Bucket=settings.S3_BUCKET,
         Key=object_key,
         Body=BytesIO(file_data),
@@ -51,8 +150,8 @@ async def upload_file(
     return object_key
 
 
-async def get_presigned_url(object_key: str, expires_in: int = 3600) -> str:
-    """Generate a presigned URL for downloading a file."""
+async def get_presigned_url(object_key: str, expires_in: int = 3600) -> str | None:
+    """Generate a presigned URL for downloading a file (None with the stub)."""
     client = get_s3_client()
     return client.generate_presigned_url(
         "get_object",
@@ -63,26 +162,39 @@ async def get_presigned_url(object_key: str, expires_in: int = 3600) -> str:
 
 async def delete_file(object_key: str) -> None:
     """Delete a file from S3."""
+    from app.core.storage_service import run_blocking
+
     client = get_s3_client()
-    client.delete_object(Bucket=settings.S3_BUCKET, Key=object_key)
+    await run_blocking(client.delete_object, Bucket=settings.S3_BUCKET, Key=object_key)
     logger.info("S3: deleted %s", object_key)
 
 
 async def download_bytes(object_key: str) -> bytes | None:
     """Download a file from S3 and return the raw bytes (None on missing)."""
+    from app.core.storage_service import run_blocking
+
     client = get_s3_client()
-    try:
-        resp = client.get_object(Bucket=settings.S3_BUCKET, Key=object_key)
-        return resp["Body"].read()
-    except ClientError:
-        return None
+
+    def _read() -> bytes | None:
+        try:
+            return client.get_object(Bucket=settings.S3_BUCKET, Key=object_key)["Body"].read()
+        except Exception as exc:
+            if _is_missing(exc):
+                return None
+            raise
+
+    return await run_blocking(_read)
 
 
 async def ensure_bucket() -> None:
     """Create the bucket if it doesn't exist."""
+    from app.core.storage_service import run_blocking
+
     client = get_s3_client()
     try:
-        client.head_bucket(Bucket=settings.S3_BUCKET)
-    except ClientError:
-        client.create_bucket(Bucket=settings.S3_BUCKET)
+        await run_blocking(client.head_bucket, Bucket=settings.S3_BUCKET)
+    except Exception as exc:
+        if not _is_missing(exc) and exc.__class__.__name__ != "ClientError":
+            raise
+        await run_blocking(client.create_bucket, Bucket=settings.S3_BUCKET)
         logger.info("S3: created bucket %s", settings.S3_BUCKET)
@@ -1,7 +1,7 @@
 """JWT encode/decode, password hashing."""
 
 from datetime import UTC, datetime, timedelta
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import bcrypt
 from jose import JWTError, jwt
@@ -9,8 +9,10 @@ from jose import JWTError, jwt
 from app.core.config import settings
 
 
+# Sync helpers for scripts and sync code. Async handlers use
+# app.core.password_hashing, which runs bcrypt off the event loop.
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(settings.BCRYPT_ROUNDS)).decode("utf-8")
 
 
 def verify_password(plain: str, hashed: str) -> bool:
@@ -31,6 +33,7 @@ def create_access_token(
         "iat": now,
         "exp": now + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES),
         "type": "access",
+        "jti": uuid4().hex,
     }
     if entity_id:
         payload["entity_id"] = str(entity_id)
@@ -0,0 +1,219 @@
+"""Startup orchestration — phase timing and fingerprinted, single-worker seeding.
+
+Every uvicorn worker runs the lifespan. Permission/role sync and the
+production seed are idempotent but expensive, and during a rolling restart
+all workers used to run them against the DB at the same moment.
+
+``run_seeding`` now:
+
+1. computes a content fingerprint of what the seeds depend on — module
+   manifests (permissions, roles), the source of the seeding modules, the
+   bootstrap env vars and the alembic revision;
+2. returns immediately when the fingerprint stored in ``settings`` matches;
+3. otherwise elects one worker with ``pg_try_advisory_lock``. The others
+   wait on the lock, then re-check the fingerprint and only seed
+   themselves if the elected worker failed.
+
+``STARTUP_FORCE_SEED=true`` bypasses the fingerprint check.
+
+``startup_phase`` times each lifespan phase; ``get_startup_report`` exposes
+the durations and the seeding outcome (admin health payload).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+SEED_LOCK_ID = 0x4F50534E_53454544  # 'OPSN'+'SEED'
+FINGERPRINT_KEY = "system.startup_seed_fingerprint"
+
+# Modules whose code defines the seeded data.
+_SEED_SOURCE_MODULES = (
+    "app.core.email_templates",
+    "app.core.pdf_templates",
+    "app.services.core.permission_sync",
+    "app.services.core.seed_service",
+)
+# Env vars read by seed_production_essentials.
+_SEED_ENV_VARS = (
+    "FIRST_ENTITY_CODE", "FIRST_ENTITY_NAME", "FIRST_ENTITY_COUNTRY",
+    "FIRST_ENTITY_TIMEZONE", "FIRST_ENTITY_CURRENCY",
+    "FIRST_SUPERUSER", "FIRST_SUPERUSER_PASSWORD",
+)
+
+_report: dict[str, Any] = {"phases": {}, "seeding": None, "pid": os.getpid()}
+
+
+# ── Phase timing ─────────────────────────────────────────────────────────────
+
+
+@asynccontextmanager
+async def startup_phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _report["phases"][name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def log_startup_report() -> None:
+    phases = _report["phases"]
+    logger.info(
+        "Startup phases (ms): %s — total %.0f ms, seeding=%s",
+        ", ".join(f"{k}={v}" for k, v in phases.items()),
+        sum(phases.values()),
+        _report["seeding"],
+    )
+
+
+def get_startup_report() -> dict[str, Any]:
+    return {
+        **_report,
+        "phases": dict(_report["phases"]),
+        "total_ms": round(sum(_report["phases"].values()), 1),
+    }
+
+
+# ── Fingerprint ──────────────────────────────────────────────────────────────
+
+
+def compute_seed_fingerprint(modules: list[Any], schema_revision: str | None) -> str:
+    """Content hash of every input of permission sync and production seeding."""
+    digest = hashlib.sha256()
+    manifests = [
+        {
+            "slug": m.slug,
+            "version": m.version,
+            "permissions": sorted(m.permissions),
+            "roles": m.roles,
+        }
+        for m in sorted(modules, key=lambda m: m.slug)
+    ]
+    digest.update(json.dumps(manifests, sort_keys=True, default=str).encode())
+    for module_name in _SEED_SOURCE_MODULES:
+        digest.update(Path(importlib.import_module(module_name).__file__).read_bytes())
+    for var in _SEED_ENV_VARS:
+        digest.update(f"{var}={os.environ.get(var, '')}\n".encode())
+    digest.update((schema_revision or "").encode())
+    return digest.hexdigest()
+
+
+async def _schema_revision(conn) -> str | None:
+    try:
+        rows = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars().all()
+    except Exception:
+        await conn.rollback()
+        return None
+    return ",".join(sorted(rows))
+
+
+async def _stored_fingerprint(conn) -> str | None:
+    value = (
+        await conn.execute(
+            text(
+                "SELECT value FROM settings WHERE key = :key AND scope = 'tenant' "
+                "AND scope_id IS NULL"
+            ),
+            {"key": FINGERPRINT_KEY},
+        )
+    ).scalar_one_or_none()
+    if isinstance(value, str):  # JSONB comes back undecoded through text()
+        value = json.loads(value)
+    return value.get("sha256") if isinstance(value, dict) else None
+
+
+async def _store_fingerprint(fingerprint: str) -> None:
+    from app.core.database import async_session_factory
+    from app.services.core.settings_service import upsert_scoped_setting
+
+    async with async_session_factory() as db:
+        await upsert_scoped_setting(
+            db,
+            key=FINGERPRINT_KEY,
+            value={"sha256": fingerprint, "seeded_by_pid": os.getpid(), "seeded_at": time.time()},
+            scope="tenant",
+            scope_id=None,
+        )
+
+
+# ── Seeding ──────────────────────────────────────────────────────────────────
+
+
+async def run_seeding(
+    modules: list[Any],
+    steps: list[tuple[str, Callable[[], Awaitable[None]]]],
+    *,
+    force: bool = False,
+    fatal: frozenset[str] = frozenset(),
+) -> str:
+    """Run ``steps`` once per fingerprint across all workers.
+
+    Returns the outcome: ``"skipped"`` (fingerprint unchanged),
+    ``"seeded"`` (this worker seeded), ``"waited"`` (another worker
+    seeded while this one waited on the lock) or ``"failed"``. A failing
+    step is logged and leaves the fingerprint unset so the next boot
+    retries; failures of steps named in ``fatal`` are re-raised once the
+    lock is released.
+    """
+    from app.core.database import engine
+
+    async with engine.connect() as conn:
+        fingerprint = compute_seed_fingerprint(modules, await _schema_revision(conn))
+        if not force and await _stored_fingerprint(conn) == fingerprint:
+            await conn.commit()
+            return _finish("skipped")
+
+        elected = bool((
+            await conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": SEED_LOCK_ID})
+        ).scalar())
+        await conn.commit()
+        if not elected:
+            logger.info("Startup: another worker is seeding — waiting for it")
+            await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": SEED_LOCK_ID})
+            await conn.commit()
+            if not force and await _stored_fingerprint(conn) == fingerprint:
+                await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": SEED_LOCK_ID})
+                await conn.commit()
+                return _finish("waited")
+
+        ok = True
+        fatal_error: Exception | None = None
+        try:
+            for name, step in steps:
+                async with startup_phase(f"seed:{name}"):
+                    try:
+                        await step()
+                    except Exception as exc:
+                        ok = False
+                        if name in fatal:
+                            fatal_error = exc
+                            break
+                        logger.exception("Startup seeding step %s failed (non-fatal)", name)
+            if ok:
+                await _store_fingerprint(fingerprint)
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": SEED_LOCK_ID})
+            await conn.commit()
+    _finish("seeded" if ok else "failed")
+    if fatal_error is not None:
+        raise fatal_error
+    return _report["seeding"]
+
+
+def _finish(outcome: str) -> str:
+    _report["seeding"] = outcome
+    logger.info("Startup seeding: %s", outcome)
+    return outcome
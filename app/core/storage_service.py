@@ -4,12 +4,25 @@ Reads STORAGE_BACKEND from settings to decide where to store files.
 - "local": stores in /opt/opsflux/static/attachments/
 - "s3" or "minio": stores in S3-compatible bucket via s3_client.py
 
-All functions are async-safe. The S3 client uses boto3 synchronous calls
-wrapped in the existing s3_client.py module.
+Uploads are streamed: ``store_stream`` consumes the source in CHUNK_SIZE
+pieces, hashes (SHA-256) and counts bytes on the fly and writes each chunk
+to the backend — a temp file renamed into place on local disk, a
+multipart upload on S3 once the object outgrows MULTIPART_PART_SIZE.
+Memory per upload is bounded by one part, whatever the file size.
+
+Every blocking call (file I/O, boto3) runs through ``run_blocking`` in a
+bounded thread pool (STORAGE_IO_THREADS) so the event loop never waits on
+storage. ``iter_file`` streams a byte range back for HTTP Range downloads.
 """
 
+import asyncio
+import functools
+import hashlib
 import logging
 import os
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from uuid import uuid4
 
 from app.core.config import settings
@@ -20,12 +33,206 @@ logger = logging.getLogger(__name__)
 STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "static")
 ATTACHMENTS_DIR = os.path.join(STATIC_DIR, "attachments")
 
+CHUNK_SIZE = 1024 * 1024  # read / hash / stream granularity
+MULTIPART_PART_SIZE = 8 * 1024 * 1024  # S3 minimum is 5 MiB (except the last part)
+
+_executor: ThreadPoolExecutor | None = None
+
+
+class UploadTooLarge(Exception):
+    """Raised by ``store_stream`` once the source exceeds ``max_bytes``."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    storage_path: str
+    filename: str
+    size_bytes: int
+    sha256: str
+
 
 def _is_s3() -> bool:
     """Check if storage backend is S3/MinIO."""
     return getattr(settings, "STORAGE_BACKEND", "local") in ("s3", "minio")
 
 
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking storage call in the bounded storage I/O pool."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, getattr(settings, "STORAGE_IO_THREADS", 8)),
+            thread_name_prefix="storage-io",
+        )
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def _local_path(storage_path: str) -> str | None:
+    full_path = os.path.abspath(os.path.join(STATIC_DIR, storage_path))
+    # Prevent path traversal: resolved path must stay within STATIC_DIR
+    if not full_path.startswith(os.path.abspath(STATIC_DIR)):
+        logger.warning("Path traversal attempt blocked: %s", storage_path)
+        return None
+    return full_path
+
+
+# ── Writers ──────────────────────────────────────────────────────────────────
+
+
+class _LocalWriter:
+    """Writes to ``<path>.part`` and renames into place on close."""
+
+    def __init__(self, full_path: str):
+        self.full_path = full_path
+        self.tmp_path = f"{full_path}.part"
+        self._fh = None
+
+    async def write(self, chunk: bytes) -> None:
+        if self._fh is None:
+            os.makedirs(os.path.dirname(self.full_path), exist_ok=True)
+            self._fh = await run_blocking(open, self.tmp_path, "wb")
+        await run_blocking(self._fh.write, chunk)
+
+    async def close(self) -> None:
+        if self._fh is None:  # empty upload
+            await self.write(b"")
+        await run_blocking(self._fh.close)
+        await run_blocking(os.replace, self.tmp_path, self.full_path)
+
+    async def abort(self) -> None:
+        if self._fh is not None:
+            await run_blocking(self._fh.close)
+        if os.path.exists(self.tmp_path):
+            await run_blocking(os.remove, self.tmp_path)
+
+
+class _S3Writer:
+    """Single PUT for small objects, multipart upload above one part."""
+
+    def __init__(self, key: str, content_type: str):
+        from app.core.s3_client import get_s3_client
+
+        self.client = get_s3_client()
+        self.key = key
+        self.content_type = content_type
+        self.buffer = bytearray()
+        self.upload_id: str | None = None
+        self.parts: list[dict] = []
+
+    async def write(self, chunk: bytes) -> None:
+        self.buffer += chunk
+        while len(self.buffer) >= MULTIPART_PART_SIZE:
+            part = bytes(self.buffer[:MULTIPART_PART_SIZE])
+            del self.buffer[:MULTIPART_PART_SIZE]
+            await self._upload_part(part)
+
+    async def _upload_part(self, data: bytes) -> None:
+        if self.upload_id is None:
+            created = await run_blocking(
+                self.client.create_multipart_upload,
+                Bucket=settings.S3_BUCKET, Key=self.key, ContentType=self.content_type,
+            )
+            self.upload_id = created["UploadId"]
+        number = len(self.parts) + 1
+        result = await run_blocking(
+            self.client.upload_part,
+            Bucket=settings.S3_BUCKET, Key=self.key, UploadId=self.upload_id,
+            PartNumber=number, Body=data,
+        )
+        self.parts.append({"PartNumber": number, "ETag": result["ETag"]})
+
+    async def close(self) -> None:
+        if self.upload_id is None:
+            await run_blocking(
+                self.client.put_object,
+                Bucket=settings.S3_BUCKET, Key=self.key, Body=bytes(self.buffer),
+                ContentType=self.content_type,
+            )
+            return
+        if self.buffer:
+            await self._upload_part(bytes(self.buffer))
+            self.buffer.clear()
+        await run_blocking(
+            self.client.complete_multipart_upload,
+            Bucket=settings.S3_BUCKET, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+
+    async def abort(self) -> None:
+        self.buffer.clear()
+        if self.upload_id is not None:
+            await run_blocking(
+                self.client.abort_multipart_upload,
+                Bucket=settings.S3_BUCKET, Key=self.key, UploadId=self.upload_id,
+            )
+
+
+async def _iter_source(source) -> AsyncIterator[bytes]:
+    """Yield chunks from bytes, an object with async ``read(n)`` or an async iterable."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for offset in range(0, len(view), CHUNK_SIZE):
+            yield bytes(view[offset: offset + CHUNK_SIZE])
+        return
+    if hasattr(source, "read"):
+        while chunk := await source.read(CHUNK_SIZE):
+            yield chunk
+        return
+    async for chunk in source:
+        if chunk:
+            yield chunk
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+
+
+async def store_stream(
+    source,
+    owner_type: str,
+    owner_id: str,
+    original_filename: str,
+    content_type: str = "application/octet-stream",
+    *,
+    max_bytes: int | None = None,
+) -> StoredObject:
+    """Stream ``source`` to storage, hashing and sizing it on the way.
+
+    ``source`` is bytes, an ``UploadFile`` (anything with async
+    ``read(n)``) or an async iterable of bytes. Raises ``UploadTooLarge``
+    as soon as more than ``max_bytes`` have been read; the partial object
+    is discarded.
+    """
+    ext = os.path.splitext(original_filename)[1]
+    unique_name = f"{uuid4().hex}{ext}"
+    # Same structured path on both backends: attachments/{owner_type}/{owner_id}/{filename}
+    storage_path = f"attachments/{owner_type}/{owner_id}/{unique_name}"
+    if _is_s3():
+        writer = _S3Writer(storage_path, content_type)
+    else:
+        writer = _LocalWriter(os.path.join(ATTACHMENTS_DIR, owner_type, owner_id, unique_name))
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async for chunk in _iter_source(source):
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            digest.update(chunk)
+            await writer.write(chunk)
+        await writer.close()
+    except BaseException:
+        await writer.abort()
+        raise
+    logger.info("Storage: stored %s (%d bytes)", storage_path, size)
+    return StoredObject(storage_path, unique_name, size, digest.hexdigest())
+
+
 async def store_file(
     content: bytes,
     owner_type: str,
@@ -38,36 +245,106 @@ async def store_file(
     storage_path is the relative path (for DB) or S3 key.
     filename is the unique generated name.
     """
-    ext = os.path.splitext(original_filename)[1]
-    unique_name = f"{uuid4().hex}{ext}"
-
-    if _is_s3():
-        from app.core.s3_client import upload_file
-        # Store in S3 with structured path: {owner_type}/{owner_id}/{filename}
-        folder = f"attachments/{owner_type}/{owner_id}"
-        object_key = await upload_file(content, unique_name, content_type, folder)
-        return object_key, unique_name
-    else:
-        # Local: {owner_type}/{owner_id}/
-        type_dir = os.path.join(ATTACHMENTS_DIR, owner_type, owner_id)
-        os.makedirs(type_dir, exist_ok=True)
-        file_path = os.path.join(type_dir, unique_name)
-        with open(file_path, "wb") as f:
-            f.write(content)
-        storage_path = f"attachments/{owner_type}/{owner_id}/{unique_name}"
-        return storage_path, unique_name
+    stored = await store_stream(content, owner_type, owner_id, original_filename, content_type)
+    return stored.storage_path, stored.filename
 
 
 async def get_file_path(storage_path: str) -> str | None:
     """Get the absolute local file path, or None if using S3."""
     if _is_s3():
         return None  # Use presigned URL instead
-    full_path = os.path.abspath(os.path.join(STATIC_DIR, storage_path))
-    # Prevent path traversal: resolved path must stay within STATIC_DIR
-    if not full_path.startswith(os.path.abspath(STATIC_DIR)):
-        logger.warning("Path traversal attempt blocked: %s", storage_path)
+    full_path = _local_path(storage_path)
+    return full_path if full_path and os.path.exists(full_path) else None
+
+
+async def get_file_size(storage_path: str) -> int | None:
+    """Return the stored object size in bytes (None on missing)."""
+    if _is_s3():
+        from app.core.s3_client import get_s3_client
+
+        try:
+            head = await run_blocking(get_s3_client().head_object, Bucket=settings.S3_BUCKET, Key=storage_path)
+        except Exception:
+            return None
+        return int(head["ContentLength"])
+    full_path = await get_file_path(storage_path)
+    return os.path.getsize(full_path) if full_path else None
+
+
+async def iter_file(storage_path: str, start: int = 0, end: int | None = None) -> AsyncIterator[bytes]:
+    """Stream bytes ``start``..``end`` (inclusive, ``None`` = EOF) in CHUNK_SIZE pieces."""
+    if _is_s3():
+        from app.core.s3_client import get_s3_client
+
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        response = await run_blocking(
+            get_s3_client().get_object, Bucket=settings.S3_BUCKET, Key=storage_path, Range=byte_range,
+        )
+        body = response["Body"]
+        try:
+            while chunk := await run_blocking(body.read, CHUNK_SIZE):
+                yield chunk
+        finally:
+            await run_blocking(body.close)
+        return
+
+    full_path = await get_file_path(storage_path)
+    if not full_path:
+        return
+    fh = await run_blocking(open, full_path, "rb")
+    try:
+        await run_blocking(fh.seek, start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+            chunk = await run_blocking(fh.read, size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        await run_blocking(fh.close)
+
+
+def parse_byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a single-range ``Range: bytes=…`` header into inclusive offsets.
+
+    Returns None when there is no usable range (serve the whole object);
+    raises ValueError for an unsatisfiable range (HTTP 416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
         return None
-    return full_path if os.path.exists(full_path) else None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first == "":  # suffix range: last N bytes
+            length = int(last)
+            if length <= 0:
+                raise ValueError(header)
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        raise ValueError(header) from None
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+async def hash_stored_file(storage_path: str) -> str | None:
+    """SHA-256 of a stored object, streamed (None on missing)."""
+    digest = hashlib.sha256()
+    seen = False
+    try:
+        async for chunk in iter_file(storage_path):
+            seen = True
+            digest.update(chunk)
+    except Exception:
+        logger.warning("Failed to hash stored file: %s", storage_path)
+        return None
+    if not seen and await get_file_size(storage_path) is None:
+        return None
+    return digest.hexdigest()
 
 
 async def get_file_bytes(storage_path: str) -> bytes | None:
@@ -82,9 +359,13 @@ async def get_file_bytes(storage_path: str) -> bytes | None:
     full_path = await get_file_path(storage_path)
     if not full_path:
         return None
-    try:
+
+    def _read() -> bytes:
         with open(full_path, "rb") as f:
             return f.read()
+
+    try:
+        return await run_blocking(_read)
     except OSError:
         logger.warning("Failed to read local file: %s", storage_path)
         return None
@@ -104,7 +385,7 @@ async def delete_stored_file(storage_path: str) -> None:
         from app.core.s3_client import delete_file
         await delete_file(storage_path)
     else:
-        full_path = os.path.join(STATIC_DIR, storage_path)
-        if os.path.exists(full_path):
-            os.remove(full_path)
+        full_path = _local_path(storage_path)
+        if full_path and os.path.exists(full_path):
+            await run_blocking(os.remove, full_path)
             logger.info("Local: deleted %s", storage_path)
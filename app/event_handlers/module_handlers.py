@@ -1681,25 +1681,24 @@ async def on_project_task_planner_sync_required(event: OpsFluxEvent) -> None:
 
     try:
         from sqlalchemy import select
-        from app.api.deps import has_user_permission
         from app.core.notifications import send_in_app
+        from app.core.rbac import users_with_permission
         from app.models.common import User
 
         eid = UUID(str(entity_id))
         async with async_session_factory() as db:
-            users = (
-                await db.execute(
-                    select(User).where(
-                        User.default_entity_id == eid,
-                        User.active == True,
-                    )
-                )
-            ).scalars().all()
-
+            holder_ids = await users_with_permission(eid, "planner.activity.validate", db)
             recipient_ids: list[UUID] = []
-            for user in users:
-                if await has_user_permission(user, eid, "planner.activity.validate", db):
-                    recipient_ids.append(user.id)
+            if holder_ids:
+                recipient_ids = list((
+                    await db.execute(
+                        select(User.id).where(
+                            User.id.in_(holder_ids),
+                            User.default_entity_id == eid,
+                            User.active == True,
+                        )
+                    )
+                ).scalars().all())
 
             if not recipient_ids:
                 return
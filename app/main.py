@@ -155,37 +155,53 @@ async def lifespan(app: FastAPI):
             traces_sample_rate=0.1 if settings.is_prod else 1.0,
         )
 
-    await init_db()
-    await init_redis()
+    from app.core.startup import log_startup_report, run_seeding, startup_phase
+
+    async with startup_phase("connections"):
+        await init_db()
+        await init_redis()
 
     # Register modules (idempotent)
     registry = ModuleRegistry()
-    for manifest in [ASSET_MANIFEST, TIERS_MANIFEST, DASHBOARD_MANIFEST, WORKFLOW_MANIFEST, PAXLOG_MANIFEST, CONFORMITE_MANIFEST, PROJETS_MANIFEST, PLANNER_MANIFEST, TRAVELWIZ_MANIFEST, PACKLOG_MANIFEST, PAPYRUS_MANIFEST, PID_PFD_MANIFEST, MESSAGING_MANIFEST, SUPPORT_MANIFEST, MOC_MANIFEST, TEAMS_MANIFEST, MTO_MANIFEST]:
-        await registry.register(manifest)
+    async with startup_phase("modules"):
+        for manifest in [ASSET_MANIFEST, TIERS_MANIFEST, DASHBOARD_MANIFEST, WORKFLOW_MANIFEST, PAXLOG_MANIFEST, CONFORMITE_MANIFEST, PROJETS_MANIFEST, PLANNER_MANIFEST, TRAVELWIZ_MANIFEST, PACKLOG_MANIFEST, PAPYRUS_MANIFEST, PID_PFD_MANIFEST, MESSAGING_MANIFEST, SUPPORT_MANIFEST, MOC_MANIFEST, TEAMS_MANIFEST, MTO_MANIFEST]:
+            await registry.register(manifest)
 
-    # Sync module permissions & roles to DB (idempotent upsert — D-021)
+    # Permission/role sync (D-021) + production essentials (entity, admin,
+    # workflows, templates, etc.) — skipped when their inputs are unchanged
+    # since the last seed, and run by a single elected worker otherwise.
+    from app.core.database import async_session_factory
     from app.services.core.permission_sync import sync_permissions_and_roles
-    await sync_permissions_and_roles()
+    from app.services.core.seed_service import seed_production_essentials
+
+    async def _seed_production_essentials() -> None:
+        async with async_session_factory() as session:
+            await seed_production_essentials(session)
+
+    async with startup_phase("seeding"):
+        await run_seeding(
+            registry.get_all_modules(),
+            [
+                ("permissions", sync_permissions_and_roles),
+                ("production_essentials", _seed_production_essentials),
+            ],
+            force=settings.STARTUP_FORCE_SEED,
+            fatal=frozenset({"permissions"}),
+        )
 
     # Event handlers
-    from app.core.events import event_bus
-    register_all_handlers(event_bus)
+    async with startup_phase("event_handlers"):
+        from app.core.events import event_bus
+        register_all_handlers(event_bus)
 
     # Widget data providers (dashboard)
-    from app.services.modules.dashboard_widget_providers import register_all_widget_providers
-    register_all_widget_providers()
+    async with startup_phase("widget_providers"):
+        from app.services.modules.dashboard_widget_providers import register_all_widget_providers
+        register_all_widget_providers()
 
     # MCP plugins
-    await register_mcp_plugins()
-
-    # Production essentials — ALWAYS run (idempotent: entity, admin, workflows, templates, etc.)
-    try:
-        from app.core.database import async_session_factory
-        from app.services.core.seed_service import seed_production_essentials
-        async with async_session_factory() as session:
-            await seed_production_essentials(session)
-    except Exception:
-        logger.exception("Failed to seed production essentials (non-fatal)")
+    async with startup_phase("mcp_plugins"):
+        await register_mcp_plugins()
 
     # Dev-only test data (sample users, sample assets) — only when explicitly enabled
     if settings.is_dev and settings.DEV_SEED_ON_STARTUP:
@@ -195,7 +211,8 @@ async def lifespan(app: FastAPI):
             await seed_dev_data(session)
 
     # APScheduler
-    await start_scheduler()
+    async with startup_phase("scheduler"):
+        await start_scheduler()
 
     # ── Agent maintenance scheduler (Sprint 7) ──
     # Fire-and-forget background tasks — they stop when the event
@@ -212,11 +229,17 @@ async def lifespan(app: FastAPI):
     app.state.agent_weekly_task = _asyncio.create_task(weekly_digest_loop())
     app.state.agent_orphan_task = _asyncio.create_task(orphan_rescue_loop())
 
+    # Auth context cache: drop local entries invalidated by other workers.
+    from app.core.auth_context import run_invalidation_listener
+    app.state.auth_invalidation_task = _asyncio.create_task(run_invalidation_listener())
+
     logger.info("OpsFlux ready — %d modules loaded", len(registry.get_all_modules()))
+    log_startup_report()
 
     yield
 
     # ── SHUTDOWN ─────────────────────────────────────────────────
+    app.state.auth_invalidation_task.cancel()
     await stop_scheduler()
     await close_native_backends()
     await close_http_client()
@@ -239,6 +262,8 @@ app = FastAPI(
 # ─── Middlewares (order matters: last added = first executed) ──────────────
 from app.core.middleware.sensitive_data_audit import SensitiveDataAuditMiddleware
 from app.core.middleware.body_size_limit import BodySizeLimitMiddleware
+from app.core.middleware.db_query_stats import DbQueryStatsMiddleware
+app.add_middleware(DbQueryStatsMiddleware)
 app.add_middleware(SensitiveDataAuditMiddleware)
 app.add_middleware(RateLimitMiddleware, max_requests=200, window_seconds=60)
 # 2 MB soft cap on non-multipart JSON bodies — prevents memory-exhaustion
@@ -660,3 +685,16 @@ async def health_check():
             "redis": "ok" if redis_ok else "error",
         },
     )
+
+
+@app.get("/api/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (PROMETHEUS_ENABLED + prometheus_client installed)."""
+    from starlette.responses import Response
+
+    from app.core import db_instrumentation
+
+    client = db_instrumentation.prometheus_client
+    if not settings.PROMETHEUS_ENABLED or client is None:
+        return Response(status_code=404)
+    return Response(client.generate_latest(), media_type=client.CONTENT_TYPE_LATEST)
@@ -35,6 +35,7 @@ from app.models.pid_pfd import (  # noqa: F401
     ProcessLine,
     PIDConnection,
     DCSTag,
+    DCSTagRenameJournal,
     TagNamingRule,
     ProcessLibItem,
     PIDLock,
@@ -3,12 +3,13 @@
 from datetime import date, datetime
 from decimal import Decimal
 from typing import Any
-from uuid import UUID as PyUUID
+from uuid import UUID as PyUUID, uuid4
 
 from sqlalchemy import (
     Boolean,
     CheckConstraint,
     Column,
+    DDL,
     Date,
     DateTime,
     Float,
@@ -19,7 +20,9 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    event,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import BYTEA, JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -256,6 +259,8 @@ class User(UUIDPrimaryKeyMixin, TimestampMixin, Base):
         UUID(as_uuid=True), ForeignKey("tier_contacts.id"), unique=True, index=True
     )
     intranet_id: Mapped[str | None] = mapped_column(String(100), unique=True, index=True)
+    # Directory identity set by user sync, e.g. "ldap:<dn>", "azure:<id>".
+    external_ref: Mapped[str | None] = mapped_column(String(255), index=True)
     last_login_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     language: Mapped[str] = mapped_column(String(5), default="fr", nullable=False)
     avatar_url: Mapped[str | None] = mapped_column(String(500))
@@ -678,8 +683,16 @@ class PasswordHistory(UUIDPrimaryKeyMixin, Base):
 
 # ─── Audit Log ───────────────────────────────────────────────────────────────
 
-class AuditLog(UUIDPrimaryKeyMixin, Base):
+class AuditLog(Base):
+    # Monthly range partitions on created_at (see app.core.audit). The
+    # physical primary key is (id, created_at) because PostgreSQL requires
+    # the partition key in it; ids stay unique, so the mapper keeps ``id``
+    # alone as identity for ``db.get(AuditLog, id)``.
     __tablename__ = "audit_log"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+    __mapper_args__ = {"primary_key": ["id"]}
+
+    id: Mapped[PyUUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
 
     entity_id: Mapped[PyUUID | None] = mapped_column(UUID(as_uuid=True))
     user_id: Mapped[PyUUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"))
@@ -690,10 +703,22 @@ class AuditLog(UUIDPrimaryKeyMixin, Base):
     ip_address: Mapped[str | None] = mapped_column(String(45))
     user_agent: Mapped[str | None] = mapped_column(String(500))
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
     )
 
 
+# Tables built with ``create_all`` get no monthly partitions; the DEFAULT one
+# keeps them writable until the retention job creates the monthly ones and
+# moves the rows over (``app.core.audit.ensure_audit_partitions``).
+event.listen(
+    AuditLog.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT").execute_if(
+        dialect="postgresql"
+    ),
+)
+
+
 # ─── Notifications ──────────────────────────────────────────────────────────
 
 class Notification(UUIDPrimaryKeyMixin, TimestampMixin, Base):
@@ -814,6 +839,18 @@ class TierContact(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     __tablename__ = "tier_contacts"
     __table_args__ = (
         Index("idx_tier_contacts_tier", "tier_id"),
+        Index("idx_tier_contacts_match_name_key", "tier_id", "match_name_key"),
+        Index("idx_tier_contacts_match_email", "tier_id", "match_email"),
+        Index("idx_tier_contacts_match_phone", "tier_id", "match_phone"),
+        Index("idx_tier_contacts_match_badge", "tier_id", "match_badge"),
+        Index(
+            "idx_tier_contacts_first_name_trgm", "first_name",
+            postgresql_using="gin", postgresql_ops={"first_name": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_tier_contacts_last_name_trgm", "last_name",
+            postgresql_using="gin", postgresql_ops={"last_name": "gin_trgm_ops"},
+        ),
     )
 
     tier_id: Mapped[PyUUID] = mapped_column(
@@ -848,6 +885,12 @@ class TierContact(UUIDPrimaryKeyMixin, TimestampMixin, Base):
         String(20), default="active", server_default="active", nullable=False
     )  # active | incomplete | suspended | archived
 
+    # ── Duplicate-matching keys (services.modules.contact_match_index) ──
+    match_name_key: Mapped[str | None] = mapped_column(String(201))  # phonetic "first last"
+    match_email: Mapped[str | None] = mapped_column(String(255))
+    match_phone: Mapped[str | None] = mapped_column(String(50))
+    match_badge: Mapped[str | None] = mapped_column(String(100))
+
     tier: Mapped["Tier"] = relationship(back_populates="contacts")
     job_position: Mapped["JobPosition | None"] = relationship(foreign_keys=[job_position_id])
     promoted_user: Mapped["User | None"] = relationship(
@@ -902,6 +945,14 @@ class TierContact(UUIDPrimaryKeyMixin, TimestampMixin, Base):
         return jp.name if jp else None
 
 
+@event.listens_for(TierContact, "before_insert")
+@event.listens_for(TierContact, "before_update")
+def _refresh_tier_contact_match_keys(mapper, connection, target: TierContact) -> None:
+    from app.services.modules.contact_match_index import apply_contact_match_keys
+
+    apply_contact_match_keys(target)
+
+
 class LegalIdentifier(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     """Legal / fiscal identifier — polymorphic (entity, tier, user, etc.).
 
@@ -1331,6 +1382,8 @@ class Attachment(UUIDPrimaryKeyMixin, TimestampMixin, SoftDeleteMixin, Base):
         Index("idx_attachments_owner", "owner_type", "owner_id"),
         Index("idx_attachments_entity", "entity_id"),
         Index("idx_attachments_category", "category"),
+        Index("idx_attachments_content_hash", "entity_id", "file_hash_sha256"),
+        Index("idx_attachments_storage_path", "storage_path"),
     )
 
     owner_type: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -1922,6 +1975,10 @@ class Project(UUIDPrimaryKeyMixin, TimestampMixin, AuditUserMixin, SoftDeleteMix
         Index("idx_projects_manager", "manager_id"),
         Index("idx_projects_type", "project_type"),
         Index("idx_projects_department", "department_id"),
+        Index(
+            "uq_projects_entity_gouti_ref", "entity_id", "external_ref",
+            unique=True, postgresql_where=text("external_ref LIKE 'gouti:%'"),
+        ),
     )
 
     entity_id: Mapped[PyUUID] = mapped_column(UUID(as_uuid=True), ForeignKey("entities.id"), nullable=False)
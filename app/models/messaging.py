@@ -10,6 +10,7 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     func,
@@ -192,6 +193,26 @@ class LoginEvent(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     )
 
 
+class LoginEventHourly(Base):
+    """Hourly rollup of ``login_events`` (see ``app.services.core.stats_rollup``).
+
+    One row per closed UTC hour, written by the catch-up job. ``ip_sketch``
+    is a compressed HyperLogLog sketch of the source IPs, so distinct-IP
+    counts can be merged across hours without keeping the addresses.
+    """
+    __tablename__ = "login_event_hourly"
+
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    successful: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    blocked: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    suspicious: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failure_reasons: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    # {"invalid_password": 12, "account_locked": 1}
+    ip_sketch: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
 # ─── Security Rules (admin-configurable) ─────────────────────────────────────
 
 class SecurityRule(UUIDPrimaryKeyMixin, TimestampMixin, SoftDeleteMixin, Base):
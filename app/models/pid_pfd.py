@@ -72,6 +72,9 @@ class PIDDocument(UUIDPrimaryKeyMixin, TimestampMixin, SoftDeleteMixin, Base):
     created_by: Mapped[PyUUID | None] = mapped_column(
         UUID(as_uuid=True), ForeignKey("users.id"), nullable=True
     )
+    sync_fingerprints: Mapped[dict | None] = mapped_column(
+        JSONB, nullable=True
+    )  # {mxgraph_cell_id: content hash} of the last XML → DB sync
 
     # Relationships
     revisions: Mapped[list["PIDRevision"]] = relationship(
@@ -274,6 +277,7 @@ class PIDConnection(UUIDPrimaryKeyMixin, TimestampMixin, Base):
             "entity_id", "from_entity_type", "from_entity_id",
         ),
         Index("idx_pid_connections_document", "pid_document_id"),
+        Index("idx_pid_connections_document_cell", "pid_document_id", "mxgraph_cell_id"),
         CheckConstraint(
             "connection_type IN ('process','instrument','utility','drain','vent')",
             name="ck_pid_connections_type",
@@ -305,6 +309,9 @@ class PIDConnection(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     flow_direction: Mapped[str] = mapped_column(
         String(20), nullable=False, default="forward"
     )
+    mxgraph_cell_id: Mapped[str | None] = mapped_column(
+        String(100), nullable=True
+    )  # draw.io edge this connection was synced from
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -380,6 +387,35 @@ class DCSTag(UUIDPrimaryKeyMixin, TimestampMixin, SoftDeleteMixin, Base):
     pid_document: Mapped["PIDDocument | None"] = relationship(back_populates="dcs_tags")
 
 
+# ─── DCS Tag Rename Journal ────────────────────────────────────────────────
+
+
+class DCSTagRenameJournal(UUIDPrimaryKeyMixin, TimestampMixin, Base):
+    """Applied bulk tag rename — per-tag old/new names, replayed backwards to revert."""
+    __tablename__ = "dcs_tag_rename_journal"
+    __table_args__ = (
+        Index("idx_dcs_tag_rename_journal_entity_project", "entity_id", "project_id"),
+    )
+
+    entity_id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("entities.id"), nullable=False
+    )
+    project_id: Mapped[PyUUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("projects.id"), nullable=True
+    )
+    renames: Mapped[list] = mapped_column(JSONB, nullable=False)  # [{tag_id, old_name, new_name}]
+    references: Mapped[dict] = mapped_column(
+        JSONB, nullable=False, default=dict
+    )  # rows rewritten per tag-bearing column / P&ID documents
+    reverts_id: Mapped[PyUUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("dcs_tag_rename_journal.id"), nullable=True
+    )  # set on the journal entry written by a revert
+    reverted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_by: Mapped[PyUUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id"), nullable=True
+    )
+
+
 # ─── Tag Naming Rules ──────────────────────────────────────────────────────
 
 
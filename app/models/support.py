@@ -13,6 +13,7 @@ from sqlalchemy import (
     Integer,
     String,
     Text,
+    event,
     func,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
@@ -100,6 +101,48 @@ class SupportTicket(UUIDPrimaryKeyMixin, TimestampMixin, SoftDeleteMixin, Base):
     todos = relationship("TicketTodo", back_populates="ticket", cascade="all, delete-orphan", order_by="TicketTodo.order")
 
 
+class SupportTicketCounter(Base):
+    """Live ticket counts per entity and (status, type, priority, archived).
+
+    Maintained by the ``SupportTicket`` mapper events below and reconciled
+    nightly by ``app.services.core.stats_rollup.reconcile_ticket_counters``.
+    """
+    __tablename__ = "support_ticket_counters"
+
+    entity_id: Mapped[PyUUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("entities.id", ondelete="CASCADE"), primary_key=True
+    )
+    status: Mapped[str] = mapped_column(String(20), primary_key=True)
+    ticket_type: Mapped[str] = mapped_column(String(20), primary_key=True)
+    priority: Mapped[str] = mapped_column(String(20), primary_key=True)
+    archived: Mapped[bool] = mapped_column(Boolean, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+@event.listens_for(SupportTicket, "after_insert")
+def _count_inserted_ticket(mapper, connection, target: SupportTicket) -> None:
+    from app.services.core.stats_rollup import bump_ticket_counters, ticket_counter_key
+
+    bump_ticket_counters(connection, {ticket_counter_key(target, connection): 1})
+
+
+@event.listens_for(SupportTicket, "before_update")
+def _count_updated_ticket(mapper, connection, target: SupportTicket) -> None:
+    from app.services.core.stats_rollup import bump_ticket_counters, ticket_counter_key
+
+    old = ticket_counter_key(target, connection, previous=True)
+    new = ticket_counter_key(target, connection)
+    if old != new:
+        bump_ticket_counters(connection, {old: -1, new: 1})
+
+
+@event.listens_for(SupportTicket, "before_delete")
+def _count_deleted_ticket(mapper, connection, target: SupportTicket) -> None:
+    from app.services.core.stats_rollup import bump_ticket_counters, ticket_counter_key
+
+    bump_ticket_counters(connection, {ticket_counter_key(target, connection, previous=True): -1})
+
+
 class TicketComment(UUIDPrimaryKeyMixin, TimestampMixin, Base):
     """Comment/reply on a support ticket."""
     __tablename__ = "ticket_comments"
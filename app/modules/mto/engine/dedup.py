@@ -1,15 +1,40 @@
 from dataclasses import dataclass
 from typing import List
-from rapidfuzz import fuzz
-from app.modules.mto.engine.parsing import parse_diameter, detect_family, family_from_hierarchy
-from app.modules.mto.engine.normalize import normalize_text
 import re
+import zlib
+import numpy as np
+from rapidfuzz import fuzz, process
+from app.modules.mto.engine.parsing import (
+    parse_diameter, detect_family, family_from_hierarchy,
+    parse_material, parse_pressure, parse_schedule,
+)
+from app.modules.mto.engine.normalize import normalize_text
 
 # Un (fabricant, ref) partage par plus de N articles = valeur placeholder /
 # donnee sale, jamais un vrai doublon -> ignore comme signal.
 REF_GROUP_MAX = 8
-# Au-dela de cette taille, pas de all-pairs flou intra-bloc (perf O(n^2)).
-BLOCK_FUZZY_MAX = 800
+# Jusqu'a cette taille (textes distincts), un bloc est score en all-pairs
+# (cdist dense). Au-dela : sous-blocs par signature + MinHash/LSH. Pas de
+# plafond : les gros blocs (tubes, raccords courants) sont aussi scores.
+DENSE_BLOCK_MAX = 500
+# Lignes par paquet cdist (triangle superieur, memoire ~ lignes x bloc) et
+# couples par paquet cpdist : bornent la memoire du scoring.
+CDIST_ROWS = 128
+PAIR_CHUNK = 500_000
+# Threads rapidfuzz pour cdist/cpdist (-1 = tous les coeurs).
+SCORE_WORKERS = -1
+# MinHash/LSH sur les tokens de description : LSH_BANDS bandes de LSH_ROWS
+# lignes. Seuil de Jaccard ~ (1/bandes)^(1/lignes) ~ 0.2 : rappel eleve,
+# le scoring elimine ensuite les faux candidats.
+LSH_BANDS = 20
+LSH_ROWS = 2
+LSH_SEED = 20240611
+# Token present dans plus de cette part d'un bloc = non discriminant (ex.
+# "pipe", "in") : exclu des shingles, sinon tout le bloc tombe dans un seau.
+LSH_COMMON_TOKEN_RATIO = 0.5
+# Textes traites par paquet MinHash (borne la matrice permutations x tokens).
+LSH_CHUNK = 2000
+_MERSENNE = np.uint64((1 << 61) - 1)
 # Valeurs de ref fabricant non discriminantes (placeholders) a ignorer.
 _REF_PLACEHOLDERS = {
     "0", "00", "000", "1", "-", "--", ".", "..", "na", "n/a", "tba", "tbd",
@@ -28,46 +53,166 @@ class Cluster:
     reason: str
     rows: list
 
+def _rank(reason):
+    # a score egal, un signal certain l'emporte sur un rapprochement flou
+    return (reason[2], reason[1] == "Certain")
+
 class _UnionFind:
+    """Union-find qui retient, par composante, le meilleur lien connu."""
     def __init__(self):
         self.parent = {}
+        self.best = {}
     def find(self, x):
         self.parent.setdefault(x, x)
         while self.parent[x] != x:
             self.parent[x] = self.parent[self.parent[x]]
             x = self.parent[x]
         return x
-    def union(self, a, b):
-        self.parent[self.find(a)] = self.find(b)
+    def union(self, a, b, reason=None):
+        ra, rb = self.find(a), self.find(b)
+        candidates = [r for r in (self.best.pop(ra, None), self.best.pop(rb, None), reason) if r]
+        self.parent[ra] = rb
+        if candidates:
+            self.best[rb] = max(candidates, key=_rank)
 
 def _diam_from_designation(desig):
     m = re.search(r'(\d+(?:[ \-]\d+/\d+|/\d+)?)\s*"', str(desig))
     return parse_diameter(m.group(0))[0] if m else None
 
+def _fuzzy_reason(sim):
+    conf = "Élevé" if sim >= 92 else "Moyen"
+    return (f"attributs + texte proches ({round(sim, 1)})", conf, sim)
+
+def _score_group(texts, arts, threshold, uf):
+    """All-pairs (triangle sup.) d'un groupe via cdist, par paquets de lignes."""
+    n = len(texts)
+    for start in range(0, n - 1, CDIST_ROWS):
+        stop = min(start + CDIST_ROWS, n - 1)
+        scores = process.cdist(
+            texts[start:stop], texts[start:], scorer=fuzz.token_set_ratio,
+            score_cutoff=threshold, workers=SCORE_WORKERS,
+        )
+        for r, c in zip(*np.nonzero(scores)):
+            i, j = start + int(r), start + int(c)
+            if j > i:
+                uf.union(arts[i], arts[j], _fuzzy_reason(float(scores[r, c])))
+
+def _score_pairs(texts, arts, pairs, threshold, uf):
+    """Score des couples candidats (i, j) via cpdist, par paquets."""
+    for start in range(0, len(pairs), PAIR_CHUNK):
+        left, right = pairs[start:start + PAIR_CHUNK].T
+        scores = process.cpdist(
+            [texts[i] for i in left], [texts[j] for j in right],
+            scorer=fuzz.token_set_ratio, score_cutoff=threshold, workers=SCORE_WORKERS,
+        )
+        for k in np.nonzero(scores)[0]:
+            uf.union(arts[left[k]], arts[right[k]], _fuzzy_reason(float(scores[k])))
+
+def _candidate_pairs(groups, n):
+    """Couples (i < j) distincts issus des groupes candidats."""
+    codes = []
+    for g in groups:
+        g = np.asarray(sorted(g), dtype=np.int64)
+        i, j = np.triu_indices(len(g), 1)
+        codes.append(g[i] * n + g[j])
+    if not codes:
+        return np.empty((0, 2), dtype=np.int64)
+    codes = np.unique(np.concatenate(codes))
+    return np.stack([codes // n, codes % n], axis=1)
+
+def _minhash(token_sets):
+    """Signatures MinHash (textes x LSH_BANDS*LSH_ROWS), vectorisees par paquets."""
+    rng = np.random.RandomState(LSH_SEED)
+    n_perm = LSH_BANDS * LSH_ROWS
+    a = rng.randint(1, 1 << 31, size=(n_perm, 1)).astype(np.uint64)
+    b = rng.randint(0, 1 << 31, size=(n_perm, 1)).astype(np.uint64)
+    sig = np.empty((len(token_sets), n_perm), dtype=np.uint64)
+    for start in range(0, len(token_sets), LSH_CHUNK):
+        chunk = token_sets[start:start + LSH_CHUNK]
+        hashes = np.fromiter(
+            (zlib.crc32(t.encode()) for toks in chunk for t in toks), dtype=np.uint64)
+        offsets = np.cumsum([0] + [len(toks) for toks in chunk[:-1]])
+        permuted = (a * hashes[None, :] + b) % _MERSENNE
+        sig[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return sig
+
+def _lsh_buckets(texts):
+    """Seaux LSH (indices, >= 2 membres) sur les tokens discriminants."""
+    token_sets = [set(t.split()) for t in texts]
+    df = {}
+    for toks in token_sets:
+        for t in toks:
+            df[t] = df.get(t, 0) + 1
+    common = {t for t, c in df.items() if c > LSH_COMMON_TOKEN_RATIO * len(texts)}
+    keep = [i for i, toks in enumerate(token_sets) if toks]
+    shingles = [sorted(token_sets[i] - common or token_sets[i]) for i in keep]
+    if not shingles:
+        return []
+    sig = _minhash(shingles)
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = np.ascontiguousarray(sig[:, band * LSH_ROWS:(band + 1) * LSH_ROWS])
+        keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * LSH_ROWS))).ravel()
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        if counts.max() < 2:
+            continue
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(counts)[:-1]
+        buckets += [[keep[m] for m in members]
+                    for members, count in zip(np.split(order, bounds), counts) if count >= 2]
+    return buckets
+
+def _score_block(group, threshold, uf):
+    """Score flou d'un bloc (famille, diametre), quelle que soit sa taille."""
+    # textes identiques : doublons d'office (token_set_ratio = 100), puis un
+    # seul representant par texte distinct pour le scoring
+    by_text = {}
+    for it in group:
+        by_text.setdefault(it["norm"], []).append(it)
+    for same in by_text.values():
+        for other in same[1:]:
+            uf.union(same[0]["article"], other["article"], _fuzzy_reason(100.0))
+    reps = [same[0] for same in by_text.values()]
+    if len(reps) < 2:
+        return
+    if len(reps) <= DENSE_BLOCK_MAX:
+        _score_group([it["norm"] for it in reps], [it["article"] for it in reps], threshold, uf)
+        return
+    # gros bloc : candidats = meme signature (matiere, pression, schedule)
+    # + seaux LSH ; couples dedoublonnes puis scores en cpdist
+    texts = [it["norm"] for it in reps]
+    by_sig = {}
+    for i, it in enumerate(reps):
+        by_sig.setdefault(it["sig"], []).append(i)
+    groups = [g for g in by_sig.values() if 2 <= len(g) <= DENSE_BLOCK_MAX]
+    groups += _lsh_buckets(texts)
+    pairs = _candidate_pairs(groups, len(reps))
+    _score_pairs(texts, [it["article"] for it in reps], pairs, threshold, uf)
+
 def find_duplicates(df, fuzzy_threshold=88):
     rows = df.to_dict("records")
     items = []
     for r in rows:
-        fam = detect_family(str(r.get("designation", "")))
+        desig = str(r.get("designation", ""))
+        fam = detect_family(desig)
         if fam == "OTHER":
             fam = family_from_hierarchy(r.get("hier_pdt_desc"))
         items.append({
             "article": r.get("article"), "fam": fam,
             "diam": _diam_from_designation(r.get("designation")),
             "norm": normalize_text(f"{r.get('designation','')} {r.get('designation_long','')}"),
+            "sig": (parse_material(desig), parse_pressure(desig), parse_schedule(desig)),
             "fab": str(r.get("fabricant") or "").strip(),
             "ref": _clean_ref(r.get("ref_fabricant")),
             "subst": str(r.get("subst_ca") or "").strip(),
             "row": r,
         })
     uf = _UnionFind()
-    reason = {}
     by_art = {it["article"]: it for it in items}
     # 1) signal CERTAIN : substitution declaree dans SAP
     for it in items:
         if it["subst"] and it["subst"] in by_art:
-            uf.union(it["article"], it["subst"])
-            reason[frozenset((it["article"], it["subst"]))] = ("substitution SAP", "Certain", 100.0)
+            uf.union(it["article"], it["subst"], ("substitution SAP", "Certain", 100.0))
     # 1bis) signal CERTAIN : meme (fabricant, ref). On ignore les groupes trop
     # gros (placeholder / donnee sale, jamais un vrai doublon).
     by_ref = {}
@@ -78,44 +223,26 @@ def find_duplicates(df, fuzzy_threshold=88):
         if len(arts) > REF_GROUP_MAX:
             continue
         for other in arts[1:]:
-            uf.union(arts[0], other)
-            reason[frozenset((arts[0], other))] = ("ref fabricant identique", "Certain", 100.0)
+            uf.union(arts[0], other, ("ref fabricant identique", "Certain", 100.0))
     # 2) signal flou : blocking par (famille, diametre). On EXIGE un diametre :
-    # un bloc sans diametre n'est pas discriminant -> sur-unions + explosion
-    # O(n^2). On borne aussi la taille de bloc.
+    # un bloc sans diametre n'est pas discriminant -> sur-unions.
     blocks = {}
     for it in items:
         if it["fam"] == "OTHER" or it["diam"] is None:
             continue
         blocks.setdefault((it["fam"], round(it["diam"], 3)), []).append(it)
     for group in blocks.values():
-        if len(group) < 2 or len(group) > BLOCK_FUZZY_MAX:
-            continue
-        for i in range(len(group)):
-            for j in range(i + 1, len(group)):
-                a, b = group[i], group[j]
-                sim = fuzz.token_set_ratio(a["norm"], b["norm"])
-                if sim >= fuzzy_threshold:
-                    uf.union(a["article"], b["article"])
-                    fs = frozenset((a["article"], b["article"]))
-                    if fs not in reason:
-                        conf = "Élevé" if sim >= 92 else "Moyen"
-                        reason[fs] = (f"attributs + texte proches ({sim})", conf, float(sim))
-    # 3) reconstituer les clusters
+        if len(group) >= 2:
+            _score_block(group, fuzzy_threshold, uf)
+    # 3) reconstituer les clusters ; confiance/score/raison = meilleur lien connu
     groups = {}
     for it in items:
         groups.setdefault(uf.find(it["article"]), []).append(it["article"])
     clusters = []
-    for arts in groups.values():
+    for root, arts in groups.items():
         if len(arts) < 2:
             continue
-        # confiance/score/raison du cluster = meilleur lien connu
-        best = ("", "Faible", 0.0)
-        for i in range(len(arts)):
-            for j in range(i + 1, len(arts)):
-                fs = frozenset((arts[i], arts[j]))
-                if fs in reason and reason[fs][2] >= best[2]:
-                    best = reason[fs]
+        best = uf.best.get(root, ("", "Faible", 0.0))
         clusters.append(Cluster(
             articles=sorted(arts), score=best[2], confidence=best[1],
             reason=best[0], rows=[by_art[a]["row"] for a in sorted(arts)]))
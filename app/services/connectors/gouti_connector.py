@@ -5,10 +5,21 @@ API: https://apiprd.gouti.net/v1/client
 Auth: OAuth2 code → token flow, or cached long-lived token.
 Data: Projects, Reports, Status updates
 """
-import httpx
+import asyncio
+import hashlib
+import json
+import time
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass, field
 from typing import Any
 from datetime import datetime
 
+import httpx
+
+# Requests in flight per connector (and pooled keep-alive connections).
+MAX_CONCURRENCY = 8
+HTTP_TIMEOUT_SECONDS = 30
+
 
 def _extract_items(data: Any, key: str) -> list[dict[str, Any]]:
     """Extract list items from Gouti's various response shapes.
@@ -46,7 +57,14 @@ def _extract_items(data: Any, key: str) -> list[dict[str, Any]]:
 
 
 class GoutiConnector:
-    """Client for the Gouti project management API."""
+    """Client for the Gouti project management API.
+
+    One keep-alive ``httpx.AsyncClient`` is shared by every call made
+    through a connector instance, at most ``max_concurrency`` requests are
+    in flight at once, and the token obtained by the first call is reused
+    (concurrent callers wait on a lock instead of each authenticating).
+    Use it as an async context manager, or call ``aclose()``.
+    """
 
     def __init__(
         self,
@@ -55,6 +73,9 @@ class GoutiConnector:
         client_secret: str,
         entity_code: str,
         token: str | None = None,
+        *,
+        max_concurrency: int = MAX_CONCURRENCY,
+        transport: httpx.AsyncBaseTransport | None = None,
     ):
         self.base_url = base_url.rstrip("/")
         self.client_id = client_id
@@ -62,6 +83,35 @@ class GoutiConnector:
         self.entity_code = entity_code
         self._token: str | None = token or None
         self._token_expires: datetime | None = None
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._auth_lock = asyncio.Lock()
+        self.max_concurrency = max(1, max_concurrency)
+        self.request_count = 0
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=HTTP_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "GoutiConnector":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
 
     async def _authenticate(self) -> str:
         """Two-step OAuth: request code → exchange for token.
@@ -72,12 +122,15 @@ class GoutiConnector:
         """
         if self._token:
             return self._token
-        if not self.client_secret:
-            raise ValueError(
-                "Gouti auth failed: no cached token and no client_secret "
-                "to perform the OAuth code exchange."
-            )
-        async with httpx.AsyncClient(timeout=30) as client:
+        async with self._auth_lock:
+            if self._token:  # another caller authenticated while we waited
+                return self._token
+            if not self.client_secret:
+                raise ValueError(
+                    "Gouti auth failed: no cached token and no client_secret "
+                    "to perform the OAuth code exchange."
+                )
+            client = self._http()
             # Step 1: Request authorization code
             code_resp = await client.post(
                 f"{self.base_url}/code",
@@ -124,33 +177,44 @@ class GoutiConnector:
             "Accept": "application/json",
         }
 
+    async def _get(self, path: str) -> httpx.Response:
+        """GET through the shared client, bounded by the concurrency semaphore.
+
+        A 401 drops the cached token and retries once after a fresh OAuth
+        exchange (only possible with a client_secret).
+        """
+        async with self._semaphore:
+            for attempt in (1, 2):
+                headers = await self._get_headers()
+                stale_token = self._token
+                resp = await self._http().get(f"{self.base_url}{path}", headers=headers)
+                self.request_count += 1
+                if resp.status_code == 401 and attempt == 1 and self.client_secret:
+                    if self._token == stale_token:
+                        self._token = None
+                    continue
+                resp.raise_for_status()
+                return resp
+        raise AssertionError("unreachable")
+
     async def get_projects(self) -> list[dict[str, Any]]:
         """Fetch all projects from Gouti.
 
         Handles all response shapes via ``_extract_items`` — notably the
         dict-keyed-by-id shape which is Gouti's default for list endpoints.
         """
-        headers = await self._get_headers()
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(f"{self.base_url}/projects", headers=headers)
-            resp.raise_for_status()
-            return _extract_items(resp.json(), "projects")
+        resp = await self._get("/projects")
+        return _extract_items(resp.json(), "projects")
 
     async def get_project(self, project_id: str) -> dict[str, Any]:
         """Fetch a single project by ID."""
-        headers = await self._get_headers()
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(f"{self.base_url}/projects/{project_id}", headers=headers)
-            resp.raise_for_status()
-            return resp.json()
+        resp = await self._get(f"/projects/{project_id}")
+        return resp.json()
 
     async def get_project_reports(self, project_id: str) -> list[dict[str, Any]]:
         """Fetch reports for a project."""
-        headers = await self._get_headers()
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(f"{self.base_url}/projects/{project_id}/reports", headers=headers)
-            resp.raise_for_status()
-            return _extract_items(resp.json(), "reports")
+        resp = await self._get(f"/projects/{project_id}/reports")
+        return _extract_items(resp.json(), "reports")
 
     async def get_project_tasks(self, project_id: str) -> list[dict[str, Any]]:
         """Fetch tasks for a specific project from Gouti.
@@ -159,35 +223,52 @@ class GoutiConnector:
         by ``_extract_items`` so callers receive a flat list with an
         ``_id`` field injected from the container key.
         """
-        headers = await self._get_headers()
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(
-                f"{self.base_url}/projects/{project_id}/tasks",
-                headers=headers,
-            )
-            resp.raise_for_status()
-            return _extract_items(resp.json(), "tasks")
+        resp = await self._get(f"/projects/{project_id}/tasks")
+        return _extract_items(resp.json(), "tasks")
+
+    async def iter_project_tasks(
+        self, project_ids: Iterable[str],
+    ) -> AsyncIterator[tuple[str, list[dict[str, Any]] | Exception]]:
+        """Fetch the task lists of many projects in parallel.
+
+        Yields ``(project_id, tasks)`` in completion order; a failed fetch
+        yields the exception instead of the list so one broken project
+        does not abort the others. Concurrency is bounded by ``_get``.
+        """
+
+        async def _one(project_id: str):
+            try:
+                return project_id, await self.get_project_tasks(project_id)
+            except Exception as exc:
+                return project_id, exc
+
+        pending = [asyncio.ensure_future(_one(pid)) for pid in project_ids]
+        try:
+            for fut in asyncio.as_completed(pending):
+                yield await fut
+        finally:
+            for fut in pending:
+                fut.cancel()
 
     async def get_raw_projects_response(self) -> dict[str, Any]:
         """Diagnostic: returns the untransformed Gouti /projects response
         plus metadata (status, shape). Used by the /gouti/debug endpoint."""
         headers = await self._get_headers()
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(f"{self.base_url}/projects", headers=headers)
-            try:
-                body = resp.json()
-            except Exception:
-                body = resp.text
-            return {
-                "http_status": resp.status_code,
-                "shape": type(body).__name__,
-                "top_level_keys": list(body.keys()) if isinstance(body, dict) else None,
-                "sample_body_preview": (
-                    {k: (list(v.keys())[:3] if isinstance(v, dict) else v) for k, v in list(body.items())[:3]}
-                    if isinstance(body, dict) else
-                    body[:3] if isinstance(body, list) else str(body)[:300]
-                ),
-            }
+        resp = await self._http().get(f"{self.base_url}/projects", headers=headers)
+        try:
+            body = resp.json()
+        except Exception:
+            body = resp.text
+        return {
+            "http_status": resp.status_code,
+            "shape": type(body).__name__,
+            "top_level_keys": list(body.keys()) if isinstance(body, dict) else None,
+            "sample_body_preview": (
+                {k: (list(v.keys())[:3] if isinstance(v, dict) else v) for k, v in list(body.items())[:3]}
+                if isinstance(body, dict) else
+                body[:3] if isinstance(body, list) else str(body)[:300]
+            ),
+        }
 
     async def test_connection(self) -> tuple[str, str]:
         """Test the connection to Gouti API."""
@@ -200,6 +281,8 @@ class GoutiConnector:
             return ("error", f"Impossible de se connecter à {self.base_url}")
         except Exception as e:
             return ("error", str(e)[:300])
+        finally:
+            await self.aclose()
 
 
 def create_gouti_connector(settings: dict[str, Any]) -> GoutiConnector:
@@ -211,3 +294,40 @@ def create_gouti_connector(settings: dict[str, Any]) -> GoutiConnector:
         entity_code=settings.get("entity_code", ""),
         token=settings.get("token") or None,
     )
+
+
+def content_hash(*parts: Any) -> str:
+    """Stable SHA-256 of JSON-serialisable Gouti payloads (key order ignored)."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class SyncProgress:
+    """Counters of a running sync, with throughput for progress reporting."""
+
+    total: int = 0
+    fetched: int = 0
+    applied: int = 0
+    skipped: int = 0
+    failed: int = 0
+    tasks: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> int:
+        return self.applied + self.skipped + self.failed
+
+    def snapshot(self, requests: int = 0) -> dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        return {
+            "total": self.total,
+            "fetched": self.fetched,
+            "applied": self.applied,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "tasks": self.tasks,
+            "requests": requests,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "projects_per_second": round(self.done / elapsed, 2),
+        }
@@ -650,6 +650,16 @@ PROVIDER_SETTINGS_PREFIX: dict[str, str] = {
     "scim": "integration.scim",
 }
 
+# ``external_ref`` prefix each provider stamps on its users ("azure:<id>", …)
+PROVIDER_REF_PREFIX: dict[str, str] = {
+    "ldap": "ldap",
+    "azure_ad": "azure",
+    "gouti": "gouti",
+    "okta": "okta",
+    "keycloak": "keycloak",
+    "scim": "scim",
+}
+
 
 def get_provider(provider_id: str, settings: dict[str, str]) -> UserSyncProvider:
     """Build a provider instance from settings dict."""
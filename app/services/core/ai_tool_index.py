@@ -0,0 +1,123 @@
+"""Embedding index over MCP tools for the AI chat tool planner.
+
+The planner only sees a shortlist of tools. Tool names + descriptions are
+embedded once with the local model2vec model (the same static model the
+MTO engine uses, ``app.modules.mto.engine.semantic``) and cached under a
+hash of the tool list, so a new message costs one short query encoding
+and a matrix-vector product instead of re-scanning every description.
+
+When model2vec (or its weights) is unavailable the index carries no
+vectors and ranking falls back to keyword overlap — the former behaviour.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Shortlist sent to the planner, and its size when nothing clears the bar.
+TOOL_TOP_K = 12
+TOOL_FALLBACK_K = 8
+# Cosine below which a tool is not considered related to the question.
+MIN_TOOL_SIMILARITY = 0.2
+# Added to the cosine when the question names the tool explicitly.
+NAME_MENTION_BOOST = 1.0
+# Distinct tool lists kept in memory (one per backend version in practice).
+INDEX_CACHE_SIZE = 4
+
+_WORD_RE = re.compile(r"[a-zA-Z0-9_:-]{3,}")
+
+
+@dataclass(frozen=True)
+class ToolIndex:
+    key: str
+    names: tuple[str, ...]
+    vectors: np.ndarray | None  # L2-normalised rows, None = keyword ranking
+    positions: dict[str, int]
+
+
+_indexes: "OrderedDict[str, ToolIndex]" = OrderedDict()
+
+
+def tool_list_key(tools: list[dict]) -> str:
+    payload = json.dumps(
+        [[t.get("name", ""), t.get("description", "")] for t in tools],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _tool_text(tool: dict) -> str:
+    return f"{tool.get('name', '').replace('_', ' ')}. {tool.get('description', '')}"
+
+
+def _encode(texts: list[str]) -> np.ndarray:
+    """L2-normalised embeddings (model loaded lazily on first call)."""
+    from app.modules.mto.engine import semantic
+
+    return semantic.encode(texts)
+
+
+def _build(key: str, tools: list[dict]) -> ToolIndex:
+    names = tuple(t.get("name", "") for t in tools)
+    try:
+        vectors = np.asarray(_encode([_tool_text(t) for t in tools]), dtype=np.float32)
+    except Exception:
+        logger.warning("AI tool index: embeddings unavailable, keyword ranking only", exc_info=True)
+        vectors = None
+    return ToolIndex(key=key, names=names, vectors=vectors, positions={n: i for i, n in enumerate(names)})
+
+
+async def get_tool_index(tools: list[dict]) -> ToolIndex:
+    """Index for this tool list, built once (off the event loop) per distinct list."""
+    key = tool_list_key(tools)
+    index = _indexes.get(key)
+    if index is None:
+        # First message after startup / a tool list change; concurrent
+        # builds of the same list are idempotent.
+        index = await asyncio.to_thread(_build, key, tools)
+        _indexes[key] = index
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    else:
+        _indexes.move_to_end(key)
+    return index
+
+
+def keyword_score(question: str, tool: dict) -> int:
+    haystack = f"{tool.get('name', '')} {tool.get('description', '')}".lower()
+    words = set(_WORD_RE.findall(question.lower()))
+    if not words:
+        return 0
+    score = sum(1 for word in words if word in haystack)
+    if tool.get("name", "").lower() in question.lower():
+        score += 3
+    return score
+
+
+def select_tools(question: str, tools: list[dict], index: ToolIndex) -> list[dict]:
+    """Rank ``tools`` (already filtered by visibility + allowlist) for ``question``."""
+    if not tools:
+        return []
+    rows = [index.positions.get(t.get("name", "")) for t in tools]
+    if index.vectors is None or any(r is None for r in rows):
+        ranked = sorted(tools, key=lambda t: keyword_score(question, t), reverse=True)
+        chosen = [t for t in ranked if keyword_score(question, t) > 0][:TOOL_TOP_K]
+        return chosen or ranked[:TOOL_FALLBACK_K]
+
+    query = np.asarray(_encode([question]), dtype=np.float32)[0]
+    scores = index.vectors[rows] @ query
+    lowered = question.lower()
+    for i, tool in enumerate(tools):
+        if tool.get("name", "").lower() in lowered:
+            scores[i] += NAME_MENTION_BOOST
+    order = np.argsort(-scores, kind="stable")
+    chosen = [tools[i] for i in order[:TOOL_TOP_K] if scores[i] >= MIN_TOOL_SIMILARITY]
+    return chosen or [tools[i] for i in order[:TOOL_FALLBACK_K]]
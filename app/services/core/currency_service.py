@@ -9,18 +9,37 @@ Design rationale: financial figures (cost rebill, accruals,
 intercompany invoices) MUST be reproducible at the original operation
 date — never at "today's rate". So every rate ever applied is kept and
 addressed by date.
+
+Lookups are served from an in-memory ``RateTable`` per entity: the whole
+``currency_rates`` history is loaded once into sorted per-pair timelines
+(direct, inverse, and triangulated through the entity currency as pivot),
+and "as-of" lookups are a binary search. The table is dropped on rate
+create/delete (``invalidate_rate_table``) and shared workers notice through a
+Redis version counter. ``convert_many`` converts a whole batch of lines with
+no further DB round-trip.
 """
 
 from __future__ import annotations
 
+import bisect
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
 from datetime import date as date_type
 from uuid import UUID
 
-from sqlalchemy import desc, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.redis_client import bump_version, read_version
 from app.models.common import CurrencyRate, Entity
 
+logger = logging.getLogger(__name__)
+
+# Max age of a cached rate table when the Redis version counter is unreachable.
+RATE_TABLE_TTL_SECONDS = 300
+
 
 class RateNotFoundError(Exception):
     """No currency rate available for (entity, from, to) at on_date."""
@@ -33,6 +52,150 @@ async def get_entity_currency(db: AsyncSession, entity_id: UUID) -> str:
     return currency or "EUR"
 
 
+@dataclass
+class _Timeline:
+    """Rates of one (from, to) pair sorted by effective date."""
+
+    dates: list[date_type] = field(default_factory=list)
+    rates: list[float] = field(default_factory=list)
+
+    def at(self, on_date: date_type) -> float | None:
+        i = bisect.bisect_right(self.dates, on_date) - 1
+        return self.rates[i] if i >= 0 else None
+
+
+def _combine(first: _Timeline, second: _Timeline) -> _Timeline:
+    """Timeline of ``first * second`` at every date where both are defined."""
+    out = _Timeline()
+    for d in sorted(set(first.dates) | set(second.dates)):
+        a, b = first.at(d), second.at(d)
+        if a is not None and b is not None:
+            out.dates.append(d)
+            out.rates.append(a * b)
+    return out
+
+
+@dataclass
+class RateTable:
+    """All rate timelines of one entity.
+
+    Resolution order for a pair on a date mirrors the historical lookup:
+    the direct rate if one is effective, else the inverse of the reverse
+    pair, else the rate triangulated through ``pivot``.
+    """
+
+    entity_id: UUID
+    pivot: str
+    direct: dict[tuple[str, str], _Timeline] = field(default_factory=dict)
+    inverse: dict[tuple[str, str], _Timeline] = field(default_factory=dict)
+    triangulated: dict[tuple[str, str], _Timeline] = field(default_factory=dict)
+    version: str | None = None
+
+    @classmethod
+    def build(
+        cls,
+        entity_id: UUID,
+        pivot: str,
+        rows: Sequence[tuple[str, str, float, date_type]],
+    ) -> "RateTable":
+        table = cls(entity_id=entity_id, pivot=pivot)
+        for from_currency, to_currency, rate, effective_date in sorted(rows, key=lambda r: r[3]):
+            rate = float(rate)
+            tl = table.direct.setdefault((from_currency, to_currency), _Timeline())
+            tl.dates.append(effective_date)
+            tl.rates.append(rate)
+            if rate != 0:
+                inv = table.inverse.setdefault((to_currency, from_currency), _Timeline())
+                inv.dates.append(effective_date)
+                inv.rates.append(1.0 / rate)
+
+        # X -> pivot and pivot -> Y legs (direct preferred, inverse otherwise).
+        currencies = {c for pair in table.direct for c in pair} - {pivot}
+        to_pivot = {c: table._leg(c, pivot) for c in currencies}
+        from_pivot = {c: table._leg(pivot, c) for c in currencies}
+        for a in currencies:
+            for b in currencies:
+                if a == b:
+                    continue
+                if to_pivot[a] is not None and from_pivot[b] is not None:
+                    combined = _combine(to_pivot[a], from_pivot[b])
+                    if combined.dates:
+                        table.triangulated[(a, b)] = combined
+        return table
+
+    def _leg(self, from_currency: str, to_currency: str) -> _Timeline | None:
+        direct = self.direct.get((from_currency, to_currency))
+        inverse = self.inverse.get((from_currency, to_currency))
+        if direct and inverse:
+            # Direct wins whenever it is effective; inverse fills the gaps before.
+            merged = _Timeline()
+            for d in sorted(set(direct.dates) | set(inverse.dates)):
+                rate = direct.at(d)
+                if rate is None:
+                    rate = inverse.at(d)
+                merged.dates.append(d)
+                merged.rates.append(rate)
+            return merged
+        return direct or inverse
+
+    def rate(self, from_currency: str, to_currency: str, on_date: date_type) -> float | None:
+        if from_currency == to_currency:
+            return 1.0
+        pair = (from_currency, to_currency)
+        for timelines in (self.direct, self.inverse, self.triangulated):
+            tl = timelines.get(pair)
+            if tl is not None:
+                rate = tl.at(on_date)
+                if rate is not None:
+                    return rate
+        return None
+
+
+# ── Per-worker cache ─────────────────────────────────────────────────────────
+
+# entity_id -> (table, loaded_at)
+_rate_tables: dict[UUID, tuple[RateTable, float]] = {}
+
+
+def _version_key(entity_id: UUID) -> str:
+    return f"currency_rates:version:{entity_id}"
+
+
+async def get_rate_table(db: AsyncSession, entity_id: UUID) -> RateTable:
+    """Rate table of ``entity_id`` — two queries on a cold cache, none after."""
+    version = await read_version(_version_key(entity_id))
+    cached = _rate_tables.get(entity_id)
+    if cached is not None:
+        table, loaded_at = cached
+        if version is not None and table.version == version:
+            return table
+        if version is None and time.monotonic() - loaded_at < RATE_TABLE_TTL_SECONDS:
+            return table
+
+    pivot = await get_entity_currency(db, entity_id)
+    result = await db.execute(
+        select(
+            CurrencyRate.from_currency,
+            CurrencyRate.to_currency,
+            CurrencyRate.rate,
+            CurrencyRate.effective_date,
+        ).where(CurrencyRate.entity_id == entity_id)
+    )
+    table = RateTable.build(entity_id, pivot, result.all())
+    table.version = version
+    _rate_tables[entity_id] = (table, time.monotonic())
+    return table
+
+
+async def invalidate_rate_table(entity_id: UUID) -> None:
+    """Drop the cached table after a rate is created or deleted."""
+    _rate_tables.pop(entity_id, None)
+    await bump_version(_version_key(entity_id))
+
+
+# ── Lookups ──────────────────────────────────────────────────────────────────
+
+
 async def get_rate(
     db: AsyncSession,
     entity_id: UUID,
@@ -40,45 +203,17 @@ async def get_rate(
     to_currency: str,
     on_date: date_type,
 ) -> float:
-    """Lookup the most recent rate ≤ on_date. Falls back to inverse if needed."""
+    """Lookup the most recent rate ≤ on_date (direct, inverse, then via pivot)."""
     if from_currency == to_currency:
         return 1.0
 
-    # Direct lookup
-    direct = await db.execute(
-        select(CurrencyRate.rate)
-        .where(
-            CurrencyRate.entity_id == entity_id,
-            CurrencyRate.from_currency == from_currency,
-            CurrencyRate.to_currency == to_currency,
-            CurrencyRate.effective_date <= on_date,
-        )
-        .order_by(desc(CurrencyRate.effective_date))
-        .limit(1)
-    )
-    rate = direct.scalar_one_or_none()
-    if rate is not None:
-        return float(rate)
-
-    # Inverse fallback
-    inverse = await db.execute(
-        select(CurrencyRate.rate)
-        .where(
-            CurrencyRate.entity_id == entity_id,
-            CurrencyRate.from_currency == to_currency,
-            CurrencyRate.to_currency == from_currency,
-            CurrencyRate.effective_date <= on_date,
+    table = await get_rate_table(db, entity_id)
+    rate = table.rate(from_currency, to_currency, on_date)
+    if rate is None:
+        raise RateNotFoundError(
+            f"No rate {from_currency}->{to_currency} for entity {entity_id} at {on_date}"
         )
-        .order_by(desc(CurrencyRate.effective_date))
-        .limit(1)
-    )
-    inv = inverse.scalar_one_or_none()
-    if inv is not None and inv != 0:
-        return 1.0 / float(inv)
-
-    raise RateNotFoundError(
-        f"No rate {from_currency}->{to_currency} for entity {entity_id} at {on_date}"
-    )
+    return rate
 
 
 async def convert(
@@ -92,3 +227,41 @@ async def convert(
     """Convert amount using the historical rate at on_date."""
     rate = await get_rate(db, entity_id, from_currency, to_currency, on_date)
     return amount * rate
+
+
+async def convert_many(
+    db: AsyncSession,
+    entity_id: UUID,
+    amounts: Sequence[float],
+    currencies: Sequence[str],
+    dates: Sequence[date_type],
+    target: str,
+    *,
+    strict: bool = True,
+) -> list[float | None]:
+    """Convert parallel sequences of amounts into ``target``.
+
+    Each amount uses the rate effective on its own date. Distinct
+    (currency, date) pairs are resolved once. With ``strict`` a missing rate
+    raises ``RateNotFoundError``; otherwise that position is None.
+    """
+    if not (len(amounts) == len(currencies) == len(dates)):
+        raise ValueError("amounts, currencies and dates must have the same length")
+
+    table = await get_rate_table(db, entity_id)
+    resolved: dict[tuple[str, date_type], float | None] = {}
+    out: list[float | None] = []
+    for amount, currency, on_date in zip(amounts, currencies, dates):
+        key = (currency, on_date)
+        if key not in resolved:
+            resolved[key] = table.rate(currency, target, on_date)
+        rate = resolved[key]
+        if rate is None:
+            if strict:
+                raise RateNotFoundError(
+                    f"No rate {currency}->{target} for entity {entity_id} at {on_date}"
+                )
+            out.append(None)
+        else:
+            out.append(amount * rate)
+    return out
@@ -16,7 +16,6 @@ The registry is built automatically from SQLAlchemy models at import time:
 
 import logging
 import re
-from datetime import UTC, datetime, timedelta
 from typing import Any
 from uuid import UUID
 
@@ -285,50 +284,81 @@ async def purge_archived(
     entity_type: str,
     retention_days: int,
     db: AsyncSession,
+    *,
+    chunk_size: int | None = None,
+    sleep_seconds: float = 0.0,
+    time_budget_seconds: float | None = None,
 ) -> int:
     """Physically delete archived records older than retention_days.
 
-    Returns the number of purged records.
+    Runs the chunked purge engine (see ``purge_engine``); an interrupted or
+    time-boxed run resumes from its checkpoint on the next call. Returns
+    the number of records purged by the run (including resumed progress).
     """
+    report = await purge_archived_report(
+        entity_type, retention_days, db,
+        chunk_size=chunk_size, sleep_seconds=sleep_seconds, time_budget_seconds=time_budget_seconds,
+    )
+    return report.purged if report else 0
+
+
+async def purge_archived_report(
+    entity_type: str,
+    retention_days: int,
+    db: AsyncSession,
+    *,
+    chunk_size: int | None = None,
+    sleep_seconds: float = 0.0,
+    time_budget_seconds: float | None = None,
+):
+    """Same as ``purge_archived`` but returns the full ``PurgeReport``."""
+    from app.services.core.purge_engine import DEFAULT_CHUNK_SIZE, purge_table
+
     registry = _ensure_registry()
     reg = registry.get(entity_type)
     if not reg:
         logger.warning("purge_archived: unknown entity type %s", entity_type)
-        return 0
-
-    table_name = reg["table"]
-    cutoff = datetime.now(UTC) - timedelta(days=retention_days)
+        return None
 
-    # Use raw SQL for performance — we don't need ORM here
-    result = await db.execute(
-        text(
-            f"DELETE FROM {table_name} "  # noqa: S608 — table_name is from registry, not user input
-            "WHERE archived = true AND updated_at < :cutoff "
-            "RETURNING id"
-        ),
-        {"cutoff": cutoff},
+    report = await purge_table(
+        db, entity_type, reg["table"], retention_days,
+        chunk_size=chunk_size or DEFAULT_CHUNK_SIZE,
+        sleep_seconds=sleep_seconds,
+        time_budget_seconds=time_budget_seconds,
     )
-    purged = len(result.fetchall())
-    await db.commit()
 
-    if purged > 0:
-        logger.info("Purged %d archived %s records (retention=%d days)", purged, entity_type, retention_days)
+    if report.purged > 0 or report.blocked > 0:
+        logger.info(
+            "Purged %d archived %s records, %d blocked by references (retention=%d days, %s)",
+            report.purged, entity_type, report.blocked, retention_days,
+            "complete" if report.completed else "paused",
+        )
 
-    return purged
+    return report
 
 
-async def get_archived_counts(db: AsyncSession) -> dict[str, int]:
+async def get_archived_counts(db: AsyncSession, *, exact: bool = False) -> dict[str, int]:
     """Return count of archived records per entity type (for admin stats).
 
-    Uses SAVEPOINTs so that a failed COUNT on a table without the archived
-    column does not abort the entire transaction.
+    By default counts are planner estimates: ``pg_class.reltuples`` times
+    the frequency of ``archived = true`` from ``pg_stats``, all tables in
+    one catalog query. Tables never analysed — and every table when
+    ``exact`` is set — fall back to ``COUNT(*)``, each in a SAVEPOINT so a
+    table without the archived column does not abort the transaction.
     """
     registry = _ensure_registry()
+    tables = {
+        entity_type: reg["table"]
+        for entity_type, reg in registry.items()
+        if reg["category"] == "main"  # Only main entities support soft-delete / archived
+    }
+    estimates = {} if exact else await _estimate_archived(db, set(tables.values()))
+
     counts: dict[str, int] = {}
-    for entity_type, reg in registry.items():
-        if reg["category"] != "main":
-            continue  # Only main entities support soft-delete / archived
-        table_name = reg["table"]
+    for entity_type, table_name in tables.items():
+        if table_name in estimates:
+            counts[entity_type] = estimates[table_name]
+            continue
         try:
             async with db.begin_nested():
                 result = await db.execute(
@@ -341,6 +371,42 @@ async def get_archived_counts(db: AsyncSession) -> dict[str, int]:
     return counts
 
 
+async def _estimate_archived(db: AsyncSession, tables: set[str]) -> dict[str, int]:
+    """Estimated archived rows per analysed table, from the planner statistics."""
+    rows = (
+        await db.execute(
+            text(
+                "SELECT c.relname, c.reltuples, s.most_common_vals::text, s.most_common_freqs "
+                "FROM pg_class c "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "LEFT JOIN pg_stats s ON s.schemaname = n.nspname "
+                "  AND s.tablename = c.relname AND s.attname = 'archived' "
+                "WHERE c.relkind IN ('r', 'p') AND c.relname = ANY(:tables) "
+                "  AND n.nspname = ANY(current_schemas(false)) "
+                "ORDER BY array_position(current_schemas(false), n.nspname::text)"
+            ),
+            {"tables": sorted(tables)},
+        )
+    ).all()
+
+    estimates: dict[str, int] = {}
+    seen: set[str] = set()
+    for relname, reltuples, values, freqs in rows:
+        if relname in seen:
+            continue  # shadowed by the same table earlier in the search_path
+        seen.add(relname)
+        if reltuples is None or reltuples < 0 or values is None:
+            continue  # never analysed
+        mcv = values.strip("{}").split(",")
+        freqs = list(freqs or [])
+        if "t" in mcv:
+            share = freqs[mcv.index("t")]
+        else:
+            share = max(0.0, 1.0 - sum(freqs))
+        estimates[relname] = int(round(reltuples * share))
+    return estimates
+
+
 async def upsert_delete_policy(
     entity_type: str,
     mode: str,
@@ -9,6 +9,7 @@ from fastapi import HTTPException
 from sqlalchemy import select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.auth_context import get_disabled_modules, invalidate_auth_entity
 from app.core.module_registry import ModuleRegistry
 from app.models.common import Entity
 from app.models.dashboard import Dashboard, DashboardTab, UserDashboardTab
@@ -61,7 +62,9 @@ async def is_module_enabled(db: AsyncSession, entity_id: UUID, slug: str | None)
         return True
     if ModuleRegistry().get_module(normalized) is None:
         return False
-    disabled = await _load_entity_disabled_modules(db, entity_id)
+    disabled = await get_disabled_modules(
+        entity_id, lambda: _load_entity_disabled_modules(db, entity_id)
+    )
     return normalized not in disabled
 
 
@@ -307,6 +310,7 @@ async def set_module_enabled_for_entity(
         scope="entity",
         scope_id=str(entity_id),
     )
+    await invalidate_auth_entity(entity_id)
     modules = await list_modules_for_entity(db, entity_id)
     for module in modules:
         if module["slug"] == normalized:
@@ -30,7 +30,7 @@ from typing import Any
 from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import hash_password, verify_password
+from app.core.password_hashing import hash_password, verify_many
 from app.models.common import PasswordHistory, User
 
 
@@ -91,33 +91,38 @@ async def check_history_reuse(
     """
     size = int(config.get("password_history_size", 5) or 0)
 
+    rows: list[str] = []
+    if size > 0:
+        rows = list(
+            (
+                await db.execute(
+                    select(PasswordHistory.hashed_password)
+                    .where(PasswordHistory.user_id == user.id)
+                    .order_by(PasswordHistory.created_at.desc())
+                    .limit(size)
+                )
+            ).scalars().all()
+        )
+
+    # Current hash + history verified in parallel on the hashing pool:
+    # one bcrypt round-trip of latency instead of size + 1.
+    current = [user.hashed_password] if user.hashed_password else []
+    matches = await verify_many(password, current + rows)
+
     # Always block reusing the current password — regardless of the
     # history window setting. This catches the "reset to my own
     # password" trick.
-    if user.hashed_password and verify_password(password, user.hashed_password):
+    if current and matches[0]:
         raise PasswordPolicyError(
             "PASSWORD_REUSE",
             "Le nouveau mot de passe doit être différent du mot de passe actuel.",
         )
 
-    if size <= 0:
-        return
-
-    rows = (
-        await db.execute(
-            select(PasswordHistory.hashed_password)
-            .where(PasswordHistory.user_id == user.id)
-            .order_by(PasswordHistory.created_at.desc())
-            .limit(size)
+    if any(matches[len(current):]):
+        raise PasswordPolicyError(
+            "PASSWORD_REUSE_HISTORY",
+            f"Ce mot de passe a déjà été utilisé récemment (historique des {size} derniers).",
         )
-    ).scalars().all()
-
-    for h in rows:
-        if verify_password(password, h):
-            raise PasswordPolicyError(
-                "PASSWORD_REUSE_HISTORY",
-                f"Ce mot de passe a déjà été utilisé récemment (historique des {size} derniers).",
-            )
 
 
 async def record_password_change(
@@ -141,7 +146,9 @@ async def record_password_change(
         db.add(
             PasswordHistory(
                 user_id=user.id,
-                hashed_password=hash_password(new_plain_password),
+                # Same hash the caller just stored on the user: no second
+                # bcrypt run for the history row.
+                hashed_password=user.hashed_password or await hash_password(new_plain_password),
             )
         )
         await db.flush()
@@ -0,0 +1,353 @@
+"""Chunked, resumable purge of archived records.
+
+``delete_service.purge_archived`` used to issue one ``DELETE … RETURNING``
+over every expired archived row of a table: long locks, a WAL burst, and a
+single blocking foreign key made the whole purge fail. This engine works
+from the model metadata behind ``delete_service._build_registry``:
+
+* ``build_cascade_plan`` walks the foreign keys pointing at the purged
+  table. References with ``ON DELETE CASCADE`` / ``SET NULL`` are left to
+  PostgreSQL. Mandatory (NOT NULL) references from child tables
+  (hard-delete category or plain association tables) are owned rows and
+  become explicit steps, deleted children first. Optional references and
+  references from main entities or protected tables (audit trail, users,
+  settings, RBAC) are *blockers*: rows they still point at are skipped.
+* ``purge_table`` selects candidate ids in keyset order (``id > last``),
+  deletes each chunk and its plan inside one transaction, and records the
+  last id in a checkpoint setting in that same transaction. An interrupted
+  run resumes after the last committed chunk with the original cutoff.
+  A chunk hitting an unexpected FK violation is retried row by row and
+  the offending rows are counted as blocked instead of aborting the run.
+* ``sleep_seconds`` throttles between chunks and ``time_budget_seconds``
+  stops cleanly (checkpoint kept) once exceeded.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_CASCADE_DEPTH = 4
+CHECKPOINT_KEY_PREFIX = "delete_purge.checkpoint."
+
+# Tables whose rows must never be removed as a side effect of a purge.
+_PROTECTED_TABLES = frozenset({
+    "audit_log", "settings", "users", "entities", "roles", "permissions", "role_permissions",
+})
+_DB_HANDLED_ONDELETE = frozenset({"CASCADE", "SET NULL", "SET DEFAULT"})
+
+
+# ─── Cascade planning ─────────────────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class CascadeStep:
+    """Rows of ``table`` whose ``column`` references the parent step's ids."""
+
+    table: str
+    column: str
+    pk: str | None
+    children: tuple["CascadeStep", ...] = ()
+
+
+@dataclass(frozen=True)
+class Blocker:
+    """A reference that keeps a candidate row alive (``table.column``)."""
+
+    table: str
+    column: str
+
+
+@dataclass(frozen=True)
+class CascadePlan:
+    table: str
+    pk: str
+    steps: tuple[CascadeStep, ...]
+    blockers: tuple[Blocker, ...]
+
+    def delete_order(self) -> list[str]:
+        """Tables in deletion order: descendants first, the purged table last."""
+        order: list[str] = []
+
+        def visit(step: CascadeStep) -> None:
+            for child in step.children:
+                visit(child)
+            if step.table not in order:
+                order.append(step.table)
+
+        for step in self.steps:
+            visit(step)
+        order.append(self.table)
+        return order
+
+
+def _single_pk(table) -> str | None:
+    columns = list(table.primary_key.columns)
+    return columns[0].name if len(columns) == 1 else None
+
+
+def _references(metadata) -> dict[str, list[tuple[Any, Any]]]:
+    """parent table name -> [(child table, foreign key)]."""
+    refs: dict[str, list[tuple[Any, Any]]] = {}
+    for table in metadata.tables.values():
+        for fk in table.foreign_keys:
+            # target_fullname ("[schema.]table.column") does not require the
+            # referenced table to be mapped, unlike fk.column.
+            parent = fk.target_fullname.rsplit(".", 2)[-2]
+            refs.setdefault(parent, []).append((table, fk))
+    return refs
+
+
+def build_cascade_plan(
+    table_name: str,
+    *,
+    metadata=None,
+    main_tables: frozenset[str] | None = None,
+) -> CascadePlan:
+    """FK-aware cascade plan for purging rows of ``table_name``."""
+    if metadata is None:
+        from app.models.base import Base
+        metadata = Base.metadata
+    if main_tables is None:
+        from app.services.core.delete_service import _ensure_registry
+        main_tables = frozenset(
+            reg["table"] for reg in _ensure_registry().values() if reg["category"] == "main"
+        )
+    refs = _references(metadata)
+    blockers: list[Blocker] = []
+
+    def expand(parent: str, path: tuple[str, ...], depth: int) -> tuple[CascadeStep, ...]:
+        steps: list[CascadeStep] = []
+        for child, fk in refs.get(parent, []):
+            if (fk.ondelete or "").upper() in _DB_HANDLED_ONDELETE:
+                continue
+            owned = not fk.parent.nullable
+            if (
+                not owned
+                or child.name in main_tables
+                or child.name in _PROTECTED_TABLES
+                or child.name in path
+            ):
+                # Only references to the purged rows themselves can be filtered
+                # up front; deeper ones surface as FK errors on the chunk.
+                if depth == 0:
+                    blockers.append(Blocker(child.name, fk.parent.name))
+                continue
+            pk = _single_pk(child)
+            grandchildren: tuple[CascadeStep, ...] = ()
+            if pk is not None and depth + 1 < MAX_CASCADE_DEPTH:
+                grandchildren = expand(child.name, path + (child.name,), depth + 1)
+            steps.append(CascadeStep(child.name, fk.parent.name, pk, grandchildren))
+        return tuple(steps)
+
+    root = metadata.tables[table_name]
+    steps = expand(table_name, (table_name,), 0)
+    return CascadePlan(table_name, _single_pk(root) or "id", steps, tuple(blockers))
+
+
+# ─── Reporting ────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class TableStats:
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return round(self.rows / self.seconds, 1) if self.seconds > 0 else 0.0
+
+
+@dataclass
+class PurgeReport:
+    entity_type: str
+    table: str
+    cutoff: datetime
+    purged: int = 0
+    blocked: int = 0
+    chunks: int = 0
+    completed: bool = False
+    resumed: bool = False
+    tables: dict[str, TableStats] = field(default_factory=dict)
+
+    def _track(self, table: str, rows: int, seconds: float) -> None:
+        stats = self.tables.setdefault(table, TableStats())
+        stats.rows += rows
+        stats.seconds += seconds
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "entity_type": self.entity_type,
+            "table": self.table,
+            "cutoff": self.cutoff.isoformat(),
+            "purged": self.purged,
+            "blocked": self.blocked,
+            "chunks": self.chunks,
+            "completed": self.completed,
+            "resumed": self.resumed,
+            "tables": {
+                name: {"rows": s.rows, "seconds": round(s.seconds, 3), "rows_per_sec": s.rows_per_sec}
+                for name, s in self.tables.items()
+            },
+        }
+
+
+# ─── Execution ────────────────────────────────────────────────────────────────
+
+
+def _ids_param(name: str):
+    return bindparam(name, type_=ARRAY(PG_UUID(as_uuid=True)))
+
+
+async def _delete_step(db: AsyncSession, step: CascadeStep, parent_ids: list[UUID], report: PurgeReport) -> None:
+    if step.children and step.pk:
+        child_ids = (
+            await db.execute(
+                text(f"SELECT {step.pk} FROM {step.table} WHERE {step.column} = ANY(:ids)")  # noqa: S608
+                .bindparams(_ids_param("ids")),
+                {"ids": parent_ids},
+            )
+        ).scalars().all()
+        if child_ids:
+            for child in step.children:
+                await _delete_step(db, child, list(child_ids), report)
+    started = time.perf_counter()
+    result = await db.execute(
+        text(f"DELETE FROM {step.table} WHERE {step.column} = ANY(:ids)")  # noqa: S608
+        .bindparams(_ids_param("ids")),
+        {"ids": parent_ids},
+    )
+    report._track(step.table, result.rowcount or 0, time.perf_counter() - started)
+
+
+async def _delete_ids(db: AsyncSession, plan: CascadePlan, ids: list[UUID], report: PurgeReport) -> int:
+    for step in plan.steps:
+        await _delete_step(db, step, ids, report)
+    started = time.perf_counter()
+    result = await db.execute(
+        text(f"DELETE FROM {plan.table} WHERE {plan.pk} = ANY(:ids)")  # noqa: S608
+        .bindparams(_ids_param("ids")),
+        {"ids": ids},
+    )
+    deleted = result.rowcount or 0
+    report._track(plan.table, deleted, time.perf_counter() - started)
+    return deleted
+
+
+def _candidate_query(plan: CascadePlan) -> Any:
+    not_exists = "".join(
+        f" AND NOT EXISTS (SELECT 1 FROM {b.table} ref WHERE ref.{b.column} = t.{plan.pk})"
+        for b in plan.blockers
+    )
+    return text(
+        f"SELECT t.{plan.pk} FROM {plan.table} t "  # noqa: S608 — names come from model metadata
+        "WHERE t.archived = true AND t.updated_at < :cutoff "
+        f"AND (CAST(:after AS uuid) IS NULL OR t.{plan.pk} > CAST(:after AS uuid)){not_exists} "
+        f"ORDER BY t.{plan.pk} LIMIT :limit"
+    )
+
+
+async def _load_checkpoint(db: AsyncSession, entity_type: str):
+    from app.services.core.settings_service import get_scoped_setting_row
+
+    return await get_scoped_setting_row(
+        db, key=f"{CHECKPOINT_KEY_PREFIX}{entity_type}", scope="tenant", scope_id=None,
+    )
+
+
+async def purge_table(
+    db: AsyncSession,
+    entity_type: str,
+    table_name: str,
+    retention_days: int,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    sleep_seconds: float = 0.0,
+    time_budget_seconds: float | None = None,
+    plan: CascadePlan | None = None,
+) -> PurgeReport:
+    """Purge archived rows of ``table_name`` older than ``retention_days``."""
+    from app.models.common import Setting
+
+    plan = plan or build_cascade_plan(table_name)
+    checkpoint = await _load_checkpoint(db, entity_type)
+    state = checkpoint.value if checkpoint is not None and isinstance(checkpoint.value, dict) else None
+    if state and state.get("retention_days") == retention_days:
+        cutoff = datetime.fromisoformat(state["cutoff"])
+        after = state.get("after_id")
+        report = PurgeReport(
+            entity_type, table_name, cutoff,
+            purged=state.get("purged", 0), blocked=state.get("blocked", 0), resumed=True,
+        )
+    else:
+        cutoff = datetime.now(UTC) - timedelta(days=retention_days)
+        after = None
+        report = PurgeReport(entity_type, table_name, cutoff)
+
+    query = _candidate_query(plan)
+    deadline = time.monotonic() + time_budget_seconds if time_budget_seconds else None
+    while True:
+        ids = list((
+            await db.execute(query, {"cutoff": cutoff, "after": after, "limit": chunk_size})
+        ).scalars().all())
+        if not ids:
+            report.completed = True
+            break
+
+        try:
+            async with db.begin_nested():
+                report.purged += await _delete_ids(db, plan, ids, report)
+        except IntegrityError:
+            # Some row is referenced by a table outside the plan: isolate it.
+            for row_id in ids:
+                try:
+                    async with db.begin_nested():
+                        report.purged += await _delete_ids(db, plan, [row_id], report)
+                except IntegrityError:
+                    report.blocked += 1
+
+        after = str(ids[-1])
+        report.chunks += 1
+        if checkpoint is None:
+            checkpoint = Setting(key=f"{CHECKPOINT_KEY_PREFIX}{entity_type}", scope="tenant", scope_id=None)
+            db.add(checkpoint)
+        checkpoint.value = {
+            "retention_days": retention_days,
+            "cutoff": cutoff.isoformat(),
+            "after_id": after,
+            "purged": report.purged,
+            "blocked": report.blocked,
+        }
+        await db.commit()
+
+        if len(ids) < chunk_size:
+            report.completed = True
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        if sleep_seconds:
+            await asyncio.sleep(sleep_seconds)
+
+    if report.completed and checkpoint is not None:
+        await db.delete(checkpoint)
+        await db.commit()
+
+    for name, stats in report.tables.items():
+        logger.info(
+            "purge %s: %s %d rows in %.2fs (%.0f rows/s)",
+            entity_type, name, stats.rows, stats.seconds, stats.rows_per_sec,
+        )
+    return report
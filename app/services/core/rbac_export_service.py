@@ -1,4 +1,6 @@
 """Helpers to build the `variables` dict passed to render_pdf for each RBAC PDF template."""
+import hashlib
+import json
 from datetime import datetime, timezone
 from uuid import UUID
 
@@ -345,21 +347,15 @@ async def build_matrix_group_permissions_variables(
     }
 
 
-async def build_matrix_user_permissions_variables(
-    db: AsyncSession, entity_id: UUID, user: User, lang: str,
-    user_ids: list[UUID] | None = None, role_code: str | None = None,
-    audit_event_id: str = "", content_hash: str = "",
-) -> dict:
-    """Users x Permissions matrix. Uses get_user_permissions for each user."""
-    from app.core.rbac import get_user_permissions
-
-    # Resolve user list
+def _matrix_users_stmt(entity_id: UUID, user_ids: list[UUID] | None, role_code: str | None):
+    """Users shown in the Users × Permissions matrix (id, names, email), name-ordered."""
     stmt = (
-        select(User)
+        select(User.id, User.first_name, User.last_name, User.email)
         .join(UserGroupMember, UserGroupMember.user_id == User.id)
         .join(UserGroup, UserGroup.id == UserGroupMember.group_id)
         .where(UserGroup.entity_id == entity_id)
         .distinct()
+        .order_by(User.last_name, User.first_name, User.id)
     )
     if user_ids:
         stmt = stmt.where(User.id.in_(user_ids))
@@ -367,22 +363,33 @@ async def build_matrix_user_permissions_variables(
         stmt = stmt.join(UserGroupRole, UserGroupRole.group_id == UserGroup.id).where(
             UserGroupRole.role_code == role_code
         )
+    return stmt
+
 
-    users = list((await db.execute(stmt)).scalars().all())
+async def build_matrix_user_permissions_variables(
+    db: AsyncSession, entity_id: UUID, user: User, lang: str,
+    user_ids: list[UUID] | None = None, role_code: str | None = None,
+    audit_event_id: str = "", content_hash: str = "",
+) -> dict:
+    """Users x Permissions matrix, resolved in bulk (one query per RBAC layer per chunk)."""
+    from app.core.rbac import iter_entity_permissions
+
+    users = (await db.execute(_matrix_users_stmt(entity_id, user_ids, role_code))).all()
 
     permissions = await _list_permissions(db, entity_id, include_disabled=False)
     disabled_mods = await _disabled_modules_for_entity(db, entity_id)
 
-    # For each user, get effective permissions
     grants: list[dict] = []
-    for u in users:
-        effective = await get_user_permissions(u.id, entity_id, db)
+    async for uid, effective in iter_entity_permissions(entity_id, db, [u.id for u in users]):
         for pcode in effective:
-            grants.append({"user_id": str(u.id), "perm_code": pcode})
+            grants.append({"user_id": str(uid), "perm_code": pcode})
 
     return {
         "tenant": await _build_tenant_block(db, entity_id),
-        "users": [{"id": str(u.id), "full_name": u.full_name, "email": u.email} for u in users],
+        "users": [
+            {"id": str(u.id), "full_name": f"{u.first_name} {u.last_name}", "email": u.email}
+            for u in users
+        ],
         "permissions": [_serialize_perm(p, disabled_mods) for p in permissions],
         "grants": grants,
         "generated_at": datetime.now(timezone.utc).isoformat(),
@@ -393,6 +400,93 @@ async def build_matrix_user_permissions_variables(
     }
 
 
+_XLSX_LABELS = {
+    "fr": {"user": "Utilisateur", "email": "Email", "matrix": "Matrice", "info": "Informations",
+           "tenant": "Entité", "generated_at": "Généré le", "generated_by": "Généré par",
+           "audit": "Événement d'audit", "data_hash": "SHA-256 des données"},
+    "en": {"user": "User", "email": "Email", "matrix": "Matrix", "info": "Information",
+           "tenant": "Entity", "generated_at": "Generated at", "generated_by": "Generated by",
+           "audit": "Audit event", "data_hash": "Data SHA-256"},
+}
+
+_XLSX_SOURCE_LABELS = {
+    "fr": {"role": "Rôle", "group": "Groupe", "user": "Utilisateur", "delegation": "Délégation"},
+    "en": {"role": "Role", "group": "Group", "user": "User", "delegation": "Delegation"},
+}
+
+
+async def write_matrix_user_permissions_xlsx(
+    db: AsyncSession, entity_id: UUID, user: User, lang: str, path: str,
+    user_ids: list[UUID] | None = None, role_code: str | None = None,
+    audit_event_id: str = "",
+) -> dict:
+    """Stream the Users × Permissions matrix into an XLSX file at ``path``.
+
+    The workbook runs in xlsxwriter's ``constant_memory`` mode and rows are
+    written as each resolver chunk arrives, so memory stays flat whatever the
+    user count. Cells hold the winning source layer (role, group, user,
+    delegation). Returns a summary with the data hash: sha256 over the
+    canonical JSON of each written row, stable for identical data.
+    """
+    import xlsxwriter
+
+    from app.core.rbac import iter_entity_permissions
+    from app.core.storage_service import run_blocking
+
+    labels = _XLSX_LABELS.get(lang, _XLSX_LABELS["fr"])
+    source_labels = _XLSX_SOURCE_LABELS.get(lang, _XLSX_SOURCE_LABELS["fr"])
+    permissions = await _list_permissions(db, entity_id, include_disabled=False)
+    perm_codes = [p.code for p in permissions]
+    users = (await db.execute(_matrix_users_stmt(entity_id, user_ids, role_code))).all()
+    names = {u.id: (f"{u.first_name} {u.last_name}", u.email) for u in users}
+    data_hash = hashlib.sha256()
+    grant_count = 0
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        bold = workbook.add_format({"bold": True})
+        sheet = workbook.add_worksheet(labels["matrix"])
+        sheet.freeze_panes(1, 2)
+        sheet.set_column(0, 1, 28)
+        sheet.write_row(0, 0, [labels["user"], labels["email"], *perm_codes], bold)
+
+        row_idx = 0
+        async for uid, effective in iter_entity_permissions(entity_id, db, list(names)):
+            row_idx += 1
+            full_name, email = names[uid]
+            cells = [source_labels[effective[c]] if c in effective else "" for c in perm_codes]
+            sheet.write_row(row_idx, 0, [full_name, email, *cells])
+            grant_count += sum(1 for c in perm_codes if c in effective)
+            data_hash.update(json.dumps(
+                [str(uid), sorted((c, effective[c]) for c in perm_codes if c in effective)],
+                ensure_ascii=False,
+            ).encode("utf-8"))
+            data_hash.update(b"\n")
+
+        tenant = await _build_tenant_block(db, entity_id)
+        info = workbook.add_worksheet(labels["info"])
+        info.set_column(0, 0, 24)
+        info.set_column(1, 1, 70)
+        for i, (key, value) in enumerate([
+            ("tenant", tenant["name"]),
+            ("generated_at", datetime.now(timezone.utc).isoformat()),
+            ("generated_by", f"{user.full_name} <{user.email}>"),
+            ("audit", audit_event_id),
+            ("data_hash", data_hash.hexdigest()),
+        ]):
+            info.write_row(i, 0, [labels[key], value])
+    finally:
+        # close() zips the temp sheets into the final file: keep it off the loop.
+        await run_blocking(workbook.close)
+
+    return {
+        "users": len(names),
+        "permissions": len(perm_codes),
+        "grants": grant_count,
+        "data_hash": data_hash.hexdigest(),
+    }
+
+
 async def build_group_detail_variables(
     db: AsyncSession, entity_id: UUID, user: User, group_id: UUID, lang: str,
     audit_event_id: str = "", content_hash: str = "",
@@ -9,7 +9,7 @@ from uuid import UUID, uuid4, uuid5
 from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import hash_password
+from app.core.password_hashing import hash_password
 from app.models.asset_registry import Installation
 from app.models.common import (
 
@@ -336,7 +336,7 @@ async def seed_production_essentials(db: AsyncSession) -> None:
             email=admin_email,
             first_name="Admin",
             last_name="OpsFlux",
-            hashed_password=hash_password(superuser_password),
+            hashed_password=await hash_password(superuser_password),
             default_entity_id=entity.id,
             language="fr",
         )
@@ -347,7 +347,7 @@ async def seed_production_essentials(db: AsyncSession) -> None:
         # Validate hash integrity — fix if corrupted (e.g. shell $ escaping)
         pw_hash = admin.hashed_password or ""
         if not pw_hash.startswith("$2b$") or len(pw_hash) != 60:
-            admin.hashed_password = hash_password(superuser_password)
+            admin.hashed_password = await hash_password(superuser_password)
             logger.warning("Seed: admin password hash was corrupted — reset")
 
     # ── SUPER_ADMIN group ───────────────────────────────────────
@@ -445,7 +445,7 @@ async def seed_dev_data(db: AsyncSession) -> None:
                 email=email,
                 first_name=first,
                 last_name=last,
-                hashed_password=hash_password("Test@2026!"),
+                hashed_password=await hash_password("Test@2026!"),
                 default_entity_id=entity.id,
                 language="fr",
             )
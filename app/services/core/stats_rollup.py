@@ -0,0 +1,448 @@
+"""Incremental statistics rollups — login events and support tickets.
+
+The admin dashboards poll ``/login-events/stats`` and ``/support/stats``
+constantly; recounting a year of raw rows on every poll does not scale.
+
+* ``login_event_hourly`` holds one row per closed UTC hour of
+  ``login_events``: counters, failure reasons and a HyperLogLog sketch of
+  the source IPs. :func:`rollup_login_events` (scheduled catch-up job)
+  appends the hours closed since the last run. :func:`login_event_stats`
+  answers a window from the buckets plus a raw scan of the partial hours
+  at either end, so figures stay current between runs.
+* ``support_ticket_counters`` holds live ticket counts per entity and
+  (status, type, priority, archived), bumped by the ``SupportTicket``
+  mapper events and reconciled nightly by :func:`reconcile_ticket_counters`
+  (bulk statements bypass the events).
+
+Both read paths take ``exact=True`` to recount the raw rows instead.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import and_, delete, func, insert, inspect, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.messaging import LoginEvent, LoginEventHourly
+from app.models.support import SupportTicket, SupportTicketCounter
+
+logger = logging.getLogger(__name__)
+
+# HyperLogLog precision: 2**12 registers, ~1.6 % standard error.
+HLL_PRECISION = 12
+# An hour is rolled up once it ended this long ago (late commits).
+LOGIN_ROLLUP_SETTLE = timedelta(minutes=5)
+# Hourly buckets written per transaction by the catch-up job.
+LOGIN_ROLLUP_COMMIT_EVERY = 24
+TOP_FAILURE_REASONS = 10
+
+_HOUR = timedelta(hours=1)
+_HLL_REGISTERS = 1 << HLL_PRECISION
+_HLL_RANK_BITS = 64 - HLL_PRECISION
+
+_TICKET_KEY_COLUMNS = ("entity_id", "status", "ticket_type", "priority", "archived")
+
+
+# ── Distinct-IP sketch ───────────────────────────────────────────────────
+
+
+class IpSketch:
+    """HyperLogLog sketch of a set of strings (``HLL_PRECISION`` registers)."""
+
+    __slots__ = ("registers",)
+
+    def __init__(self, registers: np.ndarray | None = None) -> None:
+        self.registers = registers if registers is not None else np.zeros(_HLL_REGISTERS, dtype=np.uint8)
+
+    def add(self, value: str) -> None:
+        digest = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = digest >> _HLL_RANK_BITS
+        rank = _HLL_RANK_BITS - (digest & ((1 << _HLL_RANK_BITS) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: IpSketch) -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = _HLL_REGISTERS
+        zeros = int(np.count_nonzero(self.registers == 0))
+        raw = (0.7213 / (1 + 1.079 / m)) * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))  # linear counting for small sets
+        return round(raw)
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> IpSketch:
+        return cls(np.frombuffer(zlib.decompress(data), dtype=np.uint8).copy())
+
+
+# ── Login events ─────────────────────────────────────────────────────────
+
+
+@dataclass
+class _LoginTally:
+    total: int = 0
+    successful: int = 0
+    failed: int = 0
+    blocked: int = 0
+    suspicious: int = 0
+    reasons: Counter = field(default_factory=Counter)
+    ips: set[str] = field(default_factory=set)
+    sketch: IpSketch | None = None
+
+    def add(self, other: _LoginTally) -> None:
+        self.total += other.total
+        self.successful += other.successful
+        self.failed += other.failed
+        self.blocked += other.blocked
+        self.suspicious += other.suspicious
+        self.reasons.update(other.reasons)
+        self.ips |= other.ips
+        if other.sketch is not None:
+            if self.sketch is None:
+                self.sketch = IpSketch()
+            self.sketch.merge(other.sketch)
+
+    def unique_ips(self) -> int:
+        if self.sketch is None:
+            return len(self.ips)
+        sketch = IpSketch(self.sketch.registers.copy())
+        sketch.update(self.ips)
+        return sketch.estimate()
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+def _hour_floor(value: datetime) -> datetime:
+    return _as_utc(value).replace(minute=0, second=0, microsecond=0)
+
+
+_LOGIN_GROUP = (
+    LoginEvent.ip_address,
+    LoginEvent.success,
+    LoginEvent.blocked,
+    LoginEvent.suspicious,
+    LoginEvent.failure_reason,
+)
+
+
+def _tally_rows(tally: _LoginTally, rows) -> None:
+    for ip, success, blocked, suspicious, reason, count in rows:
+        tally.total += count
+        if success:
+            tally.successful += count
+        else:
+            tally.failed += count
+            if reason is not None:
+                tally.reasons[reason] += count
+        if blocked:
+            tally.blocked += count
+        if suspicious:
+            tally.suspicious += count
+        tally.ips.add(ip)
+
+
+def _event_hour(db: AsyncSession):
+    """``created_at`` truncated to its UTC hour, in the session's dialect."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:00:00", LoginEvent.created_at)
+    return func.date_trunc("hour", func.timezone("UTC", LoginEvent.created_at))
+
+
+async def _scan_login_events(db: AsyncSession, start: datetime, end: datetime) -> _LoginTally:
+    """Tally the raw events of ``[start, end)`` in one grouped query."""
+    tally = _LoginTally()
+    if start >= end:
+        return tally
+    rows = await db.execute(
+        select(*_LOGIN_GROUP, func.count())
+        .where(LoginEvent.created_at >= start, LoginEvent.created_at < end)
+        .group_by(*_LOGIN_GROUP)
+    )
+    _tally_rows(tally, rows.all())
+    return tally
+
+
+async def _scan_login_hours(db: AsyncSession, start: datetime, end: datetime) -> dict[datetime, _LoginTally]:
+    """Tally the raw events of ``[start, end)`` per UTC hour, in one grouped query."""
+    if start >= end:
+        return {}
+    hour = _event_hour(db)
+    rows = await db.execute(
+        select(hour, *_LOGIN_GROUP, func.count())
+        .where(LoginEvent.created_at >= start, LoginEvent.created_at < end)
+        .group_by(hour, *_LOGIN_GROUP)
+    )
+    grouped: dict[datetime, list] = {}
+    for bucket, *row in rows.all():
+        if isinstance(bucket, str):
+            bucket = datetime.fromisoformat(bucket)
+        grouped.setdefault(_as_utc(bucket), []).append(row)
+    hours = {}
+    for bucket, bucket_rows in grouped.items():
+        hours[bucket] = _LoginTally()
+        _tally_rows(hours[bucket], bucket_rows)
+    return hours
+
+
+def _bucket_tally(bucket: LoginEventHourly) -> _LoginTally:
+    return _LoginTally(
+        total=bucket.total,
+        successful=bucket.successful,
+        failed=bucket.failed,
+        blocked=bucket.blocked,
+        suspicious=bucket.suspicious,
+        reasons=Counter(bucket.failure_reasons or {}),
+        sketch=IpSketch.from_bytes(bucket.ip_sketch),
+    )
+
+
+async def _login_watermark(db: AsyncSession) -> datetime | None:
+    """End of the last rolled-up hour, or None before the first rollup."""
+    last = (await db.execute(select(func.max(LoginEventHourly.bucket_start)))).scalar()
+    return _as_utc(last) + _HOUR if last is not None else None
+
+
+async def rollup_login_events(db: AsyncSession, *, now: datetime | None = None) -> int:
+    """Write the hourly buckets closed since the last run. Returns buckets written.
+
+    Hours without events are skipped, except the last closed hour, which is
+    always written so the watermark keeps up with the clock.
+    """
+    horizon = _hour_floor((now or datetime.now(UTC)) - LOGIN_ROLLUP_SETTLE)
+    cursor = await _login_watermark(db)
+    if cursor is None:
+        first = (await db.execute(select(func.min(LoginEvent.created_at)))).scalar()
+        cursor = _hour_floor(first) if first is not None else horizon - _HOUR
+
+    written = 0
+    while cursor < horizon:
+        upcoming = (await db.execute(
+            select(func.min(LoginEvent.created_at)).where(
+                LoginEvent.created_at >= cursor, LoginEvent.created_at < horizon - _HOUR,
+            )
+        )).scalar()
+        cursor = _hour_floor(upcoming) if upcoming is not None else horizon - _HOUR
+
+        tally = await _scan_login_events(db, cursor, cursor + _HOUR)
+        sketch = IpSketch()
+        sketch.update(tally.ips)
+        await db.execute(insert(LoginEventHourly).values(
+            bucket_start=cursor,
+            total=tally.total,
+            successful=tally.successful,
+            failed=tally.failed,
+            blocked=tally.blocked,
+            suspicious=tally.suspicious,
+            failure_reasons=dict(tally.reasons),
+            ip_sketch=sketch.to_bytes(),
+        ))
+        written += 1
+        if written % LOGIN_ROLLUP_COMMIT_EVERY == 0:
+            await db.commit()
+        cursor += _HOUR
+    await db.commit()
+    return written
+
+
+async def login_event_stats(
+    db: AsyncSession, *, since: datetime, now: datetime | None = None, exact: bool = False,
+) -> dict:
+    """Login statistics for ``[since, now)`` in the ``LoginEventStats`` shape.
+
+    Whole hours up to the rollup watermark come from ``login_event_hourly``
+    (``unique_ips`` is then a HyperLogLog estimate); the partial hour at the
+    start of the window and everything past the watermark are scanned raw,
+    grouped by hour in one query, so ``attempts_by_hour`` is complete. ``exact=True``
+    recounts the whole window from ``login_events`` in one query and returns
+    no hourly breakdown.
+    """
+    since, now = _as_utc(since), _as_utc(now or datetime.now(UTC))
+    if exact:
+        return _login_stats_payload(await _scan_login_events(db, since, now), [])
+
+    hours: dict[datetime, _LoginTally] = {}
+    watermark = await _login_watermark(db)
+    first_hour = _hour_floor(since)
+    if first_hour < since:
+        first_hour += _HOUR
+
+    raw_from = since
+    covered = min(watermark, _hour_floor(now)) if watermark is not None else None
+    if covered is not None and covered > first_hour:
+        buckets = (await db.execute(
+            select(LoginEventHourly)
+            .where(LoginEventHourly.bucket_start >= first_hour, LoginEventHourly.bucket_start < covered)
+            .order_by(LoginEventHourly.bucket_start)
+        )).scalars().all()
+        hours = {_as_utc(b.bucket_start): _bucket_tally(b) for b in buckets if b.total}
+        head = await _scan_login_events(db, since, first_hour)
+        if head.total:
+            hours[_hour_floor(since)] = head
+        raw_from = covered
+
+    for hour, tally in (await _scan_login_hours(db, raw_from, now)).items():
+        hours.setdefault(hour, _LoginTally()).add(tally)
+
+    window = _LoginTally()
+    for tally in hours.values():
+        window.add(tally)
+    by_hour = [
+        {"hour": hour.isoformat(), "total": tally.total, "failed": tally.failed}
+        for hour, tally in sorted(hours.items())
+    ]
+    return _login_stats_payload(window, by_hour)
+
+
+def _login_stats_payload(tally: _LoginTally, by_hour: list[dict]) -> dict:
+    return {
+        "total": tally.total,
+        "successful": tally.successful,
+        "failed": tally.failed,
+        "blocked": tally.blocked,
+        "suspicious": tally.suspicious,
+        "unique_ips": tally.unique_ips(),
+        "top_failure_reasons": [
+            {"reason": reason, "count": count}
+            for reason, count in tally.reasons.most_common(TOP_FAILURE_REASONS)
+        ],
+        "attempts_by_hour": by_hour,
+    }
+
+
+# ── Support tickets ──────────────────────────────────────────────────────
+
+
+def ticket_counter_key(ticket: SupportTicket, connection, *, previous: bool = False) -> tuple:
+    """``(entity_id, status, ticket_type, priority, archived)`` of a ticket.
+
+    ``previous=True`` returns the values before the pending changes, i.e.
+    the key the ticket is currently counted under. Values the instance does
+    not hold are read from its row through ``connection``, so call this
+    before the row is updated.
+    """
+    state = inspect(ticket)
+    values = {}
+    for name in _TICKET_KEY_COLUMNS:
+        history = state.attrs[name].history
+        if previous and history.deleted:
+            values[name] = history.deleted[0]
+        elif name in state.dict and not (previous and history.added):
+            values[name] = state.dict[name]
+    missing = [name for name in _TICKET_KEY_COLUMNS if name not in values]
+    if missing:
+        row = connection.execute(
+            select(*(getattr(SupportTicket, name) for name in missing)).where(SupportTicket.id == ticket.id)
+        ).one()
+        values.update(zip(missing, row))
+    return tuple(values[name] for name in _TICKET_KEY_COLUMNS)
+
+
+def bump_ticket_counters(connection, deltas: dict[tuple, int]) -> None:
+    """Add ``deltas`` (counter key -> change) to ``support_ticket_counters``.
+
+    Runs on the flushing connection, so counters commit with the tickets.
+    """
+    if connection.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as upsert
+
+    table = SupportTicketCounter.__table__
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        statement = upsert(table).values(**dict(zip(_TICKET_KEY_COLUMNS, key)), count=delta)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=list(_TICKET_KEY_COLUMNS),
+            set_={"count": table.c.count + delta},
+        ))
+
+
+def _ticket_truth_query():
+    columns = [getattr(SupportTicket, name) for name in _TICKET_KEY_COLUMNS]
+    return select(*columns, func.count()).group_by(*columns)
+
+
+async def reconcile_ticket_counters(db: AsyncSession) -> int:
+    """Recount ``support_ticket_counters`` from the tickets. Returns keys fixed."""
+    truth = {tuple(row[:-1]): row[-1] for row in (await db.execute(_ticket_truth_query())).all()}
+    stored = {
+        tuple(getattr(c, name) for name in _TICKET_KEY_COLUMNS): c.count
+        for c in (await db.execute(select(SupportTicketCounter))).scalars().all()
+    }
+    drifted = {key for key in truth.keys() | stored.keys() if truth.get(key, 0) != stored.get(key, 0)}
+    if drifted:
+        logger.warning("stats_rollup: %d ticket counter(s) drifted, rewriting", len(drifted))
+        await db.execute(delete(SupportTicketCounter).where(or_(*(
+            and_(*(getattr(SupportTicketCounter, name) == value for name, value in zip(_TICKET_KEY_COLUMNS, key)))
+            for key in drifted
+        ))))
+        rows = [
+            {**dict(zip(_TICKET_KEY_COLUMNS, key)), "count": truth[key]}
+            for key in drifted if truth.get(key)
+        ]
+        if rows:
+            await db.execute(insert(SupportTicketCounter), rows)
+    await db.commit()
+    return len(drifted)
+
+
+async def ticket_counts(db: AsyncSession, entity_id: UUID, *, exact: bool = False) -> dict:
+    """Non-archived ticket counts of an entity: total, by status, type, priority.
+
+    Read from ``support_ticket_counters``; ``exact=True`` groups the tickets
+    themselves instead.
+    """
+    if exact:
+        rows = (await db.execute(
+            select(SupportTicket.status, SupportTicket.ticket_type, SupportTicket.priority, func.count())
+            .where(SupportTicket.entity_id == entity_id, SupportTicket.archived == False)  # noqa: E712
+            .group_by(SupportTicket.status, SupportTicket.ticket_type, SupportTicket.priority)
+        )).all()
+    else:
+        rows = (await db.execute(
+            select(
+                SupportTicketCounter.status,
+                SupportTicketCounter.ticket_type,
+                SupportTicketCounter.priority,
+                SupportTicketCounter.count,
+            ).where(
+                SupportTicketCounter.entity_id == entity_id,
+                SupportTicketCounter.archived == False,  # noqa: E712
+                SupportTicketCounter.count != 0,
+            )
+        )).all()
+
+    by_status: Counter = Counter()
+    by_type: Counter = Counter()
+    by_priority: Counter = Counter()
+    for status, ticket_type, priority, count in rows:
+        by_status[status] += count
+        by_type[ticket_type] += count
+        by_priority[priority] += count
+    return {
+        "total": sum(by_status.values()),
+        "by_status": dict(by_status),
+        "by_type": dict(by_type),
+        "by_priority": dict(by_priority),
+    }
@@ -0,0 +1,433 @@
+"""Set-based directory → users synchronisation.
+
+``run_user_sync`` applies a directory snapshot (``NormalizedUser`` list from
+``app.services.connectors.user_sync_service``) in chunks of
+``USER_SYNC_CHUNK_SIZE`` users. Each chunk is one transaction:
+
+1. the chunk is staged into temporary tables (users, mapped groups);
+2. existing accounts are flagged with one join on ``lower(email)``;
+3. in ``update`` mode, changed accounts are updated with one
+   ``UPDATE … FROM stage``; unchanged ones count as skipped;
+4. new accounts are inserted with one ``INSERT … ON CONFLICT (email) DO
+   NOTHING``, sharing a default-password hash computed once per chunk;
+5. group memberships are diffed against the stage: missing ones are
+   inserted (anti-join), and in ``update`` mode memberships of *mapped*
+   groups the directory no longer lists are removed;
+6. the checkpoint (``<provider prefix>.user_sync_checkpoint``) is advanced
+   and the chunk committed; the auth/RBAC caches of every account the chunk
+   updated (``RETURNING id``) are then invalidated, so a renamed,
+   deactivated or regrouped user is re-read on their next request.
+
+A run that fails or dies mid-way resumes from its checkpoint when the same
+request (same selection and options) is executed again. With
+``deactivate_missing``, accounts carrying this provider's ``external_ref``
+prefix that are absent from the directory are deactivated (anti-join
+against the staged directory) — never on an empty directory snapshot,
+which is what providers return when the fetch fails.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from uuid import UUID, uuid4
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    MetaData,
+    String,
+    Table,
+    Uuid,
+    delete,
+    exists,
+    func,
+    insert,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import CreateTable, DropTable
+
+from app.core.password_hashing import hash_password
+from app.models.common import Setting, User, UserGroup, UserGroupMember
+from app.services.connectors.user_sync_service import NormalizedUser
+
+logger = logging.getLogger(__name__)
+
+USER_SYNC_CHUNK_SIZE = 500  # users per staged, committed transaction
+CHECKPOINT_SUFFIX = "user_sync_checkpoint"
+
+_stage_meta = MetaData()
+_stage_users = Table(
+    "_user_sync_stage", _stage_meta,
+    Column("email", String(255), primary_key=True),  # lower-cased
+    Column("raw_email", String(255), nullable=False),
+    Column("external_ref", String(255)),
+    Column("first_name", String(100), nullable=False),
+    Column("last_name", String(100), nullable=False),
+    Column("active", Boolean, nullable=False),
+    Column("existing", Boolean, nullable=False, default=False),
+    prefixes=["TEMPORARY"],
+)
+_stage_groups = Table(
+    "_user_sync_stage_groups", _stage_meta,
+    Column("email", String(255), primary_key=True),
+    Column("group_id", Uuid, primary_key=True),
+    prefixes=["TEMPORARY"],
+)
+_stage_directory = Table(
+    "_user_sync_directory", _stage_meta,
+    Column("email", String(255), primary_key=True),
+    prefixes=["TEMPORARY"],
+)
+
+
+@dataclass
+class UserSyncOptions:
+    default_password: str
+    duplicate_strategy: str = "skip"  # skip | update
+    group_map: dict[str, UUID] = field(default_factory=dict)  # directory group → user_groups.id
+    deactivate_missing: bool = False
+
+
+@dataclass
+class UserSyncResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    deactivated: int = 0
+    memberships_added: int = 0
+    memberships_removed: int = 0
+    chunks: int = 0
+    resumed_from_chunk: int = 0
+    completed: bool = False
+    errors: list[str] = field(default_factory=list)
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _insert_ignore(db: AsyncSession, table):
+    """INSERT … ON CONFLICT DO NOTHING builder for the session's dialect."""
+    return (sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert)(table)
+
+
+def _request_fingerprint(provider_id: str, emails: list[str], options: UserSyncOptions) -> str:
+    payload = {
+        "provider": provider_id,
+        "emails": emails,
+        "strategy": options.duplicate_strategy,
+        "groups": sorted((k, str(v)) for k, v in options.group_map.items()),
+        "deactivate": options.deactivate_missing,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+# ── Checkpoint (Setting row) ──────────────────────────────────────────────
+
+async def _load_checkpoint(db: AsyncSession, prefix: str) -> dict | None:
+    row = (await db.execute(
+        select(Setting).where(Setting.key == f"{prefix}.{CHECKPOINT_SUFFIX}")
+    )).scalar_one_or_none()
+    return row.value if row and isinstance(row.value, dict) else None
+
+
+async def _save_checkpoint(db: AsyncSession, prefix: str, checkpoint: dict | None) -> None:
+    key = f"{prefix}.{CHECKPOINT_SUFFIX}"
+    row = (await db.execute(select(Setting).where(Setting.key == key))).scalar_one_or_none()
+    if checkpoint is None:
+        if row:
+            await db.delete(row)
+    elif row:
+        row.value = checkpoint
+    else:
+        db.add(Setting(key=key, value=checkpoint))
+
+
+# ── Staging ───────────────────────────────────────────────────────────────
+
+async def _create_stage(db: AsyncSession, *tables: Table) -> None:
+    for table in tables:
+        await db.execute(DropTable(table, if_exists=True))
+        await db.execute(CreateTable(table))
+
+
+async def _drop_stage(db: AsyncSession, *tables: Table) -> None:
+    for table in tables:
+        await db.execute(DropTable(table, if_exists=True))
+
+
+async def existing_emails(db: AsyncSession, emails: list[str]) -> set[str]:
+    """Lower-cased emails among ``emails`` that already have an account."""
+    lowered = sorted({e.lower() for e in emails if e})
+    found: set[str] = set()
+    for chunk in _chunks(lowered, USER_SYNC_CHUNK_SIZE):
+        found.update((await db.execute(
+            select(func.lower(User.email)).where(func.lower(User.email).in_(chunk))
+        )).scalars())
+    return found
+
+
+async def _apply_chunk(
+    db: AsyncSession,
+    users: list[NormalizedUser],
+    options: UserSyncOptions,
+    result: UserSyncResult,
+) -> tuple[set[UUID], set[UUID]]:
+    """Apply one chunk; returns the ids of updated accounts and of accounts whose memberships changed."""
+    update_mode = options.duplicate_strategy == "update"
+    await _create_stage(db, _stage_users, _stage_groups)
+    await db.execute(insert(_stage_users), [
+        {
+            "email": u.email.lower(), "raw_email": u.email, "external_ref": u.external_ref or None,
+            "first_name": u.first_name or "", "last_name": u.last_name or "",
+            "active": bool(u.active), "existing": False,
+        }
+        for u in users
+    ])
+    memberships = {
+        (u.email.lower(), options.group_map[g])
+        for u in users for g in u.groups if g in options.group_map
+    }
+    if memberships:
+        await db.execute(insert(_stage_groups), [
+            {"email": email, "group_id": group_id} for email, group_id in memberships
+        ])
+
+    stage = _stage_users.c
+    await db.execute(
+        update(_stage_users)
+        .where(exists().where(func.lower(User.email) == stage.email))
+        .values(existing=True)
+    )
+    existing = set((await db.execute(select(stage.email).where(stage.existing))).scalars())
+
+    # Existing accounts: update the changed ones (update mode) or skip.
+    if update_mode and existing:
+        first = func.coalesce(func.nullif(stage.first_name, ""), User.first_name)
+        last = func.coalesce(func.nullif(stage.last_name, ""), User.last_name)
+        changed = (await db.execute(
+            update(User)
+            .where(
+                func.lower(User.email) == stage.email,
+                or_(
+                    User.first_name != first,
+                    User.last_name != last,
+                    User.active != stage.active,
+                    func.coalesce(User.external_ref, "") != func.coalesce(stage.external_ref, ""),
+                ),
+            )
+            .values(first_name=first, last_name=last, external_ref=stage.external_ref, active=stage.active)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )).scalars().all()
+        result.updated += len(changed)
+        result.skipped += len(existing) - len(changed)
+    else:
+        changed = []
+        result.skipped += len(existing)
+
+    # New accounts: one INSERT, one bcrypt hash for the whole chunk.
+    new_users = [u for u in users if u.email.lower() not in existing]
+    if new_users:
+        hashed = await hash_password(options.default_password)
+        created = (await db.execute(
+            _insert_ignore(db, User.__table__)
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(User.__table__.c.id),
+            [
+                {
+                    "id": uuid4(), "email": u.email, "first_name": u.first_name or "",
+                    "last_name": u.last_name or "", "hashed_password": hashed,
+                    "active": bool(u.active), "language": "fr",
+                    "external_ref": u.external_ref or None,
+                }
+                for u in new_users
+            ],
+        )).scalars().all()
+        result.created += len(created)
+        # Lost an ON CONFLICT race with a concurrent insert: leave it alone.
+        result.skipped += len(new_users) - len(created)
+
+    regrouped: set[UUID] = set()
+    if options.group_map:
+        regrouped = await _apply_memberships(db, options, existing, result)
+    await _drop_stage(db, _stage_users, _stage_groups)
+    return set(changed), regrouped
+
+
+async def _apply_memberships(
+    db: AsyncSession, options: UserSyncOptions, existing: set[str], result: UserSyncResult,
+) -> set[UUID]:
+    """Diff memberships of the staged users against the staged mapped groups.
+
+    Returns the ids of the users who gained or lost a membership.
+    """
+    update_mode = options.duplicate_strategy == "update"
+    stage, groups = _stage_users.c, _stage_groups.c
+    member = UserGroupMember.__table__.c
+
+    wanted = (
+        select(User.id, groups.group_id)
+        .select_from(_stage_groups)
+        .join(_stage_users, stage.email == groups.email)
+        .join(User, func.lower(User.email) == groups.email)
+        .join(UserGroup, UserGroup.id == groups.group_id)
+        .where(~exists().where(member.user_id == User.id, member.group_id == groups.group_id))
+    )
+    if not update_mode:
+        wanted = wanted.where(~stage.existing)  # skip mode: only accounts created now
+    added = (await db.execute(
+        insert(UserGroupMember.__table__)
+        .from_select(["user_id", "group_id"], wanted)
+        .returning(member.user_id)
+    )).scalars().all()
+    result.memberships_added += len(added)
+    regrouped = set(added)
+
+    if update_mode and existing:
+        # Only groups the mapping manages lose members; others are untouched.
+        synced_users = (
+            select(User.id)
+            .join(_stage_users, func.lower(User.email) == stage.email)
+            .where(stage.existing)
+        )
+        still_listed = exists().where(
+            groups.group_id == member.group_id,
+            groups.email == func.lower(User.email),
+            User.id == member.user_id,
+        )
+        removed = (await db.execute(
+            delete(UserGroupMember.__table__)
+            .where(
+                member.group_id.in_(set(options.group_map.values())),
+                member.user_id.in_(synced_users),
+                ~still_listed,
+            )
+            .returning(member.user_id)
+        )).scalars().all()
+        result.memberships_removed += len(removed)
+        regrouped.update(removed)
+    return regrouped
+
+
+async def _invalidate_user_caches(accounts: set[UUID], regrouped: set[UUID]) -> None:
+    """Drop cached principals/permissions of users changed by a committed chunk."""
+    from app.core.auth_context import invalidate_auth_user
+    from app.core.rbac import invalidate_rbac_cache
+
+    failed = 0
+    for user_id in regrouped:
+        try:
+            await invalidate_rbac_cache(user_id)
+        except Exception:
+            # No Redis: still drop this worker's cached principal.
+            failed += 1
+            await invalidate_auth_user(user_id)
+    if failed:
+        logger.warning("User sync: RBAC cache not invalidated for %d user(s)", failed)
+    for user_id in accounts - regrouped:
+        await invalidate_auth_user(user_id)
+
+
+async def _deactivate_missing(
+    db: AsyncSession, ref_prefix: str, directory: list[NormalizedUser],
+) -> list[UUID]:
+    await _create_stage(db, _stage_directory)
+    emails = sorted({u.email.lower() for u in directory})
+    for chunk in _chunks(emails, USER_SYNC_CHUNK_SIZE):
+        await db.execute(insert(_stage_directory), [{"email": e} for e in chunk])
+    left = (await db.execute(
+        update(User)
+        .where(
+            User.external_ref.like(f"{ref_prefix}:%"),
+            User.active.is_(True),
+            ~exists().where(_stage_directory.c.email == func.lower(User.email)),
+        )
+        .values(active=False)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    await _drop_stage(db, _stage_directory)
+    return left
+
+
+# ── Entry point ───────────────────────────────────────────────────────────
+
+async def run_user_sync(
+    db: AsyncSession,
+    *,
+    provider_id: str,
+    settings_prefix: str,
+    ref_prefix: str,
+    directory: list[NormalizedUser],
+    selected_emails: set[str] | None,
+    options: UserSyncOptions,
+    chunk_size: int | None = None,
+) -> UserSyncResult:
+    """Apply ``directory`` (restricted to ``selected_emails`` when given).
+
+    Commits after every chunk; see the module docstring for the steps.
+    """
+    result = UserSyncResult()
+    by_email: dict[str, NormalizedUser] = {}
+    for u in directory:
+        if not (u.email or "").strip():
+            result.errors.append(f"{u.external_ref or '?'}: adresse email manquante")
+            continue
+        by_email.setdefault(u.email.strip().lower(), u)
+    selected = {e.lower() for e in selected_emails} if selected_emails is not None else None
+    emails = sorted(e for e in by_email if selected is None or e in selected)
+    size = chunk_size or USER_SYNC_CHUNK_SIZE
+    chunks = list(_chunks(emails, size))
+    result.chunks = len(chunks)
+
+    fingerprint = _request_fingerprint(provider_id, emails, options)
+    checkpoint = await _load_checkpoint(db, settings_prefix)
+    start = 0
+    if checkpoint and checkpoint.get("fingerprint") == fingerprint and checkpoint.get("chunk_size") == size:
+        start = int(checkpoint.get("next_chunk", 0))
+        for counter in ("created", "updated", "skipped", "memberships_added", "memberships_removed"):
+            setattr(result, counter, int(checkpoint.get(counter, 0)))
+        result.resumed_from_chunk = start
+        logger.info("User sync %s: resuming at chunk %d/%d", provider_id, start, len(chunks))
+
+    for index in range(start, len(chunks)):
+        try:
+            accounts, regrouped = await _apply_chunk(db, [by_email[e] for e in chunks[index]], options, result)
+            await _save_checkpoint(db, settings_prefix, {
+                "fingerprint": fingerprint, "chunk_size": size, "next_chunk": index + 1,
+                **{k: v for k, v in asdict(result).items() if isinstance(v, int)},
+            })
+            await db.commit()
+        except Exception as exc:
+            await db.rollback()
+            logger.warning("User sync %s: chunk %d failed: %s", provider_id, index, exc)
+            result.errors.append(
+                f"Lot {index + 1}/{len(chunks)} ({chunks[index][0]} … {chunks[index][-1]}): {str(exc)[:200]}"
+            )
+            return result  # checkpoint still points at this chunk: re-run resumes here
+        await _invalidate_user_caches(accounts, regrouped)
+
+    deactivated: list[UUID] = []
+    if options.deactivate_missing:
+        if by_email:
+            deactivated = await _deactivate_missing(db, ref_prefix, list(by_email.values()))
+            result.deactivated = len(deactivated)
+        else:
+            result.errors.append("Annuaire vide : désactivation des comptes absents ignorée")
+    await _save_checkpoint(db, settings_prefix, None)
+    await db.commit()
+    await _invalidate_user_caches(set(deactivated), set())
+    result.completed = True
+    logger.info(
+        "User sync %s: created=%d updated=%d skipped=%d deactivated=%d in %d chunk(s)",
+        provider_id, result.created, result.updated, result.skipped, result.deactivated, len(chunks),
+    )
+    return result
@@ -14,19 +14,31 @@ OilField. Implements ADR 003 decisions:
 - Create/upsert pipelines whose from/to tags resolve to two installations
   (parsed from '{SIZE}IN_{FLUID}_{FROM}_{TO}' names).
 
+The KML is streamed (kmz_parser.iter_placemarks), never held as a tree:
+a first pass picks up the platforms — a few hundred at most, and last in
+ArcGIS exports — then wells and pipelines are read in batches of
+KMZ_BATCH_SIZE. Each batch is one multi-row INSERT (geometries bound as
+EWKT, wrapped in ST_GeogFromText by geoalchemy) plus one bulk UPDATE for
+the matched rows; pipeline lengths and the run's bounding box are computed
+by PostGIS. Existing rows are preloaded as bare columns, not ORM objects.
+
 The whole run is tracked in an ar_import_runs row so it can be rolled back.
 Returns a structured report with counts + warnings.
 """
 from __future__ import annotations
 
-import math
+import inspect
+import logging
 import re
-from dataclasses import dataclass, field
-from typing import Any
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from dataclasses import field as dc_field
+from typing import IO, Any
 from uuid import UUID, uuid4
 
-from geoalchemy2 import WKTElement
-from sqlalchemy import select
+import numpy as np
+from geoalchemy2 import Geometry, WKTElement
+from sqlalchemy import cast, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.asset_registry import (
@@ -37,7 +49,22 @@ from app.models.asset_registry import (
     RegistryPipeline,
 )
 from app.models.asset_registry_import import ImportRun
-from app.services.kmz_parser import parse_kmz
+from app.services.kmz_parser import KmlStats, iter_placemarks, open_kml
+
+logger = logging.getLogger(__name__)
+
+# Wells / pipelines written per INSERT. Bounded so a batch stays well
+# under PostgreSQL's 32767 bind-parameter limit and progress is reported
+# at a useful granularity.
+KMZ_BATCH_SIZE = 1000
+
+# A well with no name-prefix match attaches to the nearest platform
+# within this distance.
+WELL_ATTACH_RADIUS_KM = 0.5
+
+_EARTH_RADIUS_KM = 6371.0
+
+ProgressCallback = Callable[[dict[str, Any]], Awaitable[None] | None]
 
 
 # ── Helpers ────────────────────────────────────────────────────────────
@@ -50,38 +77,99 @@ def _norm_code(raw: str | None) -> str:
     return re.sub(r"[^A-Z0-9]", "", raw.upper())
 
 
-def _point_wkt(coord: tuple[float, float]) -> str:
+def _point(coord: tuple[float, float]) -> WKTElement:
     lon, lat = coord
-    return f"SRID=4326;POINT({lon} {lat})"
+    return WKTElement(f"POINT({lon} {lat})", srid=4326)
+
 
+def _linestring(coords: list[tuple[float, float]]) -> WKTElement:
+    parts = ", ".join(f"{lon} {lat}" for lon, lat in coords)
+    return WKTElement(f"LINESTRING({parts})", srid=4326)
 
-def _linestring_wkt(coords: list[tuple[float, float]]) -> str:
-    parts = " ".join(f"{lon} {lat}" for lon, lat in coords)
-    return f"SRID=4326;LINESTRING({parts})"
 
+@dataclass
+class _Known:
+    """An existing or just-created row, reduced to what matching needs."""
+
+    id: UUID
+    external_id: str | None = None
+    lon: float | None = None
+    lat: float | None = None
+
+
+class _PlatformIndex:
+    """Installation points as radian arrays for vectorised nearest lookups."""
+
+    def __init__(self, installations: list[_Known]):
+        self.rows = [i for i in installations if i.lon is not None and i.lat is not None]
+        self.lon = np.radians(np.array([float(i.lon) for i in self.rows], dtype=float))
+        self.lat = np.radians(np.array([float(i.lat) for i in self.rows], dtype=float))
+
+    def nearest_within(self, points: list[tuple[float, float]], max_km: float) -> list[_Known | None]:
+        """Nearest installation (haversine) for each point, or None beyond ``max_km``."""
+        if not points or not self.rows:
+            return [None] * len(points)
+        lon = np.radians(np.array([p[0] for p in points], dtype=float))[:, None]
+        lat = np.radians(np.array([p[1] for p in points], dtype=float))[:, None]
+        h = (
+            np.sin((self.lat[None, :] - lat) / 2) ** 2
+            + np.cos(lat) * np.cos(self.lat[None, :]) * np.sin((self.lon[None, :] - lon) / 2) ** 2
+        )
+        dist = 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+        best = dist.argmin(axis=1)
+        return [
+            self.rows[j] if dist[i, j] <= max_km else None
+            for i, j in enumerate(best)
+        ]
 
-def _haversine_km(a: tuple[float, float], b: tuple[float, float]) -> float:
-    lon1, lat1 = a
-    lon2, lat2 = b
-    r = 6371.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlam = math.radians(lon2 - lon1)
-    h = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2) ** 2
-    return 2 * r * math.asin(math.sqrt(h))
+
+@dataclass
+class _ImportState:
+    """Lookup tables shared by the platform, well and pipeline phases."""
+
+    entity_id: UUID
+    field_id: UUID
+    sites_by_code: dict[str, UUID] = dc_field(default_factory=dict)
+    sites_by_name: dict[str, UUID] = dc_field(default_factory=dict)
+    installations_by_code: dict[str, _Known] = dc_field(default_factory=dict)
+    installations_by_external: dict[str, _Known] = dc_field(default_factory=dict)
+    equipment_by_tag: dict[str, _Known] = dc_field(default_factory=dict)
+    equipment_by_external: dict[str, _Known] = dc_field(default_factory=dict)
+    pipelines_by_external: dict[str, _Known] = dc_field(default_factory=dict)
+    pipeline_codes: set[str] = dc_field(default_factory=set)
+    platforms: _PlatformIndex | None = None
+    created_site_ids: list[str] = dc_field(default_factory=list)
+    created_installation_ids: list[str] = dc_field(default_factory=list)
+    created_equipment_ids: list[str] = dc_field(default_factory=list)
+    created_pipeline_ids: list[str] = dc_field(default_factory=list)
 
 
 @dataclass
 class ImportReport:
     """Structured report returned from the import."""
 
-    field: dict[str, Any] = field(default_factory=dict)
-    sites: dict[str, int] = field(default_factory=lambda: {"created": 0, "matched": 0, "errors": 0})
-    installations: dict[str, int] = field(default_factory=lambda: {"created": 0, "matched": 0, "errors": 0})
-    wells: dict[str, int] = field(default_factory=lambda: {"created": 0, "matched": 0, "errors": 0})
-    pipelines: dict[str, int] = field(default_factory=lambda: {"created": 0, "matched": 0, "skipped": 0, "errors": 0})
-    warnings: list[dict[str, str]] = field(default_factory=list)
+    field: dict[str, Any] = dc_field(default_factory=dict)
+    sites: dict[str, int] = dc_field(default_factory=lambda: {"created": 0, "matched": 0, "errors": 0})
+    installations: dict[str, int] = dc_field(default_factory=lambda: {"created": 0, "matched": 0, "errors": 0})
+    wells: dict[str, int] = dc_field(default_factory=lambda: {"created": 0, "matched": 0, "errors": 0})
+    pipelines: dict[str, int] = dc_field(default_factory=lambda: {"created": 0, "matched": 0, "skipped": 0, "errors": 0})
+    warnings: list[dict[str, str]] = dc_field(default_factory=list)
+    batches: int = 0
+    pipeline_length_km: float = 0.0
+    bbox: list[float] | None = None  # [min_lon, min_lat, max_lon, max_lat] of imported geometries
+
+    def extend_bbox(self, box: tuple[float | None, ...] | None) -> None:
+        if not box or box[0] is None:
+            return
+        if self.bbox is None:
+            self.bbox = [float(v) for v in box]
+            return
+        self.bbox = [
+            min(self.bbox[0], float(box[0])),
+            min(self.bbox[1], float(box[1])),
+            max(self.bbox[2], float(box[2])),
+            max(self.bbox[3], float(box[3])),
+        ]
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -91,123 +179,145 @@ class ImportReport:
             "wells": self.wells,
             "pipelines": self.pipelines,
             "warnings": self.warnings,
+            "batches": self.batches,
+            "pipeline_length_km": round(self.pipeline_length_km, 4),
+            "bbox": self.bbox,
         }
 
 
-# ── Import service ─────────────────────────────────────────────────────
+# ── SQL helpers ────────────────────────────────────────────────────────
 
 
-async def import_kmz(
-    db: AsyncSession,
-    *,
-    entity_id: UUID,
-    field_id: UUID,
-    user_id: UUID | None,
-    kmz_bytes: bytes,
-    filename: str | None = None,
-) -> ImportReport:
-    """
-    Parse the KMZ and commit its content under the given OilField.
+async def _load_existing(db: AsyncSession, state: _ImportState) -> None:
+    """Preload the keys used for upsert-on-conflict (columns only, no ORM objects)."""
+    entity_id = state.entity_id
+    for site_id, code, name in (await db.execute(
+        select(OilSite.id, OilSite.code, OilSite.name)
+        .where(OilSite.entity_id == entity_id, OilSite.field_id == state.field_id)
+    )).all():
+        state.sites_by_code[_norm_code(code)] = site_id
+        state.sites_by_name[name.strip().upper()] = site_id
 
-    A single transaction: db.commit() is called by the caller after this
-    returns so that a failure rolls the whole run back automatically.
-    An ImportRun record is always persisted (even on partial success) so
-    the user can audit or rollback the run.
-    """
-    parsed = parse_kmz(kmz_bytes)
-    report = ImportReport()
+    for inst_id, code, external_id, lon, lat in (await db.execute(
+        select(
+            Installation.id, Installation.code, Installation.external_id,
+            Installation.longitude, Installation.latitude,
+        ).where(Installation.entity_id == entity_id)
+    )).all():
+        known = _Known(inst_id, external_id, lon, lat)
+        state.installations_by_code[_norm_code(code)] = known
+        if external_id:
+            state.installations_by_external[external_id] = known
+
+    for equip_id, tag, external_id in (await db.execute(
+        select(RegistryEquipment.id, RegistryEquipment.tag_number, RegistryEquipment.external_id)
+        .where(RegistryEquipment.entity_id == entity_id, RegistryEquipment.equipment_class == "WELL")
+    )).all():
+        known = _Known(equip_id, external_id)
+        state.equipment_by_tag[_norm_code(tag)] = known
+        if external_id:
+            state.equipment_by_external[external_id] = known
 
-    # ── Verify the target field exists and belongs to the entity ──
-    field_obj = (await db.execute(
-        select(OilField).where(OilField.id == field_id, OilField.entity_id == entity_id)
-    )).scalar_one_or_none()
-    if not field_obj:
-        raise ValueError(f"Field {field_id} not found for this entity")
-    report.field = {"id": str(field_obj.id), "code": field_obj.code, "name": field_obj.name}
+    for pipe_id, code, external_id in (await db.execute(
+        select(RegistryPipeline.id, RegistryPipeline.pipeline_id, RegistryPipeline.external_id)
+        .where(RegistryPipeline.entity_id == entity_id)
+    )).all():
+        state.pipeline_codes.add(code)
+        if external_id:
+            state.pipelines_by_external[external_id] = _Known(pipe_id, external_id)
 
-    created_site_ids: list[str] = []
-    created_installation_ids: list[str] = []
-    created_equipment_ids: list[str] = []
-    created_pipeline_ids: list[str] = []
-
-    # ── Preload existing sites / installations for upsert-on-conflict ──
-    existing_sites = (
-        await db.execute(select(OilSite).where(OilSite.entity_id == entity_id, OilSite.field_id == field_id))
-    ).scalars().all()
-    sites_by_code: dict[str, OilSite] = {_norm_code(s.code): s for s in existing_sites}
-    sites_by_name: dict[str, OilSite] = {s.name.strip().upper(): s for s in existing_sites}
-
-    existing_installations = (
-        await db.execute(select(Installation).where(Installation.entity_id == entity_id))
-    ).scalars().all()
-    installations_by_code: dict[str, Installation] = {_norm_code(i.code): i for i in existing_installations}
-    installations_by_external: dict[str, Installation] = {
-        i.external_id: i for i in existing_installations if i.external_id
-    }
-
-    existing_equipment = (
-        await db.execute(
-            select(RegistryEquipment).where(
-                RegistryEquipment.entity_id == entity_id, RegistryEquipment.equipment_class == "WELL"
-            )
-        )
-    ).scalars().all()
-    equipment_by_external: dict[str, RegistryEquipment] = {
-        e.external_id: e for e in existing_equipment if e.external_id
-    }
-    equipment_by_tag: dict[str, RegistryEquipment] = {_norm_code(e.tag_number): e for e in existing_equipment}
-
-    existing_pipelines = (
-        await db.execute(select(RegistryPipeline).where(RegistryPipeline.entity_id == entity_id))
-    ).scalars().all()
-    pipelines_by_external: dict[str, RegistryPipeline] = {
-        p.external_id: p for p in existing_pipelines if p.external_id
-    }
 
-    # ══════ PLATFORMS → Sites + Installations ══════
+async def _write_batch(db: AsyncSession, model: Any, inserts: list[dict], updates: list[dict]) -> None:
+    """One multi-row INSERT for new rows, then one bulk UPDATE-by-id for matched rows."""
+    if inserts:
+        await db.execute(insert(model), inserts)
+    if updates:
+        await db.execute(update(model), updates)
+
+
+async def _extent(db: AsyncSession, column: Any, ids: list[UUID]) -> tuple[float | None, ...] | None:
+    """Bounding box of ``column`` over the given rows, computed by PostGIS."""
+    if not ids:
+        return None
+    box = func.ST_Extent(cast(column, Geometry(srid=4326)))
+    return tuple((await db.execute(
+        select(func.ST_XMin(box), func.ST_YMin(box), func.ST_XMax(box), func.ST_YMax(box))
+        .where(column.class_.id.in_(ids))
+    )).one())
+
+
+async def _update_lengths(db: AsyncSession, ids: list[UUID]) -> float:
+    """Set total_length_km from the geodesic route length; return the batch total."""
+    if not ids:
+        return 0.0
+    lengths = (await db.execute(
+        update(RegistryPipeline)
+        .where(RegistryPipeline.id.in_(ids))
+        .values(total_length_km=func.ST_Length(RegistryPipeline.geom_route) / 1000)
+        .returning(RegistryPipeline.total_length_km)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    return float(sum(v for v in lengths if v is not None))
+
+
+async def _report_progress(progress: ProgressCallback | None, event: dict[str, Any]) -> None:
+    logger.info("KMZ import %(phase)s batch %(batch)s: %(rows)s rows (%(processed)s total)", event)
+    if progress is None:
+        return
+    result = progress(event)
+    if inspect.isawaitable(result):
+        await result
+
+
+# ── Phases ─────────────────────────────────────────────────────────────
+
+
+async def _import_platforms(
+    db: AsyncSession, state: _ImportState, platforms: list[dict], report: ImportReport,
+) -> None:
     # First pass: collect the unique FIELD attribute values from platforms,
     # upsert a Site for each under the selected OilField.
     site_names: dict[str, list[dict]] = {}  # normalised name → [platform records]
-    for platform in parsed["platforms"]:
+    for platform in platforms:
         attrs = platform.get("attributes", {})
         raw_field = (attrs.get("FIELD") or attrs.get("SITE") or "DEFAULT").strip()
-        key = raw_field.upper()
-        site_names.setdefault(key, []).append(platform)
+        site_names.setdefault(raw_field.upper(), []).append(platform)
 
-    site_by_key: dict[str, OilSite] = {}
+    site_by_key: dict[str, UUID] = {}
+    new_sites: list[dict] = []
     for site_key, members in site_names.items():
         pretty_name = members[0].get("attributes", {}).get("FIELD", site_key).strip() or site_key
-        code = _norm_code(pretty_name) or "DEFAULT_SITE"
-        code = code[:30]
-        existing = sites_by_code.get(code) or sites_by_name.get(site_key)
+        code = (_norm_code(pretty_name) or "DEFAULT_SITE")[:30]
+        existing = state.sites_by_code.get(code) or state.sites_by_name.get(site_key)
         if existing:
             site_by_key[site_key] = existing
             report.sites["matched"] += 1
             continue
-        # Country + centroid from the platform samples.
         country = (members[0].get("attributes", {}).get("COUNTRY") or "XXX").strip()[:3] or "XXX"
-        site = OilSite(
-            entity_id=entity_id,
-            field_id=field_id,
-            code=code,
-            name=pretty_name[:200],
-            site_type="OFFSHORE_CLUSTER",
-            environment="OFFSHORE",
-            country=country.upper(),
-        )
-        db.add(site)
-        await db.flush()
-        site_by_key[site_key] = site
-        created_site_ids.append(str(site.id))
+        site_id = uuid4()
+        new_sites.append({
+            "id": site_id,
+            "entity_id": state.entity_id,
+            "field_id": state.field_id,
+            "code": code,
+            "name": pretty_name[:200],
+            "site_type": "OFFSHORE_CLUSTER",
+            "environment": "OFFSHORE",
+            "country": country.upper(),
+        })
+        state.sites_by_code[code] = site_id
+        site_by_key[site_key] = site_id
+        state.created_site_ids.append(str(site_id))
         report.sites["created"] += 1
+    await _write_batch(db, OilSite, new_sites, [])
 
     # Second pass: upsert installations under their matching sites.
-    for platform in parsed["platforms"]:
+    inserts: list[dict] = []
+    updates: list[dict] = []
+    for platform in platforms:
         attrs = platform.get("attributes", {})
         name = platform.get("name") or attrs.get("PLATFORM_N") or "Unnamed platform"
-        alt = attrs.get("ALTERNATIV") or ""
-        code = _norm_code(alt) or _norm_code(name)
-        code = code[:30] or "UNKNOWN"
+        code = (_norm_code(attrs.get("ALTERNATIV") or "") or _norm_code(name))[:30] or "UNKNOWN"
         external_id = (attrs.get("globalid") or attrs.get("GLOBALID") or "").strip("{} ")
         raw_field = (attrs.get("FIELD") or attrs.get("SITE") or "DEFAULT").strip().upper()
         target_site = site_by_key.get(raw_field) or next(iter(site_by_key.values()), None)
@@ -222,101 +332,127 @@ async def import_kmz(
             continue
         lon, lat = coords[0]
         existing = (
-            (external_id and installations_by_external.get(external_id))
-            or installations_by_code.get(code)
+            (external_id and state.installations_by_external.get(external_id))
+            or state.installations_by_code.get(code)
         )
         if existing:
             # Update geometry + external_id only; preserve operational fields.
-            existing.latitude = lat
-            existing.longitude = lon
-            existing.geom_point = WKTElement(f"POINT({lon} {lat})", srid=4326)
+            existing.lon, existing.lat = lon, lat
             if external_id and not existing.external_id:
                 existing.external_id = external_id
+                state.installations_by_external[external_id] = existing
+            updates.append({
+                "id": existing.id,
+                "latitude": lat,
+                "longitude": lon,
+                "geom_point": _point((lon, lat)),
+                "external_id": existing.external_id,
+            })
             report.installations["matched"] += 1
             continue
-        inst = Installation(
-            entity_id=entity_id,
-            site_id=target_site.id,
-            code=code,
-            name=name[:200],
-            installation_type=(attrs.get("TYPE_PLATF") or "PLATFORM")[:60],
-            environment="OFFSHORE",
-            latitude=lat,
-            longitude=lon,
-            geom_point=WKTElement(f"POINT({lon} {lat})", srid=4326),
-            status="OPERATIONAL",
-            external_id=external_id or None,
-        )
-        db.add(inst)
-        await db.flush()
-        installations_by_code[_norm_code(code)] = inst
+        known = _Known(uuid4(), external_id or None, lon, lat)
+        inserts.append({
+            "id": known.id,
+            "entity_id": state.entity_id,
+            "site_id": target_site,
+            "code": code,
+            "name": name[:200],
+            "installation_type": (attrs.get("TYPE_PLATF") or "PLATFORM")[:60],
+            "environment": "OFFSHORE",
+            "latitude": lat,
+            "longitude": lon,
+            "geom_point": _point((lon, lat)),
+            "status": "OPERATIONAL",
+            "external_id": external_id or None,
+        })
+        state.installations_by_code[code] = known
         if external_id:
-            installations_by_external[external_id] = inst
-        created_installation_ids.append(str(inst.id))
+            state.installations_by_external[external_id] = known
+        state.created_installation_ids.append(str(known.id))
         report.installations["created"] += 1
 
-    # ══════ WELLS → RegistryEquipment(class='WELL') ══════
-    # Sorted list of platform points for fast haversine fallback.
-    platform_points: list[tuple[Installation, float, float]] = []
-    for inst in installations_by_code.values():
-        if inst.latitude is not None and inst.longitude is not None:
-            platform_points.append((inst, float(inst.longitude), float(inst.latitude)))
+    await _write_batch(db, Installation, inserts, updates)
+    touched = [row["id"] for row in inserts] + [row["id"] for row in updates]
+    report.extend_bbox(await _extent(db, Installation.geom_point, touched))
+    state.platforms = _PlatformIndex(list(state.installations_by_code.values()))
 
-    for well in parsed["wells"]:
+
+async def _import_wells(
+    db: AsyncSession, state: _ImportState, wells: list[dict], report: ImportReport,
+) -> None:
+    located: list[tuple[dict, str, tuple[float, float]]] = []
+    for well in wells:
         attrs = well.get("attributes", {})
         name = well.get("name") or attrs.get("Name") or "Unnamed well"
-        external_id = (attrs.get("globalid") or "").strip("{} ")
         coords = well.get("coordinates") or []
         if not coords:
             report.wells["errors"] += 1
             report.warnings.append({"kind": "well_no_coord", "name": name, "reason": "No geometry"})
             continue
-        lon, lat = coords[0]
-        # Attach-to-installation resolution
-        prefix = name.split("-")[0] if "-" in name else name
-        target = installations_by_code.get(_norm_code(prefix))
-        if not target and platform_points:
-            nearest = min(platform_points, key=lambda p: _haversine_km((p[1], p[2]), (lon, lat)))
-            if _haversine_km((nearest[1], nearest[2]), (lon, lat)) <= 0.5:
-                target = nearest[0]
+        located.append((attrs, name, coords[0]))
+
+    platforms = state.platforms or _PlatformIndex([])
+    nearest = platforms.nearest_within([c for _, _, c in located], WELL_ATTACH_RADIUS_KM)
+
+    inserts: list[dict] = []
+    updates: list[dict] = []
+    for (attrs, name, (lon, lat)), near in zip(located, nearest):
+        external_id = (attrs.get("globalid") or "").strip("{} ")
         existing = (
-            (external_id and equipment_by_external.get(external_id))
-            or equipment_by_tag.get(_norm_code(name))
+            (external_id and state.equipment_by_external.get(external_id))
+            or state.equipment_by_tag.get(_norm_code(name))
         )
         if existing:
-            existing.latitude = lat
-            existing.longitude = lon
-            existing.geom_point = WKTElement(f"POINT({lon} {lat})", srid=4326)
             if external_id and not existing.external_id:
                 existing.external_id = external_id
+                state.equipment_by_external[external_id] = existing
+            updates.append({
+                "id": existing.id,
+                "latitude": lat,
+                "longitude": lon,
+                "geom_point": _point((lon, lat)),
+                "external_id": existing.external_id,
+            })
             report.wells["matched"] += 1
             continue
+        # Attach-to-installation resolution: name prefix, then nearest platform.
+        prefix = name.split("-")[0] if "-" in name else name
+        target = state.installations_by_code.get(_norm_code(prefix)) or near
         if not target:
             report.warnings.append({"kind": "well_unmatched", "name": name, "reason": "No platform within 500m and no name-prefix match"})
             # We still create it with null installation_id so the user sees it.
         tag = _norm_code(name)[:50] or "WELL"
-        equip = RegistryEquipment(
-            entity_id=entity_id,
-            installation_id=target.id if target else None,
-            tag_number=tag,
-            name=name[:200],
-            equipment_class="WELL",
-            status="OPERATIONAL",
-            latitude=lat,
-            longitude=lon,
-            geom_point=WKTElement(f"POINT({lon} {lat})", srid=4326),
-            external_id=external_id or None,
-        )
-        db.add(equip)
-        await db.flush()
-        equipment_by_tag[_norm_code(tag)] = equip
+        known = _Known(uuid4(), external_id or None)
+        inserts.append({
+            "id": known.id,
+            "entity_id": state.entity_id,
+            "installation_id": target.id if target else None,
+            "tag_number": tag,
+            "name": name[:200],
+            "equipment_class": "WELL",
+            "status": "OPERATIONAL",
+            "latitude": lat,
+            "longitude": lon,
+            "geom_point": _point((lon, lat)),
+            "external_id": external_id or None,
+        })
+        state.equipment_by_tag[_norm_code(tag)] = known
         if external_id:
-            equipment_by_external[external_id] = equip
-        created_equipment_ids.append(str(equip.id))
+            state.equipment_by_external[external_id] = known
+        state.created_equipment_ids.append(str(known.id))
         report.wells["created"] += 1
 
-    # ══════ PIPELINES → RegistryPipeline ══════
-    for pipe in parsed["pipelines"]:
+    await _write_batch(db, RegistryEquipment, inserts, updates)
+    touched = [row["id"] for row in inserts] + [row["id"] for row in updates]
+    report.extend_bbox(await _extent(db, RegistryEquipment.geom_point, touched))
+
+
+async def _import_pipelines(
+    db: AsyncSession, state: _ImportState, pipes: list[dict], report: ImportReport,
+) -> None:
+    inserts: list[dict] = []
+    updates: list[dict] = []
+    for pipe in pipes:
         attrs = pipe.get("attributes", {})
         name = pipe.get("name") or attrs.get("line_name") or "Unnamed pipeline"
         parsed_name = pipe.get("parsed_name") or {}
@@ -328,8 +464,8 @@ async def import_kmz(
             continue
         from_tag = _norm_code(parsed_name.get("from_tag") or "")
         to_tag = _norm_code(parsed_name.get("to_tag") or "")
-        from_inst = installations_by_code.get(from_tag)
-        to_inst = installations_by_code.get(to_tag)
+        from_inst = state.installations_by_code.get(from_tag)
+        to_inst = state.installations_by_code.get(to_tag)
         if not from_inst or not to_inst:
             report.pipelines["skipped"] += 1
             report.warnings.append({
@@ -338,37 +474,129 @@ async def import_kmz(
                 "reason": f"Missing endpoint(s): from={from_tag or '?'} to={to_tag or '?'}",
             })
             continue
-        existing = (external_id and pipelines_by_external.get(external_id))
+        existing = external_id and state.pipelines_by_external.get(external_id)
+        if existing:
+            updates.append({"id": existing.id, "geom_route": _linestring(coords), "external_id": external_id})
+            report.pipelines["matched"] += 1
+            continue
         diameter = parsed_name.get("diameter_in")
         fluid = (parsed_name.get("fluid") or attrs.get("process_fluid") or "UNKNOWN").upper()
         pid = f"{from_tag}-{to_tag}-{int(diameter) if diameter else 0}IN"[:50]
-        if existing:
-            existing.geom_route = WKTElement(_linestring_wkt(coords).split(";", 1)[1], srid=4326)
-            if external_id and not existing.external_id:
-                existing.external_id = external_id
-            report.pipelines["matched"] += 1
+        if pid in state.pipeline_codes:
+            # Same endpoints + size as a pipeline already in the registry
+            # (or earlier in this file): the (entity, pipeline_id) key would
+            # reject the whole batch.
+            report.pipelines["skipped"] += 1
+            report.warnings.append({"kind": "pipeline_duplicate", "name": name, "reason": f"Pipeline id {pid} already exists"})
             continue
-        pipeline = RegistryPipeline(
-            entity_id=entity_id,
-            pipeline_id=pid,
-            name=name[:200],
-            service=fluid[:50],
-            status="OPERATIONAL",
-            from_installation_id=from_inst.id,
-            to_installation_id=to_inst.id,
-            nominal_diameter_in=diameter or 0,
-            design_pressure_barg=0,  # required but unknown from KMZ
-            design_temp_max_c=0,  # required but unknown from KMZ
-            geom_route=WKTElement(_linestring_wkt(coords).split(";", 1)[1], srid=4326),
-            external_id=external_id or None,
-        )
-        db.add(pipeline)
-        await db.flush()
+        known = _Known(uuid4(), external_id or None)
+        inserts.append({
+            "id": known.id,
+            "entity_id": state.entity_id,
+            "pipeline_id": pid,
+            "name": name[:200],
+            "service": fluid[:50],
+            "status": "OPERATIONAL",
+            "from_installation_id": from_inst.id,
+            "to_installation_id": to_inst.id,
+            "nominal_diameter_in": diameter or 0,
+            "design_pressure_barg": 0,  # required but unknown from KMZ
+            "design_temp_max_c": 0,  # required but unknown from KMZ
+            "geom_route": _linestring(coords),
+            "external_id": external_id or None,
+        })
+        state.pipeline_codes.add(pid)
         if external_id:
-            pipelines_by_external[external_id] = pipeline
-        created_pipeline_ids.append(str(pipeline.id))
+            state.pipelines_by_external[external_id] = known
+        state.created_pipeline_ids.append(str(known.id))
         report.pipelines["created"] += 1
 
+    await _write_batch(db, RegistryPipeline, inserts, updates)
+    touched = [row["id"] for row in inserts] + [row["id"] for row in updates]
+    report.pipeline_length_km += await _update_lengths(db, touched)
+    report.extend_bbox(await _extent(db, RegistryPipeline.geom_route, touched))
+
+
+_PHASES = {"wells": _import_wells, "pipelines": _import_pipelines}
+
+
+# ── Import service ─────────────────────────────────────────────────────
+
+
+async def import_kmz(
+    db: AsyncSession,
+    *,
+    entity_id: UUID,
+    field_id: UUID,
+    user_id: UUID | None,
+    kmz_bytes: bytes | IO[bytes],
+    filename: str | None = None,
+    progress: ProgressCallback | None = None,
+    batch_size: int | None = None,
+) -> ImportReport:
+    """
+    Stream the KMZ and commit its content under the given OilField.
+
+    ``kmz_bytes`` may be the archive bytes or a seekable binary file (the
+    upload's spooled file), which is read twice. ``progress`` — sync or
+    async — is called after every written batch with
+    ``{"phase", "batch", "rows", "processed"}``.
+
+    A single transaction: db.commit() is called by the caller after this
+    returns so that a failure rolls the whole run back automatically.
+    An ImportRun record is always persisted (even on partial success) so
+    the user can audit or rollback the run.
+    """
+    batch_size = batch_size or KMZ_BATCH_SIZE
+    report = ImportReport()
+
+    # ── Verify the target field exists and belongs to the entity ──
+    field_obj = (await db.execute(
+        select(OilField).where(OilField.id == field_id, OilField.entity_id == entity_id)
+    )).scalar_one_or_none()
+    if not field_obj:
+        raise ValueError(f"Field {field_id} not found for this entity")
+    report.field = {"id": str(field_obj.id), "code": field_obj.code, "name": field_obj.name}
+
+    state = _ImportState(entity_id=entity_id, field_id=field_id)
+    await _load_existing(db, state)
+
+    # ══════ PLATFORMS → Sites + Installations ══════
+    stats = KmlStats()
+    with open_kml(kmz_bytes) as kml:
+        platforms = [rec for _, rec in iter_placemarks(kml, categories={"platforms"}, stats=stats)]
+    await _import_platforms(db, state, platforms, report)
+    report.batches += 1
+    await _report_progress(progress, {
+        "phase": "platforms", "batch": 1, "rows": len(platforms), "processed": len(platforms),
+    })
+
+    # ══════ WELLS + PIPELINES, streamed in batches ══════
+    pending: dict[str, list[dict]] = {phase: [] for phase in _PHASES}
+    processed = dict.fromkeys(_PHASES, 0)
+    batch_no = dict.fromkeys(_PHASES, 0)
+
+    async def flush(phase: str) -> None:
+        batch = pending[phase]
+        if not batch:
+            return
+        pending[phase] = []
+        await _PHASES[phase](db, state, batch, report)
+        processed[phase] += len(batch)
+        batch_no[phase] += 1
+        report.batches += 1
+        await _report_progress(progress, {
+            "phase": phase, "batch": batch_no[phase], "rows": len(batch), "processed": processed[phase],
+        })
+
+    with open_kml(kmz_bytes) as kml:
+        for category, record in iter_placemarks(kml, categories=set(_PHASES)):
+            pending[category].append(record)
+            if len(pending[category]) >= batch_size:
+                await flush(category)
+    for phase in _PHASES:
+        await flush(phase)
+
     # ══════ Persist the run ledger ══════
     run = ImportRun(
         id=uuid4(),
@@ -376,13 +604,13 @@ async def import_kmz(
         field_id=field_id,
         created_by=user_id,
         source_filename=filename,
-        document_name=parsed["source"].get("document_name"),
+        document_name=stats.document_name,
         status="completed",
         report=report.to_dict(),
-        created_site_ids=created_site_ids,
-        created_installation_ids=created_installation_ids,
-        created_equipment_ids=created_equipment_ids,
-        created_pipeline_ids=created_pipeline_ids,
+        created_site_ids=state.created_site_ids,
+        created_installation_ids=state.created_installation_ids,
+        created_equipment_ids=state.created_equipment_ids,
+        created_pipeline_ids=state.created_pipeline_ids,
     )
     db.add(run)
     await db.flush()
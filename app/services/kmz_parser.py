@@ -21,13 +21,21 @@ Typical KMZ schema (from MASTER_MAP_CAMEROON-RDR):
 
 Each placemark's <description> block is an HTML table of attributes; the
 parser extracts the key/value pairs into a dict alongside the geometry.
+
+The KML is read with ``etree.iterparse`` straight from the zip member:
+placemarks are yielded one at a time (``iter_placemarks``) and freed as
+soon as they are consumed, so a 100 MB export never sits in memory as a
+tree. ``parse_kmz`` / ``parse_kmz_preview`` are built on the same stream.
 """
 from __future__ import annotations
 
 import io
 import re
 import zipfile
-from typing import Any
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO, Any
 
 from lxml import etree  # type: ignore[import-untyped]
 
@@ -55,20 +63,30 @@ def _classify(folder_name: str) -> str:
     return "other"
 
 
-def _extract_kml_bytes(kmz_bytes: bytes) -> bytes:
-    """Return the raw KML bytes from a KMZ archive. Tolerates any KML filename."""
-    with zipfile.ZipFile(io.BytesIO(kmz_bytes)) as zf:
-        # Prefer doc.kml, then body.kml, then any *.kml.
-        names = zf.namelist()
-        for candidate in ("doc.kml", "body.kml"):
-            if candidate in names:
-                return zf.read(candidate)
-        for name in names:
-            if name.lower().endswith(".kml"):
-                return zf.read(name)
+def _kml_member(names: list[str]) -> str:
+    """Pick the KML entry of a KMZ archive. Tolerates any KML filename."""
+    # Prefer doc.kml, then body.kml, then any *.kml.
+    for candidate in ("doc.kml", "body.kml"):
+        if candidate in names:
+            return candidate
+    for name in names:
+        if name.lower().endswith(".kml"):
+            return name
     raise ValueError("No .kml file found in KMZ archive")
 
 
+@contextmanager
+def open_kml(kmz: bytes | IO[bytes]) -> Iterator[IO[bytes]]:
+    """
+    Open the KML entry of a KMZ as a decompressing stream. ``kmz`` is the
+    archive bytes or any seekable binary file (e.g. an upload's spooled file).
+    """
+    source = io.BytesIO(kmz) if isinstance(kmz, (bytes, bytearray)) else kmz
+    with zipfile.ZipFile(source) as zf:
+        with zf.open(_kml_member(zf.namelist())) as stream:
+            yield stream
+
+
 _ATTR_ROW_RE = re.compile(
     r"<tr[^>]*>\s*<td[^>]*>([^<]+)</td>\s*<td[^>]*>([^<]*)</td>\s*</tr>",
     re.IGNORECASE | re.DOTALL,
@@ -190,9 +208,127 @@ def parse_pipeline_name(name: str) -> dict[str, str | float | None]:
     }
 
 
+# ── Streaming parser ───────────────────────────────────────────────────
+
+_FOLDER = f"{KML_NS}Folder"
+_PLACEMARK = f"{KML_NS}Placemark"
+_DOCUMENT = f"{KML_NS}Document"
+_NAME = f"{KML_NS}name"
+
+
+@dataclass
+class KmlStats:
+    """Document-level counters filled in while ``iter_placemarks`` runs."""
+
+    document_name: str = ""
+    folder_count: int = 0
+    placemark_count: int = 0
+
+
+def _release(elem: etree._Element) -> None:
+    """Free a fully consumed element and the siblings parsed before it."""
+    elem.clear(keep_tail=True)
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def _placemark_record(placemark: etree._Element, folder_name: str, category: str) -> dict[str, Any] | None:
+    name_el = placemark.find(_NAME)
+    name = (name_el.text or "").strip() if name_el is not None else ""
+
+    desc_el = placemark.find(f"{KML_NS}description")
+    description = desc_el.text if desc_el is not None else None
+
+    geom = _find_geometry(placemark)
+    if geom is None and category not in ("bathymetry", "other"):
+        return None  # No usable geometry, skip for non-bathy layers
+
+    record: dict[str, Any] = {
+        "kml_id": placemark.get("id") or "",
+        "name": name,
+        "attributes": _parse_description_attrs(description),
+        "folder": folder_name,
+    }
+    if geom is not None:
+        record["geometry_type"] = geom[0]
+        record["coordinates"] = geom[1]
+
+    # Category-specific enrichment for pipelines.
+    if category == "pipelines":
+        record["parsed_name"] = parse_pipeline_name(name)
+    return record
+
+
+def iter_placemarks(
+    kml: IO[bytes],
+    *,
+    categories: set[str] | None = None,
+    stats: KmlStats | None = None,
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    """
+    Stream ``(category, record)`` pairs for every Placemark that sits
+    directly in a Folder, in document order.
+
+    ``kml`` is a binary KML stream (see ``open_kml``). Placemarks whose
+    category is not in ``categories`` are skipped without building a record.
+    Each Placemark / Folder is cleared once handled, so memory stays flat
+    regardless of the file size. Folder names are expected before their
+    placemarks, which is how every KML writer we have seen orders them.
+    """
+    stats = stats if stats is not None else KmlStats()
+    scopes: dict[etree._Element, tuple[str, str]] = {}  # open Folder → (name, category)
+    document_seen = False
+
+    def scope(folder: etree._Element) -> tuple[str, str]:
+        found = scopes.get(folder)
+        if found is None:
+            name_el = folder.find(_NAME)
+            name = (name_el.text or "").strip() if name_el is not None else ""
+            found = scopes[folder] = (name, _classify(name))
+        return found
+
+    # Only Folder / Placemark ends are reported, so the per-element work
+    # stays in libxml2. recover=True so minor XML quirks (common in exports
+    # from ArcGIS) don't abort the whole parse.
+    context = etree.iterparse(kml, events=("end",), tag=(_FOLDER, _PLACEMARK), recover=True, huge_tree=True)
+    try:
+        for _, elem in context:
+            parent = elem.getparent()
+            if not document_seen:
+                # Read before the first release drops the <name> siblings.
+                document_seen = True
+                for doc in elem.iterancestors(_DOCUMENT):
+                    name_el = doc.find(_NAME)
+                    stats.document_name = (name_el.text or "").strip() if name_el is not None else ""
+                    break
+            in_folder = parent is not None and parent.tag == _FOLDER
+            if in_folder:
+                # Cache the enclosing folder's name before releasing this
+                # child removes it.
+                folder_name, category = scope(parent)
+
+            if elem.tag == _PLACEMARK:
+                if parent is not None and parent.tag == _PLACEMARK:
+                    continue  # not valid KML; left to the outer placemark
+                if in_folder:
+                    stats.placemark_count += 1
+                    if categories is None or category in categories:
+                        record = _placemark_record(elem, folder_name, category)
+                        if record is not None:
+                            yield category, record
+            else:
+                stats.folder_count += 1
+                scopes.pop(elem, None)
+            _release(elem)
+    except etree.XMLSyntaxError as exc:
+        raise ValueError(f"Invalid KML: {exc}") from exc
+
+
 # ── Main parser ────────────────────────────────────────────────────────
 
-def parse_kmz(kmz_bytes: bytes) -> dict[str, Any]:
+def parse_kmz(kmz_bytes: bytes | IO[bytes]) -> dict[str, Any]:
     """
     Parse a KMZ file and classify placemarks into asset categories.
 
@@ -212,22 +348,6 @@ def parse_kmz(kmz_bytes: bytes) -> dict[str, Any]:
           "other":       [...]
         }
     """
-    kml_bytes = _extract_kml_bytes(kmz_bytes)
-    # Strip BOM if any, then parse with recover mode so minor XML quirks
-    # (common in exports from ArcGIS) don't abort the whole parse.
-    parser = etree.XMLParser(recover=True, huge_tree=True)
-    try:
-        root = etree.fromstring(kml_bytes, parser=parser)
-    except etree.XMLSyntaxError as exc:
-        raise ValueError(f"Invalid KML: {exc}") from exc
-
-    if root is None:
-        raise ValueError("Empty KML document")
-
-    doc = root.find(f"{KML_NS}Document")
-    doc_name_el = doc.find(f"{KML_NS}name") if doc is not None else None
-    document_name = (doc_name_el.text or "").strip() if doc_name_el is not None else ""
-
     buckets: dict[str, list[dict[str, Any]]] = {
         "platforms": [],
         "wells": [],
@@ -237,61 +357,26 @@ def parse_kmz(kmz_bytes: bytes) -> dict[str, Any]:
         "bathymetry": [],
         "other": [],
     }
-
-    folder_count = 0
-    placemark_count = 0
-
-    # Iterate through every Folder at any depth.
-    for folder in root.iter(f"{KML_NS}Folder"):
-        folder_count += 1
-        folder_name_el = folder.find(f"{KML_NS}name")
-        folder_name = (folder_name_el.text or "").strip() if folder_name_el is not None else ""
-        category = _classify(folder_name)
-
-        for placemark in folder.findall(f"{KML_NS}Placemark"):
-            placemark_count += 1
-
-            name_el = placemark.find(f"{KML_NS}name")
-            name = (name_el.text or "").strip() if name_el is not None else ""
-
-            desc_el = placemark.find(f"{KML_NS}description")
-            description = desc_el.text if desc_el is not None else None
-            attrs = _parse_description_attrs(description)
-
-            geom = _find_geometry(placemark)
-            if geom is None and category not in ("bathymetry", "other"):
-                continue  # No usable geometry, skip for non-bathy layers
-
-            kml_id = placemark.get("id") or ""
-
-            record: dict[str, Any] = {
-                "kml_id": kml_id,
-                "name": name,
-                "attributes": attrs,
-                "folder": folder_name,
-            }
-            if geom is not None:
-                record["geometry_type"] = geom[0]
-                record["coordinates"] = geom[1]
-
-            # Category-specific enrichment for pipelines.
-            if category == "pipelines":
-                parsed = parse_pipeline_name(name)
-                record["parsed_name"] = parsed
-
+    # Compact bathymetry output: keep only counts + a few samples, not all 11k points.
+    bathy_count = 0
+    stats = KmlStats()
+    with open_kml(kmz_bytes) as kml:
+        for category, record in iter_placemarks(kml, stats=stats):
+            if category == "bathymetry":
+                bathy_count += 1
+                if len(buckets["bathymetry"]) >= 10:
+                    continue
             buckets[category].append(record)
 
-    # Compact bathymetry output: keep only counts + a few samples, not all 11k points.
-    bathy_full = buckets["bathymetry"]
     buckets["bathymetry"] = [
-        {"count": len(bathy_full), "samples": bathy_full[:10]}
-    ] if bathy_full else []
+        {"count": bathy_count, "samples": buckets["bathymetry"]}
+    ] if bathy_count else []
 
     return {
         "source": {
-            "document_name": document_name,
-            "folder_count": folder_count,
-            "placemark_count": placemark_count,
+            "document_name": stats.document_name,
+            "folder_count": stats.folder_count,
+            "placemark_count": stats.placemark_count,
         },
         "platforms": buckets["platforms"],
         "wells": buckets["wells"],
@@ -303,29 +388,52 @@ def parse_kmz(kmz_bytes: bytes) -> dict[str, Any]:
     }
 
 
-def parse_kmz_preview(kmz_bytes: bytes) -> dict[str, Any]:
+_PREVIEW_CATEGORIES = ("platforms", "wells", "pipelines", "cables", "structures")
+
+
+def parse_kmz_preview(kmz_bytes: bytes | IO[bytes]) -> dict[str, Any]:
     """
     Return a lightweight preview suitable for an API response: counts, first
     N records per category, and detected attribute keys. Avoids returning the
-    full 10k-line payload to the frontend.
+    full 10k-line payload to the frontend — and never holds it either: the
+    records are streamed and only the samples are kept.
     """
-    full = parse_kmz(kmz_bytes)
-    preview: dict[str, Any] = {"source": full["source"], "categories": {}}
-
-    for category in ("platforms", "wells", "pipelines", "cables", "structures"):
-        records = full[category]
-        # Collect the union of attribute keys to expose the schema.
-        attr_keys: set[str] = set()
-        for rec in records:
-            attr_keys.update(rec.get("attributes", {}).keys())
+    counts = dict.fromkeys(_PREVIEW_CATEGORIES, 0)
+    attr_keys: dict[str, set[str]] = {c: set() for c in _PREVIEW_CATEGORIES}
+    samples: dict[str, list[dict[str, Any]]] = {c: [] for c in _PREVIEW_CATEGORIES}
+    bathy_count = 0
+    stats = KmlStats()
+
+    with open_kml(kmz_bytes) as kml:
+        for category, record in iter_placemarks(kml, stats=stats):
+            if category == "bathymetry":
+                bathy_count += 1
+                continue
+            if category not in counts:
+                continue
+            counts[category] += 1
+            # Collect the union of attribute keys to expose the schema.
+            attr_keys[category].update(record.get("attributes", {}).keys())
+            if len(samples[category]) < 5:
+                samples[category].append(record)
+
+    preview: dict[str, Any] = {
+        "source": {
+            "document_name": stats.document_name,
+            "folder_count": stats.folder_count,
+            "placemark_count": stats.placemark_count,
+        },
+        "categories": {},
+    }
+    for category in _PREVIEW_CATEGORIES:
         preview["categories"][category] = {
-            "count": len(records),
-            "attribute_keys": sorted(attr_keys),
-            "samples": records[:5],
+            "count": counts[category],
+            "attribute_keys": sorted(attr_keys[category]),
+            "samples": samples[category],
         }
 
     preview["categories"]["bathymetry"] = {
-        "count": full["bathymetry"][0]["count"] if full["bathymetry"] else 0,
+        "count": bathy_count,
         "note": "Bathymetry points are summarised — not imported as assets",
     }
 
@@ -0,0 +1,408 @@
+"""Asset registry — in-memory field → site → installation hierarchy.
+
+Each entity's hierarchy is held as parallel arrays (ids, kinds, parent
+pointers, POB capacities, equipment counts) so tree rendering, ancestor
+lookups, subtree filters and the POB capacity fallback are answered without a
+database round-trip.
+
+The tree is versioned in Redis (``asset_hierarchy:version:{entity}``). Asset
+create/update/archive routes call ``publish_asset_change`` which patches the
+local copy, bumps the version and stores the patch under
+``asset_hierarchy:patches:{entity}`` so other workers replay it instead of
+reloading. A worker that misses patches (expired, or too far behind) reloads
+from the database. Without Redis the local copy is trusted for
+``HIERARCHY_TTL_SECONDS``.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis_client import bump_version, get_redis_or_none, read_version
+
+logger = logging.getLogger(__name__)
+
+# Max age of a cached hierarchy when Redis is unreachable.
+HIERARCHY_TTL_SECONDS = 60
+# A worker further behind than this reloads rather than replaying patches.
+MAX_PATCH_REPLAY = 200
+# Lifetime of the shared patch log.
+PATCH_LOG_TTL_SECONDS = 86400
+
+KINDS = ("field", "site", "installation")
+_KIND_BY_TABLE = {"ar_fields": "field", "ar_sites": "site", "ar_installations": "installation"}
+_PARENT_ATTR = {"site": "field_id", "installation": "site_id"}
+_TYPE_ATTR = {"field": "country", "site": "site_type", "installation": "installation_type"}
+# Labels used by the planner for the POB fallback source.
+_POB_SOURCE = {"installation": "installation", "site": "site", "field": "champ"}
+
+
+@dataclass
+class AssetHierarchy:
+    """Array-backed tree of one entity's fields, sites and installations."""
+
+    entity_id: UUID
+    version: str | None = None
+    ids: list[UUID] = field(default_factory=list)
+    index: dict[UUID, int] = field(default_factory=dict)
+    kind: list[str] = field(default_factory=list)
+    parent: list[int] = field(default_factory=list)
+    archived: list[bool] = field(default_factory=list)
+    pob_capacity: list[int | None] = field(default_factory=list)
+    equipment_count: list[int] = field(default_factory=list)
+    attrs: list[dict[str, Any]] = field(default_factory=list)
+    _pending_parents: dict[int, UUID] = field(default_factory=dict)
+    _children: list[list[int]] | None = None
+
+    # ── Mutation ─────────────────────────────────────────────────────────
+
+    def upsert(
+        self,
+        kind: str,
+        asset_id: UUID,
+        parent_id: UUID | None,
+        *,
+        archived: bool = False,
+        pob_capacity: int | None = None,
+        **attrs: Any,
+    ) -> None:
+        i = self.index.get(asset_id)
+        if i is None:
+            i = len(self.ids)
+            self.index[asset_id] = i
+            self.ids.append(asset_id)
+            self.kind.append(kind)
+            self.parent.append(-1)
+            self.archived.append(archived)
+            self.pob_capacity.append(pob_capacity)
+            self.equipment_count.append(0)
+            self.attrs.append(attrs)
+        else:
+            self.archived[i] = archived
+            self.pob_capacity[i] = pob_capacity
+            self.attrs[i] = attrs
+        self._pending_parents[i] = parent_id
+        self._children = None
+
+    def adjust_equipment(self, installation_id: UUID | None, delta: int) -> None:
+        i = self.index.get(installation_id) if installation_id else None
+        if i is not None:
+            self.equipment_count[i] = max(0, self.equipment_count[i] + delta)
+
+    def apply_patch(self, patch: dict[str, Any]) -> None:
+        if patch["op"] == "node":
+            self.upsert(
+                patch["kind"],
+                UUID(patch["id"]),
+                UUID(patch["parent_id"]) if patch.get("parent_id") else None,
+                archived=patch["archived"],
+                pob_capacity=patch["pob_capacity"],
+                **patch["attrs"],
+            )
+        elif patch["op"] == "equipment":
+            for key, delta in (("from", -1), ("to", 1)):
+                if patch.get(key):
+                    self.adjust_equipment(UUID(patch[key]), delta)
+
+    def _link(self) -> list[list[int]]:
+        """Resolve parent ids to positions and rebuild child lists."""
+        for i, parent_id in self._pending_parents.items():
+            self.parent[i] = self.index.get(parent_id, -1) if parent_id else -1
+        self._pending_parents.clear()
+        if self._children is None:
+            children: list[list[int]] = [[] for _ in self.ids]
+            for i, p in enumerate(self.parent):
+                if p >= 0:
+                    children[p].append(i)
+            for child_list in children:
+                child_list.sort(key=lambda c: self.attrs[c].get("code") or "")
+            self._children = children
+        return self._children
+
+    # ── Queries ──────────────────────────────────────────────────────────
+
+    def __contains__(self, asset_id: UUID) -> bool:
+        return asset_id in self.index
+
+    def _path(self, i: int) -> list[int]:
+        self._link()
+        path = [i]
+        while self.parent[path[-1]] >= 0 and len(path) <= len(KINDS):
+            path.append(self.parent[path[-1]])
+        return path
+
+    def ancestors(self, asset_id: UUID, include_self: bool = True) -> list[UUID]:
+        """``asset_id`` then its site and field (archived ones included)."""
+        i = self.index.get(asset_id)
+        if i is None:
+            return []
+        path = self._path(i)
+        return [self.ids[j] for j in (path if include_self else path[1:])]
+
+    def effective_pob(self, asset_id: UUID) -> tuple[int | None, str]:
+        """First non-null POB capacity walking installation → site → field."""
+        i = self.index.get(asset_id)
+        if i is None:
+            return None, "installation"
+        for j in self._path(i):
+            if self.pob_capacity[j] is not None:
+                return self.pob_capacity[j], _POB_SOURCE[self.kind[j]]
+        return None, _POB_SOURCE[self.kind[i]]
+
+    def subtree_ids(self, asset_id: UUID, kinds: tuple[str, ...] = KINDS) -> list[UUID]:
+        """Active descendants of ``asset_id`` (itself included) of the given kinds."""
+        i = self.index.get(asset_id)
+        if i is None:
+            return []
+        children = self._link()
+        stack, found = [i], []
+        while stack:
+            j = stack.pop()
+            if self.archived[j]:
+                continue
+            if self.kind[j] in kinds:
+                found.append(self.ids[j])
+            stack.extend(children[j])
+        return found
+
+    def render(self, root_id: UUID | None = None) -> list[dict[str, Any]]:
+        """Fields → sites → installations with counts, as ``GET /hierarchy``.
+
+        With ``root_id`` only the branch leading to and below that asset is
+        kept.
+        """
+        children = self._link()
+        keep: set[int] | None = None
+        if root_id is not None:
+            i = self.index.get(root_id)
+            if i is None or self.archived[i]:
+                return []
+            keep = set(self._path(i))
+            stack = [i]
+            while stack:
+                j = stack.pop()
+                keep.add(j)
+                stack.extend(children[j])
+
+        def visible(j: int) -> bool:
+            return not self.archived[j] and (keep is None or j in keep)
+
+        def node(j: int) -> dict[str, Any]:
+            kind = self.kind[j]
+            attrs = self.attrs[j]
+            out = {
+                "id": str(self.ids[j]),
+                "code": attrs.get("code"),
+                "name": attrs.get("name"),
+                _TYPE_ATTR[kind]: attrs.get(_TYPE_ATTR[kind]),
+                "status": attrs.get("status"),
+            }
+            kids = [node(c) for c in children[j] if visible(c)]
+            if kind == "field":
+                out.update(site_count=len(kids), sites=kids)
+            elif kind == "site":
+                out.update(installation_count=len(kids), installations=kids)
+            else:
+                out["equipment_count"] = self.equipment_count[j]
+            return out
+
+        roots = sorted(
+            (j for j in range(len(self.ids)) if self.kind[j] == "field" and visible(j)),
+            key=lambda j: self.attrs[j].get("code") or "",
+        )
+        return [node(j) for j in roots]
+
+    def etag(self, root_id: UUID | None = None, rendered: list[dict[str, Any]] | None = None) -> str:
+        """Validator for ``render(root_id)``.
+
+        Built from the shared version when Redis is up; otherwise a digest
+        of the rendered tree, since the local copy may be reloaded with
+        different data at any time.
+        """
+        if self.version is not None:
+            return f'"ah-{self.entity_id}-{self.version}-{root_id or "all"}"'
+        if rendered is None:
+            rendered = self.render(root_id)
+        digest = hashlib.sha1(json.dumps(rendered, sort_keys=True).encode()).hexdigest()[:20]
+        return f'"ah-{self.entity_id}-d{digest}"'
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Patches
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def node_patch(obj: Any) -> dict[str, Any]:
+    """Patch describing a field, site or installation row."""
+    kind = _KIND_BY_TABLE[obj.__tablename__]
+    parent_id = getattr(obj, _PARENT_ATTR[kind]) if kind in _PARENT_ATTR else None
+    type_attr = _TYPE_ATTR[kind]
+    return {
+        "op": "node",
+        "kind": kind,
+        "id": str(obj.id),
+        "parent_id": str(parent_id) if parent_id else None,
+        "archived": bool(obj.archived),
+        "pob_capacity": obj.pob_capacity,
+        "attrs": {
+            "code": obj.code,
+            "name": obj.name,
+            "status": obj.status,
+            type_attr: getattr(obj, type_attr),
+        },
+    }
+
+
+def equipment_patch(before: UUID | None, after: UUID | None) -> dict[str, Any] | None:
+    """Patch moving one active equipment between installations (None = none/archived)."""
+    if before == after:
+        return None
+    return {
+        "op": "equipment",
+        "from": str(before) if before else None,
+        "to": str(after) if after else None,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Load & cache
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+async def load_asset_hierarchy(db: AsyncSession, entity_id: UUID) -> AssetHierarchy:
+    """Build the hierarchy with one column-only query per table."""
+    from app.models.asset_registry import Installation, OilField, OilSite, RegistryEquipment
+
+    tree = AssetHierarchy(entity_id=entity_id)
+    for kind, model in (("field", OilField), ("site", OilSite), ("installation", Installation)):
+        type_col = getattr(model, _TYPE_ATTR[kind])
+        parent_col = getattr(model, _PARENT_ATTR[kind]) if kind in _PARENT_ATTR else None
+        columns = [
+            model.id, model.code, model.name, model.status, type_col,
+            model.pob_capacity, model.archived,
+        ]
+        result = await db.execute(
+            select(*columns, *([parent_col] if parent_col is not None else []))
+            .where(model.entity_id == entity_id)
+        )
+        for row in result.all():
+            tree.upsert(
+                kind, row[0], row[7] if parent_col is not None else None,
+                archived=row[6], pob_capacity=row[5],
+                code=row[1], name=row[2], status=row[3], **{_TYPE_ATTR[kind]: row[4]},
+            )
+
+    counts = await db.execute(
+        select(RegistryEquipment.installation_id, func.count(RegistryEquipment.id))
+        .where(
+            RegistryEquipment.entity_id == entity_id,
+            RegistryEquipment.archived == False,  # noqa: E712
+            RegistryEquipment.installation_id.is_not(None),
+        )
+        .group_by(RegistryEquipment.installation_id)
+    )
+    for installation_id, count in counts.all():
+        tree.adjust_equipment(installation_id, count)
+    return tree
+
+
+# entity_id -> (hierarchy, loaded_at)
+_hierarchies: dict[UUID, tuple[AssetHierarchy, float]] = {}
+
+
+def _version_key(entity_id: UUID) -> str:
+    return f"asset_hierarchy:version:{entity_id}"
+
+
+def _patches_key(entity_id: UUID) -> str:
+    return f"asset_hierarchy:patches:{entity_id}"
+
+
+def _decode(value: Any) -> str | None:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+async def _catch_up(r: Any, tree: AssetHierarchy, version: str) -> bool:
+    """Replay shared patches up to ``version``; False if any is missing."""
+    try:
+        start, end = int(tree.version), int(version)
+    except (TypeError, ValueError):
+        return False
+    if end < start or end - start > MAX_PATCH_REPLAY:
+        return False
+    wanted = [str(v) for v in range(start + 1, end + 1)]
+    try:
+        raw = await r.hmget(_patches_key(tree.entity_id), wanted)
+    except Exception:
+        return False
+    if any(item is None for item in raw):
+        return False
+    for item in raw:
+        tree.apply_patch(json.loads(_decode(item)))
+    tree.version = version
+    return True
+
+
+async def get_asset_hierarchy(db: AsyncSession, entity_id: UUID) -> AssetHierarchy:
+    """Current hierarchy for ``entity_id`` — cached, patched, or reloaded."""
+    version = await read_version(_version_key(entity_id))
+
+    cached = _hierarchies.get(entity_id)
+    if cached is not None:
+        tree, loaded_at = cached
+        if version is None:
+            if time.monotonic() - loaded_at < HIERARCHY_TTL_SECONDS:
+                return tree
+        elif tree.version == version or await _catch_up(get_redis_or_none(), tree, version):
+            return tree
+
+    tree = await load_asset_hierarchy(db, entity_id)
+    tree.version = version
+    _hierarchies[entity_id] = (tree, time.monotonic())
+    return tree
+
+
+async def publish_asset_change(entity_id: UUID, patch: dict[str, Any] | None) -> None:
+    """Apply ``patch`` locally and share it with the other workers.
+
+    Call after the change is committed. Failures only cost a reload.
+    """
+    if patch is None:
+        return
+    cached = _hierarchies.get(entity_id)
+    if cached is not None:
+        cached[0].apply_patch(patch)
+
+    r = get_redis_or_none()
+    if r is None:
+        return
+    try:
+        new_version = int(await r.incr(_version_key(entity_id)))
+        await r.hset(_patches_key(entity_id), str(new_version), json.dumps(patch))
+        await r.expire(_patches_key(entity_id), PATCH_LOG_TTL_SECONDS)
+    except Exception:
+        logger.warning("Could not publish asset hierarchy change for entity %s", entity_id)
+        _hierarchies.pop(entity_id, None)
+        return
+
+    if cached is not None:
+        tree = cached[0]
+        if tree.version == str(new_version - 1):
+            tree.version = str(new_version)
+        else:
+            # Another worker published in between: replay on next read.
+            _hierarchies.pop(entity_id, None)
+
+
+async def invalidate_asset_hierarchy(entity_id: UUID) -> None:
+    """Force every worker to reload (bulk imports and other unpatched writes)."""
+    _hierarchies.pop(entity_id, None)
+    # A version with no stored patch makes replay fail, hence a reload.
+    await bump_version(_version_key(entity_id))
@@ -264,28 +264,11 @@ async def check_pax_asset_compliance(
 
     pax_type = "internal" if user_id else "external"
 
-    # Build asset hierarchy: Installation → Site → Field
-    # ar_installations has site_id (FK to ar_sites), ar_sites has field_id (FK to ar_fields)
-    asset_hierarchy = await db.execute(
-        text(
-            """
-            SELECT i.id FROM ar_installations i WHERE i.id = :asset_id
-            UNION
-            SELECT s.id FROM ar_sites s
-            JOIN ar_installations i ON i.site_id = s.id
-            WHERE i.id = :asset_id
-            UNION
-            SELECT f.id FROM ar_fields f
-            JOIN ar_sites s ON s.field_id = f.id
-            JOIN ar_installations i ON i.site_id = s.id
-            WHERE i.id = :asset_id
-            """
-        ),
-        {"asset_id": str(asset_id)},
-    )
-    ancestor_ids = [row[0] for row in asset_hierarchy.all()]
-    if not ancestor_ids:
-        ancestor_ids = [asset_id]
+    # Asset hierarchy: Installation → Site → Field (cached per entity)
+    from app.services.modules.asset_hierarchy_service import get_asset_hierarchy
+
+    hierarchy = await get_asset_hierarchy(db, entity_id)
+    ancestor_ids = hierarchy.ancestors(asset_id) or [asset_id]
 
     matrix_result = await db.execute(
         select(ComplianceMatrixEntry).where(
@@ -0,0 +1,153 @@
+"""Persisted match keys for external-contact deduplication.
+
+``find_external_contact_matches`` only reports a ``TierContact`` when
+``is_external_contact_match_strong`` holds, i.e. when the badge, email or
+phone matches, or when the score reaches 50 — which without one of those
+three needs a name match (exact or phonetic). An exact normalised name
+always has the same phonetic key, so a strong match implies at least one
+of:
+
+- same phonetic first/last name key (``match_name_key``);
+- same normalised email (``match_email``);
+- same normalised phone (``match_phone``);
+- same normalised badge number (``match_badge``).
+
+Those keys are stored on ``tier_contacts`` (refreshed by the
+``before_insert`` / ``before_update`` mapper hooks of the model) and
+indexed per company, so candidates come from one indexed OR-of-keys
+query and only they go through ``score_external_contact_match``.
+Contacts without keys yet (written before the columns existed) are
+always candidates until ``rebuild_contact_match_index`` has run.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from uuid import UUID
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.common import TierContact
+from app.services.modules.paxlog_service import normalize_external_phone, phonetic_pax_name_key
+
+# Contacts per keyset page / bulk UPDATE during a rebuild.
+MATCH_INDEX_CHUNK_SIZE = 1000
+
+
+def _lowered(value: str | None) -> str | None:
+    return value.strip().lower() if value else None
+
+
+def contact_match_keys(
+    *,
+    first_name: str,
+    last_name: str,
+    email: str | None,
+    phone: str | None,
+    badge_number: str | None,
+) -> dict[str, str | None]:
+    """Column values of the match keys, normalised the way the scorer compares them."""
+    return {
+        "match_name_key": f"{phonetic_pax_name_key(first_name or '')} {phonetic_pax_name_key(last_name or '')}",
+        "match_email": _lowered(email),
+        "match_phone": normalize_external_phone(phone) if phone else None,
+        "match_badge": _lowered(badge_number),
+    }
+
+
+def apply_contact_match_keys(contact: TierContact) -> None:
+    for column, value in contact_match_keys(
+        first_name=contact.first_name,
+        last_name=contact.last_name,
+        email=contact.email,
+        phone=contact.phone,
+        badge_number=contact.badge_number,
+    ).items():
+        setattr(contact, column, value)
+
+
+def match_candidates_query(
+    allowed_company_ids: list[UUID],
+    *,
+    first_name: str,
+    last_name: str,
+    email: str | None,
+    phone: str | None,
+    badge_number: str | None,
+):
+    """Active contacts of the companies sharing at least one key with the lookup."""
+    keys = contact_match_keys(
+        first_name=first_name,
+        last_name=last_name,
+        email=email,
+        phone=phone,
+        badge_number=badge_number,
+    )
+    terms = [TierContact.match_name_key == keys["match_name_key"], TierContact.match_name_key.is_(None)]
+    for column in ("match_email", "match_phone", "match_badge"):
+        if keys[column] is not None:
+            terms.append(getattr(TierContact, column) == keys[column])
+    return (
+        select(TierContact)
+        .where(
+            TierContact.tier_id.in_(allowed_company_ids),
+            TierContact.active == True,  # noqa: E712
+            or_(*terms),
+        )
+        .order_by(TierContact.last_name.asc(), TierContact.first_name.asc())
+    )
+
+
+async def rebuild_contact_match_index(
+    db: AsyncSession,
+    *,
+    tier_ids: Iterable[UUID] | None = None,
+    chunk_size: int | None = None,
+) -> int:
+    """
+    Recompute the match keys of every contact (or of those of ``tier_ids``).
+
+    Walks ``tier_contacts`` by primary key in pages and writes each page
+    back with one executemany UPDATE; commits after each page so a large
+    rebuild does not hold one long transaction. Returns the number of
+    contacts processed.
+    """
+    size = chunk_size or MATCH_INDEX_CHUNK_SIZE
+    scope = list(tier_ids) if tier_ids is not None else None
+    processed = 0
+    last_id: UUID | None = None
+    while True:
+        query = select(
+            TierContact.id,
+            TierContact.first_name,
+            TierContact.last_name,
+            TierContact.email,
+            TierContact.phone,
+            TierContact.badge_number,
+        ).order_by(TierContact.id).limit(size)
+        if scope is not None:
+            query = query.where(TierContact.tier_id.in_(scope))
+        if last_id is not None:
+            query = query.where(TierContact.id > last_id)
+        rows = (await db.execute(query)).all()
+        if not rows:
+            return processed
+        await db.execute(
+            update(TierContact).execution_options(synchronize_session=False),
+            [
+                {
+                    "id": contact_id,
+                    **contact_match_keys(
+                        first_name=first_name,
+                        last_name=last_name,
+                        email=email,
+                        phone=phone,
+                        badge_number=badge_number,
+                    ),
+                }
+                for contact_id, first_name, last_name, email, phone, badge_number in rows
+            ],
+        )
+        await db.commit()
+        processed += len(rows)
+        last_id = rows[-1][0]
@@ -0,0 +1,427 @@
+"""Deck packing for cargo placement suggestions.
+
+``pack_deck`` lays the cargo of one deck surface out in 2D (x across the
+deck, y along it; y = 0 is the working end where cargo is discharged):
+
+- skyline bottom-left packing, every item tried in both orientations;
+  cargo goes on in unloading order from the working end, so cargo for an
+  early stop never sits behind cargo for a later one;
+- a stackable item may carry one lighter item that leaves no later than
+  it does (``STACK_MAX_LEVEL`` high at most); hazmat is never stacked;
+- hazmat is packed from the far end, last stop first, and kept
+  ``HAZMAT_SEPARATION_M`` away from other cargo, explosives
+  ``EXPLOSIVE_SEPARATION_M`` away from the other hazmat;
+- the deck is split fore–aft into ``LOAD_BAND_COUNT`` bands, each allowed
+  ``LOAD_BAND_ALLOWANCE`` × its share of the deck weight limit;
+- between equally low positions the one keeping the transverse centre of
+  gravity nearest the centreline wins.
+
+With a ``time_budget_s`` a local search then swaps items bound for the
+same stop in the packing order and keeps any order that places more
+cargo, uses less deck length or centres the load better.
+"""
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+MARGIN_M = 0.5  # clearance along the deck edges
+GAP_M = 0.3  # lashing gap between items
+HAZMAT_SEPARATION_M = 3.0
+EXPLOSIVE_SEPARATION_M = 6.0
+STACK_MAX_LEVEL = 2
+LOAD_BAND_COUNT = 4
+LOAD_BAND_ALLOWANCE = 1.5
+COG_LATERAL_TOLERANCE_PCT = 10.0
+
+_EPS = 1e-6
+
+
+@dataclass(frozen=True)
+class DeckItem:
+    key: Any
+    code: str
+    width_m: float
+    length_m: float
+    weight_kg: float
+    stackable: bool = False
+    hazmat: bool = False
+    explosive: bool = False
+    unload_rank: int = 0  # lower leaves the deck first
+
+    @property
+    def area(self) -> float:
+        return self.width_m * self.length_m
+
+    def orientations(self) -> list[tuple[bool, float, float]]:
+        if abs(self.width_m - self.length_m) < _EPS:
+            return [(False, self.width_m, self.length_m)]
+        return [(False, self.width_m, self.length_m), (True, self.length_m, self.width_m)]
+
+
+@dataclass(frozen=True)
+class Rect:
+    x: float
+    y: float
+    w: float
+    l: float  # noqa: E741
+
+    @property
+    def x2(self) -> float:
+        return self.x + self.w
+
+    @property
+    def y2(self) -> float:
+        return self.y + self.l
+
+    def inflate(self, d: float) -> Rect:
+        return Rect(self.x - d, self.y - d, self.w + 2 * d, self.l + 2 * d)
+
+    def overlaps(self, other: Rect) -> bool:
+        return (
+            self.x < other.x2 - _EPS and other.x < self.x2 - _EPS
+            and self.y < other.y2 - _EPS and other.y < self.y2 - _EPS
+        )
+
+
+@dataclass
+class Placement:
+    item: DeckItem
+    rect: Rect
+    rotated: bool
+    zone: str = "main"
+    stack_level: int = 0
+    base: Placement | None = None
+    topped: bool = False
+
+
+@dataclass
+class DeckPlan:
+    width_m: float
+    length_m: float
+    max_weight_kg: float | None
+    placements: list[Placement] = field(default_factory=list)
+    unplaced: list[tuple[DeckItem, str]] = field(default_factory=list)  # (item, "no_space" | "load_limit")
+    band_loads_kg: list[float] = field(default_factory=list)
+    search_iterations: int = 0
+
+    @property
+    def used_length_m(self) -> float:
+        main = [p.rect.y2 for p in self.placements if p.zone == "main"]
+        hazmat = [p.rect.y for p in self.placements if p.zone != "main"]
+        used = (max(main) - MARGIN_M) if main else 0.0
+        if hazmat:
+            used += self.length_m - MARGIN_M - min(hazmat)
+        return used
+
+    @property
+    def cog(self) -> tuple[float, float] | None:
+        weight = sum(p.item.weight_kg for p in self.placements)
+        if weight <= 0:
+            return None
+        return (
+            sum(p.item.weight_kg * (p.rect.x + p.rect.w / 2) for p in self.placements) / weight,
+            sum(p.item.weight_kg * (p.rect.y + p.rect.l / 2) for p in self.placements) / weight,
+        )
+
+    @property
+    def cog_lateral_offset_pct(self) -> float:
+        cog = self.cog
+        return abs(cog[0] - self.width_m / 2) / self.width_m * 100 if cog else 0.0
+
+    def score(self) -> tuple:
+        """Lower is better — what the local search minimises."""
+        return (
+            len(self.unplaced),
+            round(sum(item.area for item, _ in self.unplaced), 6),
+            round(self.used_length_m, 3),
+            round(self.cog_lateral_offset_pct, 3),
+        )
+
+    def metrics(self) -> dict[str, Any]:
+        usable = max(self.width_m - 2 * MARGIN_M, 0) * max(self.length_m - 2 * MARGIN_M, 0)
+        floor = sum(p.rect.w * p.rect.l for p in self.placements if p.stack_level == 0)
+        cog = self.cog
+        return {
+            "placed_count": len(self.placements),
+            "unplaced_count": len(self.unplaced),
+            "stacked_count": sum(1 for p in self.placements if p.stack_level > 0),
+            "area_utilization_pct": round(floor / usable * 100, 1) if usable else 0.0,
+            "length_used_m": round(self.used_length_m, 2),
+            "placed_weight_kg": round(sum(p.item.weight_kg for p in self.placements), 2),
+            "cog_x_m": round(cog[0], 2) if cog else None,
+            "cog_y_m": round(cog[1], 2) if cog else None,
+            "cog_lateral_offset_pct": round(self.cog_lateral_offset_pct, 1),
+            "band_loads_kg": [round(load, 1) for load in self.band_loads_kg],
+            "band_limit_kg": round(_band_limit(self.max_weight_kg), 1) if self.max_weight_kg else None,
+            "search_iterations": self.search_iterations,
+        }
+
+
+def _band_limit(max_weight_kg: float | None) -> float:
+    if not max_weight_kg or max_weight_kg <= 0:
+        return float("inf")
+    return max_weight_kg / LOAD_BAND_COUNT * LOAD_BAND_ALLOWANCE
+
+
+class _Skyline:
+    """Lowest free height over [left, right), as ``[x, width, height]`` segments."""
+
+    def __init__(self, left: float, right: float, bottom: float):
+        self.right = right
+        self.segments = [[left, right - left, bottom]]
+
+    def candidates(self, width: float) -> Iterable[tuple[float, float]]:
+        segments = self.segments
+        for i, (x, _, _) in enumerate(segments):
+            end = x + width
+            if end > self.right + _EPS:
+                return
+            y = segments[i][2]
+            j = i + 1
+            while j < len(segments) and segments[j][0] < end - _EPS:
+                y = max(y, segments[j][2])
+                j += 1
+            yield x, y
+
+    def add(self, x: float, width: float, top: float) -> None:
+        """Raise [x, x + width) to ``top``."""
+        end = x + width
+        pieces: list[list[float]] = []
+        raised = False
+        for sx, sw, sy in self.segments:
+            sx2 = sx + sw
+            if sx2 <= x + _EPS:
+                pieces.append([sx, sw, sy])
+                continue
+            if not raised:
+                if sx < x - _EPS:
+                    pieces.append([sx, x - sx, sy])
+                pieces.append([x, width, top])
+                raised = True
+            if sx2 > end + _EPS:
+                pieces.append([max(sx, end), sx2 - max(sx, end), sy])
+        segments: list[list[float]] = []
+        for piece in pieces:
+            if segments and abs(segments[-1][2] - piece[2]) < _EPS:
+                segments[-1][1] = piece[0] + piece[1] - segments[-1][0]
+            else:
+                segments.append(piece)
+        self.segments = segments
+
+
+def _mirror(rect: Rect, length: float) -> Rect:
+    return Rect(rect.x, length - rect.y2, rect.w, rect.l)
+
+
+class _Packer:
+    def __init__(self, width: float, length: float, max_weight_kg: float | None, exclusions: list[Rect]):
+        self.width = width
+        self.length = length
+        self.exclusions = exclusions
+        self.band_limit = _band_limit(max_weight_kg)
+        self.plan = DeckPlan(width, length, max_weight_kg, band_loads_kg=[0.0] * LOAD_BAND_COUNT)
+        self.moment_x = 0.0
+        self.weight = 0.0
+        right = width - MARGIN_M + GAP_M
+        self.main = _Skyline(MARGIN_M, right, MARGIN_M)
+        self.hazmat = _Skyline(MARGIN_M, right, MARGIN_M)  # in far-end (mirrored) coordinates
+
+    def _band(self, rect: Rect) -> int:
+        index = int((rect.y + rect.l / 2) / (self.length / LOAD_BAND_COUNT))
+        return min(max(index, 0), LOAD_BAND_COUNT - 1)
+
+    def _load_ok(self, item: DeckItem, rect: Rect) -> bool:
+        return self.plan.band_loads_kg[self._band(rect)] + item.weight_kg <= self.band_limit + _EPS
+
+    def _lateral(self, item: DeckItem, rect: Rect) -> float:
+        weight = self.weight + item.weight_kg
+        if weight <= 0:
+            return 0.0
+        return abs((self.moment_x + item.weight_kg * (rect.x + rect.w / 2)) / weight - self.width / 2)
+
+    def _commit(self, placement: Placement) -> None:
+        self.plan.placements.append(placement)
+        self.plan.band_loads_kg[self._band(placement.rect)] += placement.item.weight_kg
+        self.moment_x += placement.item.weight_kg * (placement.rect.x + placement.rect.w / 2)
+        self.weight += placement.item.weight_kg
+
+    @staticmethod
+    def _clear(x: float, y: float, w: float, l: float, obstacles: list[Rect]) -> float:  # noqa: E741
+        """Lowest y >= ``y`` where the padded footprint misses every obstacle."""
+        moved = True
+        while moved:
+            moved = False
+            padded = Rect(x, y, w + GAP_M, l + GAP_M)
+            for obstacle in obstacles:
+                if padded.overlaps(obstacle):
+                    y = obstacle.y2 + GAP_M
+                    moved = True
+                    break
+        return y
+
+    def _floor(self, item: DeckItem, sky: _Skyline, obstacles: list[Rect], mirrored: bool):
+        """Best floor position ``(key, rect, real_rect, rotated)`` and, failing one, why."""
+        best = None
+        load_blocked = False
+        top = self.length - MARGIN_M
+        band = self.length / LOAD_BAND_COUNT
+        for rotated, w, l in item.orientations():
+            for x, y in sky.candidates(w + GAP_M):
+                while True:
+                    y = self._clear(x, y, w, l, obstacles)
+                    if y + l > top + _EPS:
+                        break
+                    rect = Rect(x, y, w, l)
+                    real = _mirror(rect, self.length) if mirrored else rect
+                    if self._load_ok(item, real):
+                        key = (round(y + l, 6), round(self._lateral(item, real), 6), x)
+                        if best is None or key < best[0]:
+                            best = (key, rect, real, rotated)
+                        break
+                    # Band full: move the centre on into the next band.
+                    load_blocked = True
+                    y = (int((y + l / 2) / band) + 1) * band - l / 2 + _EPS
+        return best, ("load_limit" if load_blocked else "no_space")
+
+    def _stack(self, item: DeckItem) -> Placement | None:
+        best = None
+        for base in self.plan.placements:
+            under = base.item
+            if (
+                not under.stackable or under.hazmat or base.topped
+                or base.stack_level >= STACK_MAX_LEVEL
+                or item.weight_kg > under.weight_kg
+                or item.unload_rank > under.unload_rank
+            ):
+                continue
+            for rotated, w, l in item.orientations():
+                if w > base.rect.w + _EPS or l > base.rect.l + _EPS:
+                    continue
+                rect = Rect(base.rect.x, base.rect.y, w, l)
+                if not self._load_ok(item, rect):
+                    continue
+                key = (round(base.rect.w * base.rect.l - w * l, 6), round(self._lateral(item, rect), 6))
+                if best is None or key < best[0]:
+                    best = (key, base, rect, rotated)
+        if best is None:
+            return None
+        _, base, rect, rotated = best
+        base.topped = True
+        return Placement(item, rect, rotated, stack_level=base.stack_level + 1, base=base)
+
+    def place_hazmat(self, item: DeckItem) -> None:
+        keep_off = [p for p in self.plan.placements if p.item.explosive != item.explosive]
+        obstacles = [_mirror(r, self.length) for r in self.exclusions] + [
+            _mirror(p.rect.inflate(EXPLOSIVE_SEPARATION_M), self.length) for p in keep_off
+        ]
+        found, reason = self._floor(item, self.hazmat, obstacles, mirrored=True)
+        if found is None:
+            self.plan.unplaced.append((item, reason))
+            return
+        _, rect, real, rotated = found
+        self.hazmat.add(rect.x, rect.w + GAP_M, rect.y2 + GAP_M)
+        self._commit(Placement(item, real, rotated, zone="hazmat_isolated"))
+
+    def place(self, item: DeckItem) -> None:
+        obstacles = self.exclusions + [
+            p.rect.inflate(HAZMAT_SEPARATION_M) for p in self.plan.placements if p.zone != "main"
+        ]
+        found, reason = self._floor(item, self.main, obstacles, mirrored=False)
+        if found is not None:
+            _, rect, _, rotated = found
+            self.main.add(rect.x, rect.w + GAP_M, rect.y2 + GAP_M)
+            self._commit(Placement(item, rect, rotated))
+            return
+        stacked = self._stack(item)
+        if stacked is None:
+            self.plan.unplaced.append((item, reason))
+            return
+        self._commit(stacked)
+
+
+def _decode(
+    hazmat: list[DeckItem],
+    cargo: list[DeckItem],
+    *,
+    width_m: float,
+    length_m: float,
+    max_weight_kg: float | None,
+    exclusions: list[Rect],
+) -> DeckPlan:
+    packer = _Packer(width_m, length_m, max_weight_kg, exclusions)
+    for item in hazmat:
+        packer.place_hazmat(item)
+    for item in cargo:
+        packer.place(item)
+    return packer.plan
+
+
+def _same_stop_runs(items: list[DeckItem]) -> list[list[int]]:
+    runs: dict[int, list[int]] = {}
+    for index, item in enumerate(items):
+        runs.setdefault(item.unload_rank, []).append(index)
+    return [run for run in runs.values() if len(run) > 1]
+
+
+def pack_deck(
+    items: Iterable[DeckItem],
+    *,
+    width_m: float,
+    length_m: float,
+    max_weight_kg: float | None = None,
+    exclusions: Iterable[Rect] = (),
+    time_budget_s: float | None = None,
+    seed: int = 0,
+) -> DeckPlan:
+    """
+    Place ``items`` on a ``width_m`` × ``length_m`` deck.
+
+    ``exclusions`` are areas nothing may cover (hatches, cranes, …). Items
+    that cannot be placed come back in ``DeckPlan.unplaced``. Without a
+    ``time_budget_s`` the greedy packing is returned as is; with one the
+    packing order is improved until the budget runs out (``seed`` drives
+    the choice of swaps).
+    """
+    items = list(items)
+    hazmat = sorted(
+        (i for i in items if i.hazmat),
+        key=lambda i: (not i.explosive, -i.unload_rank, -i.area, -i.weight_kg),
+    )
+    cargo = sorted(
+        (i for i in items if not i.hazmat),
+        key=lambda i: (i.unload_rank, -i.area, -i.weight_kg),
+    )
+    layout = dict(width_m=width_m, length_m=length_m, max_weight_kg=max_weight_kg, exclusions=list(exclusions))
+    best = _decode(hazmat, cargo, **layout)
+    if not time_budget_s or time_budget_s <= 0:
+        return best
+
+    runs = [("hazmat", run) for run in _same_stop_runs(hazmat)] + [("cargo", run) for run in _same_stop_runs(cargo)]
+    if not runs:
+        return best
+    rng = random.Random(seed)
+    orders = {"hazmat": hazmat, "cargo": cargo}
+    deadline = time.perf_counter() + time_budget_s
+    iterations = 0
+    best_score = best.score()
+    while time.perf_counter() < deadline:
+        iterations += 1
+        kind, run = rng.choice(runs)
+        i, j = rng.sample(run, 2)
+        trial = list(orders[kind])
+        trial[i], trial[j] = trial[j], trial[i]
+        candidate = _decode(
+            trial if kind == "hazmat" else orders["hazmat"],
+            trial if kind == "cargo" else orders["cargo"],
+            **layout,
+        )
+        score = candidate.score()
+        if score <= best_score:
+            orders[kind] = trial
+            best, best_score = candidate, score
+    best.search_iterations = iterations
+    return best
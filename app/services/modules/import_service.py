@@ -2761,6 +2761,11 @@ async def validate_import(
     }
 
 
+# Targets whose rows feed the cached asset hierarchy (fields, sites,
+# installations and their equipment counts).
+_ASSET_HIERARCHY_TARGETS = frozenset({"asset", "ar_field", "ar_site", "ar_installation", "ar_equipment"})
+
+
 async def execute_import(
     target_object: str,
     column_mapping: dict[str, str],
@@ -2868,6 +2873,10 @@ async def execute_import(
             skipped += 1
 
     await db.commit()
+    if target_object in _ASSET_HIERARCHY_TARGETS and (created or updated):
+        from app.services.modules.asset_hierarchy_service import invalidate_asset_hierarchy
+
+        await invalidate_asset_hierarchy(entity_id)
     logger.info(
         "Import %s: %d created, %d updated, %d skipped, %d errors",
         target_object, created, updated, skipped, len(errors),
@@ -922,12 +922,7 @@ async def _notify_transition(
     # Resolve users holding any of the MOC roles on this entity. We check each
     # user for *any* matching OpsFlux role code — defensive in case customers
     # haven't seeded the canonical MOC_* roles.
-    from app.api.deps import has_user_permission
-
-    active_users = await db.execute(
-        select(User).where(User.active == True, User.id != actor.id)  # noqa: E712
-    )
-    user_list = active_users.scalars().all()
+    from app.core.rbac import users_with_permission
 
     # Map role → permission we test: we can't test role membership directly
     # without touching UserGroupRole tables here. Fall back to permission-
@@ -970,22 +965,21 @@ async def _notify_transition(
         )
         site_assignment_user_ids = {row[0] for row in r.all()}
 
-    recipients: list[User] = []
     if site_assignment_user_ids:
         # Use explicit site assignments — precise targeting
-        for user in user_list:
-            if user.id in site_assignment_user_ids:
-                recipients.append(user)
+        recipient_ids = set(site_assignment_user_ids)
     else:
         # Fallback: permission-based broadcast on the entity
-        for user in user_list:
-            for perm in perms_to_test:
-                try:
-                    if await has_user_permission(user, moc.entity_id, perm, db):
-                        recipients.append(user)
-                        break
-                except Exception:
-                    continue
+        recipient_ids = set()
+        for perm in perms_to_test:
+            recipient_ids |= await users_with_permission(moc.entity_id, perm, db)
+    recipient_ids.discard(actor.id)
+
+    recipients: list[User] = []
+    if recipient_ids:
+        recipients = list((await db.execute(
+            select(User).where(User.id.in_(recipient_ids), User.active == True)  # noqa: E712
+        )).scalars().all())
 
     # For cancelled / closed, always include the initiator (they may not hold
     # any of the MOC_* permissions but must be kept in the loop).
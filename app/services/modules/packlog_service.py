@@ -1,5 +1,6 @@
 """PackLog service constants and helpers."""
 
+import asyncio
 import csv
 import io
 import json
@@ -1115,20 +1116,33 @@ async def suggest_deck_layout(
     trip_id: UUID,
     deck_surface_id: UUID,
     entity_id: UUID,
+    *,
+    time_budget_s: float | None = None,
 ) -> dict:
-    """Algorithm for deck placement suggestions.
-
-    Rules:
-    1. Heavy items at bottom (stack_level=0)
-    2. Hazmat isolated (separate zone)
-    3. Explosive cargo separated from other hazmat
-    4. Group by destination for efficient unloading
-    5. Respect weight distribution limits per zone
+    """Deck placement suggestions for the cargo of a voyage.
+
+    Packing is done by ``deck_packing_engine.pack_deck``:
+    1. Rotation-aware skyline packing of the deck surface, around its
+       exclusion zones
+    2. Cargo loaded in unloading order (voyage stop order) from the
+       working end, cargo without a known stop last
+    3. Stackable cargo carries lighter cargo leaving no later
+    4. Hazmat isolated at the far end with separation distances,
+       explosives kept apart from other hazmat
+    5. Per-band weight limits and transverse centre of gravity
+    ``time_budget_s`` lets a local search improve the packing.
 
     Moved from travelwiz_service during PackLog isolation. Reads
     TransportVectorZone (TravelWiz) and VoyageManifest (TravelWiz) via
     cross-module FKs — both still imported at the top of this file.
     """
+    from app.services.modules.deck_packing_engine import (
+        COG_LATERAL_TOLERANCE_PCT,
+        DeckItem,
+        Rect,
+        pack_deck,
+    )
+
     zone_result = await db.execute(
         select(TransportVectorZone).where(TransportVectorZone.id == deck_surface_id)
     )
@@ -1149,77 +1163,88 @@ async def suggest_deck_layout(
         .order_by(CargoItem.weight_kg.desc())
     )
     cargo_items = cargo_result.scalars().all()
-
-    placements = []
-    warnings = []
-    total_weight = 0.0
-
-    hazmat_items = [c for c in cargo_items if c.cargo_type == "hazmat"]
-    regular_items = [c for c in cargo_items if c.cargo_type != "hazmat"]
-
-    dest_groups: dict[str, list] = {}
-    for item in regular_items:
-        dest_key = str(item.destination_asset_id) if item.destination_asset_id else "unknown"
-        dest_groups.setdefault(dest_key, []).append(item)
+    stop_orders = dict(
+        (
+            await db.execute(
+                select(VoyageStop.asset_id, sqla_func.min(VoyageStop.stop_order))
+                .where(VoyageStop.voyage_id == trip_id, VoyageStop.active == True)  # noqa: E712
+                .group_by(VoyageStop.asset_id)
+            )
+        ).all()
+    )
+    unknown_stop = max(stop_orders.values(), default=0) + 1
 
     deck_width = zone.width_m or 10.0
     deck_length = zone.length_m or 20.0
+    exclusions = [
+        Rect(float(area["x"]), float(area["y"]), float(area["w"]), float(area["h"]))
+        for area in (zone.exclusion_zones if isinstance(zone.exclusion_zones, list) else [])
+        if isinstance(area, dict) and all(area.get(k) is not None for k in ("x", "y", "w", "h"))
+    ]
+    items = [
+        DeckItem(
+            key=item.id,
+            code=item.tracking_code,
+            width_m=(item.width_cm or 100) / 100.0,
+            length_m=(item.length_cm or 100) / 100.0,
+            weight_kg=item.weight_kg,
+            stackable=bool(item.stackable),
+            hazmat=item.cargo_type == "hazmat",
+            explosive=item.cargo_type == "hazmat" and "explos" in (item.description or "").lower(),
+            unload_rank=stop_orders.get(item.destination_asset_id, unknown_stop),
+        )
+        for item in cargo_items
+    ]
+    # CPU-bound (and up to time_budget_s long): keep it off the event loop.
+    plan = await asyncio.to_thread(
+        pack_deck,
+        items,
+        width_m=deck_width,
+        length_m=deck_length,
+        max_weight_kg=zone.max_weight_kg,
+        exclusions=exclusions,
+        time_budget_s=time_budget_s,
+    )
 
-    x_cursor = 0.5
-    y_cursor = 0.5
-    row_height = 0.0
-
-    for dest_key, items in dest_groups.items():
-        for item in items:
-            item_w = (item.width_cm or 100) / 100.0
-            item_l = (item.length_cm or 100) / 100.0
-
-            if x_cursor + item_w > deck_width:
-                x_cursor = 0.5
-                y_cursor += row_height + 0.3
-                row_height = 0.0
-
-            if y_cursor + item_l > deck_length:
-                warnings.append(
-                    f"Cargo {item.tracking_code} may not fit on deck "
-                    f"(deck full at {y_cursor:.1f}m / {deck_length:.1f}m)"
-                )
-
-            placements.append({
-                "cargo_item_id": item.id,
-                "tracking_code": item.tracking_code,
-                "suggested_x": round(x_cursor, 2),
-                "suggested_y": round(y_cursor, 2),
-                "stack_level": 0,
-                "zone": "main",
-                "reason": f"Grouped by destination ({dest_key[:8]}...)" if dest_key != "unknown" else "Standard placement",
-            })
-
-            total_weight += item.weight_kg
-            x_cursor += item_w + 0.3
-            row_height = max(row_height, item_l)
-
-    hazmat_y = max(y_cursor + row_height + 2.0, deck_length * 0.75)
-    hazmat_x = 0.5
-
-    for item in hazmat_items:
+    placements = []
+    for placement in plan.placements:
+        item = placement.item
+        if placement.zone != "main":
+            reason = "Hazmat cargo isolated per safety regulations"
+        elif placement.base is not None:
+            reason = f"Stacked on {placement.base.item.code}"
+        elif item.unload_rank != unknown_stop:
+            reason = f"Grouped by destination (stop {item.unload_rank})"
+        else:
+            reason = "Standard placement"
         placements.append({
-            "cargo_item_id": item.id,
-            "tracking_code": item.tracking_code,
-            "suggested_x": round(hazmat_x, 2),
-            "suggested_y": round(hazmat_y, 2),
-            "stack_level": 0,
-            "zone": "hazmat_isolated",
-            "reason": "Hazmat cargo isolated per safety regulations",
+            "cargo_item_id": item.key,
+            "tracking_code": item.code,
+            "suggested_x": round(placement.rect.x, 2),
+            "suggested_y": round(placement.rect.y, 2),
+            "width_m": round(placement.rect.w, 2),
+            "length_m": round(placement.rect.l, 2),
+            "rotated": placement.rotated,
+            "stack_level": placement.stack_level,
+            "zone": placement.zone,
+            "reason": reason,
         })
-        total_weight += item.weight_kg
-        hazmat_x += 2.0
 
-        if item.description and "explos" in item.description.lower():
-            warnings.append(
-                f"EXPLOSIVE cargo {item.tracking_code} -- requires dedicated isolation zone"
-            )
+    warnings = []
+    for item, why in plan.unplaced:
+        if why == "load_limit":
+            warnings.append(f"Cargo {item.code} may not fit on deck (zone load limit reached)")
+        else:
+            warnings.append(f"Cargo {item.code} may not fit on deck (no free area of {item.width_m:.1f}m x {item.length_m:.1f}m)")
+    for item in items:
+        if item.explosive:
+            warnings.append(f"EXPLOSIVE cargo {item.code} -- requires dedicated isolation zone")
+    if plan.cog_lateral_offset_pct > COG_LATERAL_TOLERANCE_PCT:
+        warnings.append(
+            f"Centre of gravity {plan.cog_lateral_offset_pct:.1f}% of deck width off the centreline"
+        )
 
+    total_weight = sum(item.weight_kg for item in items)
     max_weight = zone.max_weight_kg
     utilization_pct = 0.0
     if max_weight and max_weight > 0:
@@ -1235,6 +1260,11 @@ async def suggest_deck_layout(
         "max_weight_kg": max_weight,
         "utilization_pct": utilization_pct,
         "placements": placements,
+        "unplaced": [
+            {"cargo_item_id": item.key, "tracking_code": item.code, "reason": why}
+            for item, why in plan.unplaced
+        ],
+        "metrics": plan.metrics(),
         "warnings": warnings,
     }
 
@@ -18,7 +18,7 @@ from app.core.email_templates import render_and_send_email
 from app.models.common import Entity, User
 from app.models.papyrus import PapyrusDispatchRun
 from app.models.papyrus_document import Document, Revision
-from app.services.modules.papyrus_runtime_service import render_papyrus_document, resolve_ref
+from app.services.modules.papyrus_runtime_service import RenderContext, render_papyrus_document
 from app.services.modules.papyrus_versioning_service import ensure_papyrus_document
 
 logger = logging.getLogger(__name__)
@@ -150,6 +150,9 @@ async def process_due_papyrus_dispatches(
     )
     rows = result.all()
     now_utc = datetime.now(timezone.utc)
+    # One ref memo per entity for the whole run: documents of the same entity
+    # commonly embed the same KPI / Gantt refs.
+    render_contexts: dict[UUID, RenderContext] = {}
 
     for doc, revision, entity in rows:
         summary["checked"] += 1
@@ -178,6 +181,12 @@ async def process_due_papyrus_dispatches(
                 summary["skipped"] += 1
                 continue
 
+            render_context = render_contexts.get(doc.entity_id)
+            if render_context is None:
+                render_context = RenderContext.for_session(db, entity_id=doc.entity_id)
+                render_contexts[doc.entity_id] = render_context
+            rendered_cache: dict[UUID, dict[str, Any]] = {}
+
             dispatched_for_doc = 0
             for due_time in due_times:
                 trigger_key = f"scheduled:{due_time.astimezone(timezone.utc).replace(second=0, microsecond=0).isoformat()}"
@@ -190,6 +199,8 @@ async def process_due_papyrus_dispatches(
                     scheduled_for=due_time.astimezone(timezone.utc),
                     triggered_by=None,
                     schedule_override=schedule,
+                    render_context=render_context,
+                    rendered_cache=rendered_cache,
                 )
                 if run is not None:
                     dispatched_for_doc += 1
@@ -215,10 +226,19 @@ async def _dispatch_document(
     scheduled_for: datetime,
     triggered_by: UUID | None,
     schedule_override: dict[str, Any] | None,
+    render_context: RenderContext | None = None,
+    rendered_cache: dict[UUID, dict[str, Any]] | None = None,
 ) -> PapyrusDispatchRun | None:
+    """Render ``doc`` once and deliver it to every resolved recipient.
+
+    ``rendered_cache`` (keyed by revision id) lets a caller dispatching the
+    same revision for several due times reuse a single render.
+    """
     if revision is None:
         return None
 
+    render_context = render_context or RenderContext.for_session(db, entity_id=doc.entity_id)
+
     canonical = ensure_papyrus_document(
         revision.content,
         document_id=doc.id,
@@ -232,6 +252,7 @@ async def _dispatch_document(
         db=db,
         entity_id=doc.entity_id,
         conditions=schedule.get("conditions", []),
+        render_context=render_context,
     ):
         return None
 
@@ -261,8 +282,23 @@ async def _dispatch_document(
         return None
 
     try:
-        rendered = await render_papyrus_document(db=db, entity_id=doc.entity_id, document=canonical)
-        dispatch_context = await _build_dispatch_context(db=db, doc=doc, revision=revision, rendered=rendered)
+        rendered = rendered_cache.get(revision.id) if rendered_cache is not None else None
+        if rendered is None:
+            rendered = await render_papyrus_document(
+                db=db,
+                entity_id=doc.entity_id,
+                document=canonical,
+                context=render_context,
+            )
+            if rendered_cache is not None:
+                rendered_cache[revision.id] = rendered
+        dispatch_context = await _build_dispatch_context(
+            db=db,
+            doc=doc,
+            revision=revision,
+            rendered=rendered,
+            render_context=render_context,
+        )
         subject = _render_template_string(
             channel.get("subject") or f"Papyrus - {doc.title}",
             dispatch_context,
@@ -393,17 +429,20 @@ async def _conditions_match(
     db: AsyncSession,
     entity_id: UUID,
     conditions: list[dict[str, Any]],
+    render_context: RenderContext | None = None,
 ) -> bool:
     if not conditions:
         return True
 
+    render_context = render_context or RenderContext(entity_id=entity_id)
+
     for condition in conditions:
         ref = condition.get("kpi")
         op = condition.get("op")
         expected = condition.get("value")
         if not isinstance(ref, str) or not isinstance(op, str):
             return False
-        actual = await resolve_ref(db=db, entity_id=entity_id, ref=ref)
+        actual = await render_context.resolve(db, ref)
         if not _compare_condition(actual, op, expected):
             return False
     return True
@@ -504,11 +543,13 @@ async def _build_dispatch_context(
     doc: Document,
     revision: Revision,
     rendered: dict[str, Any],
+    render_context: RenderContext | None = None,
 ) -> dict[str, Any]:
+    render_context = render_context or RenderContext(entity_id=doc.entity_id)
     entity = await db.get(Entity, doc.entity_id)
     project = None
     if doc.project_id:
-        project = await resolve_ref(db=db, entity_id=doc.entity_id, ref=f"project://{doc.project_id}")
+        project = await render_context.resolve(db, f"project://{doc.project_id}")
     return {
         "date": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
         "document": {
@@ -631,6 +631,38 @@ async def get_papyrus_document(
     )
 
 
+async def diff_papyrus_versions(
+    *,
+    doc_id: str | UUID,
+    entity_id: UUID,
+    db: AsyncSession,
+    from_version: int,
+    to_version: int,
+) -> dict[str, Any]:
+    from app.services.modules.papyrus_versioning_service import reconstruct_many, summarize_document_diff
+
+    doc = await get_document(doc_id, entity_id, db)
+    documents = await reconstruct_many(
+        db=db,
+        entity_id=entity_id,
+        document_id=doc.id,
+        versions=[from_version, to_version],
+    )
+    old_doc = documents.get(from_version)
+    new_doc = documents.get(to_version)
+    if old_doc is None or new_doc is None:
+        from fastapi import HTTPException
+        raise HTTPException(404, "Papyrus version not found")
+    summary = summarize_document_diff(old_doc, new_doc)
+    return {
+        "from_version": from_version,
+        "to_version": to_version,
+        "additions": summary["additions"],
+        "deletions": summary["deletions"],
+        "modifications": summary["modifications"],
+    }
+
+
 async def get_rendered_papyrus_document(
     *,
     doc_id: str | UUID,
@@ -2,14 +2,16 @@
 
 from __future__ import annotations
 
-from copy import deepcopy
+import asyncio
+import time
+from collections.abc import Iterable
 from datetime import datetime, timezone
 from typing import Any
 from uuid import UUID
 
 from jinja2 import BaseLoader, Environment, StrictUndefined
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
 from app.models.asset_registry import Installation
 from app.models.common import Project, ProjectTask, ProjectTaskDependency
@@ -20,27 +22,159 @@ from app.services.modules.papyrus_versioning_service import ensure_papyrus_docum
 _template_env = Environment(loader=BaseLoader(), autoescape=False, undefined=StrictUndefined)
 
 
+DEFAULT_REF_TTL_SECONDS = 60.0
+DEFAULT_REF_CONCURRENCY = 8
+
+_MISSING = object()
+
+
+class RenderContext:
+    """Memo of resolved refs and formulas shared by one or more renders.
+
+    Refs are deduplicated, independent refs are resolved concurrently on
+    their own sessions (when a session factory is available) and results are
+    kept for ``ttl_seconds``. A dispatch run reuses one context for every
+    document of an entity so identical KPI/Gantt refs are resolved once.
+
+    Rendered payloads share structure with the memo: treat them as read-only.
+    """
+
+    def __init__(
+        self,
+        *,
+        entity_id: UUID,
+        ttl_seconds: float = DEFAULT_REF_TTL_SECONDS,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+        max_concurrency: int = DEFAULT_REF_CONCURRENCY,
+    ) -> None:
+        self.entity_id = entity_id
+        self.ttl_seconds = ttl_seconds
+        self.session_factory = session_factory
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._refs: dict[str, tuple[float, Any]] = {}
+        self._formulas: dict[str, tuple[float, Any, tuple[str, ...]]] = {}
+        self.resolved = 0
+        self.hits = 0
+
+    @classmethod
+    def for_session(cls, db: AsyncSession, *, entity_id: UUID, **kwargs: Any) -> RenderContext:
+        """Build a context whose concurrent lookups run on ``db``'s engine."""
+        bind = getattr(db, "bind", None)
+        factory = (
+            async_sessionmaker(bind, class_=AsyncSession, expire_on_commit=False)
+            if isinstance(bind, AsyncEngine)
+            else None
+        )
+        return cls(entity_id=entity_id, session_factory=factory, **kwargs)
+
+    def _lookup_ref(self, ref: str) -> Any:
+        entry = self._refs.get(ref)
+        if entry is None:
+            return _MISSING
+        if entry[0] < time.monotonic():
+            del self._refs[ref]
+            return _MISSING
+        self.hits += 1
+        return entry[1]
+
+    def _store_ref(self, ref: str, value: Any) -> None:
+        self.resolved += 1
+        self._refs[ref] = (time.monotonic() + self.ttl_seconds, value)
+
+    async def resolve(self, db: AsyncSession, ref: str) -> Any:
+        """Resolve a single ref on the caller's session."""
+        value = self._lookup_ref(ref)
+        if value is _MISSING:
+            value = await resolve_ref(db=db, entity_id=self.entity_id, ref=ref)
+            self._store_ref(ref, value)
+        return value
+
+    async def resolve_many(self, db: AsyncSession, refs: Iterable[str]) -> dict[str, Any]:
+        """Resolve refs (deduplicated, input order kept)."""
+        results: dict[str, Any] = {}
+        pending: list[str] = []
+        for ref in dict.fromkeys(refs):
+            value = self._lookup_ref(ref)
+            if value is _MISSING:
+                pending.append(ref)
+            results[ref] = value
+
+        if len(pending) > 1 and self.session_factory is not None:
+            values = await asyncio.gather(*(self._resolve_isolated(ref) for ref in pending))
+        else:
+            # AsyncSession does not support concurrent statements.
+            values = [await resolve_ref(db=db, entity_id=self.entity_id, ref=ref) for ref in pending]
+
+        for ref, value in zip(pending, values, strict=True):
+            self._store_ref(ref, value)
+            results[ref] = value
+        return results
+
+    async def _resolve_isolated(self, ref: str) -> Any:
+        async with self._semaphore:
+            async with self.session_factory() as session:
+                return await resolve_ref(db=session, entity_id=self.entity_id, ref=ref)
+
+    async def evaluate_formula(
+        self,
+        db: AsyncSession,
+        expression: str,
+        rendered_refs: dict[str, Any],
+    ) -> Any:
+        entry = self._formulas.get(expression)
+        if entry is not None and entry[0] >= time.monotonic():
+            self.hits += 1
+            _, value, touched = entry
+            for ref in touched:
+                if ref not in rendered_refs:
+                    rendered_refs[ref] = await self.resolve(db, ref)
+            return value
+
+        touched_refs: list[str] = []
+
+        async def _resolve(ref: str) -> Any:
+            touched_refs.append(ref)
+            return await self.resolve(db, ref)
+
+        value = await evaluate_formula_expression(
+            db=db,
+            entity_id=self.entity_id,
+            expression=expression,
+            rendered_refs=rendered_refs,
+            resolve_ref=_resolve,
+        )
+        self._formulas[expression] = (time.monotonic() + self.ttl_seconds, value, tuple(touched_refs))
+        return value
+
+
 async def render_papyrus_document(
     *,
     db: AsyncSession,
     entity_id: UUID,
     document: dict[str, Any],
+    context: RenderContext | None = None,
 ) -> dict[str, Any]:
-    """Resolve refs and formulas into a render-ready Papyrus payload."""
+    """Resolve refs and formulas into a render-ready Papyrus payload.
+
+    The input document is not mutated; blocks are shallow-copied and only
+    gain render keys (``resolved``, ``computed_value``, ``rendered_html``...).
+    """
 
-    rendered = deepcopy(document)
-    rendered_refs: dict[str, Any] = {}
+    context = context or RenderContext.for_session(db, entity_id=entity_id)
+    rendered = dict(document)
     rendered_data: dict[str, Any] = rendered.get("data", {}) if isinstance(rendered.get("data"), dict) else {}
     rendered_form_data: dict[str, Any] = (
         rendered_data.get("form_data", {}) if isinstance(rendered_data.get("form_data"), dict) else {}
     )
 
+    ref_values: list[str] = []
     refs = rendered.get("refs", [])
     if isinstance(refs, list):
         for ref_item in refs:
             ref_value = ref_item if isinstance(ref_item, str) else ref_item.get("ref")
             if isinstance(ref_value, str):
-                rendered_refs[ref_value] = await resolve_ref(db=db, entity_id=entity_id, ref=ref_value)
+                ref_values.append(ref_value)
+    rendered_refs = await context.resolve_many(db, ref_values)
 
     blocks = rendered.get("blocks", [])
     resolved_blocks: list[dict[str, Any]] = []
@@ -48,7 +182,7 @@ async def render_papyrus_document(
         resolved_blocks.append(
             await _render_block(
                 db=db,
-                entity_id=entity_id,
+                context=context,
                 block=block,
                 rendered_refs=rendered_refs,
                 rendered_form_data=rendered_form_data,
@@ -65,13 +199,13 @@ async def render_papyrus_document(
 async def _render_block(
     *,
     db: AsyncSession,
-    entity_id: UUID,
+    context: RenderContext,
     block: dict[str, Any],
     rendered_refs: dict[str, Any],
     rendered_form_data: dict[str, Any],
     rendered_data: dict[str, Any],
 ) -> dict[str, Any]:
-    current = deepcopy(block)
+    current = dict(block)
     block_type = current.get("type")
 
     if block_type in {"opsflux_kpi", "opsflux_asset", "opsflux_actions", "opsflux_gantt"}:
@@ -90,12 +224,7 @@ async def _render_block(
     if block_type == "formula":
         expression = current.get("expression")
         if isinstance(expression, str):
-            value = await evaluate_formula(
-                db=db,
-                entity_id=entity_id,
-                expression=expression,
-                rendered_refs=rendered_refs,
-            )
+            value = await context.evaluate_formula(db, expression, rendered_refs)
             current["computed_value"] = value
             current["computed_at"] = datetime.utcnow().isoformat() + "Z"
 
@@ -121,7 +250,7 @@ async def _render_block(
         current["children"] = [
             await _render_block(
                 db=db,
-                entity_id=entity_id,
+                context=context,
                 block=child,
                 rendered_refs=rendered_refs,
                 rendered_form_data=rendered_form_data,
@@ -309,6 +438,7 @@ async def get_renderable_papyrus_for_document(
     created_at: datetime | None,
     updated_at: datetime | None,
     content: dict[str, Any] | list[Any] | None,
+    context: RenderContext | None = None,
 ) -> dict[str, Any]:
     canonical = ensure_papyrus_document(
         content,
@@ -319,7 +449,7 @@ async def get_renderable_papyrus_for_document(
         created_at=created_at,
         updated_at=updated_at,
     )
-    return await render_papyrus_document(db=db, entity_id=entity_id, document=canonical)
+    return await render_papyrus_document(db=db, entity_id=entity_id, document=canonical, context=context)
 
 async def _resolve_project_actions(*, db: AsyncSession, project_id: UUID) -> list[dict[str, Any]]:
     result = await db.execute(
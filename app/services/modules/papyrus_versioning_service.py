@@ -1,5 +1,16 @@
-"""Papyrus versioning helpers for canonical document snapshots and diffs."""
-
+"""Papyrus versioning helpers for canonical document snapshots and diffs.
+
+Versions are stored as a chain of JSON patches anchored on periodic snapshot
+checkpoints. Reconstruction only fetches the rows from the nearest checkpoint
+forward and keeps a small in-process LRU of reconstructed documents keyed by
+``(entity, document, version)``. Only versions that exist are cached, and
+versions are immutable once written, so a cached reconstruction never goes
+stale in any worker.
+"""
+
+import json
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
 from copy import deepcopy
 from datetime import datetime, timezone
 from typing import Any
@@ -15,6 +26,76 @@ try:
 except ImportError:  # pragma: no cover - graceful fallback until dependency is installed
     jsonpatch = None
 
+# A snapshot checkpoint is forced once either threshold is reached since the
+# previous snapshot, bounding the replay cost of any single version.
+CHECKPOINT_EVERY_PATCHES = 20
+CHECKPOINT_MAX_BYTES = 256 * 1024
+
+RECONSTRUCTION_CACHE_SIZE = 256
+
+_VersionKey = tuple[UUID, UUID, int]
+
+
+class _ReconstructionCache:
+    """Bounded LRU of reconstructed documents.
+
+    Entries are stored and returned as private copies so callers are free to
+    mutate what they receive.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[_VersionKey, dict[str, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: _VersionKey) -> dict[str, Any] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return deepcopy(entry)
+
+    def put(self, key: _VersionKey, document: dict[str, Any]) -> None:
+        self._entries[key] = deepcopy(document)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def nearest_below(self, entity_id: UUID, document_id: UUID, version: int, floor: int) -> int | None:
+        """Highest cached version in ``[floor, version)`` for a document."""
+        best: int | None = None
+        for cached_entity, cached_document, cached_version in self._entries:
+            if cached_entity != entity_id or cached_document != document_id:
+                continue
+            if floor <= cached_version < version and (best is None or cached_version > best):
+                best = cached_version
+        return best
+
+    def peek(self, key: _VersionKey) -> dict[str, Any] | None:
+        return self._entries.get(key)
+
+    def invalidate(self, document_id: UUID | None = None) -> None:
+        if document_id is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[1] == document_id]:
+            del self._entries[key]
+
+
+_reconstruction_cache = _ReconstructionCache(RECONSTRUCTION_CACHE_SIZE)
+
+
+def invalidate_reconstruction_cache(document_id: UUID | None = None) -> None:
+    """Drop this process's cached reconstructions for one document, or all.
+
+    Only stored versions are cached and those never change, so no other
+    worker needs telling; this only frees memory.
+    """
+    _reconstruction_cache.invalidate(document_id)
+
 
 def ensure_papyrus_document(
     content: dict[str, Any] | list[Any] | None,
@@ -106,6 +187,75 @@ async def list_document_versions(
     return list(result.scalars().all())
 
 
+async def _resolve_latest_version(*, db: AsyncSession, entity_id: UUID, document_id: UUID) -> int | None:
+    return (
+        await db.execute(
+            select(func.max(PapyrusVersion.version)).where(
+                PapyrusVersion.entity_id == entity_id,
+                PapyrusVersion.document_id == document_id,
+            )
+        )
+    ).scalar_one()
+
+
+async def _find_checkpoint(*, db: AsyncSession, entity_id: UUID, document_id: UUID, version: int) -> int | None:
+    """Latest snapshot version at or below ``version``."""
+    return (
+        await db.execute(
+            select(func.max(PapyrusVersion.version)).where(
+                PapyrusVersion.entity_id == entity_id,
+                PapyrusVersion.document_id == document_id,
+                PapyrusVersion.patch_type == "snapshot",
+                PapyrusVersion.version <= version,
+            )
+        )
+    ).scalar_one()
+
+
+async def _load_version_chain(
+    *,
+    db: AsyncSession,
+    entity_id: UUID,
+    document_id: UUID,
+    from_version: int,
+    to_version: int,
+) -> list[tuple[int, str, Any]]:
+    result = await db.execute(
+        select(PapyrusVersion.version, PapyrusVersion.patch_type, PapyrusVersion.payload)
+        .where(
+            PapyrusVersion.entity_id == entity_id,
+            PapyrusVersion.document_id == document_id,
+            PapyrusVersion.version >= from_version,
+            PapyrusVersion.version <= to_version,
+        )
+        .order_by(PapyrusVersion.version.asc())
+    )
+    return [(row[0], row[1], row[2]) for row in result.all()]
+
+
+def _replay_chain(
+    base: dict[str, Any] | None,
+    chain: Iterable[tuple[int, str, Any]],
+    *,
+    capture: set[int] | None = None,
+) -> tuple[dict[str, Any] | None, dict[int, dict[str, Any]]]:
+    """Apply ``chain`` on top of ``base`` (which is consumed in place).
+
+    Returns the final document and deep copies of the versions listed in
+    ``capture``.
+    """
+    current = base
+    captured: dict[int, dict[str, Any]] = {}
+    for version, patch_type, payload in chain:
+        if patch_type == "snapshot" or jsonpatch is None or current is None:
+            current = deepcopy(payload)
+        else:
+            current = jsonpatch.apply_patch(current, payload, in_place=True)
+        if capture is not None and version in capture:
+            captured[version] = deepcopy(current)
+    return current, captured
+
+
 async def reconstruct_document_version(
     *,
     db: AsyncSession,
@@ -113,37 +263,102 @@ async def reconstruct_document_version(
     document_id: UUID,
     version: int | None = None,
 ) -> dict[str, Any] | None:
-    versions = await list_document_versions(db=db, entity_id=entity_id, document_id=document_id)
-    if not versions:
-        return None
+    """Rebuild a document version from its nearest checkpoint.
 
-    ordered = sorted(versions, key=lambda item: item.version)
-    if version is not None:
-        ordered = [item for item in ordered if item.version <= version]
-        if not ordered:
+    ``version=None`` resolves to the latest stored version.
+    """
+    if version is None:
+        version = await _resolve_latest_version(db=db, entity_id=entity_id, document_id=document_id)
+        if version is None:
             return None
 
-    snapshot_index = None
-    for idx in range(len(ordered) - 1, -1, -1):
-        if ordered[idx].patch_type == "snapshot":
-            snapshot_index = idx
-            break
+    cache_key = (entity_id, document_id, version)
+    cached = _reconstruction_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    if snapshot_index is None:
+    checkpoint = await _find_checkpoint(db=db, entity_id=entity_id, document_id=document_id, version=version)
+    if checkpoint is None:
         return None
 
-    current = deepcopy(ordered[snapshot_index].payload)
-    for item in ordered[snapshot_index + 1:]:
-        if item.patch_type == "snapshot":
-            current = deepcopy(item.payload)
-            continue
-        if jsonpatch is None:
-            current = deepcopy(item.payload)
-            continue
-        current = jsonpatch.apply_patch(current, item.payload, in_place=False)
+    base: dict[str, Any] | None = None
+    start = checkpoint
+    cached_base = _reconstruction_cache.nearest_below(entity_id, document_id, version, checkpoint)
+    if cached_base is not None:
+        base = deepcopy(_reconstruction_cache.peek((entity_id, document_id, cached_base)))
+        start = cached_base + 1
+
+    chain = await _load_version_chain(
+        db=db,
+        entity_id=entity_id,
+        document_id=document_id,
+        from_version=start,
+        to_version=version,
+    )
+    if base is None and not chain:
+        return None
+
+    current, _ = _replay_chain(base, chain)
+    if current is None:
+        return None
+    # A version past the latest resolves to the latest one: cache it under
+    # the version actually rebuilt, which exists and is immutable, never
+    # under the requested number (it may be written later).
+    rebuilt = chain[-1][0] if chain else cached_base
+    _reconstruction_cache.put((entity_id, document_id, rebuilt), current)
     return current
 
 
+async def reconstruct_many(
+    *,
+    db: AsyncSession,
+    entity_id: UUID,
+    document_id: UUID,
+    versions: Sequence[int],
+) -> dict[int, dict[str, Any] | None]:
+    """Rebuild several versions of one document in a single replay pass.
+
+    Intended for diff and timeline views: the rows between the checkpoint of
+    the oldest requested version and the newest one are fetched once.
+    """
+    wanted = sorted(set(versions))
+    results: dict[int, dict[str, Any] | None] = {}
+    missing: list[int] = []
+    for version in wanted:
+        cached = _reconstruction_cache.get((entity_id, document_id, version))
+        if cached is not None:
+            results[version] = cached
+        else:
+            missing.append(version)
+    if not missing:
+        return results
+
+    checkpoint = await _find_checkpoint(db=db, entity_id=entity_id, document_id=document_id, version=missing[0])
+    if checkpoint is None:
+        # Versions older than the first snapshot cannot be rebuilt; later
+        # ones may still have a checkpoint of their own.
+        for version in missing:
+            results[version] = await reconstruct_document_version(
+                db=db, entity_id=entity_id, document_id=document_id, version=version
+            )
+        return results
+
+    chain = await _load_version_chain(
+        db=db,
+        entity_id=entity_id,
+        document_id=document_id,
+        from_version=checkpoint,
+        to_version=missing[-1],
+    )
+    _, captured = _replay_chain(None, chain, capture=set(missing))
+    for version in missing:
+        document = captured.get(version)
+        if document is not None:
+            _reconstruction_cache.put((entity_id, document_id, version), document)
+        results[version] = document
+    return results
+
+
 def summarize_document_diff(
     old_doc: dict[str, Any],
     new_doc: dict[str, Any],
@@ -255,9 +470,19 @@ async def record_document_version(
         ).scalar_one()
         versions_since_snapshot = int(current_max or 0) - int(latest_snapshot or 0)
         patch = jsonpatch.make_patch(previous_doc, new_doc).patch
-        if patch and versions_since_snapshot < 20:
-            patch_type = "diff"
-            payload = patch
+        if patch and versions_since_snapshot < CHECKPOINT_EVERY_PATCHES:
+            pending_bytes = (
+                await db.execute(
+                    select(func.coalesce(func.sum(func.pg_column_size(PapyrusVersion.payload)), 0)).where(
+                        PapyrusVersion.document_id == document_id,
+                        PapyrusVersion.version > int(latest_snapshot or 0),
+                    )
+                )
+            ).scalar_one()
+            patch_bytes = len(json.dumps(patch, default=str))
+            if int(pending_bytes or 0) + patch_bytes < CHECKPOINT_MAX_BYTES:
+                patch_type = "diff"
+                payload = patch
 
     version_row = PapyrusVersion(
         entity_id=entity_id,
@@ -272,6 +497,7 @@ async def record_document_version(
     )
     db.add(version_row)
     await db.flush()
+    _reconstruction_cache.invalidate(document_id)
     return version_row
 
 
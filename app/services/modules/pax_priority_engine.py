@@ -0,0 +1,182 @@
+"""Set-based PAX priority scoring.
+
+Scores a whole list of ``AdsPax`` at once: the scoring facts (activity
+priority, lowest profile-type code, VIP profile, prior approved visit in
+the entity) come back from one joined query per chunk of ids, and the
+scores are written back with one ``UPDATE … CASE`` per chunk. The rules
+are the per-PAX ones of ``paxlog_service.PRIORITY_WEIGHTS``, applied by
+``score_pax``:
+
+- activity priority of the AdS's planner activity (critical/high/medium);
+- role from the PAX's first profile-type code (CDS > supervisor > operator);
+- VIP profile type;
+- first-time visitor penalty when the PAX has no approved/completed AdS
+  in the entity yet.
+
+A PAX is its ``user_id`` when set, its ``contact_id`` otherwise. Scores
+are floored at 0.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from uuid import UUID
+
+from sqlalchemy import and_, case, exists, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.paxlog import Ads, AdsPax, PaxProfileType, ProfileType
+from app.models.planner import PlannerActivity
+from app.services.modules.paxlog_service import PRIORITY_WEIGHTS
+
+# Ids per facts SELECT / scores UPDATE — keeps IN lists and CASE arms bounded.
+PRIORITY_CHUNK_SIZE = 500
+
+PRIOR_VISIT_STATUSES = ("approved", "completed")
+
+AUTO_COMPUTED = "auto_computed"
+
+
+@dataclass(frozen=True)
+class PaxPriorityFacts:
+    """Everything the score of one AdsPax depends on."""
+
+    ads_pax_id: UUID
+    entity_id: UUID | None
+    activity_priority: str | None
+    role_code: str | None
+    is_vip: bool
+    has_prior_visit: bool
+
+
+def score_pax(facts: PaxPriorityFacts) -> int:
+    score = 0
+    if facts.activity_priority is not None:
+        score += PRIORITY_WEIGHTS.get(f"activity_{facts.activity_priority}", 0)
+
+    if facts.role_code is not None:
+        role_code = facts.role_code.lower()
+        if "cds" in role_code or "chef_de_site" in role_code:
+            score += PRIORITY_WEIGHTS["role_cds"]
+        elif "supervisor" in role_code or "chef" in role_code:
+            score += PRIORITY_WEIGHTS["role_supervisor"]
+        elif "operator" in role_code or "operateur" in role_code:
+            score += PRIORITY_WEIGHTS["role_operator"]
+        else:
+            score += PRIORITY_WEIGHTS["role_default"]
+
+    if facts.is_vip:
+        score += PRIORITY_WEIGHTS["vip_flag"]
+
+    if facts.entity_id and not facts.has_prior_visit:
+        score += PRIORITY_WEIGHTS["first_time_penalty"]
+
+    return max(score, 0)
+
+
+def _same_pax(user_col, contact_col):
+    """Rows of another table that belong to the outer AdsPax's person."""
+    return or_(
+        and_(AdsPax.user_id.is_not(None), user_col == AdsPax.user_id),
+        and_(AdsPax.user_id.is_(None), contact_col == AdsPax.contact_id),
+    )
+
+
+def _facts_query(ids: list[UUID]):
+    role_code = (
+        select(func.min(ProfileType.code))
+        .join(PaxProfileType, PaxProfileType.profile_type_id == ProfileType.id)
+        .where(_same_pax(PaxProfileType.user_id, PaxProfileType.contact_id))
+        .scalar_subquery()
+    )
+    is_vip = exists().where(
+        PaxProfileType.profile_type_id == ProfileType.id,
+        _same_pax(PaxProfileType.user_id, PaxProfileType.contact_id),
+        ProfileType.code.ilike("%vip%"),
+    )
+    prior_pax = aliased(AdsPax)
+    prior_ads = aliased(Ads)
+    has_prior_visit = exists().where(
+        prior_ads.id == prior_pax.ads_id,
+        _same_pax(prior_pax.user_id, prior_pax.contact_id),
+        prior_ads.entity_id == Ads.entity_id,
+        prior_ads.status.in_(PRIOR_VISIT_STATUSES),
+    )
+    return (
+        select(
+            AdsPax.id,
+            Ads.entity_id,
+            PlannerActivity.priority,
+            role_code,
+            is_vip,
+            has_prior_visit,
+        )
+        .join(Ads, Ads.id == AdsPax.ads_id)
+        .outerjoin(PlannerActivity, PlannerActivity.id == Ads.planner_activity_id)
+        .where(AdsPax.id.in_(ids))
+    )
+
+
+def _chunks(ids: list[UUID]) -> Iterable[list[UUID]]:
+    for start in range(0, len(ids), PRIORITY_CHUNK_SIZE):
+        yield ids[start:start + PRIORITY_CHUNK_SIZE]
+
+
+async def load_priority_facts(db: AsyncSession, ads_pax_ids: Iterable[UUID]) -> list[PaxPriorityFacts]:
+    """Scoring facts for the given AdsPax ids; unknown ids are left out."""
+    ids = list(dict.fromkeys(ads_pax_ids))
+    facts: list[PaxPriorityFacts] = []
+    for chunk in _chunks(ids):
+        for ads_pax_id, entity_id, priority, role_code, is_vip, prior in (
+            await db.execute(_facts_query(chunk))
+        ).all():
+            facts.append(PaxPriorityFacts(
+                ads_pax_id=ads_pax_id,
+                entity_id=entity_id,
+                activity_priority=priority,
+                role_code=role_code,
+                is_vip=bool(is_vip),
+                has_prior_visit=bool(prior),
+            ))
+    return facts
+
+
+async def compute_pax_priorities(
+    db: AsyncSession,
+    ads_pax_ids: Iterable[UUID],
+    *,
+    persist: bool = True,
+) -> dict[UUID, int]:
+    """
+    Score every given AdsPax; return ``{ads_pax_id: score}``.
+
+    With ``persist`` the scores are stored (``priority_source =
+    'auto_computed'``) in one UPDATE per chunk, and AdsPax instances
+    already loaded in the session are given the new values without being
+    marked dirty. Without it nothing is written — manifest ordering uses
+    that to rank passengers on fresh scores.
+    """
+    scores = {f.ads_pax_id: score_pax(f) for f in await load_priority_facts(db, ads_pax_ids)}
+    if not persist or not scores:
+        return scores
+
+    ids = list(scores)
+    for chunk in _chunks(ids):
+        await db.execute(
+            update(AdsPax)
+            .where(AdsPax.id.in_(chunk))
+            .values(
+                priority_score=case({i: scores[i] for i in chunk}, value=AdsPax.id, else_=AdsPax.priority_score),
+                priority_source=AUTO_COMPUTED,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    for ads_pax_id, score in scores.items():
+        entry = db.identity_map.get(identity_key(AdsPax, ads_pax_id))
+        if entry is not None:
+            set_committed_value(entry, "priority_score", score)
+            set_committed_value(entry, "priority_source", AUTO_COMPUTED)
+    return scores
@@ -311,16 +311,22 @@ async def find_external_contact_matches(
     email: str | None,
     phone: str | None,
 ) -> list[dict[str, object | None]]:
+    from app.services.modules.contact_match_index import match_candidates_query
+
     if not allowed_company_ids:
         return []
+    # Only contacts sharing a name/email/phone/badge key can be strong
+    # matches; the indexed key lookup narrows the scan to those.
     candidates = (
         await db.execute(
-            select(TierContact)
-            .where(
-                TierContact.tier_id.in_(allowed_company_ids),
-                TierContact.active == True,  # noqa: E712
+            match_candidates_query(
+                allowed_company_ids,
+                first_name=first_name,
+                last_name=last_name,
+                email=email,
+                phone=phone,
+                badge_number=badge_number,
             )
-            .order_by(TierContact.last_name.asc(), TierContact.first_name.asc())
         )
     ).scalars().all()
     linked_contact_ids = set(
@@ -841,98 +847,27 @@ async def compute_pax_priority(db: AsyncSession, ads_pax_id: UUID) -> int:
     - VIP flag
     - First-time visitor penalty
 
-    Returns the computed integer priority score.
+    Persists and returns the computed integer priority score (0 when the
+    AdsPax does not exist). Single-PAX form of ``compute_pax_priorities``.
     """
-    # Load AdsPax with related Ads
-    result = await db.execute(
-        select(AdsPax).where(AdsPax.id == ads_pax_id)
-    )
-    ads_pax = result.scalar_one_or_none()
-    if not ads_pax:
-        return 0
-
-    score = 0
+    scores = await compute_pax_priorities(db, [ads_pax_id])
+    return scores.get(ads_pax_id, 0)
 
-    # ── Activity priority (via linked planner activity) ──────────────────
-    ads_result = await db.execute(
-        select(Ads.planner_activity_id, Ads.entity_id).where(Ads.id == ads_pax.ads_id)
-    )
-    ads_row = ads_result.first()
-
-    if ads_row and ads_row[0]:
-        activity_result = await db.execute(
-            text("SELECT priority FROM planner_activities WHERE id = :aid"),
-            {"aid": str(ads_row[0])},
-        )
-        activity_row = activity_result.first()
-        if activity_row:
-            priority = activity_row[0]
-            score += PRIORITY_WEIGHTS.get(f"activity_{priority}", 0)
-
-    # ── Determine PAX FK column for raw SQL ─────────────────────────────
-    pax_fk_col = "user_id" if ads_pax.user_id else "contact_id"
-    pax_fk_val = str(ads_pax.user_id or ads_pax.contact_id)
-
-    # ── Role-based scoring ───────────────────────────────────────────────
-    role_result = await db.execute(
-        text(
-            f"""
-            SELECT pt.code FROM profile_types pt
-            JOIN pax_profile_types ppt ON ppt.profile_type_id = pt.id
-            WHERE ppt.{pax_fk_col} = :pax_fk
-            ORDER BY pt.code
-            LIMIT 1
-            """
-        ),
-        {"pax_fk": pax_fk_val},
-    )
-    role_row = role_result.first()
-    if role_row:
-        role_code = (role_row[0] or "").lower()
-        if "cds" in role_code or "chef_de_site" in role_code:
-            score += PRIORITY_WEIGHTS["role_cds"]
-        elif "supervisor" in role_code or "chef" in role_code:
-            score += PRIORITY_WEIGHTS["role_supervisor"]
-        elif "operator" in role_code or "operateur" in role_code:
-            score += PRIORITY_WEIGHTS["role_operator"]
-        else:
-            score += PRIORITY_WEIGHTS["role_default"]
 
-    # ── VIP flag ─────────────────────────────────────────────────────────
-    vip_result = await db.execute(
-        text(
-            f"SELECT 1 FROM pax_profile_types ppt "
-            f"JOIN profile_types pt ON pt.id = ppt.profile_type_id "
-            f"WHERE ppt.{pax_fk_col} = :pax_fk AND pt.code ILIKE '%vip%' "
-            f"LIMIT 1"
-        ),
-        {"pax_fk": pax_fk_val},
-    )
-    if vip_result.first():
-        score += PRIORITY_WEIGHTS["vip_flag"]
-
-    # ── First-time visitor penalty ───────────────────────────────────────
-    entity_id = ads_row[1] if ads_row else None
-    if entity_id:
-        prev_ads_count = await db.execute(
-            text(
-                f"SELECT COUNT(*) FROM ads_pax ap "
-                f"JOIN ads a ON a.id = ap.ads_id "
-                f"WHERE ap.{pax_fk_col} = :pax_fk AND a.entity_id = :eid "
-                f"AND a.status IN ('approved', 'completed')"
-            ),
-            {"pax_fk": pax_fk_val, "eid": str(entity_id)},
-        )
-        count = prev_ads_count.scalar() or 0
-        if count == 0:
-            score += PRIORITY_WEIGHTS["first_time_penalty"]
+async def compute_pax_priorities(
+    db: AsyncSession,
+    ads_pax_ids: list[UUID],
+    *,
+    persist: bool = True,
+) -> dict[UUID, int]:
+    """Score (and by default persist) many AdsPax in a few set-based queries.
 
-    # Persist the score
-    ads_pax.priority_score = max(score, 0)
-    ads_pax.priority_source = "auto_computed"
-    await db.flush()
+    See ``pax_priority_engine``. Returns ``{ads_pax_id: score}``; unknown
+    ids are absent.
+    """
+    from app.services.modules.pax_priority_engine import compute_pax_priorities as compute_batch
 
-    return ads_pax.priority_score
+    return await compute_batch(db, ads_pax_ids, persist=persist)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
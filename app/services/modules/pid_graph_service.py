@@ -0,0 +1,343 @@
+"""PID/PFD — per-project connectivity graph.
+
+Equipment, process lines and instruments of a project are loaded with one
+set-based query per table, together with every ``PIDConnection`` drawn on the
+project's PIDs, into an in-memory adjacency index. Line tracing, multi-hop
+upstream/downstream traces, isolation boundaries and equipment appearances are
+then answered from that index instead of issuing one lookup per connection.
+
+Graphs are cached per worker and validated against a Redis version counter
+(``pid:graph:version:{entity}:{project}``). ``invalidate_project_graph`` bumps
+the counter after a PID sync or an equipment/line edit so every worker
+rebuilds on its next read. Without Redis the cache falls back to a short TTL.
+"""
+
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis_client import bump_version, read_version
+
+logger = logging.getLogger(__name__)
+
+# Max age of a cached graph when the Redis version counter is unreachable.
+GRAPH_TTL_SECONDS = 60
+# Graphs kept per worker (oldest evicted first).
+GRAPH_CACHE_SIZE = 64
+
+# Devices a maintenance isolation can be made on.
+ISOLATION_EQUIPMENT_TYPES = frozenset({"valve", "control_valve", "safety_valve", "choke"})
+ISOLATION_TAG_TYPES = frozenset({
+    "XV", "HV", "MOV", "SOV", "PCV", "TCV", "FCV", "LCV", "PSV", "TSV", "FSV", "LSV",
+})
+
+DIRECTIONS = ("upstream", "downstream", "both")
+
+NodeKey = tuple[str, UUID]
+
+
+@dataclass(slots=True)
+class GraphEdge:
+    """One traversable hop of a ``PIDConnection``."""
+
+    target: NodeKey
+    pid_document_id: UUID
+    connection_type: str
+    continuation_ref: str | None
+    connection_point: str | None
+
+
+@dataclass
+class PIDGraph:
+    """Adjacency index of one (entity, project)."""
+
+    entity_id: UUID
+    project_id: UUID | None
+    nodes: dict[NodeKey, dict[str, Any]] = field(default_factory=dict)
+    documents: dict[UUID, dict[str, Any]] = field(default_factory=dict)
+    downstream: dict[NodeKey, list[GraphEdge]] = field(default_factory=dict)
+    upstream: dict[NodeKey, list[GraphEdge]] = field(default_factory=dict)
+    instruments_by_equipment: dict[UUID, list[UUID]] = field(default_factory=dict)
+    lines_by_number: dict[str, UUID] = field(default_factory=dict)
+    equipment_by_tag: dict[str, list[UUID]] = field(default_factory=dict)
+
+    # ── Construction ──────────────────────────────────────────────────────
+
+    def add_node(self, kind: str, node_id: UUID, **attrs: Any) -> None:
+        self.nodes[(kind, node_id)] = {"kind": kind, "id": node_id, **attrs}
+        if kind == "process_line":
+            self.lines_by_number[attrs["line_number"]] = node_id
+        elif kind == "equipment":
+            self.equipment_by_tag.setdefault(attrs["tag"], []).append(node_id)
+
+    def add_connection(self, conn: Any) -> None:
+        """Index a connection row in both directions according to its flow."""
+        src: NodeKey = (conn.from_entity_type, conn.from_entity_id)
+        dst: NodeKey = (conn.to_entity_type, conn.to_entity_id)
+        if src not in self.nodes or dst not in self.nodes:
+            return
+        if conn.flow_direction == "reverse":
+            src, dst = dst, src
+        point = conn.from_connection_point or conn.to_connection_point
+        pairs = [(src, dst)]
+        if conn.flow_direction == "bidirectional":
+            pairs.append((dst, src))
+        for a, b in pairs:
+            self.downstream.setdefault(a, []).append(GraphEdge(
+                b, conn.pid_document_id, conn.connection_type, conn.continuation_ref, point,
+            ))
+            self.upstream.setdefault(b, []).append(GraphEdge(
+                a, conn.pid_document_id, conn.connection_type, conn.continuation_ref, point,
+            ))
+
+    # ── Queries ───────────────────────────────────────────────────────────
+
+    def edges(self, node: NodeKey, direction: str = "both") -> Iterator[GraphEdge]:
+        if direction in ("downstream", "both"):
+            yield from self.downstream.get(node, ())
+        if direction in ("upstream", "both"):
+            yield from self.upstream.get(node, ())
+
+    def is_isolation_point(self, node: NodeKey) -> bool:
+        attrs = self.nodes.get(node)
+        if not attrs:
+            return False
+        if node[0] == "equipment":
+            return attrs.get("equipment_type") in ISOLATION_EQUIPMENT_TYPES
+        if node[0] == "instrument":
+            return attrs.get("tag_type") in ISOLATION_TAG_TYPES
+        return False
+
+    def trace(
+        self,
+        start: NodeKey,
+        direction: str = "both",
+        max_hops: int | None = None,
+        stop_at_isolation: bool = False,
+    ) -> list[dict[str, Any]]:
+        """Breadth-first walk from ``start``; returns reached nodes with hop count.
+
+        With ``stop_at_isolation`` the walk does not continue past isolation
+        devices (they are still reported, flagged ``isolation_point``).
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}")
+        seen: set[NodeKey] = {start}
+        queue: deque[tuple[NodeKey, int]] = deque([(start, 0)])
+        reached: list[dict[str, Any]] = []
+        while queue:
+            node, hops = queue.popleft()
+            if max_hops is not None and hops >= max_hops:
+                continue
+            if hops and stop_at_isolation and self.is_isolation_point(node):
+                continue
+            for edge in self.edges(node, direction):
+                if edge.target in seen:
+                    continue
+                seen.add(edge.target)
+                reached.append({
+                    **self.node_summary(edge.target),
+                    "hops": hops + 1,
+                    "pid_id": str(edge.pid_document_id),
+                    "continuation_ref": edge.continuation_ref,
+                    "isolation_point": self.is_isolation_point(edge.target),
+                })
+                queue.append((edge.target, hops + 1))
+        return reached
+
+    def isolation_boundary(self, start: NodeKey) -> dict[str, list[dict[str, Any]]]:
+        """Nearest isolation devices upstream and downstream of ``start``."""
+        return {
+            direction: [
+                n for n in self.trace(start, direction, stop_at_isolation=True)
+                if n["isolation_point"]
+            ]
+            for direction in ("upstream", "downstream")
+        }
+
+    def node_summary(self, node: NodeKey) -> dict[str, Any]:
+        attrs = self.nodes[node]
+        summary: dict[str, Any] = {"kind": node[0], "id": str(node[1])}
+        if node[0] == "equipment":
+            summary.update(tag=attrs["tag"], type=attrs["equipment_type"])
+        elif node[0] == "process_line":
+            summary.update(tag=attrs["line_number"], type="process_line")
+        else:
+            summary.update(tag=attrs["tag_name"], type=attrs["tag_type"])
+        return summary
+
+    def document_summary(self, pid_id: UUID) -> dict[str, Any] | None:
+        doc = self.documents.get(pid_id)
+        if not doc or not doc["is_active"]:
+            return None
+        return {
+            "pid_id": str(pid_id),
+            "pid_number": doc["number"],
+            "pid_title": doc["title"],
+            "pid_status": doc["status"],
+        }
+
+    def appearances(self, tag: str) -> list[dict[str, Any]]:
+        """Every active PID showing ``tag`` — as its home drawing or via a connection."""
+        found: dict[tuple[UUID, UUID], dict[str, Any]] = {}
+        for eq_id in self.equipment_by_tag.get(tag, ()):
+            node = ("equipment", eq_id)
+            attrs = self.nodes[node]
+            pid_ids = [attrs["pid_document_id"]] if attrs["pid_document_id"] else []
+            pid_ids += [e.pid_document_id for e in self.edges(node)]
+            for pid_id in pid_ids:
+                if (pid_id, eq_id) in found:
+                    continue
+                doc = self.document_summary(pid_id)
+                if doc is None:
+                    continue
+                found[(pid_id, eq_id)] = {
+                    **doc,
+                    "equipment_id": str(eq_id),
+                    "mxgraph_cell_id": (
+                        attrs["mxgraph_cell_id"] if pid_id == attrs["pid_document_id"] else None
+                    ),
+                }
+        return list(found.values())
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Build
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+async def build_project_graph(
+    entity_id: UUID, project_id: UUID | None, db: AsyncSession,
+) -> PIDGraph:
+    """Load the whole project graph with one query per table."""
+    from app.models.pid_pfd import DCSTag, Equipment, PIDConnection, PIDDocument, ProcessLine
+
+    graph = PIDGraph(entity_id=entity_id, project_id=project_id)
+
+    def _scoped(model):
+        return (
+            model.entity_id == entity_id,
+            model.project_id.is_not_distinct_from(project_id),
+        )
+
+    docs = await db.execute(
+        select(
+            PIDDocument.id, PIDDocument.number, PIDDocument.title,
+            PIDDocument.status, PIDDocument.is_active,
+        ).where(*_scoped(PIDDocument))
+    )
+    for row in docs.all():
+        graph.documents[row.id] = {
+            "number": row.number, "title": row.title,
+            "status": row.status, "is_active": row.is_active,
+        }
+
+    equipment = await db.execute(
+        select(
+            Equipment.id, Equipment.tag, Equipment.equipment_type,
+            Equipment.pid_document_id, Equipment.mxgraph_cell_id,
+        ).where(*_scoped(Equipment), Equipment.is_active == True)  # noqa: E712
+    )
+    for row in equipment.all():
+        graph.add_node(
+            "equipment", row.id, tag=row.tag, equipment_type=row.equipment_type,
+            pid_document_id=row.pid_document_id, mxgraph_cell_id=row.mxgraph_cell_id,
+        )
+
+    lines = await db.execute(
+        select(
+            ProcessLine.id, ProcessLine.line_number, ProcessLine.nominal_diameter_inch,
+            ProcessLine.spec_class, ProcessLine.fluid, ProcessLine.design_pressure_barg,
+        ).where(*_scoped(ProcessLine), ProcessLine.is_active == True)  # noqa: E712
+    )
+    for row in lines.all():
+        graph.add_node(
+            "process_line", row.id, line_number=row.line_number,
+            nominal_diameter_inch=row.nominal_diameter_inch, spec_class=row.spec_class,
+            fluid=row.fluid, design_pressure_barg=row.design_pressure_barg,
+        )
+
+    instruments = await db.execute(
+        select(
+            DCSTag.id, DCSTag.tag_name, DCSTag.tag_type, DCSTag.equipment_id,
+        ).where(*_scoped(DCSTag), DCSTag.is_active == True)  # noqa: E712
+    )
+    for row in instruments.all():
+        graph.add_node(
+            "instrument", row.id, tag_name=row.tag_name, tag_type=row.tag_type,
+            equipment_id=row.equipment_id,
+        )
+        if row.equipment_id:
+            graph.instruments_by_equipment.setdefault(row.equipment_id, []).append(row.id)
+
+    if graph.documents:
+        connections = await db.execute(
+            select(
+                PIDConnection.pid_document_id,
+                PIDConnection.from_entity_type, PIDConnection.from_entity_id,
+                PIDConnection.from_connection_point,
+                PIDConnection.to_entity_type, PIDConnection.to_entity_id,
+                PIDConnection.to_connection_point,
+                PIDConnection.connection_type, PIDConnection.continuation_ref,
+                PIDConnection.flow_direction,
+            ).where(
+                PIDConnection.entity_id == entity_id,
+                PIDConnection.pid_document_id.in_(
+                    select(PIDDocument.id).where(*_scoped(PIDDocument))
+                ),
+            )
+        )
+        for row in connections.all():
+            graph.add_connection(row)
+
+    return graph
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Cache
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# (entity_id, project_id) -> (version, built_at, graph)
+_graph_cache: dict[tuple[UUID, UUID | None], tuple[str | None, float, PIDGraph]] = {}
+
+
+def _version_key(entity_id: UUID, project_id: UUID | None) -> str:
+    return f"pid:graph:version:{entity_id}:{project_id or 'none'}"
+
+
+async def get_project_graph(
+    entity_id: UUID, project_id: UUID | None, db: AsyncSession,
+) -> PIDGraph:
+    """Cached project graph, rebuilt when the shared version moved."""
+    key = (entity_id, project_id)
+    version = await read_version(_version_key(entity_id, project_id))
+    cached = _graph_cache.get(key)
+    if cached is not None:
+        cached_version, built_at, graph = cached
+        if version is not None and cached_version == version:
+            return graph
+        if version is None and time.monotonic() - built_at < GRAPH_TTL_SECONDS:
+            return graph
+
+    graph = await build_project_graph(entity_id, project_id, db)
+    _graph_cache.pop(key, None)
+    _graph_cache[key] = (version, time.monotonic(), graph)
+    while len(_graph_cache) > GRAPH_CACHE_SIZE:
+        _graph_cache.pop(next(iter(_graph_cache)))
+    logger.debug(
+        "Built PID graph for %s/%s: %d nodes, %d documents",
+        entity_id, project_id, len(graph.nodes), len(graph.documents),
+    )
+    return graph
+
+
+async def invalidate_project_graph(entity_id: UUID, project_id: UUID | None) -> None:
+    """Drop the local graph and bump the shared version for other workers."""
+    _graph_cache.pop((entity_id, project_id), None)
+    await bump_version(_version_key(entity_id, project_id))
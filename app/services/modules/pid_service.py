@@ -5,12 +5,11 @@ process line tracing, and draw.io integration.
 """
 
 import logging
-import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
 from typing import Any, Optional
 from uuid import UUID
 
-from sqlalchemy import func, select, and_, or_
+from sqlalchemy import func, select, or_
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.expression import cast
@@ -148,6 +147,7 @@ async def update_pid_document(
 ) -> Any:
     """Update PID document metadata."""
     pid = await get_pid_document(pid_id, entity_id, db)
+    previous_project_id = pid.project_id
 
     update_data = body.model_dump(exclude_unset=True)
     for key, value in update_data.items():
@@ -155,6 +155,9 @@ async def update_pid_document(
             setattr(pid, key, value)
 
     await db.commit()
+    await _invalidate_graph(entity_id, previous_project_id)
+    if pid.project_id != previous_project_id:
+        await _invalidate_graph(entity_id, pid.project_id)
     return pid
 
 
@@ -176,6 +179,7 @@ async def delete_pid_document(
 
     pid.is_active = False
     await db.commit()
+    await _invalidate_graph(entity_id, pid.project_id)
     logger.info("Soft-deleted PID document %s (%s)", pid.number, pid.id)
 
 
@@ -560,22 +564,24 @@ async def diff_revisions(
         from fastapi import HTTPException
         raise HTTPException(404, "One or both revisions not found")
 
-    # Parse both XMLs and compare cell IDs
-    cells_a = _extract_cell_ids(rev_a.xml_content)
-    cells_b = _extract_cell_ids(rev_b.xml_content)
+    from app.services.modules.pid_sync_service import cell_fingerprints, diff_cell_fingerprints
 
-    added = cells_b - cells_a
-    removed = cells_a - cells_b
-    common = cells_a & cells_b
+    # Compare per-cell content fingerprints (same as the XML → DB sync)
+    diff = diff_cell_fingerprints(
+        cell_fingerprints(rev_a.xml_content),
+        cell_fingerprints(rev_b.xml_content),
+    )
 
     return {
         "rev_a": rev_a.revision_code,
         "rev_b": rev_b.revision_code,
-        "objects_added": len(added),
-        "objects_removed": len(removed),
-        "objects_unchanged": len(common),
-        "added_ids": list(added),
-        "removed_ids": list(removed),
+        "objects_added": len(diff["added"]),
+        "objects_removed": len(diff["removed"]),
+        "objects_modified": len(diff["modified"]),
+        "objects_unchanged": len(diff["unchanged"]),
+        "added_ids": sorted(diff["added"]),
+        "removed_ids": sorted(diff["removed"]),
+        "modified_ids": sorted(diff["modified"]),
     }
 
 
@@ -595,9 +601,14 @@ async def parse_and_sync_pid(
     Parse draw.io XML and synchronize objects to DB.
 
     Called after each save in draw.io. Detects equipment, process lines,
-    and instruments from mxGraph cell styles and syncs to DB.
+    and instruments from mxGraph cell styles and syncs to DB. Only cells
+    whose fingerprint changed since the previous sync are written (see
+    ``pid_sync_service``).
     """
-    from app.models.pid_pfd import PIDDocument, Equipment, ProcessLine, PIDConnection
+    from lxml import etree
+
+    from app.models.pid_pfd import PIDDocument
+    from app.services.modules.pid_sync_service import parse_pid_cells, sync_pid_cells
 
     pid = await db.get(PIDDocument, UUID(str(pid_id)))
     if not pid:
@@ -605,59 +616,30 @@ async def parse_and_sync_pid(
         raise HTTPException(404, f"PID {pid_id} not found")
 
     try:
-        root = ET.fromstring(xml_content)
-    except ET.ParseError as e:
+        cells = parse_pid_cells(xml_content)
+    except etree.XMLSyntaxError as e:
         logger.exception("Failed to parse XML for PID %s: %s", pid_id, e)
         return {"error": f"Invalid XML: {e}", "equipment": 0, "lines": 0, "connections": 0}
 
-    cells = root.findall(".//mxCell")
-    stats = {"equipment": 0, "lines": 0, "connections": 0, "instruments": 0}
-
-    # Track cell IDs found in XML for detecting removed objects
-    found_cell_ids: set[str] = set()
-
-    for cell in cells:
-        style = cell.get("style", "")
-        cell_id = cell.get("id", "")
-
-        if not cell_id or cell_id in ("0", "1"):
-            continue
-
-        found_cell_ids.add(cell_id)
-
-        # Detect equipment
-        if _is_equipment_style(style):
-            await _sync_equipment(cell, pid, entity_id, db)
-            stats["equipment"] += 1
-
-        # Detect process lines
-        elif _is_process_line_style(style):
-            await _sync_process_line(cell, pid, entity_id, db)
-            stats["lines"] += 1
-
-        # Detect instruments
-        elif _is_instrument_style(style):
-            await _sync_instrument(cell, pid, entity_id, db)
-            stats["instruments"] += 1
-
-    # Sync connections (edges)
-    edges = root.findall(".//mxCell[@edge='1']")
-    for edge in edges:
-        await _sync_connection(edge, pid, entity_id, db)
-        stats["connections"] += 1
-
-    # Mark equipment removed from PID (D-093)
-    await _mark_removed_equipment(pid, found_cell_ids, entity_id, db)
+    stats = await sync_pid_cells(pid=pid, cells=cells, entity_id=entity_id, db=db)
 
     await db.commit()
+    await _invalidate_graph(entity_id, pid.project_id)
 
     logger.info(
-        "PID sync complete for %s: %d equip, %d lines, %d connections, %d instruments",
+        "PID sync complete for %s: %d equip, %d lines, %d connections, %d instruments (%d changed, %d removed)",
         pid.number, stats["equipment"], stats["lines"],
-        stats["connections"], stats["instruments"],
+        stats["connections"], stats["instruments"], stats["changed"], stats["removed"],
     )
     return stats
 
+async def _invalidate_graph(entity_id: UUID, project_id: UUID | None) -> None:
+    """Drop the cached connectivity graph after a topology-affecting edit."""
+    from app.services.modules.pid_graph_service import invalidate_project_graph
+
+    await invalidate_project_graph(entity_id, project_id)
+
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # Equipment CRUD
@@ -763,6 +745,7 @@ async def update_equipment(
 
     eq.updated_at = datetime.now(timezone.utc)
     await db.commit()
+    await _invalidate_graph(entity_id, eq.project_id)
     return eq
 
 
@@ -816,6 +799,7 @@ async def create_equipment(
     )
     db.add(eq)
     await db.commit()
+    await _invalidate_graph(entity_id, eq.project_id)
 
     logger.info("Created equipment %s (%s) by user %s", eq.tag, eq.id, created_by)
     return eq
@@ -833,6 +817,7 @@ async def delete_equipment(
     eq.is_active = False
     eq.updated_at = datetime.now(timezone.utc)
     await db.commit()
+    await _invalidate_graph(entity_id, eq.project_id)
     logger.info("Soft-deleted equipment %s (%s)", eq.tag, eq.id)
 
 
@@ -842,34 +827,16 @@ async def get_equipment_appearances(
     entity_id: UUID,
     db: AsyncSession,
 ) -> dict:
-    """Trace an equipment across all PIDs where it appears."""
-    from app.models.pid_pfd import Equipment, PIDDocument, PIDConnection
+    """Trace an equipment across all PIDs where it appears.
 
-    eq = await get_equipment(eq_id, entity_id, db)
+    Served from the project connectivity graph: the equipment's own drawing
+    plus every PID on which a connection reaches it.
+    """
+    from app.services.modules.pid_graph_service import get_project_graph
 
-    # Find all PIDs containing this equipment tag
-    appearances_result = await db.execute(
-        select(Equipment, PIDDocument)
-        .join(PIDDocument, Equipment.pid_document_id == PIDDocument.id)
-        .where(
-            Equipment.entity_id == entity_id,
-            Equipment.tag == eq.tag,
-            Equipment.is_active == True,  # noqa: E712
-            PIDDocument.is_active == True,  # noqa: E712
-        )
-    )
-    rows = appearances_result.all()
-
-    appearances = []
-    for eq_instance, pid in rows:
-        appearances.append({
-            "pid_id": str(pid.id),
-            "pid_number": pid.number,
-            "pid_title": pid.title,
-            "pid_status": pid.status,
-            "equipment_id": str(eq_instance.id),
-            "mxgraph_cell_id": eq_instance.mxgraph_cell_id,
-        })
+    eq = await get_equipment(eq_id, entity_id, db)
+    graph = await get_project_graph(entity_id, eq.project_id, db)
+    appearances = graph.appearances(eq.tag)
 
     return {
         "tag": eq.tag,
@@ -877,6 +844,60 @@ async def get_equipment_appearances(
         "description": eq.description,
         "appearance_count": len(appearances),
         "appearances": appearances,
+        "instruments": [
+            graph.node_summary(("instrument", tag_id))
+            for tag_id in graph.instruments_by_equipment.get(eq.id, ())
+        ],
+    }
+
+
+async def trace_equipment(
+    *,
+    eq_id: str | UUID,
+    entity_id: UUID,
+    direction: str = "both",
+    max_hops: int | None = None,
+    db: AsyncSession,
+) -> dict:
+    """Multi-hop upstream/downstream trace from an equipment, across PIDs."""
+    from app.services.modules.pid_graph_service import DIRECTIONS, get_project_graph
+
+    if direction not in DIRECTIONS:
+        from fastapi import HTTPException
+        raise HTTPException(400, f"direction must be one of {', '.join(DIRECTIONS)}")
+
+    eq = await get_equipment(eq_id, entity_id, db)
+    graph = await get_project_graph(entity_id, eq.project_id, db)
+    reached = graph.trace(("equipment", eq.id), direction, max_hops)
+
+    return {
+        "tag": eq.tag,
+        "direction": direction,
+        "max_hops": max_hops,
+        "node_count": len(reached),
+        "pid_count": len({n["pid_id"] for n in reached}),
+        "nodes": reached,
+    }
+
+
+async def get_isolation_points(
+    *,
+    eq_id: str | UUID,
+    entity_id: UUID,
+    db: AsyncSession,
+) -> dict:
+    """Nearest upstream and downstream isolation devices around an equipment."""
+    from app.services.modules.pid_graph_service import get_project_graph
+
+    eq = await get_equipment(eq_id, entity_id, db)
+    graph = await get_project_graph(entity_id, eq.project_id, db)
+    boundary = graph.isolation_boundary(("equipment", eq.id))
+
+    return {
+        "tag": eq.tag,
+        "upstream": boundary["upstream"],
+        "downstream": boundary["downstream"],
+        "isolatable": bool(boundary["upstream"]) and bool(boundary["downstream"]),
     }
 
 
@@ -889,86 +910,79 @@ async def trace_process_line(
     *,
     line_number: str,
     entity_id: UUID,
-    project_id: str,
+    project_id: str | None = None,
+    max_hops: int | None = None,
     db: AsyncSession,
 ) -> dict:
-    """Trace a process line across all PIDs where it appears."""
-    from app.models.pid_pfd import ProcessLine, PIDConnection, PIDDocument, Equipment
+    """Trace a process line across all PIDs where it appears.
 
-    line = await db.execute(
-        select(ProcessLine).where(
-            ProcessLine.entity_id == entity_id,
-            ProcessLine.project_id == UUID(project_id),
-            ProcessLine.line_number == line_number,
-        )
-    )
-    line = line.scalar_one_or_none()
+    Without ``project_id`` the line's project is looked up by number. With
+    ``max_hops`` the upstream/downstream equipment reached within that many
+    hops is included as well.
+    """
+    from app.models.pid_pfd import ProcessLine
+    from app.services.modules.pid_graph_service import get_project_graph
 
-    if not line:
+    if project_id:
+        project_uuid: UUID | None = UUID(str(project_id))
+    else:
+        project_uuid = (await db.execute(
+            select(ProcessLine.project_id).where(
+                ProcessLine.entity_id == entity_id,
+                ProcessLine.line_number == line_number,
+                ProcessLine.is_active == True,  # noqa: E712
+            ).limit(1)
+        )).scalar_one_or_none()
+
+    graph = await get_project_graph(entity_id, project_uuid, db)
+    line_id = graph.lines_by_number.get(line_number)
+    if line_id is None:
         from fastapi import HTTPException
         raise HTTPException(404, f"Process line '{line_number}' not found")
 
-    # Find all connections involving this line
-    connections = await db.execute(
-        select(PIDConnection).where(
-            PIDConnection.entity_id == entity_id,
-            or_(
-                and_(
-                    PIDConnection.from_entity_type == "process_line",
-                    PIDConnection.from_entity_id == line.id,
-                ),
-                and_(
-                    PIDConnection.to_entity_type == "process_line",
-                    PIDConnection.to_entity_id == line.id,
-                ),
-            ),
-        )
-    )
-    connections = connections.scalars().all()
-
+    node = ("process_line", line_id)
+    line = graph.nodes[node]
     pid_appearances: dict[str, dict] = {}
-    equipment_connected: list[str] = []
-
-    for conn in connections:
-        pid = await db.get(PIDDocument, conn.pid_document_id)
-        if pid:
-            pid_key = str(pid.id)
-            if pid_key not in pid_appearances:
-                pid_appearances[pid_key] = {
-                    "pid_id": pid_key,
-                    "pid_number": pid.number,
-                    "pid_title": pid.title,
-                    "pid_status": pid.status,
-                    "continuation_ref": conn.continuation_ref,
-                    "connected_equipment": [],
-                }
-
-            # Get connected equipment
-            other_type = conn.to_entity_type if conn.from_entity_id == line.id else conn.from_entity_type
-            other_id = conn.to_entity_id if conn.from_entity_id == line.id else conn.from_entity_id
-
-            if other_type == "equipment":
-                eq = await db.get(Equipment, other_id)
-                if eq:
-                    pid_appearances[pid_key]["connected_equipment"].append({
-                        "tag": eq.tag,
-                        "type": eq.equipment_type,
-                        "connection_point": conn.from_connection_point or conn.to_connection_point,
-                    })
-                    equipment_connected.append(eq.tag)
+    equipment_connected: set[str] = set()
+    seen: set[tuple] = set()
 
-    return {
+    for edge in graph.edges(node):
+        doc = graph.document_summary(edge.pid_document_id)
+        if doc is None:
+            continue
+        entry = pid_appearances.setdefault(doc["pid_id"], {
+            **doc,
+            "continuation_ref": edge.continuation_ref,
+            "connected_equipment": [],
+        })
+        if edge.target[0] == "equipment" and (doc["pid_id"], edge.target) not in seen:
+            seen.add((doc["pid_id"], edge.target))
+            other = graph.nodes[edge.target]
+            entry["connected_equipment"].append({
+                "tag": other["tag"],
+                "type": other["equipment_type"],
+                "connection_point": edge.connection_point,
+            })
+            equipment_connected.add(other["tag"])
+
+    result = {
         "line_number": line_number,
         "line_details": {
-            "nominal_diameter_inch": float(line.nominal_diameter_inch) if line.nominal_diameter_inch else None,
-            "spec_class": line.spec_class,
-            "fluid": line.fluid,
-            "design_pressure_barg": float(line.design_pressure_barg) if line.design_pressure_barg else None,
+            "nominal_diameter_inch": float(line["nominal_diameter_inch"]) if line["nominal_diameter_inch"] else None,
+            "spec_class": line["spec_class"],
+            "fluid": line["fluid"],
+            "design_pressure_barg": float(line["design_pressure_barg"]) if line["design_pressure_barg"] else None,
         },
         "pid_count": len(pid_appearances),
         "pids": list(pid_appearances.values()),
-        "equipment_connected": list(set(equipment_connected)),
+        "equipment_connected": sorted(equipment_connected),
     }
+    if max_hops:
+        for direction in ("upstream", "downstream"):
+            result[direction] = [
+                n for n in graph.trace(node, direction, max_hops) if n["kind"] == "equipment"
+            ]
+    return result
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1092,6 +1106,7 @@ async def create_process_line(
     )
     db.add(line)
     await db.commit()
+    await _invalidate_graph(entity_id, line.project_id)
 
     logger.info("Created process line %s (%s) by user %s", line.line_number, line.id, created_by)
     return line
@@ -1113,6 +1128,7 @@ async def update_process_line(
             setattr(line, key, value)
 
     await db.commit()
+    await _invalidate_graph(entity_id, line.project_id)
     return line
 
 
@@ -1127,6 +1143,7 @@ async def delete_process_line(
 
     line.is_active = False
     await db.commit()
+    await _invalidate_graph(entity_id, line.project_id)
     logger.info("Soft-deleted process line %s (%s)", line.line_number, line.id)
 
 
@@ -2004,223 +2021,6 @@ def _infer_equipment_type(style: str) -> str:
     return "other"
 
 
-def _parse_cell_properties(cell: ET.Element) -> dict[str, str]:
-    """Extract opsflux_* attributes from a draw.io cell."""
-    props: dict[str, str] = {}
-    for attr_name, attr_value in cell.attrib.items():
-        if attr_name.startswith("opsflux_"):
-            key = attr_name.replace("opsflux_", "")
-            props[key] = attr_value
-    return props
-
-
-async def _sync_equipment(
-    cell: ET.Element,
-    pid: Any,
-    entity_id: UUID,
-    db: AsyncSession,
-) -> None:
-    """Create or update an equipment from a draw.io cell."""
-    from app.models.pid_pfd import Equipment
-
-    props = _parse_cell_properties(cell)
-    tag = props.get("tag") or cell.get("value", "").strip()
-    cell_id = cell.get("id")
-
-    if not tag:
-        return
-
-    style = cell.get("style", "")
-    equipment_type = _infer_equipment_type(style)
-
-    # Find existing by cell_id
-    existing_result = await db.execute(
-        select(Equipment).where(
-            Equipment.entity_id == entity_id,
-            Equipment.pid_document_id == pid.id,
-            Equipment.mxgraph_cell_id == cell_id,
-        )
-    )
-    existing = existing_result.scalar_one_or_none()
-
-    if existing:
-        existing.tag = tag
-        if props.get("description"):
-            existing.description = props["description"]
-        if props.get("service"):
-            existing.service = props["service"]
-        if props.get("design_pressure_barg"):
-            try:
-                existing.design_pressure_barg = float(props["design_pressure_barg"])
-            except ValueError:
-                pass
-        if props.get("design_temperature_c"):
-            try:
-                existing.design_temperature_c = float(props["design_temperature_c"])
-            except ValueError:
-                pass
-        existing.updated_at = datetime.now(timezone.utc)
-        existing.removed_from_pid = False
-    else:
-        db.add(Equipment(
-            entity_id=entity_id,
-            project_id=pid.project_id,
-            pid_document_id=pid.id,
-            tag=tag,
-            equipment_type=equipment_type,
-            description=props.get("description"),
-            service=props.get("service"),
-            design_pressure_barg=_safe_float(props.get("design_pressure_barg")),
-            design_temperature_c=_safe_float(props.get("design_temperature_c")),
-            mxgraph_cell_id=cell_id,
-        ))
-
-
-async def _sync_process_line(
-    cell: ET.Element,
-    pid: Any,
-    entity_id: UUID,
-    db: AsyncSession,
-) -> None:
-    """Create or update a process line from a draw.io cell."""
-    from app.models.pid_pfd import ProcessLine
-
-    props = _parse_cell_properties(cell)
-    line_number = props.get("line_number") or cell.get("value", "").strip()
-    cell_id = cell.get("id")
-
-    if not line_number:
-        return
-
-    existing_result = await db.execute(
-        select(ProcessLine).where(
-            ProcessLine.entity_id == entity_id,
-            ProcessLine.mxgraph_cell_id == cell_id,
-        )
-    )
-    existing = existing_result.scalar_one_or_none()
-
-    if existing:
-        existing.line_number = line_number
-        if props.get("fluid"):
-            existing.fluid = props["fluid"]
-        if props.get("spec_class"):
-            existing.spec_class = props["spec_class"]
-    else:
-        db.add(ProcessLine(
-            entity_id=entity_id,
-            project_id=pid.project_id,
-            line_number=line_number,
-            fluid=props.get("fluid"),
-            spec_class=props.get("spec_class"),
-            spec_code=props.get("spec_code"),
-            mxgraph_cell_id=cell_id,
-        ))
-
-
-async def _sync_instrument(
-    cell: ET.Element,
-    pid: Any,
-    entity_id: UUID,
-    db: AsyncSession,
-) -> None:
-    """Create or update a DCS tag/instrument from a draw.io cell."""
-    from app.models.pid_pfd import DCSTag
-
-    props = _parse_cell_properties(cell)
-    tag_name = props.get("tag_name") or cell.get("value", "").strip()
-
-    if not tag_name:
-        return
-
-    existing_result = await db.execute(
-        select(DCSTag).where(
-            DCSTag.entity_id == entity_id,
-            DCSTag.tag_name == tag_name,
-            DCSTag.project_id == pid.project_id,
-        )
-    )
-    existing = existing_result.scalar_one_or_none()
-
-    if existing:
-        existing.pid_document_id = pid.id
-        if props.get("tag_type"):
-            existing.tag_type = props["tag_type"]
-        existing.updated_at = datetime.now(timezone.utc)
-    else:
-        db.add(DCSTag(
-            entity_id=entity_id,
-            project_id=pid.project_id,
-            pid_document_id=pid.id,
-            tag_name=tag_name,
-            tag_type=props.get("tag_type", "other"),
-            area=props.get("area"),
-            source="manual",
-        ))
-
-
-async def _sync_connection(
-    edge: ET.Element,
-    pid: Any,
-    entity_id: UUID,
-    db: AsyncSession,
-) -> None:
-    """Create or update a PID connection from a draw.io edge."""
-    from app.models.pid_pfd import PIDConnection
-
-    source = edge.get("source")
-    target = edge.get("target")
-
-    if not source or not target:
-        return
-
-    # Check if connection already exists
-    existing_result = await db.execute(
-        select(PIDConnection).where(
-            PIDConnection.pid_document_id == pid.id,
-            PIDConnection.from_entity_id == UUID(source) if _is_uuid(source) else PIDConnection.from_entity_type == "unknown",
-            PIDConnection.to_entity_id == UUID(target) if _is_uuid(target) else PIDConnection.to_entity_type == "unknown",
-        )
-    )
-    # Simplified — full implementation would resolve cell_id to entity_id
-
-
-async def _mark_removed_equipment(
-    pid: Any,
-    found_cell_ids: set[str],
-    entity_id: UUID,
-    db: AsyncSession,
-) -> None:
-    """Mark equipment removed from PID canvas (D-093)."""
-    from app.models.pid_pfd import Equipment
-
-    result = await db.execute(
-        select(Equipment).where(
-            Equipment.pid_document_id == pid.id,
-            Equipment.entity_id == entity_id,
-            Equipment.is_active == True,  # noqa: E712
-            Equipment.mxgraph_cell_id.isnot(None),
-        )
-    )
-    all_equipment = result.scalars().all()
-
-    for eq in all_equipment:
-        if eq.mxgraph_cell_id and eq.mxgraph_cell_id not in found_cell_ids:
-            # D-093: Don't delete, mark as removed
-            eq.removed_from_pid = True
-            logger.info("Equipment %s removed from PID %s canvas", eq.tag, pid.number)
-
-
-def _extract_cell_ids(xml_content: str) -> set[str]:
-    """Extract all cell IDs from mxGraph XML."""
-    try:
-        root = ET.fromstring(xml_content)
-        cells = root.findall(".//mxCell")
-        return {c.get("id", "") for c in cells if c.get("id") not in ("0", "1", "")}
-    except ET.ParseError:
-        return set()
-
-
 def _safe_float(value: str | None) -> float | None:
     """Safely convert string to float."""
     if value is None:
@@ -2231,15 +2031,6 @@ def _safe_float(value: str | None) -> float | None:
         return None
 
 
-def _is_uuid(value: str) -> bool:
-    """Check if a string is a valid UUID."""
-    try:
-        UUID(value)
-        return True
-    except (ValueError, AttributeError):
-        return False
-
-
 def _escape_xml_for_json(xml: str) -> str:
     """Escape XML for embedding in JSON string."""
     return (
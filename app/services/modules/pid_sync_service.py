@@ -0,0 +1,632 @@
+"""PID/PFD — incremental draw.io XML → DB synchronization.
+
+The XML is streamed once with ``lxml.etree.iterparse`` into per-cell records
+carrying a content fingerprint (kind, label, style, ``opsflux_*`` properties
+and edge endpoints — geometry is deliberately ignored so moving a shape does
+not count as a change). Fingerprints of the last synced state are stored on
+``pid_documents.sync_fingerprints``; a save only touches cells whose
+fingerprint changed, with one set-based statement per object kind.
+
+``diff_cell_fingerprints`` reuses the same fingerprints to compare two
+revisions.
+"""
+
+import hashlib
+import io
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID, uuid4
+
+from lxml import etree
+from sqlalchemy import String, any_, delete, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.modules.pid_service import (
+    _infer_equipment_type,
+    _is_equipment_style,
+    _is_instrument_style,
+    _is_process_line_style,
+    _safe_float,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows per multi-row INSERT — keeps bind parameters well under asyncpg's limit.
+BATCH_SIZE = 1000
+
+_ROOT_CELL_IDS = {"0", "1"}
+_WRAPPER_TAGS = {"object", "UserObject"}
+
+
+@dataclass(slots=True)
+class PIDCell:
+    """One draw.io cell reduced to the attributes the sync cares about."""
+
+    cell_id: str
+    kind: str  # equipment | process_line | instrument | other
+    value: str
+    style: str
+    props: dict[str, str] = field(default_factory=dict)
+    is_edge: bool = False
+    source: str | None = None
+    target: str | None = None
+    fingerprint: str = ""
+
+
+def parse_pid_cells(xml_content: str) -> dict[str, PIDCell]:
+    """Stream ``mxCell`` elements into ``PIDCell`` records keyed by cell id.
+
+    Cells wrapped in draw.io ``<object>``/``<UserObject>`` elements take their
+    id, label and ``opsflux_*`` properties from the wrapper.
+
+    Raises ``lxml.etree.XMLSyntaxError`` on malformed XML.
+    """
+    cells: dict[str, PIDCell] = {}
+    context = etree.iterparse(
+        io.BytesIO(xml_content.encode("utf-8")),
+        events=("end",),
+        tag="mxCell",
+        resolve_entities=False,
+        no_network=True,
+        huge_tree=True,
+    )
+    for _, element in context:
+        attrs = dict(element.attrib)
+        wrapper = element.getparent()
+        if wrapper is not None and wrapper.tag in _WRAPPER_TAGS:
+            wrapper_attrs = dict(wrapper.attrib)
+            if "label" in wrapper_attrs:
+                wrapper_attrs.setdefault("value", wrapper_attrs.pop("label"))
+            attrs = {**attrs, **wrapper_attrs}
+        cell = _build_cell(attrs)
+        if cell is not None:
+            cells[cell.cell_id] = cell
+        element.clear(keep_tail=True)
+        if wrapper is not None and wrapper.tag not in _WRAPPER_TAGS:
+            while element.getprevious() is not None:
+                del wrapper[0]
+    return cells
+
+
+def cell_fingerprints(xml_content: str | None) -> dict[str, str]:
+    """``{cell_id: fingerprint}`` for an XML document (empty on parse error)."""
+    if not xml_content:
+        return {}
+    try:
+        return {cell_id: cell.fingerprint for cell_id, cell in parse_pid_cells(xml_content).items()}
+    except etree.XMLSyntaxError:
+        return {}
+
+
+def diff_cell_fingerprints(old: dict[str, str], new: dict[str, str]) -> dict[str, set[str]]:
+    """Split cell ids into added / removed / modified / unchanged sets."""
+    old_ids = set(old)
+    new_ids = set(new)
+    common = old_ids & new_ids
+    modified = {cell_id for cell_id in common if old[cell_id] != new[cell_id]}
+    return {
+        "added": new_ids - old_ids,
+        "removed": old_ids - new_ids,
+        "modified": modified,
+        "unchanged": common - modified,
+    }
+
+
+def _build_cell(attrs: dict[str, str]) -> PIDCell | None:
+    cell_id = attrs.get("id", "")
+    if not cell_id or cell_id in _ROOT_CELL_IDS:
+        return None
+
+    style = attrs.get("style", "")
+    if _is_equipment_style(style):
+        kind = "equipment"
+    elif _is_process_line_style(style):
+        kind = "process_line"
+    elif _is_instrument_style(style):
+        kind = "instrument"
+    else:
+        kind = "other"
+
+    props = {name.removeprefix("opsflux_"): value for name, value in attrs.items() if name.startswith("opsflux_")}
+    cell = PIDCell(
+        cell_id=cell_id,
+        kind=kind,
+        value=attrs.get("value", ""),
+        style=style,
+        props=props,
+        is_edge=attrs.get("edge") == "1",
+        source=attrs.get("source") or None,
+        target=attrs.get("target") or None,
+    )
+    digest = hashlib.blake2b(digest_size=8)
+    for part in (
+        cell.kind,
+        cell.value,
+        cell.style,
+        "1" if cell.is_edge else "0",
+        cell.source or "",
+        cell.target or "",
+        *(f"{key}={props[key]}" for key in sorted(props)),
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    cell.fingerprint = digest.hexdigest()
+    return cell
+
+
+def _any_of(column: Any, values: list[str]) -> Any:
+    """``column = ANY(:array)`` — one bind parameter regardless of list size."""
+    return column == any_(literal(values, ARRAY(String)))
+
+
+def _chunks(rows: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+    return [rows[start:start + BATCH_SIZE] for start in range(0, len(rows), BATCH_SIZE)]
+
+
+def _equipment_tag(cell: PIDCell) -> str:
+    return cell.props.get("tag") or cell.value.strip()
+
+
+def _line_number(cell: PIDCell) -> str:
+    return cell.props.get("line_number") or cell.value.strip()
+
+
+def _instrument_tag(cell: PIDCell) -> str:
+    return cell.props.get("tag_name") or cell.value.strip()
+
+
+_OBJECT_KEYS = {"equipment": _equipment_tag, "process_line": _line_number, "instrument": _instrument_tag}
+
+
+def _object_key(cell: PIDCell) -> str:
+    """Tag / line number the cell syncs to, or "" when it maps to no object."""
+    key = _OBJECT_KEYS.get(cell.kind)
+    return key(cell) if key else ""
+
+
+async def sync_pid_cells(
+    *,
+    pid: Any,
+    cells: dict[str, PIDCell],
+    entity_id: UUID,
+    db: AsyncSession,
+) -> dict[str, int]:
+    """Apply the cells that changed since the last sync of ``pid``.
+
+    Does not commit; the caller owns the transaction.
+    """
+    previous: dict[str, str] = dict(getattr(pid, "sync_fingerprints", None) or {})
+    changed = [cell for cell in cells.values() if previous.get(cell.cell_id) != cell.fingerprint]
+    removed_ids = [cell_id for cell_id in previous if cell_id not in cells]
+
+    stats = {
+        "equipment": sum(1 for cell in cells.values() if cell.kind == "equipment"),
+        "lines": sum(1 for cell in cells.values() if cell.kind == "process_line"),
+        "instruments": sum(1 for cell in cells.values() if cell.kind == "instrument"),
+        "connections": sum(1 for cell in cells.values() if cell.is_edge),
+        "changed": len(changed),
+        "unchanged": len(cells) - len(changed),
+        "removed": len(removed_ids),
+    }
+
+    now = datetime.now(timezone.utc)
+    equipment_ids = await _upsert_equipment(
+        pid=pid, cells=[cell for cell in changed if cell.kind == "equipment"], entity_id=entity_id, now=now, db=db
+    )
+    line_ids = await _upsert_process_lines(
+        pid=pid, cells=[cell for cell in changed if cell.kind == "process_line"], entity_id=entity_id, db=db
+    )
+    instrument_ids = await _upsert_instruments(
+        pid=pid, cells=[cell for cell in changed if cell.kind == "instrument"], entity_id=entity_id, now=now, db=db
+    )
+    unresolved_edges = await _sync_connections(
+        pid=pid,
+        cells=cells,
+        changed_edges=[cell for cell in changed if cell.is_edge],
+        removed_ids=removed_ids,
+        known={
+            **{cell_id: ("equipment", obj_id) for cell_id, obj_id in equipment_ids.items()},
+            **{cell_id: ("process_line", obj_id) for cell_id, obj_id in line_ids.items()},
+            **{cell_id: ("instrument", obj_id) for cell_id, obj_id in instrument_ids.items()},
+        },
+        entity_id=entity_id,
+        db=db,
+    )
+    stats["removed_equipment"] = await _mark_removed_equipment(
+        pid=pid, present_ids=list(cells), entity_id=entity_id, db=db
+    )
+
+    # Cells that got no object (a duplicate tag, an insert lost to a
+    # conflict) and edges whose endpoints could not be resolved yet keep no
+    # fingerprint, so the next save retries them instead of treating them
+    # as unchanged.
+    synced = equipment_ids.keys() | line_ids.keys() | instrument_ids.keys()
+    retry = unresolved_edges | {
+        cell.cell_id for cell in changed if _object_key(cell) and cell.cell_id not in synced
+    }
+    pid.sync_fingerprints = {
+        cell_id: cell.fingerprint for cell_id, cell in cells.items() if cell_id not in retry
+    }
+    await db.flush()
+    return stats
+
+
+async def _upsert_equipment(
+    *,
+    pid: Any,
+    cells: list[PIDCell],
+    entity_id: UUID,
+    now: datetime,
+    db: AsyncSession,
+) -> dict[str, UUID]:
+    from app.models.pid_pfd import Equipment
+
+    cells = [cell for cell in cells if _equipment_tag(cell)]
+    if not cells:
+        return {}
+
+    existing_rows = (
+        await db.execute(
+            select(
+                Equipment.id,
+                Equipment.mxgraph_cell_id,
+                Equipment.description,
+                Equipment.service,
+                Equipment.design_pressure_barg,
+                Equipment.design_temperature_c,
+            ).where(
+                Equipment.entity_id == entity_id,
+                Equipment.pid_document_id == pid.id,
+                _any_of(Equipment.mxgraph_cell_id, [cell.cell_id for cell in cells]),
+            )
+        )
+    ).all()
+    existing = {row.mxgraph_cell_id: row for row in existing_rows}
+
+    ids: dict[str, UUID] = {}
+    updates: list[dict[str, Any]] = []
+    inserts: list[dict[str, Any]] = []
+    seen_tags: set[str] = set()
+    for cell in cells:
+        props = cell.props
+        tag = _equipment_tag(cell)
+        row = existing.get(cell.cell_id)
+        if row is not None:
+            pressure = _safe_float(props.get("design_pressure_barg"))
+            temperature = _safe_float(props.get("design_temperature_c"))
+            updates.append({
+                "id": row.id,
+                "tag": tag,
+                "description": props.get("description") or row.description,
+                "service": props.get("service") or row.service,
+                "design_pressure_barg": pressure if pressure is not None else row.design_pressure_barg,
+                "design_temperature_c": temperature if temperature is not None else row.design_temperature_c,
+                "updated_at": now,
+                "removed_from_pid": False,
+            })
+            ids[cell.cell_id] = row.id
+        elif tag not in seen_tags:
+            seen_tags.add(tag)
+            inserts.append({
+                "id": uuid4(),
+                "entity_id": entity_id,
+                "project_id": pid.project_id,
+                "pid_document_id": pid.id,
+                "tag": tag,
+                "equipment_type": _infer_equipment_type(cell.style),
+                "description": props.get("description"),
+                "service": props.get("service"),
+                "design_pressure_barg": _safe_float(props.get("design_pressure_barg")),
+                "design_temperature_c": _safe_float(props.get("design_temperature_c")),
+                "mxgraph_cell_id": cell.cell_id,
+            })
+
+    if updates:
+        await db.execute(update(Equipment), updates)
+    for chunk in _chunks(inserts):
+        result = await db.execute(
+            pg_insert(Equipment)
+            .values(chunk)
+            .on_conflict_do_nothing()
+            .returning(Equipment.id, Equipment.mxgraph_cell_id)
+        )
+        ids.update({cell_id: obj_id for obj_id, cell_id in result.all()})
+    return ids
+
+
+async def _upsert_process_lines(
+    *,
+    pid: Any,
+    cells: list[PIDCell],
+    entity_id: UUID,
+    db: AsyncSession,
+) -> dict[str, UUID]:
+    from app.models.pid_pfd import ProcessLine
+
+    cells = [cell for cell in cells if _line_number(cell)]
+    if not cells:
+        return {}
+
+    existing_rows = (
+        await db.execute(
+            select(ProcessLine.id, ProcessLine.mxgraph_cell_id, ProcessLine.fluid, ProcessLine.spec_class).where(
+                ProcessLine.entity_id == entity_id,
+                _any_of(ProcessLine.mxgraph_cell_id, [cell.cell_id for cell in cells]),
+            )
+        )
+    ).all()
+    existing = {row.mxgraph_cell_id: row for row in existing_rows}
+
+    ids: dict[str, UUID] = {}
+    updates: list[dict[str, Any]] = []
+    inserts: list[dict[str, Any]] = []
+    seen_numbers: set[str] = set()
+    for cell in cells:
+        props = cell.props
+        line_number = _line_number(cell)
+        row = existing.get(cell.cell_id)
+        if row is not None:
+            updates.append({
+                "id": row.id,
+                "line_number": line_number,
+                "fluid": props.get("fluid") or row.fluid,
+                "spec_class": props.get("spec_class") or row.spec_class,
+            })
+            ids[cell.cell_id] = row.id
+        elif line_number not in seen_numbers:
+            seen_numbers.add(line_number)
+            inserts.append({
+                "id": uuid4(),
+                "entity_id": entity_id,
+                "project_id": pid.project_id,
+                "line_number": line_number,
+                "fluid": props.get("fluid"),
+                "spec_class": props.get("spec_class"),
+                "spec_code": props.get("spec_code"),
+                "mxgraph_cell_id": cell.cell_id,
+            })
+
+    if updates:
+        await db.execute(update(ProcessLine), updates)
+    for chunk in _chunks(inserts):
+        result = await db.execute(
+            pg_insert(ProcessLine)
+            .values(chunk)
+            .on_conflict_do_nothing()
+            .returning(ProcessLine.id, ProcessLine.mxgraph_cell_id)
+        )
+        ids.update({cell_id: obj_id for obj_id, cell_id in result.all()})
+    return ids
+
+
+async def _upsert_instruments(
+    *,
+    pid: Any,
+    cells: list[PIDCell],
+    entity_id: UUID,
+    now: datetime,
+    db: AsyncSession,
+) -> dict[str, UUID]:
+    """Upsert DCS tags by name; returns ``{cell_id: dcs_tag_id}``."""
+    from app.models.pid_pfd import DCSTag
+
+    by_name: dict[str, list[PIDCell]] = {}
+    for cell in cells:
+        tag_name = _instrument_tag(cell)
+        if tag_name:
+            by_name.setdefault(tag_name, []).append(cell)
+    if not by_name:
+        return {}
+
+    existing_rows = (
+        await db.execute(
+            select(DCSTag.id, DCSTag.tag_name, DCSTag.tag_type).where(
+                DCSTag.entity_id == entity_id,
+                DCSTag.project_id.is_not_distinct_from(pid.project_id),
+                _any_of(DCSTag.tag_name, list(by_name)),
+            )
+        )
+    ).all()
+    existing = {row.tag_name: row for row in existing_rows}
+
+    name_ids: dict[str, UUID] = {}
+    updates: list[dict[str, Any]] = []
+    inserts: list[dict[str, Any]] = []
+    for tag_name, tag_cells in by_name.items():
+        props = tag_cells[-1].props
+        row = existing.get(tag_name)
+        if row is not None:
+            updates.append({
+                "id": row.id,
+                "pid_document_id": pid.id,
+                "tag_type": props.get("tag_type") or row.tag_type,
+                "updated_at": now,
+            })
+            name_ids[tag_name] = row.id
+        else:
+            inserts.append({
+                "id": uuid4(),
+                "entity_id": entity_id,
+                "project_id": pid.project_id,
+                "pid_document_id": pid.id,
+                "tag_name": tag_name,
+                "tag_type": props.get("tag_type", "other"),
+                "area": props.get("area"),
+                "source": "manual",
+            })
+
+    if updates:
+        await db.execute(update(DCSTag), updates)
+    for chunk in _chunks(inserts):
+        result = await db.execute(
+            pg_insert(DCSTag)
+            .values(chunk)
+            .on_conflict_do_nothing()
+            .returning(DCSTag.id, DCSTag.tag_name)
+        )
+        name_ids.update({tag_name: obj_id for obj_id, tag_name in result.all()})
+
+    return {
+        cell.cell_id: name_ids[tag_name]
+        for tag_name, tag_cells in by_name.items()
+        if tag_name in name_ids
+        for cell in tag_cells
+    }
+
+
+async def _resolve_endpoint_objects(
+    *,
+    pid: Any,
+    cells: dict[str, PIDCell],
+    cell_ids: set[str],
+    entity_id: UUID,
+    db: AsyncSession,
+) -> dict[str, tuple[str, UUID]]:
+    """Map unchanged endpoint cells to ``(entity_type, id)`` in three queries."""
+    from app.models.pid_pfd import DCSTag, Equipment, ProcessLine
+
+    resolved: dict[str, tuple[str, UUID]] = {}
+    by_kind: dict[str, list[str]] = {}
+    for cell_id in cell_ids:
+        cell = cells.get(cell_id)
+        if cell is not None:
+            by_kind.setdefault(cell.kind, []).append(cell_id)
+
+    if by_kind.get("equipment"):
+        rows = await db.execute(
+            select(Equipment.mxgraph_cell_id, Equipment.id).where(
+                Equipment.entity_id == entity_id,
+                Equipment.pid_document_id == pid.id,
+                _any_of(Equipment.mxgraph_cell_id, by_kind["equipment"]),
+            )
+        )
+        resolved.update({cell_id: ("equipment", obj_id) for cell_id, obj_id in rows.all()})
+
+    if by_kind.get("process_line"):
+        rows = await db.execute(
+            select(ProcessLine.mxgraph_cell_id, ProcessLine.id).where(
+                ProcessLine.entity_id == entity_id,
+                _any_of(ProcessLine.mxgraph_cell_id, by_kind["process_line"]),
+            )
+        )
+        resolved.update({cell_id: ("process_line", obj_id) for cell_id, obj_id in rows.all()})
+
+    if by_kind.get("instrument"):
+        names = {cell_id: _instrument_tag(cells[cell_id]) for cell_id in by_kind["instrument"]}
+        rows = await db.execute(
+            select(DCSTag.tag_name, DCSTag.id).where(
+                DCSTag.entity_id == entity_id,
+                DCSTag.project_id.is_not_distinct_from(pid.project_id),
+                _any_of(DCSTag.tag_name, [name for name in names.values() if name]),
+            )
+        )
+        name_ids = dict(rows.all())
+        resolved.update(
+            {cell_id: ("instrument", name_ids[name]) for cell_id, name in names.items() if name in name_ids}
+        )
+    return resolved
+
+
+async def _sync_connections(
+    *,
+    pid: Any,
+    cells: dict[str, PIDCell],
+    changed_edges: list[PIDCell],
+    removed_ids: list[str],
+    known: dict[str, tuple[str, UUID]],
+    entity_id: UUID,
+    db: AsyncSession,
+) -> set[str]:
+    """Rebuild ``PIDConnection`` rows for changed or removed edges.
+
+    An edge drawn as a process line yields ``source → line`` and
+    ``line → target`` connections so line tracing sees both ends. Returns
+    the ids of the edges skipped because an endpoint is not resolvable yet.
+    """
+    from app.models.pid_pfd import PIDConnection
+
+    stale_ids = [cell.cell_id for cell in changed_edges] + removed_ids
+    if stale_ids:
+        await db.execute(
+            delete(PIDConnection).where(
+                PIDConnection.pid_document_id == pid.id,
+                _any_of(PIDConnection.mxgraph_cell_id, stale_ids),
+            )
+        )
+
+    edges = [cell for cell in changed_edges if cell.source and cell.target]
+    if not edges:
+        return set()
+
+    endpoints = {cell.source for cell in edges} | {cell.target for cell in edges} | {cell.cell_id for cell in edges}
+    missing = {cell_id for cell_id in endpoints if cell_id not in known}
+    if missing:
+        known = {
+            **known,
+            **await _resolve_endpoint_objects(pid=pid, cells=cells, cell_ids=missing, entity_id=entity_id, db=db),
+        }
+
+    rows: list[dict[str, Any]] = []
+    unresolved: set[str] = set()
+    for edge in edges:
+        source = known.get(edge.source)
+        target = known.get(edge.target)
+        if source is None or target is None:
+            unresolved.add(edge.cell_id)
+            continue
+        connection_type = "instrument" if "instrument" in (source[0], target[0]) else "process"
+        hops = [(source, target)]
+        line = known.get(edge.cell_id)
+        if line is not None and line[0] == "process_line":
+            hops = [(source, line), (line, target)]
+        for from_obj, to_obj in hops:
+            rows.append({
+                "id": uuid4(),
+                "entity_id": entity_id,
+                "pid_document_id": pid.id,
+                "from_entity_type": from_obj[0],
+                "from_entity_id": from_obj[1],
+                "from_connection_point": edge.props.get("from_connection_point"),
+                "to_entity_type": to_obj[0],
+                "to_entity_id": to_obj[1],
+                "to_connection_point": edge.props.get("to_connection_point"),
+                "connection_type": connection_type,
+                "continuation_ref": edge.props.get("continuation_ref"),
+                "flow_direction": "forward",
+                "mxgraph_cell_id": edge.cell_id,
+            })
+    for chunk in _chunks(rows):
+        await db.execute(pg_insert(PIDConnection).values(chunk))
+    return unresolved
+
+
+async def _mark_removed_equipment(
+    *,
+    pid: Any,
+    present_ids: list[str],
+    entity_id: UUID,
+    db: AsyncSession,
+) -> int:
+    """Flag equipment whose cell left the canvas (D-093: never deleted)."""
+    from app.models.pid_pfd import Equipment
+
+    result = await db.execute(
+        update(Equipment)
+        .where(
+            Equipment.pid_document_id == pid.id,
+            Equipment.entity_id == entity_id,
+            Equipment.is_active == True,  # noqa: E712
+            Equipment.removed_from_pid == False,  # noqa: E712
+            Equipment.mxgraph_cell_id.isnot(None),
+            ~_any_of(Equipment.mxgraph_cell_id, present_ids),
+        )
+        .values(removed_from_pid=True)
+        .execution_options(synchronize_session=False)
+    )
+    removed = result.rowcount or 0
+    if removed:
+        logger.info("%d equipment removed from PID %s canvas", removed, pid.number)
+    return removed
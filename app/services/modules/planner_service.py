@@ -170,27 +170,16 @@ async def get_current_capacity(
         }
 
     # Fallback hierarchy: Installation.pob_capacity → Site.pob_capacity → Field.pob_capacity → 0
-    from app.models.asset_registry import OilField, OilSite
+    from app.services.modules.asset_hierarchy_service import get_asset_hierarchy
 
     asset = await db.get(Installation, asset_id)
     if not asset:
         return None
 
-    pob = asset.pob_capacity
-    source = "installation"
-
-    # If not set on installation, try the parent site
-    if pob is None and asset.site_id:
-        site = await db.get(OilSite, asset.site_id)
-        if site and site.pob_capacity is not None:
-            pob = site.pob_capacity
-            source = "site"
-        # If not set on site, try the parent field
-        if pob is None and site and site.field_id:
-            field = await db.get(OilField, site.field_id)
-            if field and field.pob_capacity is not None:
-                pob = field.pob_capacity
-                source = "champ"
+    pob, source = asset.pob_capacity, "installation"
+    if pob is None:
+        hierarchy = await get_asset_hierarchy(db, asset.entity_id)
+        pob, source = hierarchy.effective_pob(asset_id)
 
     return {
         "id": None,
@@ -922,36 +911,15 @@ async def get_capacity_heatmap(
         aid = UUID(str(row[0])) if not isinstance(row[0], UUID) else row[0]
         cap_history.setdefault(aid, []).append((row[3], int(row[1] or 0), int(row[2] or 0)))
 
-    # Pre-fetch fallback capacity from the asset registry hierarchy for assets
-    # without any asset_capacities row. We need site/field pob_capacity too.
-    from app.models.asset_registry import OilField, OilSite
-    site_ids = {a.site_id for a in assets if a.site_id}
-    field_ids: set[UUID] = set()
-    sites_by_id: dict[UUID, OilSite] = {}
-    if site_ids:
-        sites_result = await db.execute(select(OilSite).where(OilSite.id.in_(site_ids)))
-        for s in sites_result.scalars().all():
-            sites_by_id[s.id] = s
-            if s.field_id:
-                field_ids.add(s.field_id)
-    fields_by_id: dict[UUID, OilField] = {}
-    if field_ids:
-        fields_result = await db.execute(select(OilField).where(OilField.id.in_(field_ids)))
-        for f in fields_result.scalars().all():
-            fields_by_id[f.id] = f
+    # Fallback capacity from the cached asset hierarchy for assets without
+    # any asset_capacities row (installation → site → field pob_capacity).
+    from app.services.modules.asset_hierarchy_service import get_asset_hierarchy
+    hierarchy = await get_asset_hierarchy(db, entity_id)
 
     def fallback_capacity(asset: Installation) -> int:
         if asset.pob_capacity is not None:
             return asset.pob_capacity
-        if asset.site_id and asset.site_id in sites_by_id:
-            site = sites_by_id[asset.site_id]
-            if site.pob_capacity is not None:
-                return site.pob_capacity
-            if site.field_id and site.field_id in fields_by_id:
-                field = fields_by_id[site.field_id]
-                if field.pob_capacity is not None:
-                    return field.pob_capacity
-        return 0
+        return hierarchy.effective_pob(asset.id)[0] or 0
 
     def capacity_for_day(asset_id: UUID, day: date) -> tuple[int, int]:
         """Return (max_pax_total, permanent_ops_quota) effective on `day`."""
@@ -0,0 +1,482 @@
+"""Set-based DCS tag bulk rename with reference propagation.
+
+``run_bulk_rename`` applies a rename map (``[{"tag_id" | "old_name",
+"new_name"}]``) to the tags of one entity/project, in the caller's
+transaction:
+
+1. the tags are resolved with one query and the map is checked: unknown
+   tags, empty / too long names, two tags renamed to the same name, a tag
+   renamed onto a name another tag keeps (collisions) and rename cycles
+   (``A→B, B→A``), refused unless ``allow_cycles``;
+2. the map is staged in a temporary table;
+3. ``dcs_tags`` is renamed with one ``UPDATE … FROM stage``. When a new
+   name is also an old name of the map (chains, cycles) the tags are first
+   parked on unique placeholder names, so the (entity, project, tag_name)
+   unique constraint never sees an intermediate duplicate;
+4. the new names are propagated to every column registered in
+   ``TAG_COLUMNS`` (one ``UPDATE … FROM`` per column) and to the
+   instrument labels of the project's P&ID draw.io XML;
+5. a ``DCSTagRenameJournal`` row records the map; ``revert_bulk_rename``
+   replays it backwards.
+
+With ``dry_run`` nothing is written: the plan reports the checks and how
+many references each target would rewrite.
+"""
+
+import importlib
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID, uuid4
+from xml.sax.saxutils import escape
+
+from sqlalchemy import Column, MetaData, String, Table, Uuid, and_, exists, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.schema import CreateTable, DropTable
+
+logger = logging.getLogger(__name__)
+
+TAG_NAME_MAX_LENGTH = 100  # dcs_tags.tag_name
+_PARK_PREFIX = "~rename~"
+
+
+# ── Tag-bearing columns ──────────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class TagColumn:
+    """A column holding DCS tag names, in a table scoped by entity_id / project_id."""
+
+    label: str
+    model: str  # "package.module:Class", imported on use
+    column: str
+    only: tuple[tuple[str, tuple[str, ...]], ...] = ()  # (column, allowed values) filters
+    unique: bool = False  # unique per entity/project: new names must be free in the whole table
+
+    def resolve(self) -> Any:
+        module, _, name = self.model.partition(":")
+        return getattr(importlib.import_module(module), name)
+
+
+TAG_COLUMNS: list[TagColumn] = [
+    # Instrument records carry the tag of their DCS point.
+    TagColumn(
+        "equipment",
+        "app.models.pid_pfd:Equipment",
+        "tag",
+        only=(("equipment_type", ("instrument", "control_valve", "safety_valve")),),
+        unique=True,
+    ),
+]
+
+
+def register_tag_column(ref: TagColumn) -> None:
+    """Declare another column that must follow DCS tag renames."""
+    if ref not in TAG_COLUMNS:
+        TAG_COLUMNS.append(ref)
+
+
+# draw.io attributes whose whole value is the tag name on instrument cells.
+PID_LABEL_ATTRS = ("opsflux_tag_name", "value", "label")
+_LABEL_RE = re.compile(r'(\s(?:%s)=")([^"]*)(")' % "|".join(PID_LABEL_ATTRS))
+
+
+def _xml_attr(value: str) -> str:
+    return escape(value, {'"': "&quot;"})
+
+
+def rewrite_pid_labels(xml: str, mapping: dict[str, str]) -> tuple[str, int]:
+    """Rename label attributes equal to an old tag name, in one pass.
+
+    Returns ``(xml, replacements)``. Every attribute is looked up in the
+    original map, so swaps (``A→B, B→A``) are rewritten correctly.
+    """
+    escaped = {_xml_attr(old): _xml_attr(new) for old, new in mapping.items()}
+    count = 0
+
+    def substitute(match: re.Match) -> str:
+        nonlocal count
+        new = escaped.get(match.group(2))
+        if new is None:
+            return match.group(0)
+        count += 1
+        return f"{match.group(1)}{new}{match.group(3)}"
+
+    return _LABEL_RE.sub(substitute, xml), count
+
+
+# ── Plan ─────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class RenamePlan:
+    renames: list[dict] = field(default_factory=list)  # {"tag_id", "old_name", "new_name"}
+    errors: list[dict] = field(default_factory=list)  # {"old_name", "new_name", "code", "message"}
+    cycles: list[list[str]] = field(default_factory=list)
+    references: dict[str, int] = field(default_factory=dict)
+    applied: bool = False
+    journal_id: UUID | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "renames": self.renames,
+            "errors": self.errors,
+            "cycles": self.cycles,
+            "references": self.references,
+            "applied": self.applied,
+            "journal_id": str(self.journal_id) if self.journal_id else None,
+        }
+
+
+def find_cycles(mapping: dict[str, str]) -> list[list[str]]:
+    """Rename cycles of an ``old → new`` map, e.g. ``[["A", "B"]]`` for A→B, B→A."""
+    cycles: list[list[str]] = []
+    seen: set[str] = set()
+    for start in sorted(mapping):
+        path: list[str] = []
+        position: dict[str, int] = {}
+        node = start
+        while node in mapping and node not in seen and node not in position:
+            position[node] = len(path)
+            path.append(node)
+            node = mapping[node]
+        if node in position:
+            cycles.append(path[position[node]:])
+        seen.update(path)
+    return cycles
+
+
+def _error(entry: dict, code: str, message: str) -> dict:
+    return {
+        "tag_id": str(entry["tag_id"]) if entry.get("tag_id") else None,
+        "old_name": entry.get("old_name"),
+        "new_name": entry.get("new_name"),
+        "code": code,
+        "message": message,
+    }
+
+
+def _scope(model: Any, entity_id: UUID, project_id: UUID | None) -> list:
+    return [model.entity_id == entity_id, model.project_id.is_not_distinct_from(project_id)]
+
+
+async def _resolve(
+    db: AsyncSession,
+    entity_id: UUID,
+    project_id: UUID | None,
+    entries: list[dict],
+    plan: RenamePlan,
+) -> None:
+    """Match entries to tags (one query) and run the per-entry checks."""
+    from app.models.pid_pfd import DCSTag
+
+    ids: set[UUID] = set()
+    names: set[str] = set()
+    for entry in entries:
+        if entry.get("tag_id"):
+            try:
+                ids.add(UUID(str(entry["tag_id"])))
+            except ValueError:
+                pass
+        elif entry.get("old_name"):
+            names.add(entry["old_name"])
+    rows = (await db.execute(
+        select(DCSTag.id, DCSTag.tag_name).where(
+            *_scope(DCSTag, entity_id, project_id),
+            or_(DCSTag.id.in_(ids), DCSTag.tag_name.in_(names)),
+        )
+    )).all()
+    by_id = {row.id: row.tag_name for row in rows}
+    by_name = {row.tag_name: row.id for row in rows}
+
+    resolved: list[dict] = []
+    for entry in entries:
+        tag_id = None
+        if entry.get("tag_id"):
+            try:
+                tag_id = UUID(str(entry["tag_id"]))
+            except ValueError:
+                tag_id = None
+            tag_id = tag_id if tag_id in by_id else None
+        elif entry.get("old_name"):
+            tag_id = by_name.get(entry["old_name"])
+        if tag_id is None:
+            plan.errors.append(_error(entry, "TAG_NOT_FOUND", "Tag not found in this project"))
+            continue
+        old_name = by_id[tag_id]
+        new_name = (entry.get("new_name") or "").strip()
+        row = {"tag_id": str(tag_id), "old_name": old_name, "new_name": new_name}
+        if entry.get("expect_name") is not None and entry["expect_name"] != old_name:
+            plan.errors.append(_error(row, "TAG_CHANGED", f"Tag was renamed since, now {old_name}"))
+        elif not new_name:
+            plan.errors.append(_error(row, "EMPTY_NAME", "New tag name is empty"))
+        elif len(new_name) > TAG_NAME_MAX_LENGTH:
+            plan.errors.append(_error(row, "NAME_TOO_LONG", f"New tag name exceeds {TAG_NAME_MAX_LENGTH} characters"))
+        elif new_name != old_name:
+            resolved.append(row)
+
+    seen_tags: dict[str, dict] = {}
+    targets: dict[str, list[dict]] = {}
+    for row in resolved:
+        if row["tag_id"] in seen_tags:
+            plan.errors.append(_error(row, "DUPLICATE_TAG", "Tag listed more than once"))
+            continue
+        seen_tags[row["tag_id"]] = row
+        targets.setdefault(row["new_name"], []).append(row)
+    for new_name, rows_for_name in targets.items():
+        if len(rows_for_name) > 1:
+            for row in rows_for_name:
+                plan.errors.append(_error(row, "DUPLICATE_TARGET", f"Several tags renamed to {new_name}"))
+    plan.renames = [rows_for_name[0] for rows_for_name in targets.values() if len(rows_for_name) == 1]
+
+
+# ── Staging ──────────────────────────────────────────────────────────────
+
+_stage_meta = MetaData()
+_stage = Table(
+    "_tag_rename_stage", _stage_meta,
+    Column("tag_id", Uuid, primary_key=True),
+    Column("old_name", String(TAG_NAME_MAX_LENGTH), nullable=False),
+    Column("new_name", String(TAG_NAME_MAX_LENGTH), nullable=False),
+    Column("park_name", String(TAG_NAME_MAX_LENGTH), nullable=False),
+    prefixes=["TEMPORARY"],
+)
+
+
+async def _create_stage(db: AsyncSession, renames: list[dict]) -> None:
+    await db.execute(DropTable(_stage, if_exists=True))
+    await db.execute(CreateTable(_stage))
+    await db.execute(insert(_stage), [
+        {
+            "tag_id": UUID(r["tag_id"]), "old_name": r["old_name"], "new_name": r["new_name"],
+            "park_name": f"{_PARK_PREFIX}{UUID(r['tag_id']).hex}",
+        }
+        for r in renames
+    ])
+
+
+async def _drop_stage(db: AsyncSession) -> None:
+    await db.execute(DropTable(_stage, if_exists=True))
+
+
+async def _check_collisions(db: AsyncSession, entity_id: UUID, project_id: UUID | None, plan: RenamePlan) -> None:
+    """New names already held by a tag (or a unique reference) that is not renamed away."""
+    from app.models.pid_pfd import DCSTag
+
+    stage = _stage.c
+    taken = {
+        name: "dcs_tags"
+        for name in (await db.execute(
+            select(stage.new_name)
+            .join(DCSTag, DCSTag.tag_name == stage.new_name)
+            .where(*_scope(DCSTag, entity_id, project_id), DCSTag.id.not_in(select(stage.tag_id)))
+        )).scalars()
+    }
+    for ref in TAG_COLUMNS:
+        if not ref.unique:
+            continue
+        model = ref.resolve()
+        moving, holder = aliased(model), aliased(model)
+        moving_col, holder_col = getattr(moving, ref.column), getattr(holder, ref.column)
+        # A row of this column follows the rename onto a value another row keeps.
+        for name in (await db.execute(
+            select(stage.new_name)
+            .join(moving, moving_col == stage.old_name)
+            .join(holder, holder_col == stage.new_name)
+            .where(
+                *_scope(moving, entity_id, project_id), *_column_filters(ref, moving),
+                *_scope(holder, entity_id, project_id),
+                ~and_(holder_col.in_(select(stage.old_name)), *_column_filters(ref, holder)),
+            )
+            .distinct()
+        )).scalars():
+            taken.setdefault(name, ref.label)
+    for row in plan.renames:
+        holder = taken.get(row["new_name"])
+        if holder == "dcs_tags":
+            plan.errors.append(_error(row, "NAME_TAKEN", f"{row['new_name']} already exists in this project"))
+        elif holder:
+            plan.errors.append(_error(
+                row, "REFERENCE_NAME_TAKEN", f"{row['new_name']} is already used in {holder}",
+            ))
+
+
+# ── Apply ────────────────────────────────────────────────────────────────
+
+
+def _column_filters(ref: TagColumn, model: Any) -> list:
+    return [getattr(model, name).in_(values) for name, values in ref.only]
+
+
+async def _update_from_stage(db: AsyncSession, model: Any, target: str, match: Any, conditions: list, value: Any) -> int:
+    result = await db.execute(
+        update(model)
+        .where(match, *conditions)
+        .values({target: value})
+        .execution_options(synchronize_session=False)
+    )
+    return max(result.rowcount or 0, 0)
+
+
+async def _rename_column(
+    db: AsyncSession, model: Any, target: str, key: Any, stage_key: Any, conditions: list, parked: bool,
+) -> int:
+    """``SET target = stage.new_name WHERE key = stage_key``, via placeholders when ``parked``."""
+    stage = _stage.c
+    if not parked:
+        return await _update_from_stage(db, model, target, key == stage_key, conditions, stage.new_name)
+    await _update_from_stage(db, model, target, key == stage_key, conditions, stage.park_name)
+    park_key = stage.park_name if stage_key is stage.old_name else stage_key
+    return await _update_from_stage(db, model, target, key == park_key, conditions, stage.new_name)
+
+
+async def _count_column(db: AsyncSession, ref: TagColumn, entity_id: UUID, project_id: UUID | None) -> int:
+    model = ref.resolve()
+    column = getattr(model, ref.column)
+    return (await db.execute(
+        select(func.count())
+        .select_from(model)
+        .join(_stage, column == _stage.c.old_name)
+        .where(*_scope(model, entity_id, project_id), *_column_filters(ref, model))
+    )).scalar() or 0
+
+
+async def _rewrite_pid_documents(
+    db: AsyncSession, entity_id: UUID, project_id: UUID | None, mapping: dict[str, str], dry_run: bool,
+) -> tuple[int, int]:
+    """Rewrite P&ID labels; returns (documents changed, labels rewritten)."""
+    from app.models.pid_pfd import PIDDocument
+
+    # The database narrows the scan to documents mentioning an old name;
+    # the XML of each candidate is then loaded one at a time.
+    candidates = (await db.execute(
+        select(PIDDocument.id).where(
+            *_scope(PIDDocument, entity_id, project_id),
+            PIDDocument.is_active.is_(True),
+            exists().where(PIDDocument.xml_content.contains(_stage.c.old_name)),
+        )
+    )).scalars().all()
+    documents = labels = 0
+    for doc_id in candidates:
+        xml = (await db.execute(select(PIDDocument.xml_content).where(PIDDocument.id == doc_id))).scalar_one()
+        new_xml, count = rewrite_pid_labels(xml or "", mapping)
+        if not count:
+            continue
+        documents += 1
+        labels += count
+        if not dry_run:
+            await db.execute(
+                update(PIDDocument)
+                .where(PIDDocument.id == doc_id)
+                .values(xml_content=new_xml)
+                .execution_options(synchronize_session=False)
+            )
+    return documents, labels
+
+
+async def run_bulk_rename(
+    db: AsyncSession,
+    *,
+    entity_id: UUID,
+    project_id: UUID | None,
+    renames: list[dict],
+    user_id: UUID | None = None,
+    dry_run: bool = False,
+    allow_cycles: bool = False,
+    reverts_id: UUID | None = None,
+) -> RenamePlan:
+    """Check, then (unless ``dry_run`` or a check failed) apply ``renames``.
+
+    Entries identify the tag by ``tag_id`` or ``old_name``. Does not
+    commit; the caller owns the transaction.
+    """
+    from app.models.pid_pfd import DCSTag, DCSTagRenameJournal
+
+    plan = RenamePlan()
+    await _resolve(db, entity_id, project_id, renames, plan)
+    plan.cycles = find_cycles({r["old_name"]: r["new_name"] for r in plan.renames})
+    if plan.cycles and not allow_cycles:
+        for cycle in plan.cycles:
+            plan.errors.append({
+                "tag_id": None, "old_name": cycle[0], "new_name": None, "code": "RENAME_CYCLE",
+                "message": "Rename cycle: " + " → ".join([*cycle, cycle[0]]),
+            })
+    if not plan.renames:
+        return plan
+
+    await _create_stage(db, plan.renames)
+    await _check_collisions(db, entity_id, project_id, plan)
+    mapping = {r["old_name"]: r["new_name"] for r in plan.renames}
+
+    if dry_run or plan.errors:
+        if dry_run:
+            plan.references["dcs_tags"] = len(plan.renames)
+            for ref in TAG_COLUMNS:
+                plan.references[ref.label] = await _count_column(db, ref, entity_id, project_id)
+            documents, labels = await _rewrite_pid_documents(db, entity_id, project_id, mapping, dry_run=True)
+            plan.references.update(pid_documents=documents, pid_labels=labels)
+        await _drop_stage(db)
+        return plan
+
+    stage = _stage.c
+    parked = bool(set(mapping) & set(mapping.values()))
+    plan.references["dcs_tags"] = await _rename_column(
+        db, DCSTag, "tag_name", DCSTag.id, stage.tag_id, _scope(DCSTag, entity_id, project_id), parked,
+    )
+    for ref in TAG_COLUMNS:
+        model = ref.resolve()
+        plan.references[ref.label] = await _rename_column(
+            db, model, ref.column, getattr(model, ref.column), stage.old_name,
+            [*_scope(model, entity_id, project_id), *_column_filters(ref, model)], parked,
+        )
+    documents, labels = await _rewrite_pid_documents(db, entity_id, project_id, mapping, dry_run=False)
+    plan.references.update(pid_documents=documents, pid_labels=labels)
+    await _drop_stage(db)
+
+    plan.journal_id = uuid4()
+    await db.execute(insert(DCSTagRenameJournal).values(
+        id=plan.journal_id,
+        entity_id=entity_id,
+        project_id=project_id,
+        renames=plan.renames,
+        references=plan.references,
+        reverts_id=reverts_id,
+        created_by=user_id,
+    ))
+    plan.applied = True
+    logger.info(
+        "Bulk tag rename: %d tags, references %s (project %s, by user %s, journal %s)",
+        len(plan.renames), plan.references, project_id, user_id, plan.journal_id,
+    )
+    return plan
+
+
+async def revert_bulk_rename(db: AsyncSession, *, journal: Any, user_id: UUID | None = None) -> RenamePlan:
+    """Undo an applied rename from its journal entry.
+
+    Refused (``TAG_CHANGED``) for any tag renamed again since. Does not
+    commit.
+    """
+    if journal.reverted_at is not None:
+        return RenamePlan(errors=[{
+            "tag_id": None, "old_name": None, "new_name": None, "code": "ALREADY_REVERTED",
+            "message": "This rename was already reverted",
+        }])
+    plan = await run_bulk_rename(
+        db,
+        entity_id=journal.entity_id,
+        project_id=journal.project_id,
+        renames=[
+            {"tag_id": r["tag_id"], "new_name": r["old_name"], "expect_name": r["new_name"]}
+            for r in journal.renames
+        ],
+        user_id=user_id,
+        allow_cycles=True,  # the inverse of an applied map is always applicable
+        reverts_id=journal.id,
+    )
+    if plan.applied:
+        journal.reverted_at = datetime.now(timezone.utc)
+    return plan
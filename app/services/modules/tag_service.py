@@ -115,6 +115,7 @@ async def create_tag(
     )
     db.add(tag)
     await db.commit()
+    await _invalidate_graph(entity_id, tag.project_id)
     return tag
 
 
@@ -138,6 +139,7 @@ async def update_tag(
     if not tag:
         from fastapi import HTTPException
         raise HTTPException(404, f"DCS tag {tag_id} not found")
+    previous_project_id = tag.project_id
 
     update_data = body.model_dump(exclude_unset=True)
     for key, value in update_data.items():
@@ -146,6 +148,9 @@ async def update_tag(
 
     tag.updated_at = datetime.now(timezone.utc)
     await db.commit()
+    await _invalidate_graph(entity_id, previous_project_id)
+    if tag.project_id != previous_project_id:
+        await _invalidate_graph(entity_id, tag.project_id)
     return tag
 
 
@@ -172,6 +177,14 @@ async def delete_tag(
     tag.is_active = False
     tag.updated_at = datetime.now(timezone.utc)
     await db.commit()
+    await _invalidate_graph(entity_id, tag.project_id)
+
+
+async def _invalidate_graph(entity_id: UUID, project_id: UUID | None) -> None:
+    """Drop the cached PID connectivity graph after a tag edit."""
+    from app.services.modules.pid_graph_service import invalidate_project_graph
+
+    await invalidate_project_graph(entity_id, project_id)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -543,6 +556,7 @@ async def import_tags_from_csv(
             stats["created"] += 1
 
     await db.commit()
+    await _invalidate_graph(entity_id, UUID(project_id))
 
     logger.info(
         "CSV import: %d created, %d updated, %d errors, %d skipped",
@@ -565,11 +579,12 @@ async def preview_bulk_rename(
     filter_pattern: str | None = None,
     rename_pattern: str,
     db: AsyncSession,
-) -> list[dict]:
-    """Preview the result of a bulk rename operation."""
+) -> dict:
+    """Preview a bulk rename: new names, collisions / cycles and references to rewrite."""
     from app.models.pid_pfd import DCSTag
+    from app.services.modules.tag_rename_engine import run_bulk_rename
 
-    query = select(DCSTag).where(
+    query = select(DCSTag.id, DCSTag.tag_name).where(
         DCSTag.entity_id == entity_id,
         DCSTag.project_id == UUID(project_id),
         DCSTag.is_active == True,  # noqa: E712
@@ -585,54 +600,93 @@ async def preview_bulk_rename(
         query = query.where(DCSTag.tag_name.ilike(sql_pattern))
 
     result = await db.execute(query.order_by(DCSTag.tag_name))
-    tags = result.scalars().all()
 
     preview = []
-    for tag in tags:
-        new_name = _apply_rename_pattern(tag.tag_name, rename_pattern)
-        if new_name != tag.tag_name:
+    for tag_id, tag_name in result.all():
+        new_name = _apply_rename_pattern(tag_name, rename_pattern)
+        if new_name != tag_name:
             preview.append({
-                "tag_id": str(tag.id),
-                "old_name": tag.tag_name,
+                "tag_id": str(tag_id),
+                "old_name": tag_name,
                 "new_name": new_name,
             })
 
-    return preview
+    plan = await run_bulk_rename(
+        db, entity_id=entity_id, project_id=UUID(project_id), renames=preview, dry_run=True,
+    )
+    return {
+        "preview": preview,
+        "errors": plan.errors,
+        "cycles": plan.cycles,
+        "references": plan.references,
+    }
 
 
 async def execute_bulk_rename(
     *,
     entity_id: UUID,
     project_id: str,
-    renames: list[dict],  # [{"tag_id": "...", "new_name": "..."}]
+    renames: list[dict],  # [{"tag_id" | "old_name": "...", "new_name": "..."}]
     user_id: UUID,
     db: AsyncSession,
+    allow_cycles: bool = False,
 ) -> dict:
-    """Execute a bulk rename and update all references."""
-    from app.models.pid_pfd import DCSTag
+    """Execute a bulk rename and update all references (journaled, revertible).
 
-    renamed = 0
-    for entry in renames:
-        tag_result = await db.execute(
-            select(DCSTag).where(
-                DCSTag.id == UUID(entry["tag_id"]),
-                DCSTag.entity_id == entity_id,
-            )
+    Nothing is renamed when any entry fails the checks (unknown tag,
+    collision, cycle); the errors are returned instead.
+    """
+    from app.services.modules.tag_rename_engine import run_bulk_rename
+
+    plan = await run_bulk_rename(
+        db,
+        entity_id=entity_id,
+        project_id=UUID(project_id),
+        renames=renames,
+        user_id=user_id,
+        allow_cycles=allow_cycles,
+    )
+    if plan.applied:
+        await db.commit()
+        await _invalidate_graph(entity_id, UUID(project_id))
+    else:
+        await db.rollback()
+    return {
+        "renamed": len(plan.renames) if plan.applied else 0,
+        "total_requested": len(renames),
+        **plan.to_dict(),
+    }
+
+
+async def revert_bulk_rename(
+    *,
+    entity_id: UUID,
+    journal_id: str | UUID,
+    user_id: UUID,
+    db: AsyncSession,
+) -> dict:
+    """Undo a bulk rename from its journal entry."""
+    from app.models.pid_pfd import DCSTagRenameJournal
+    from app.services.modules.tag_rename_engine import revert_bulk_rename as revert
+
+    result = await db.execute(
+        select(DCSTagRenameJournal).where(
+            DCSTagRenameJournal.id == UUID(str(journal_id)),
+            DCSTagRenameJournal.entity_id == entity_id,
         )
-        tag = tag_result.scalar_one_or_none()
-        if tag:
-            old_name = tag.tag_name
-            tag.tag_name = entry["new_name"]
-            tag.updated_at = datetime.now(timezone.utc)
-            renamed += 1
-
-            logger.info(
-                "Renamed tag %s → %s (project %s, by user %s)",
-                old_name, entry["new_name"], project_id, user_id,
-            )
+    )
+    journal = result.scalar_one_or_none()
+    if not journal:
+        from fastapi import HTTPException
+        raise HTTPException(404, f"Rename journal {journal_id} not found")
 
-    await db.commit()
-    return {"renamed": renamed, "total_requested": len(renames)}
+    plan = await revert(db, journal=journal, user_id=user_id)
+    if plan.applied:
+        await db.commit()
+        await _invalidate_graph(entity_id, journal.project_id)
+    else:
+        await db.rollback()
+    return {"reverted": len(plan.renames) if plan.applied else 0, **plan.to_dict()}
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -723,11 +777,12 @@ def _get_seq_digits(pattern: str) -> int:
 def _apply_rename_pattern(old_name: str, pattern: str) -> str:
     """Apply a rename pattern like 'ZONE-A-* → ZONE-B-*'."""
     if " → " in pattern or " -> " in pattern:
-        parts = re.split(r"\s*[→\->]+\s*", pattern, maxsplit=1)
+        # Split on the arrow only: tag patterns themselves contain "-".
+        parts = re.split(r"\s+(?:→|->)\s+", pattern, maxsplit=1)
         if len(parts) == 2:
             from_pat, to_pat = parts
             # Convert glob to regex
-            from_regex = from_pat.replace("*", "(.*)").replace("?", "(.)")
+            from_regex = re.escape(from_pat).replace(r"\*", "(.*)").replace(r"\?", "(.)")
             match = re.fullmatch(from_regex, old_name, re.IGNORECASE)
             if match:
                 result = to_pat
@@ -320,7 +320,8 @@ async def generate_pax_manifest_from_ads(
     Steps:
     1. Load the voyage to get departure date and destination stops
     2. Find approved AdS PAX matching date range and destination
-    3. Order by priority_score DESC
+    3. Order by priority score DESC — recomputed in one batch
+       (``compute_pax_priorities``) except for manual overrides
     4. Create or find existing draft PAX manifest
     5. Add passengers (skip duplicates)
 
@@ -381,7 +382,8 @@ async def generate_pax_manifest_from_ads(
     pax_query = text(
         """
         SELECT ap.id AS ads_pax_id, ap.user_id, ap.contact_id,
-               ap.priority_score,
+               ap.priority_score, ap.priority_source,
+               COALESCE(u.last_name, tc.last_name) AS last_name,
                COALESCE(
                    u.first_name || ' ' || u.last_name,
                    tc.first_name || ' ' || tc.last_name
@@ -418,6 +420,22 @@ async def generate_pax_manifest_from_ads(
     )
     ads_pax_rows = pax_result.all()
 
+    # Rank on fresh scores; an arbitrator's manual override wins.
+    from app.services.modules.paxlog_service import compute_pax_priorities
+
+    fresh_scores = await compute_pax_priorities(
+        db,
+        [row[0] for row in ads_pax_rows if row[4] != "manual_override"],
+        persist=False,
+    )
+    ads_pax_rows = sorted(
+        (
+            (*row[:3], fresh_scores.get(row[0], row[3] or 0), *row[4:])
+            for row in ads_pax_rows
+        ),
+        key=lambda row: (-(row[3] or 0), row[5] or ""),
+    )
+
     # Get existing passengers to skip duplicates
     existing_result = await db.execute(
         select(ManifestPassenger.ads_pax_id).where(
@@ -431,7 +449,7 @@ async def generate_pax_manifest_from_ads(
     skipped_count = 0
 
     for row in ads_pax_rows:
-        ads_pax_id, user_id, contact_id, priority_score, name, company = row
+        ads_pax_id, user_id, contact_id, priority_score, _source, _last_name, name, company = row
 
         if str(ads_pax_id) in existing_ads_pax_ids:
             skipped_count += 1
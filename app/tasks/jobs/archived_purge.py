@@ -3,18 +3,26 @@
 Runs weekly by default (Sunday 04:00). For each entity type with a
 delete_policy of mode=soft_purge, physically deletes records that have
 been archived longer than retention_days.
+
+Each table is purged in keyset-ordered chunks with a short pause between
+them; the whole run is capped by ``RUN_TIME_BUDGET_SECONDS`` and an
+unfinished table resumes from its checkpoint next week.
 """
 
 import logging
+import time
 
 from sqlalchemy import select, text
 
 from app.core.database import async_session_factory
 from app.models.common import Setting
-from app.services.core.delete_service import ENTITY_TYPE_REGISTRY, purge_archived
+from app.services.core.delete_service import _ensure_registry, purge_archived_report
 
 logger = logging.getLogger(__name__)
 
+RUN_TIME_BUDGET_SECONDS = 30 * 60
+CHUNK_SLEEP_SECONDS = 0.05
+
 
 async def purge_archived_records() -> None:
     """Iterate over all soft_purge policies and purge eligible archived records."""
@@ -30,6 +38,8 @@ async def purge_archived_records() -> None:
             )
             policies = result.scalars().all()
 
+            registry = _ensure_registry()
+            deadline = time.monotonic() + RUN_TIME_BUDGET_SECONDS
             total_purged = 0
             for setting in policies:
                 value = setting.value
@@ -41,15 +51,25 @@ async def purge_archived_records() -> None:
                 entity_type = setting.key.replace("delete_policy.", "")
                 retention_days = value.get("retention_days", 90)
 
-                if entity_type not in ENTITY_TYPE_REGISTRY:
+                if entity_type not in registry:
                     logger.warning("archived_purge: unknown entity type %s, skipping", entity_type)
                     continue
 
                 if retention_days <= 0:
                     continue
 
-                count = await purge_archived(entity_type, retention_days, db)
-                total_purged += count
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.info("archived_purge: time budget exhausted, %s deferred", entity_type)
+                    continue
+
+                report = await purge_archived_report(
+                    entity_type, retention_days, db,
+                    sleep_seconds=CHUNK_SLEEP_SECONDS,
+                    time_budget_seconds=remaining,
+                )
+                if report is not None:
+                    total_purged += report.purged
 
             if total_purged > 0:
                 logger.info("archived_purge: total %d records purged", total_purged)
@@ -9,17 +9,21 @@ Retention window is configurable via Setting key
 purge entirely — useful for self-hosted deployments with indefinite
 retention requirements.
 
-Runs in batches of 10 000 rows to avoid holding a single long
-transaction on a growing table; reports the total purged to logs so
-the nightly run is visible in `scheduled_task_runs`.
+``audit_log`` is partitioned by month: expired months are detached and
+dropped whole, and only the month straddling the cutoff is trimmed with
+a DELETE (see ``app.core.audit.purge_audit_log_before``). The run also
+pre-creates the upcoming monthly partitions so inserts never fall into
+the DEFAULT partition.
 """
 
 from __future__ import annotations
 
 import logging
+from datetime import UTC, datetime, timedelta
 
 from sqlalchemy import select, text
 
+from app.core.audit import ensure_audit_partitions, purge_audit_log_before
 from app.core.database import async_session_factory
 from app.models.common import Setting
 
@@ -27,11 +31,10 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_RETENTION_DAYS = 365
 SETTING_KEY = "audit_log.retention_days"
-BATCH_SIZE = 10_000
 
 
 async def purge_old_audit_logs() -> None:
-    """Delete audit_log rows older than the configured retention window."""
+    """Drop audit_log partitions older than the configured retention window."""
     logger.debug("audit_log_retention: starting run")
 
     try:
@@ -59,6 +62,10 @@ async def purge_old_audit_logs() -> None:
                         SETTING_KEY, setting_row.value, DEFAULT_RETENTION_DAYS,
                     )
 
+            created = await ensure_audit_partitions(db)
+            if created:
+                logger.info("audit_log_retention: created partitions %s", ", ".join(created))
+
             if retention_days <= 0:
                 logger.info(
                     "audit_log_retention: disabled (retention_days=%d)",
@@ -66,37 +73,15 @@ async def purge_old_audit_logs() -> None:
                 )
                 return
 
-            # Delete in batches so a huge backlog doesn't blow up the
-            # transaction log. PostgreSQL's CTE-delete pattern keeps it
-            # atomic per batch.
-            total = 0
-            while True:
-                result = await db.execute(
-                    text(
-                        """
-                        WITH victims AS (
-                            SELECT id FROM audit_log
-                            WHERE created_at < NOW() - make_interval(days => :days)
-                            ORDER BY created_at ASC
-                            LIMIT :batch
-                        )
-                        DELETE FROM audit_log
-                        WHERE id IN (SELECT id FROM victims)
-                        """
-                    ),
-                    {"days": retention_days, "batch": BATCH_SIZE},
-                )
-                # SQLAlchemy returns rowcount from the DELETE.
-                deleted = result.rowcount or 0
-                await db.commit()
-                total += deleted
-                if deleted < BATCH_SIZE:
-                    break
-
-            if total > 0:
+            cutoff = datetime.now(UTC) - timedelta(days=retention_days)
+            dropped, trimmed = await purge_audit_log_before(db, cutoff)
+            await db.commit()
+
+            if dropped or trimmed:
                 logger.info(
-                    "audit_log_retention: purged %d entries older than %d days",
-                    total, retention_days,
+                    "audit_log_retention: dropped %d partition(s) [%s] and %d "
+                    "entries older than %d days",
+                    len(dropped), ", ".join(dropped), trimmed, retention_days,
                 )
             else:
                 logger.debug(
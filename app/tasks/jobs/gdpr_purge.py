@@ -5,7 +5,7 @@ in entity settings (gdpr.retention_*).
 
 Purge targets:
 - audit_log: gdpr.retention_audit_months (default 36)
-- login_events: gdpr.retention_sessions_months (default 6)
+- login_events (and their login_event_hourly rollups): gdpr.retention_sessions_months (default 6)
 - user_sessions: gdpr.retention_sessions_months (default 6)
 - notifications: gdpr.retention_notifications_months (default 3)
 - Inactive users: gdpr.retention_inactive_accounts_months (default 24)
@@ -72,13 +72,14 @@ async def gdpr_retention_purge() -> None:
 
             # 1. Purge old audit logs
             cutoff = datetime.now(UTC) - timedelta(days=audit_months * 30)
-            result = await db.execute(
-                text("DELETE FROM audit_log WHERE created_at < :cutoff"),
-                {"cutoff": cutoff},
-            )
-            count = result.rowcount or 0
-            if count:
-                logger.info("gdpr_purge: deleted %d audit_log entries older than %d months", count, audit_months)
+            from app.core.audit import purge_audit_log_before
+
+            dropped, count = await purge_audit_log_before(db, cutoff)
+            if dropped or count:
+                logger.info(
+                    "gdpr_purge: dropped %d audit_log partition(s) and deleted %d entries older than %d months",
+                    len(dropped), count, audit_months,
+                )
             total += count
 
             # 2. Purge old login events
@@ -91,6 +92,11 @@ async def gdpr_retention_purge() -> None:
             if count:
                 logger.info("gdpr_purge: deleted %d login_events older than %d months", count, session_months)
             total += count
+            # Their hourly rollups carry IP sketches: same retention.
+            await db.execute(
+                text("DELETE FROM login_event_hourly WHERE bucket_start < :cutoff"),
+                {"cutoff": cutoff},
+            )
 
             # 3. Purge expired sessions
             result = await db.execute(
@@ -1,8 +1,9 @@
 """Auto-sync job for Gouti-imported projects.
 
 Runs on a fixed interval (controlled by APScheduler) and iterates over every
-entity that has the Gouti integration enabled, calling the same upsert path
-as the manual POST /api/v1/gouti/sync route.
+entity that has the Gouti integration enabled, calling the same sync engine
+as the manual POST /api/v1/gouti/sync route (batched upserts, projects whose
+Gouti content is unchanged since the last run are skipped).
 
 Each entity can opt in/out via ``integration.gouti.auto_sync_enabled`` and
 tune the effective interval via ``integration.gouti.auto_sync_interval_minutes``.
@@ -68,7 +69,7 @@ async def run_gouti_auto_sync() -> None:
     """
     # Lazy import to break circular dependency: gouti_sync imports models which
     # are heavy and we want this module to stay cheap to import at startup.
-    from app.api.routes.core.gouti_sync import _upsert_project_from_gouti
+    from app.api.routes.core.gouti_sync import _sync_gouti_projects
 
     async with async_session_factory() as db:
         try:
@@ -110,39 +111,31 @@ async def run_gouti_auto_sync() -> None:
 
                 logger.info("Gouti auto-sync: starting for entity %s (%s)", entity.id, entity.code)
 
-                connector = create_gouti_connector(settings)
-                try:
-                    gouti_projects = await connector.get_projects()
-                except Exception as exc:
-                    logger.warning(
-                        "Gouti auto-sync: fetch failed for entity %s: %s",
-                        entity.id, exc,
-                    )
-                    continue
-
-                synced_count = 0
-                for gp in gouti_projects:
+                async with create_gouti_connector(settings) as connector:
                     try:
-                        await _upsert_project_from_gouti(db, entity.id, gp)
-                        synced_count += 1
+                        gouti_projects = await connector.get_projects()
                     except Exception as exc:
                         logger.warning(
-                            "Gouti auto-sync: upsert failed for entity %s, project %s: %s",
-                            entity.id, gp.get("_id") or gp.get("id") or "?", exc,
+                            "Gouti auto-sync: fetch failed for entity %s: %s",
+                            entity.id, exc,
                         )
+                        continue
 
-                try:
-                    await db.commit()
-                except SQLAlchemyError:
-                    await db.rollback()
-                    logger.exception("Gouti auto-sync: commit failed for entity %s", entity.id)
-                    continue
+                    try:
+                        result = await _sync_gouti_projects(db, entity.id, connector, gouti_projects)
+                    except SQLAlchemyError:
+                        await db.rollback()
+                        logger.exception("Gouti auto-sync: commit failed for entity %s", entity.id)
+                        continue
+
+                for error in result.errors:
+                    logger.warning("Gouti auto-sync: entity %s — %s", entity.id, error)
 
-                await _persist_last_run(db, entity.id, now.isoformat(), synced_count)
+                await _persist_last_run(db, entity.id, now.isoformat(), result.synced + result.skipped)
 
                 logger.info(
-                    "Gouti auto-sync: entity %s → %d projects synced",
-                    entity.id, synced_count,
+                    "Gouti auto-sync: entity %s → %d projects synced, %d unchanged (%.0f ms)",
+                    entity.id, result.synced, result.skipped, result.duration_ms,
                 )
             except Exception:
                 logger.exception("Gouti auto-sync: unexpected error for entity %s", entity.id)
@@ -151,19 +151,13 @@ async def _dispatch_reminder(
     db, *, moc, days_remaining: int, threshold: int,
 ) -> int:
     """Send in-app + email reminder. Returns the number of recipients reached."""
-    from app.api.deps import has_user_permission
     from app.core.email_templates import render_and_send_email
     from app.core.notifications import send_in_app_bulk
+    from app.core.rbac import users_with_permission
     from app.models.common import User
     from app.models.moc import MOCSiteAssignment
 
-    # Build recipient list: site assignments first, permission scan otherwise
-    users = (
-        await db.execute(
-            select(User).where(User.active == True)  # noqa: E712
-        )
-    ).scalars().all()
-
+    # Build recipient list: site assignments first, permission holders otherwise
     site_user_ids: set[UUID] = set()
     rows = (
         await db.execute(
@@ -177,18 +171,18 @@ async def _dispatch_reminder(
     ).all()
     site_user_ids = {r[0] for r in rows}
 
-    recipients: list[User] = []
     if site_user_ids:
-        recipients = [u for u in users if u.id in site_user_ids]
+        recipient_ids = site_user_ids
     else:
-        for user in users:
-            try:
-                if await has_user_permission(
-                    user, moc.entity_id, "moc.site_chief.approve", db,
-                ):
-                    recipients.append(user)
-            except Exception:
-                continue
+        recipient_ids = await users_with_permission(moc.entity_id, "moc.site_chief.approve", db)
+
+    recipients: list[User] = []
+    if recipient_ids:
+        recipients = list((
+            await db.execute(
+                select(User).where(User.id.in_(recipient_ids), User.active == True)  # noqa: E712
+            )
+        ).scalars().all())
 
     # Always include the initiator so they remember their own MOC is expiring
     initiator = await db.get(User, moc.initiator_id)
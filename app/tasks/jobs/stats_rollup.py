@@ -0,0 +1,38 @@
+"""Scheduled jobs — statistics rollups (see ``app.services.core.stats_rollup``).
+
+* ``rollup_login_events_job`` — every 10 min, appends the closed hours of
+  ``login_events`` to ``login_event_hourly``.
+* ``reconcile_ticket_counters_job`` — daily, recounts
+  ``support_ticket_counters`` from the tickets (bulk statements bypass the
+  ORM events that maintain them).
+"""
+
+import logging
+
+from app.core.database import async_session_factory
+
+logger = logging.getLogger(__name__)
+
+
+async def rollup_login_events_job() -> None:
+    """Catch the login-event hourly buckets up with the clock."""
+    from app.services.core.stats_rollup import rollup_login_events
+
+    try:
+        async with async_session_factory() as db:
+            written = await rollup_login_events(db)
+            if written:
+                logger.info("stats_rollup: wrote %d login-event hourly bucket(s)", written)
+    except Exception:
+        logger.exception("stats_rollup: login-event rollup failed")
+
+
+async def reconcile_ticket_counters_job() -> None:
+    """Rewrite the support ticket counters that drifted from the tickets."""
+    from app.services.core.stats_rollup import reconcile_ticket_counters
+
+    try:
+        async with async_session_factory() as db:
+            await reconcile_ticket_counters(db)
+    except Exception:
+        logger.exception("stats_rollup: ticket counter reconciliation failed")
@@ -374,6 +374,26 @@ def _register_jobs() -> None:
         max_instances=1,
     )
 
+    # Dashboard statistics rollups — login-event hourly buckets every
+    # 10 min, nightly support ticket counter reconciliation at 04:30.
+    from app.tasks.jobs.stats_rollup import reconcile_ticket_counters_job, rollup_login_events_job
+    scheduler.add_job(
+        rollup_login_events_job,
+        trigger=IntervalTrigger(minutes=10),
+        id="login_event_rollup",
+        name="Agréger les événements de connexion par heure",
+        replace_existing=True,
+        max_instances=1,
+    )
+    scheduler.add_job(
+        reconcile_ticket_counters_job,
+        trigger=CronTrigger(hour=4, minute=30),
+        id="ticket_counter_reconcile",
+        name="Réconcilier les compteurs de tickets support",
+        replace_existing=True,
+        max_instances=1,
+    )
+
     scheduler.add_job(
         _renew_scheduler_leader_lock,
         trigger=IntervalTrigger(seconds=max(30, settings.SCHEDULER_LEADER_TTL_SECONDS // 3)),
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Benchmark AI chat tool retrieval and streaming time-to-first-byte.
+
+Tool retrieval, over the real OpsFlux MCP tool list
+(``app.mcp.opsflux_tools.OPSFLUX_TOOLS_LIST``):
+
+* index build time (once per tool list) and per-question latency of
+  ``ai_tool_index.select_tools``, p50/p99 over ``--questions`` questions;
+* the same for the former keyword-overlap ranking.
+
+Embeddings use model2vec when it is installed, else (or with
+``--embedder hashing``) a deterministic hashing bag-of-words so the timing
+of the index machinery can still be measured.
+
+Streaming, against the deterministic fake LLM (``tests.fakes.llm``) emitting
+``--tokens`` deltas ``--token-ms`` ms apart:
+
+* time-to-first-byte of ``_stream_completion`` (tokens forwarded);
+* the former behaviour: await the full completion, then slice it.
+
+Run: python scripts/bench_ai_chat.py [--questions 200] [--tokens 200] [--token-ms 15]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+import zlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from app.api.routes.core import ai_chat  # noqa: E402
+from app.mcp.opsflux_tools import OPSFLUX_TOOLS_LIST  # noqa: E402
+from app.services.core import ai_tool_index  # noqa: E402
+from tests.fakes.llm import FakeLLM  # noqa: E402
+
+QUESTION_WORDS = [
+    "projets", "retard", "tâches", "jalons", "tiers", "fournisseur", "contact", "voyage",
+    "navire", "hélicoptère", "PAX", "avis de séjour", "conformité", "certificat", "expiré",
+    "équipement", "site", "champ", "imputation", "centre de coût", "utilisateur", "planning",
+    "conflits", "activité", "chemin critique", "budget", "liste", "détail", "combien",
+]
+
+
+def hashing_encode(texts):
+    out = np.zeros((len(texts), 512), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().replace("_", " ").split():
+            out[row, zlib.crc32(word.encode()) % 512] += 1.0
+    norm = np.linalg.norm(out, axis=1, keepdims=True)
+    norm[norm == 0] = 1.0
+    return out / norm
+
+
+def pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def summary(label, seconds):
+    ms = [s * 1000 for s in seconds]
+    print(f"{label:>28}: p50={statistics.median(ms):.3f}ms p99={pct(ms, 0.99):.3f}ms")
+
+
+async def bench_retrieval(args) -> None:
+    rnd = random.Random(5)
+    questions = [" ".join(rnd.sample(QUESTION_WORDS, 4)) for _ in range(args.questions)]
+    tools = [t for t in OPSFLUX_TOOLS_LIST if t["name"] in ai_chat.SAFE_OPSFLUX_TOOL_ALLOWLIST]
+
+    start = time.perf_counter()
+    index = await ai_tool_index.get_tool_index(OPSFLUX_TOOLS_LIST)
+    build = time.perf_counter() - start
+    print(f"tools={len(OPSFLUX_TOOLS_LIST)} allowlisted={len(tools)} "
+          f"embeddings={'yes' if index.vectors is not None else 'no (keyword fallback)'} "
+          f"index build={build * 1000:.1f}ms")
+
+    cached, indexed, keyword = [], [], []
+    for q in questions:
+        t0 = time.perf_counter()
+        await ai_tool_index.get_tool_index(OPSFLUX_TOOLS_LIST)
+        t1 = time.perf_counter()
+        ai_tool_index.select_tools(q, tools, index)
+        t2 = time.perf_counter()
+        ranked = sorted(tools, key=lambda t: ai_tool_index.keyword_score(q, t), reverse=True)
+        [t for t in ranked if ai_tool_index.keyword_score(q, t) > 0][:12]
+        t3 = time.perf_counter()
+        cached.append(t1 - t0)
+        indexed.append(t2 - t1)
+        keyword.append(t3 - t2)
+    summary("cached index lookup", cached)
+    summary("select_tools (embeddings)", indexed)
+    summary("keyword overlap (former)", keyword)
+
+
+async def bench_ttfb(args) -> None:
+    reply = " ".join(f"mot{i}" for i in range(args.tokens))
+    fake = FakeLLM(reply=reply, chunk_size=len(reply) // args.tokens + 1, token_delay=args.token_ms / 1000)
+    ai_chat._acompletion = fake
+    messages = [{"role": "user", "content": "résumé des projets"}]
+
+    start = time.perf_counter()
+    first = None
+    async for event in ai_chat._stream_completion(messages, {"model": "fake"}):
+        if first is None and '"content"' in event:
+            first = time.perf_counter() - start
+    streamed_total = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await fake(messages=messages)
+    former = time.perf_counter() - start
+    print(f"{'streaming':>28}: ttfb={first * 1000:.1f}ms total={streamed_total * 1000:.1f}ms")
+    print(f"{'buffered (former)':>28}: ttfb={former * 1000:.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token-ms", type=float, default=15.0)
+    parser.add_argument("--embedder", choices=("auto", "model2vec", "hashing"), default="auto")
+    args = parser.parse_args()
+
+    if args.embedder == "hashing" or args.embedder == "auto" and not _has_model2vec():
+        ai_tool_index._encode = hashing_encode
+        print("embedder: hashing bag-of-words")
+    else:
+        print("embedder: model2vec")
+    asyncio.run(bench_retrieval(args))
+    asyncio.run(bench_ttfb(args))
+
+
+def _has_model2vec() -> bool:
+    try:
+        import model2vec  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Benchmark audit_log insert throughput and retention, plain vs partitioned.
+
+Creates two scratch tables in a throw-away schema of the target database:
+
+* ``plain``: the historical heap table, written with one INSERT per
+  ``record_audit`` call and purged with the 10k-row CTE DELETE loop;
+* ``partitioned``: monthly range partitions, written with the buffered
+  multi-row INSERT and purged by detaching/dropping expired partitions
+  (``app.core.audit.purge_audit_log_before``).
+
+Rows are spread over ``--months`` months of history; retention keeps the
+last twelve. The schema is dropped at the end.
+
+Run: python scripts/bench_audit_log.py [--dsn postgresql+asyncpg://...] [--rows 50000] [--months 18]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.core import audit  # noqa: E402
+
+SCHEMA = "bench_audit_log"
+COLUMNS = """
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    entity_id UUID,
+    user_id UUID,
+    action VARCHAR(50) NOT NULL,
+    resource_type VARCHAR(100) NOT NULL,
+    resource_id VARCHAR(36),
+    details JSONB,
+    ip_address VARCHAR(45),
+    user_agent VARCHAR(500),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+"""
+
+
+def synthetic_rows(count: int, months: int) -> list[dict]:
+    now = datetime.now(UTC)
+    entity = uuid4()
+    return [
+        {
+            "entity_id": entity,
+            "user_id": None,
+            "action": random.choice(("create", "update", "delete")),
+            "resource_type": "bench",
+            "resource_id": str(uuid4()),
+            "details": {"field": "status", "i": i},
+            "ip_address": "10.0.0.1",
+            "user_agent": "bench",
+            "created_at": now - timedelta(days=random.uniform(0, months * 30)),
+        }
+        for i in range(count)
+    ]
+
+
+async def setup(session, months: int) -> None:
+    await session.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    await session.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    await session.execute(text(f"SET search_path TO {SCHEMA}, public"))
+    await session.execute(text(f"CREATE TABLE plain ({COLUMNS}, PRIMARY KEY (id))"))
+    await session.execute(text("CREATE INDEX ON plain (created_at)"))
+    await session.execute(text(
+        f"CREATE TABLE audit_log ({COLUMNS}, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)"
+    ))
+    await session.execute(text("CREATE INDEX ON audit_log (created_at)"))
+    await session.execute(text("CREATE TABLE audit_log_default PARTITION OF audit_log DEFAULT"))
+    await session.commit()
+    today = datetime.now(UTC).date()
+    await audit.ensure_audit_partitions(
+        session, ahead=months + 1, today=audit._month_start(today, -months - 1),
+    )
+
+
+async def bench_inserts(session, rows: list[dict]) -> tuple[float, float]:
+    start = time.perf_counter()
+    for row in rows:
+        await session.execute(
+            text(
+                "INSERT INTO plain (entity_id, user_id, action, resource_type, resource_id, "
+                "details, ip_address, user_agent, created_at) VALUES (:entity_id, :user_id, "
+                ":action, :resource_type, :resource_id, :details, :ip_address, :user_agent, :created_at)"
+            ),
+            {**row, "details": json.dumps(row["details"])},
+        )
+    await session.commit()
+    per_row = time.perf_counter() - start
+
+    audit.enable_audit_buffering(session)
+    start = time.perf_counter()
+    for row in rows:
+        await audit.record_audit(
+            session,
+            action=row["action"], resource_type=row["resource_type"], resource_id=row["resource_id"],
+            entity_id=row["entity_id"], details=row["details"],
+            ip_address=row["ip_address"], user_agent=row["user_agent"],
+        )
+    # Spread the buffered rows over the synthetic history like the plain table.
+    for entry, row in zip(session.info[audit._BUFFER_KEY], rows):
+        entry["created_at"] = row["created_at"]
+    await session.commit()
+    buffered = time.perf_counter() - start
+    return per_row, buffered
+
+
+async def bench_retention(session, cutoff: datetime) -> tuple[float, int, float, int]:
+    start = time.perf_counter()
+    deleted = 0
+    while True:
+        result = await session.execute(
+            text(
+                "WITH victims AS (SELECT id FROM plain WHERE created_at < :cutoff "
+                "ORDER BY created_at LIMIT 10000) "
+                "DELETE FROM plain WHERE id IN (SELECT id FROM victims)"
+            ),
+            {"cutoff": cutoff},
+        )
+        await session.commit()
+        deleted += result.rowcount or 0
+        if (result.rowcount or 0) < 10000:
+            break
+    delete_loop = time.perf_counter() - start
+
+    before = (await session.execute(text("SELECT COUNT(*) FROM audit_log"))).scalar_one()
+    start = time.perf_counter()
+    await audit.purge_audit_log_before(session, cutoff)
+    await session.commit()
+    partition_drop = time.perf_counter() - start
+    after = (await session.execute(text("SELECT COUNT(*) FROM audit_log"))).scalar_one()
+    return delete_loop, deleted, partition_drop, before - after
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--dsn", default=None, help="SQLAlchemy async DSN (default: settings.DATABASE_URL)")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--months", type=int, default=18)
+    args = parser.parse_args()
+
+    if args.dsn is None:
+        from app.core.config import settings
+        args.dsn = settings.DATABASE_URL
+
+    engine = create_async_engine(args.dsn)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    rows = synthetic_rows(args.rows, args.months)
+    try:
+        async with session_factory() as session:
+            await setup(session, args.months)
+            per_row, buffered = await bench_inserts(session, rows)
+            cutoff = datetime.now(UTC) - timedelta(days=365)
+            delete_loop, deleted, partition_drop, purged = await bench_retention(session, cutoff)
+            await session.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            await session.commit()
+    finally:
+        await engine.dispose()
+
+    print(f"rows={args.rows} months={args.months}")
+    print(f"insert  per-row INSERT       {per_row:8.2f}s  {args.rows / per_row:10.0f} rows/s")
+    print(f"insert  buffered multi-row   {buffered:8.2f}s  {args.rows / buffered:10.0f} rows/s")
+    print(f"retain  DELETE loop          {delete_loop:8.2f}s  {deleted} rows")
+    print(f"retain  partition drop+trim  {partition_drop:8.2f}s  {purged} rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Benchmark deck layout suggestions on synthetic supply-vessel manifests.
+
+For each manifest size (50–500 items: containers, baskets, pipe racks,
+pallets, some hazmat, four stops) on a ``--width`` × ``--length`` deck:
+
+* ``shelf (former)``: the left-to-right shelf cursor grouped by
+  destination that ``suggest_deck_layout`` used before — no rotation, no
+  stacking; an item counts as fitting if it ends on the deck;
+* ``greedy``: ``deck_packing_engine.pack_deck`` without local search;
+* ``search``: the same with ``--budget`` seconds of local search.
+
+Reported: items placed, deck area used by floor items, length used, time.
+
+Run: python scripts/bench_deck_layout.py [--sizes 50,100,200,500] [--budget 1.0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.services.modules.deck_packing_engine import DeckItem, pack_deck  # noqa: E402
+
+# (width m, length m, weight range kg, stackable)
+UNITS = [
+    (6.06, 2.44, (2500, 24000), True),  # 20 ft container
+    (3.0, 2.4, (800, 5000), True),  # offshore basket
+    (6.0, 1.2, (1500, 9000), False),  # pipe rack
+    (1.2, 1.0, (150, 1200), False),  # pallet
+    (2.4, 1.2, (300, 2500), True),  # tote tank
+]
+
+
+def synthetic_manifest(n: int, seed: int) -> list[DeckItem]:
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        width, length, (low, high), stackable = rng.choices(UNITS, weights=[2, 4, 2, 6, 2])[0]
+        hazmat = rng.random() < 0.06
+        items.append(DeckItem(
+            key=i,
+            code=f"CGO-{i:05d}",
+            width_m=width,
+            length_m=length,
+            weight_kg=round(rng.uniform(low, high)),
+            stackable=stackable and not hazmat,
+            hazmat=hazmat,
+            explosive=hazmat and rng.random() < 0.2,
+            unload_rank=rng.randint(1, 4),
+        ))
+    return items
+
+
+def shelf_fit(items: list[DeckItem], width: float, length: float) -> tuple[int, float, float]:
+    groups: dict[int, list[DeckItem]] = {}
+    for item in sorted((i for i in items if not i.hazmat), key=lambda i: -i.weight_kg):
+        groups.setdefault(item.unload_rank, []).append(item)
+    x, y, row, fitted, area = 0.5, 0.5, 0.0, 0, 0.0
+    for group in groups.values():
+        for item in group:
+            if x + item.width_m > width:
+                x, y, row = 0.5, y + row + 0.3, 0.0
+            if y + item.length_m <= length and x + item.width_m <= width:
+                fitted += 1
+                area += item.area
+            x += item.width_m + 0.3
+            row = max(row, item.length_m)
+    return fitted, area, y + row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", default="50,100,200,500")
+    parser.add_argument("--width", type=float, default=18.0)
+    parser.add_argument("--length", type=float, default=70.0)
+    parser.add_argument("--budget", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    usable = (args.width - 1.0) * (args.length - 1.0)
+    print(f"deck {args.width:g} m x {args.length:g} m, usable {usable:.0f} m²")
+    for n in (int(s) for s in args.sizes.split(",")):
+        items = synthetic_manifest(n, args.seed)
+        print(f"\n{n} items ({sum(i.area for i in items):.0f} m² of cargo, {sum(i.hazmat for i in items)} hazmat)")
+
+        start = time.perf_counter()
+        fitted, area, used = shelf_fit(items, args.width, args.length)
+        elapsed = time.perf_counter() - start
+        print(f"{'shelf (former)':>16}: {fitted:4d} placed (hazmat apart), "
+              f"{area / usable * 100:5.1f}% area, {min(used, args.length):5.1f} m, {elapsed * 1000:7.1f} ms")
+
+        for label, budget in (("greedy", None), (f"search {args.budget:g}s", args.budget)):
+            start = time.perf_counter()
+            plan = pack_deck(items, width_m=args.width, length_m=args.length, time_budget_s=budget)
+            elapsed = time.perf_counter() - start
+            m = plan.metrics()
+            print(f"{label:>16}: {m['placed_count']:4d} placed ({m['stacked_count']} stacked), "
+                  f"{m['area_utilization_pct']:5.1f}% area, {m['length_used_m']:5.1f} m, "
+                  f"{elapsed * 1000:7.1f} ms, {m['search_iterations']} iterations")
+
+
+if __name__ == "__main__":
+    main()
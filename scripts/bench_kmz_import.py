@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Benchmark the streaming KMZ parser and the batched importer.
+
+Input is a synthetic ArcGIS-style export (``tests.fakes.kmz.synthetic_kmz``):
+``--platforms`` platforms, ``--wells`` wells per platform, pipelines of
+``--vertices`` points between neighbours, ``--bathymetry`` depth points.
+
+Parsing — each variant runs in a forked child so its peak RSS is its own:
+
+* ``tree``: the former approach — whole KML read into bytes, parsed into
+  an lxml tree, every asset placemark turned into a record and kept;
+* ``stream``: what ``import_kmz`` now does — a platforms pass, then a
+  wells/pipelines pass holding one ``--batch`` of records at a time.
+
+Import — ``import_kmz`` against the recording session (no database):
+number of statements issued vs. the former one-INSERT-per-object loop,
+and the time spent outside the database (parsing, matching, batching).
+
+Run: python scripts/bench_kmz_import.py [--platforms 200] [--wells 40] [--bathymetry 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import multiprocessing
+import resource
+import sys
+import time
+import zipfile
+from pathlib import Path
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from lxml import etree  # noqa: E402
+from sqlalchemy.orm import configure_mappers  # noqa: E402
+
+from app.services import kmz_parser  # noqa: E402
+from app.services.kmz_import import import_kmz  # noqa: E402
+from tests.fakes.kmz import RecordingSession, synthetic_kmz  # noqa: E402
+
+NS = kmz_parser.KML_NS
+
+
+def parse_tree(kmz: bytes, batch: int) -> int:
+    with zipfile.ZipFile(io.BytesIO(kmz)) as zf:
+        raw = zf.read("doc.kml")
+    root = etree.fromstring(raw, parser=etree.XMLParser(recover=True, huge_tree=True))
+    records = []
+    for folder in root.iter(f"{NS}Folder"):
+        name_el = folder.find(f"{NS}name")
+        folder_name = (name_el.text or "").strip() if name_el is not None else ""
+        category = kmz_parser._classify(folder_name)
+        for placemark in folder.findall(f"{NS}Placemark"):
+            if category not in ("platforms", "wells", "pipelines"):
+                continue
+            record = kmz_parser._placemark_record(placemark, folder_name, category)
+            if record is not None:
+                records.append(record)
+    return len(records)
+
+
+def parse_stream(kmz: bytes, batch: int) -> int:
+    with kmz_parser.open_kml(kmz) as kml:
+        platforms = [r for _, r in kmz_parser.iter_placemarks(kml, categories={"platforms"})]
+    seen, pending = len(platforms), []
+    with kmz_parser.open_kml(kmz) as kml:
+        for _, record in kmz_parser.iter_placemarks(kml, categories={"wells", "pipelines"}):
+            pending.append(record)
+            if len(pending) >= batch:
+                seen += len(pending)
+                pending = []
+    return seen + len(pending)
+
+
+def _child(fn, kmz, batch, out):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    count = fn(kmz, batch)
+    elapsed = time.perf_counter() - start
+    out.put((count, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before))
+
+
+def bench_parse(kmz: bytes, batch: int) -> None:
+    ctx = multiprocessing.get_context("fork")
+    for label, fn in (("tree (former)", parse_tree), ("stream", parse_stream)):
+        out = ctx.Queue()
+        proc = ctx.Process(target=_child, args=(fn, kmz, batch, out))
+        proc.start()
+        count, elapsed, rss_kb = out.get()
+        proc.join()
+        print(f"{label:>16}: {count} records in {elapsed:.3f}s, peak RSS +{rss_kb / 1024:.1f} MiB")
+
+
+async def bench_import(kmz: bytes, batch: int) -> None:
+    configure_mappers()  # one-off ORM setup, not part of the import
+    field_id = uuid4()
+    db = RecordingSession(field_id=field_id)
+    start = time.perf_counter()
+    report = await import_kmz(
+        db, entity_id=uuid4(), field_id=field_id, user_id=None, kmz_bytes=kmz, batch_size=batch,
+    )
+    elapsed = time.perf_counter() - start
+    created = sum(report.to_dict()[k]["created"] for k in ("sites", "installations", "wells", "pipelines"))
+    print(f"{'import':>16}: {created} rows in {elapsed:.3f}s (excl. database), "
+          f"{db.statements} statements in {report.batches} batches; "
+          f"former loop: {created} INSERT + flush round trips")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--platforms", type=int, default=200)
+    parser.add_argument("--wells", type=int, default=40, help="wells per platform")
+    parser.add_argument("--vertices", type=int, default=50)
+    parser.add_argument("--bathymetry", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    kmz = synthetic_kmz(
+        platforms=args.platforms, wells_per_platform=args.wells,
+        pipeline_vertices=args.vertices, bathymetry_points=args.bathymetry,
+    )
+    print(f"synthetic KMZ: {len(kmz) / 1024 / 1024:.1f} MiB compressed")
+    bench_parse(kmz, args.batch)
+    asyncio.run(bench_import(kmz, args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Benchmark event-loop latency of unrelated endpoints during a login storm.
+
+Builds a minimal in-process ASGI app with two routes, served on one event
+loop like a single uvicorn worker:
+
+* ``POST /login`` — one bcrypt verification, either inline
+  (``app.core.security.verify_password``, the former behaviour) or on the
+  hashing pool (``app.core.password_hashing.verify_password``);
+* ``GET /ping`` — trivial, stands for every other request on the worker.
+
+For each mode it fires ``--logins`` concurrent logins (``--concurrency`` at
+a time) while a prober calls ``/ping`` every ``--probe-ms`` ms, and reports
+p50/p99/max ping latency and login throughput.
+
+Run: python scripts/bench_login_storm.py [--logins 40] [--concurrency 20] [--rounds 12]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fastapi import FastAPI  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from app.core import password_hashing, security  # noqa: E402
+
+
+def build_app(mode: str, stored_hash: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login(body: dict):
+        if mode == "inline":
+            ok = security.verify_password(body["password"], stored_hash)
+        else:
+            ok = await password_hashing.verify_password(body["password"], stored_hash)
+        return {"ok": ok}
+
+    @app.get("/ping")
+    async def ping():
+        return {"pong": True}
+
+    return app
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def storm(mode: str, args) -> None:
+    stored = security.hash_password("Shift-change!2026")
+    app = build_app(mode, stored)
+    latencies: list[float] = []
+    done = asyncio.Event()
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        async def probe():
+            # Latency is measured from the *scheduled* send time, so a ping
+            # that could not even start because the loop was blocked counts
+            # its full wait (no coordinated omission).
+            interval = args.probe_ms / 1000
+            scheduled = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                await client.get("/ping")
+                now = time.perf_counter()
+                latencies.append((now - scheduled) * 1000)
+                scheduled = max(scheduled + interval, now)
+
+        async def one_login(i: int):
+            async with gate:
+                password = "Shift-change!2026" if i % 2 else "wrong-password"
+                await client.post("/login", json={"password": password})
+
+        prober = asyncio.create_task(probe())
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await asyncio.gather(*(one_login(i) for i in range(args.logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+
+    print(
+        f"{mode:>6}: logins={args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s) | "
+        f"ping n={len(latencies)} p50={statistics.median(latencies):.1f}ms "
+        f"p99={percentile(latencies, 0.99):.1f}ms max={max(latencies):.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--probe-ms", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=0, help="PASSWORD_HASH_WORKERS (0 = auto)")
+    args = parser.parse_args()
+
+    password_hashing.settings.BCRYPT_ROUNDS = args.rounds
+    password_hashing.settings.PASSWORD_HASH_WORKERS = args.workers
+    print(f"bcrypt rounds={args.rounds} pool={password_hashing.pool_stats()['workers']} threads")
+    for mode in ("inline", "pool"):
+        asyncio.run(storm(mode, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Benchmark MTO duplicate detection (app.modules.mto.engine.dedup) on synthetic MTOs.
+
+Generates ``--lines`` MTO lines (pipe/fitting/flange/valve/gasket families,
+weighted so the common pipe blocks are the largest), with ``--dup-rate``
+planted fuzzy duplicates (tokens shuffled, one spec token dropped, FR
+synonyms). Reports:
+
+* wall time of ``find_duplicates`` and block sizes (dense vs LSH path);
+* recall on the planted duplicates (same cluster);
+* with ``--reference``, recall against exhaustive all-pairs scoring inside
+  each (family, diameter) block — i.e. what the engine finds when every
+  block is scored exhaustively. Quadratic: keep ``--lines`` moderate.
+
+Run: python scripts/bench_mto_dedup.py [--lines 100000] [--dup-rate 0.05] [--reference]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import pandas as pd  # noqa: E402
+from rapidfuzz import fuzz, process  # noqa: E402
+
+from app.modules.mto.engine import dedup  # noqa: E402
+from app.modules.mto.engine.normalize import normalize_text  # noqa: E402
+from app.modules.mto.engine.parsing import detect_family  # noqa: E402
+
+FAMILIES = [
+    ("PIPE SMLS BE", 0.35), ("TUYAU SANS SOUDURE", 0.05), ("ELBOW 90 LR BW", 0.15),
+    ("TEE EQUAL BW", 0.1), ("FLANGE WN RF", 0.15), ("BALL VALVE FB", 0.1),
+    ("GASKET SPIRAL WOUND", 0.1),
+]
+DIAMETERS = ['1/2"', '3/4"', '1"', '1 1/2"', '2"', '3"', '4"', '6"', '8"', '10"', '12"']
+SCHEDULES = ["SCH 10", "SCH 20", "SCH 40", "SCH 80", "SCH 120", "SCH 160", "SCH XS", "SCH STD", "SCH XXS"]
+MATERIALS = ["A106 GR B", "A333 GR6", "A312 TP316L", "A312 TP304", "A105", "A234 WPB",
+             "A182 F316", "A350 LF2", "A420 WPL6", "API 5L X52", "DUPLEX", "INCONEL 625"]
+PRESSURES = ["150#", "300#", "600#", "900#", "1500#", "2500#", "3000 PSI", "5000 PSI"]
+EXTRAS = ["ASME B36.10", "ASME B16.9", "ASME B16.5", "NACE MR0175", "GALV", "PAINTED",
+          "PSL2", "HOT DIP", "SOUR SERVICE", "LOW TEMP", "BEVELLED", "PICKLED", "IMPACT TESTED",
+          "HIC", "SSC", "DNV", "NORSOK", "EN 10204 3.1", "ISO 15156", "PMI", "HARDNESS TESTED"]
+
+
+def generate(lines: int, dup_rate: float, seed: int = 7) -> tuple[pd.DataFrame, list[tuple[str, str]]]:
+    """Synthetic MTO + the list of planted (original, duplicate) article pairs."""
+    rnd = random.Random(seed)
+    rows: list[dict] = []
+    planted: list[tuple[str, str]] = []
+    names, weights = zip(*FAMILIES)
+    while len(rows) < lines:
+        tokens = [
+            rnd.choices(names, weights=weights)[0], rnd.choice(DIAMETERS), rnd.choice(SCHEDULES),
+            rnd.choice(MATERIALS), rnd.choice(PRESSURES), *rnd.sample(EXTRAS, rnd.randint(1, 4)),
+            f"TAG-{rnd.randint(0, 10**7)}",
+        ]
+        article = f"A{len(rows):07d}"
+        rows.append({"article": article, "designation": " ".join(tokens), "designation_long": ""})
+        if rnd.random() < dup_rate and len(rows) < lines:
+            variant = tokens[:2] + rnd.sample(tokens[2:], len(tokens) - 2)
+            if len(variant) > 6:
+                variant.pop(rnd.randrange(2, len(variant)))
+            duplicate = f"A{len(rows):07d}"
+            rows.append({"article": duplicate, "designation": " ".join(variant), "designation_long": ""})
+            planted.append((article, duplicate))
+    return pd.DataFrame(rows), planted
+
+
+def block_sizes(df: pd.DataFrame) -> Counter:
+    sizes: Counter = Counter()
+    for desig in df["designation"]:
+        diameter = dedup._diam_from_designation(desig)
+        family = detect_family(desig)
+        if family != "OTHER" and diameter is not None:
+            sizes[(family, round(diameter, 3))] += 1
+    return sizes
+
+
+def reference_pairs(df: pd.DataFrame, threshold: int) -> set[tuple[str, str]]:
+    """Exhaustive scoring inside each (family, diameter) block (no LSH, no cap)."""
+    blocks: dict = {}
+    for row in df.to_dict("records"):
+        family = detect_family(row["designation"])
+        diameter = dedup._diam_from_designation(row["designation"])
+        if family == "OTHER" or diameter is None:
+            continue
+        text = normalize_text(f"{row['designation']} {row.get('designation_long', '')}")
+        blocks.setdefault((family, round(diameter, 3)), []).append((row["article"], text))
+    pairs = set()
+    for group in blocks.values():
+        texts = [t for _, t in group]
+        scores = process.cdist(texts, texts, scorer=fuzz.token_set_ratio,
+                               score_cutoff=threshold, workers=-1)
+        for i, j in zip(*scores.nonzero()):
+            if i < j:
+                pairs.add((group[i][0], group[j][0]))
+    return pairs
+
+
+def recall(clusters, pairs) -> float:
+    where = {a: i for i, c in enumerate(clusters) for a in c.articles}
+    if not pairs:
+        return 1.0
+    found = sum(1 for a, b in pairs if a in where and where[a] == where.get(b))
+    return found / len(pairs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--dup-rate", type=float, default=0.05)
+    parser.add_argument("--threshold", type=int, default=88)
+    parser.add_argument("--reference", action="store_true")
+    args = parser.parse_args()
+
+    df, planted = generate(args.lines, args.dup_rate)
+    sizes = block_sizes(df)
+    largest = sizes.most_common(3)
+    lsh_blocks = sum(1 for n in sizes.values() if n > dedup.DENSE_BLOCK_MAX)
+    print(f"lines={len(df)} blocks={len(sizes)} largest={largest} "
+          f"lsh_blocks={lsh_blocks} (> DENSE_BLOCK_MAX={dedup.DENSE_BLOCK_MAX})")
+
+    start = time.perf_counter()
+    clusters = dedup.find_duplicates(df, fuzzy_threshold=args.threshold)
+    elapsed = time.perf_counter() - start
+    print(f"find_duplicates: {elapsed:.2f}s ({len(df) / elapsed:,.0f} lines/s), clusters={len(clusters)}")
+    print(f"recall planted duplicates: {recall(clusters, planted):.4f} ({len(planted)} pairs)")
+
+    if args.reference:
+        start = time.perf_counter()
+        pairs = reference_pairs(df, args.threshold)
+        print(f"reference all-pairs: {time.perf_counter() - start:.2f}s, {len(pairs)} pairs, "
+              f"recall={recall(clusters, pairs):.4f}")
+
+
+if __name__ == "__main__":
+    main()
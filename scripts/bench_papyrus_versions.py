@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Benchmark Papyrus version reconstruction on a 1,000-revision document.
+
+Compares the historical "load every version and replay from the last
+snapshot" strategy with the checkpointed version store
+(``papyrus_versioning_service``): nearest-checkpoint fetch, LRU hits and
+``reconstruct_many`` for a timeline view.
+
+DB access is served from an in-memory row store so the benchmark runs
+offline; the number of rows each strategy would fetch is reported next to
+the timings.
+
+Run: python scripts/bench_papyrus_versions.py [--revisions 1000] [--blocks 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from copy import deepcopy
+from pathlib import Path
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import jsonpatch  # noqa: E402
+
+from app.services.modules import papyrus_versioning_service as versioning  # noqa: E402
+
+
+def build_history(revisions: int, blocks: int) -> list[tuple[int, str, object]]:
+    """Synthetic history following the store's checkpoint policy."""
+    doc = {
+        "meta": {"title": "Procedure", "version": 1},
+        "blocks": [{"id": f"b{i}", "type": "paragraph", "text": f"Step {i} " * 8} for i in range(blocks)],
+    }
+    rows: list[tuple[int, str, object]] = [(1, "snapshot", deepcopy(doc))]
+    since_snapshot = 0
+    for version in range(2, revisions + 1):
+        new_doc = deepcopy(doc)
+        new_doc["meta"]["version"] = version
+        new_doc["blocks"][version % blocks]["text"] = f"Revised at v{version} " * 6
+        since_snapshot += 1
+        if since_snapshot >= versioning.CHECKPOINT_EVERY_PATCHES:
+            rows.append((version, "snapshot", deepcopy(new_doc)))
+            since_snapshot = 0
+        else:
+            rows.append((version, "diff", jsonpatch.make_patch(doc, new_doc).patch))
+        doc = new_doc
+    return rows
+
+
+def legacy_reconstruct(rows, version):
+    """Pre-checkpoint implementation: every row is loaded and sorted."""
+    ordered = sorted(rows, key=lambda item: item[0])
+    ordered = [item for item in ordered if item[0] <= version]
+    snapshot_index = max(idx for idx, item in enumerate(ordered) if item[1] == "snapshot")
+    current = deepcopy(ordered[snapshot_index][2])
+    for _, patch_type, payload in ordered[snapshot_index + 1:]:
+        if patch_type == "snapshot":
+            current = deepcopy(payload)
+        else:
+            current = jsonpatch.apply_patch(current, payload, in_place=False)
+    return current, len(rows)
+
+
+class MemoryStore:
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetched = 0
+
+    async def latest(self, **_):
+        return self.rows[-1][0]
+
+    async def checkpoint(self, *, version, **_):
+        return max((row[0] for row in self.rows if row[1] == "snapshot" and row[0] <= version), default=None)
+
+    async def chain(self, *, from_version, to_version, **_):
+        chunk = [row for row in self.rows if from_version <= row[0] <= to_version]
+        self.fetched += len(chunk)
+        return chunk
+
+
+def timed(label, fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<44} {elapsed * 1000:9.3f} ms")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--revisions", type=int, default=1000)
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = build_history(args.revisions, args.blocks)
+    store = MemoryStore(rows)
+    versioning._resolve_latest_version = store.latest
+    versioning._find_checkpoint = store.checkpoint
+    versioning._load_version_chain = store.chain
+    entity_id, document_id = uuid4(), uuid4()
+    target = args.revisions
+
+    expected, legacy_rows = legacy_reconstruct(rows, target)
+    print(f"Document: {args.revisions} revisions, {args.blocks} blocks, "
+          f"{sum(1 for row in rows if row[1] == 'snapshot')} checkpoints")
+
+    print("Latest version")
+    legacy = timed("legacy (all rows, replay from snapshot)", lambda: legacy_reconstruct(rows, target), args.repeat)
+
+    def cold():
+        versioning.invalidate_reconstruction_cache()
+        return asyncio.run(
+            versioning.reconstruct_document_version(db=None, entity_id=entity_id, document_id=document_id)
+        )
+
+    store.fetched = 0
+    assert cold() == expected
+    cold_rows = store.fetched
+    checkpointed = timed("checkpointed (cold cache)", cold, args.repeat)
+
+    def warm():
+        return asyncio.run(
+            versioning.reconstruct_document_version(db=None, entity_id=entity_id, document_id=document_id)
+        )
+
+    warm()
+    cached = timed("checkpointed (LRU hit)", warm, args.repeat)
+    print(f"  rows fetched: legacy={legacy_rows} checkpointed={cold_rows}")
+    print(f"  speedup: cold x{legacy / checkpointed:.1f}, warm x{legacy / cached:.1f}")
+
+    timeline = list(range(max(1, target - 49), target + 1))
+    print(f"Timeline of {len(timeline)} versions")
+    timed(
+        "legacy (one full reconstruction per version)",
+        lambda: [legacy_reconstruct(rows, version) for version in timeline],
+        max(1, args.repeat // 5),
+    )
+
+    def many():
+        versioning.invalidate_reconstruction_cache()
+        return asyncio.run(
+            versioning.reconstruct_many(db=None, entity_id=entity_id, document_id=document_id, versions=timeline)
+        )
+
+    store.fetched = 0
+    many()
+    many_rows = store.fetched
+    timed("reconstruct_many (single replay pass)", many, max(1, args.repeat // 5))
+    print(f"  rows fetched: legacy={legacy_rows * len(timeline)} reconstruct_many={many_rows}")
+
+
+if __name__ == "__main__":
+    main()
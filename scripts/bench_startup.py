@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Benchmark API cold start: import time and time-to-first-request.
+
+* import time — ``import app.main`` in a fresh interpreter, repeated
+  ``--imports`` times, plus the slowest modules from ``-X importtime``;
+* time-to-first-request — launches ``uvicorn app.main:app`` with
+  ``--workers`` workers and polls ``/api/health`` until it answers 200,
+  printing the per-phase lifespan timings (``app.core.startup``) logged by
+  the workers. Run it twice: the second boot shows the fingerprint skip.
+
+Needs the same environment as the API (DATABASE_URL, REDIS_URL, …) for
+the time-to-first-request part.
+
+Run: python scripts/bench_startup.py [--imports 5] [--workers 4] [--port 8765] [--skip-serve]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def measure_imports(runs: int) -> list[float]:
+    durations = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        durations.append(float(out.stdout.strip().splitlines()[-1]))
+    return durations
+
+
+def slowest_imports(limit: int = 15) -> list[tuple[int, str]]:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+(.*)$", line)
+        if match and match.group(2).strip().startswith("app."):
+            rows.append((int(match.group(1)), match.group(2).strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def time_to_first_request(workers: int, port: int, timeout: float) -> tuple[float | None, list[str]]:
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", str(port), "--workers", str(workers), "--log-level", "info",
+    ]
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                            env={**os.environ, "PYTHONUNBUFFERED": "1"})
+    ready_at = None
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                break
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        ready_at = time.perf_counter() - started
+                        break
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                time.sleep(0.1)
+        # Give the remaining workers a moment to log their phases.
+        time.sleep(2)
+    finally:
+        proc.terminate()
+        try:
+            output, _ = proc.communicate(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            output, _ = proc.communicate()
+    phases = [line for line in output.splitlines() if "Startup phases" in line or "Startup seeding" in line]
+    return ready_at, phases
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--imports", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--skip-serve", action="store_true", help="Only measure import time")
+    args = parser.parse_args()
+
+    durations = measure_imports(args.imports)
+    print(f"import app.main   median {statistics.median(durations):.2f}s  "
+          f"min {min(durations):.2f}s  max {max(durations):.2f}s  (n={len(durations)})")
+    print("slowest app modules (cumulative µs):")
+    for micros, name in slowest_imports():
+        print(f"  {micros:>10}  {name}")
+
+    if args.skip_serve:
+        return
+    ready, phases = time_to_first_request(args.workers, args.port, args.timeout)
+    if ready is None:
+        print("time-to-first-request: server did not become healthy (check DB/Redis settings)")
+    else:
+        print(f"time-to-first-request ({args.workers} workers): {ready:.2f}s")
+    for line in phases:
+        print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
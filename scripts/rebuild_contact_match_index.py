@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""Rebuild the duplicate-matching keys of tier contacts.
+
+Recomputes ``tier_contacts.match_*`` (``app.services.modules.contact_match_index``)
+for every contact, or only for the contacts of the given companies. Run it
+once after migration 206, and after any bulk load that bypasses the ORM.
+
+Run: python -m scripts.rebuild_contact_match_index [--tier <uuid> ...] [--chunk 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from uuid import UUID
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.core.database import async_session_factory  # noqa: E402
+from app.services.modules.contact_match_index import rebuild_contact_match_index  # noqa: E402
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--tier", type=UUID, action="append", default=None, help="limit to this company (repeatable)")
+    parser.add_argument("--chunk", type=int, default=None, help="contacts per page / UPDATE")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    async with async_session_factory() as session:
+        processed = await rebuild_contact_match_index(session, tier_ids=args.tier, chunk_size=args.chunk)
+    print(f"{processed} contacts re-keyed in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
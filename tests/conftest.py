@@ -11,9 +11,12 @@ from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.database import get_db
+from app.core.db_instrumentation import instrument_engine
 from app.main import app
 from app.models.base import Base
 
+pytest_plugins = ["tests.plugins.query_budget"]
+
 
 def _get_test_database_url() -> str:
     url = os.getenv("TEST_DATABASE_URL", "").strip()
@@ -35,6 +38,7 @@ def event_loop():
 @pytest_asyncio.fixture(scope="session")
 async def test_engine():
     engine = create_async_engine(_get_test_database_url(), echo=False)
+    instrument_engine(engine.sync_engine)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield engine
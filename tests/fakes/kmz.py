@@ -0,0 +1,179 @@
+"""Synthetic KMZ exports shaped like the ArcGIS MASTER_MAP files, and a
+recording session to run ``kmz_import.import_kmz`` without PostGIS.
+
+``synthetic_kmz(platforms=..., wells_per_platform=..., ...)`` returns the
+bytes of a KMZ with the same folder layout and description tables as the
+real exports (bathymetry, pipelines, wells, platforms — in that order, so
+platforms come last like they do in the field data). Coordinates are
+deterministic for a given ``seed``: platforms on a grid off Cameroon,
+wells within ~200 m of their platform, pipelines linking neighbours.
+
+``RecordingSession`` answers the importer's SELECTs from ``existing``
+(table name → rows, in the column order the importer selects) and records
+every INSERT / UPDATE with its parameter list.
+"""
+
+from __future__ import annotations
+
+import io
+import random
+import zipfile
+from types import SimpleNamespace
+from xml.sax.saxutils import escape
+
+from sqlalchemy.sql.dml import Insert, Update
+from sqlalchemy.sql.selectable import Select
+
+_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<kml xmlns="http://www.opengis.net/kml/2.2"><Document><name>{name}</name>\n'
+)
+
+
+def _description(attrs: dict[str, str]) -> str:
+    rows = "".join(f"<tr><td>{k}</td><td>{v}</td></tr>" for k, v in attrs.items())
+    return f"<description>{escape(f'<table>{rows}</table>')}</description>"
+
+
+def _placemark(pid: str, name: str, attrs: dict[str, str], geometry: str) -> str:
+    return f'<Placemark id="{pid}"><name>{name}</name>{_description(attrs)}{geometry}</Placemark>\n'
+
+
+def _point(lon: float, lat: float) -> str:
+    return f"<Point><coordinates>{lon:.7f},{lat:.7f},0</coordinates></Point>"
+
+
+def _line(coords: list[tuple[float, float]]) -> str:
+    text = " ".join(f"{lon:.7f},{lat:.7f},0" for lon, lat in coords)
+    return f"<LineString><coordinates>{text}</coordinates></LineString>"
+
+
+def platform_code(index: int) -> str:
+    return f"P{index:04d}"
+
+
+def synthetic_kmz(
+    *,
+    platforms: int = 10,
+    wells_per_platform: int = 5,
+    pipeline_vertices: int = 20,
+    bathymetry_points: int = 0,
+    seed: int = 7,
+    name: str = "SYNTHETIC_MASTER_MAP",
+) -> bytes:
+    rng = random.Random(seed)
+    side = max(1, int(platforms ** 0.5))
+    positions = [
+        (9.0 + (i % side) * 0.05, 3.5 + (i // side) * 0.05) for i in range(platforms)
+    ]
+
+    out = io.StringIO()
+    out.write(_HEADER.format(name=name))
+
+    if bathymetry_points:
+        out.write("<Folder><name>Bathy depth points</name>\n")
+        for i in range(bathymetry_points):
+            lon, lat = 8.5 + rng.random(), 3.0 + rng.random()
+            out.write(_placemark(f"B{i}", f"{-rng.randint(5, 90)}", {"DEPTH": "-42"}, _point(lon, lat)))
+        out.write("</Folder>\n")
+
+    out.write("<Folder><name>Pipelines</name>\n")
+    for i in range(platforms - 1):
+        (lon1, lat1), (lon2, lat2) = positions[i], positions[i + 1]
+        steps = max(2, pipeline_vertices)
+        coords = [
+            (lon1 + (lon2 - lon1) * k / (steps - 1) + rng.uniform(-1e-4, 1e-4),
+             lat1 + (lat2 - lat1) * k / (steps - 1) + rng.uniform(-1e-4, 1e-4))
+            for k in range(steps)
+        ]
+        coords[0], coords[-1] = (lon1, lat1), (lon2, lat2)
+        pname = f"8IN_OIL_{platform_code(i)}_{platform_code(i + 1)}"
+        attrs = {"line_name": pname, "globalid": f"{{PIPE-{i:06d}}}"}
+        out.write(_placemark(f"L{i}", pname, attrs, _line(coords)))
+    out.write("</Folder>\n")
+
+    out.write("<Folder><name>Wells</name>\n")
+    for i, (lon, lat) in enumerate(positions):
+        for w in range(wells_per_platform):
+            wname = f"{platform_code(i)}-{w + 1:02d}"
+            attrs = {"Name": wname, "globalid": f"{{WELL-{i:04d}-{w:03d}}}"}
+            wl = lon + rng.uniform(-0.0015, 0.0015)
+            wt = lat + rng.uniform(-0.0015, 0.0015)
+            out.write(_placemark(f"W{i}-{w}", wname, attrs, _point(wl, wt)))
+    out.write("</Folder>\n")
+
+    out.write("<Folder><name>Platforms</name>\n")
+    for i, (lon, lat) in enumerate(positions):
+        attrs = {
+            "PLATFORM_N": f"Platform {i}",
+            "ALTERNATIV": platform_code(i),
+            "FIELD": f"FIELD {i % 3}",
+            "COUNTRY": "CMR",
+            "TYPE_PLATF": "JACKET",
+            "globalid": f"{{PLAT-{i:04d}}}",
+        }
+        out.write(_placemark(f"P{i}", platform_code(i), attrs, _point(lon, lat)))
+    out.write("</Folder>\n")
+
+    out.write("</Document></kml>\n")
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("doc.kml", out.getvalue())
+    return buf.getvalue()
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def all(self):
+        return self.rows
+
+    def one(self):
+        return self.rows[0]
+
+    def scalar_one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+    def scalars(self):
+        return _Result(r[0] if isinstance(r, tuple) else r for r in self.rows)
+
+
+class RecordingSession:
+    def __init__(self, field_id=None, existing: dict[str, list[tuple]] | None = None):
+        self.field = SimpleNamespace(id=field_id, code="FLD", name="Synthetic field")
+        self.existing = existing or {}
+        self.inserts: list[tuple[str, list[dict]]] = []
+        self.updates: list[tuple[str, list[dict]]] = []
+        self.statements = 0
+        self.added: list = []
+
+    async def execute(self, statement, params=None):
+        self.statements += 1
+        if isinstance(statement, Select):
+            table = statement.get_final_froms()[0].name
+            if table == "ar_fields":
+                return _Result([self.field] if self.field.id else [])
+            if "ST_XMin" in str(statement):
+                return _Result([(9.0, 3.5, 9.5, 4.0)])
+            return _Result(self.existing.get(table, []))
+        if isinstance(statement, Insert):
+            self.inserts.append((statement.table.name, list(params or [])))
+        elif isinstance(statement, Update):
+            if params is not None:
+                self.updates.append((statement.table.name, list(params)))
+            elif statement._returning:
+                # ST_Length refresh: pretend every touched route is 1.5 km.
+                ids = statement.whereclause.right.value
+                return _Result([(1.5,)] * len(ids))
+        return _Result([])
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def flush(self):
+        pass
+
+    def rows(self, table: str, kind: str = "inserts") -> list[dict]:
+        return [row for name, rows in getattr(self, kind) if name == table for row in rows]
@@ -0,0 +1,51 @@
+"""Deterministic stand-in for ``litellm.acompletion``.
+
+Install it with ``monkeypatch.setattr(ai_chat, "_acompletion", FakeLLM(...))``.
+Tool-planner calls (the user message carries ``available_tools``) get
+``plan``; every other call gets ``reply``. With ``stream=True`` the reply
+is yielded as ``chunk_size``-character deltas, ``token_delay`` seconds
+apart, shaped like litellm's streaming chunks.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+
+class FakeLLM:
+    def __init__(
+        self,
+        reply: str = "Réponse de test.",
+        plan: dict | None = None,
+        chunk_size: int = 4,
+        token_delay: float = 0.0,
+    ):
+        self.reply = reply
+        self.plan = plan or {"use_tool": False}
+        self.chunk_size = chunk_size
+        self.token_delay = token_delay
+        self.calls: list[dict] = []
+
+    def _text_for(self, messages: list[dict]) -> str:
+        last = messages[-1].get("content", "") if messages else ""
+        if '"available_tools"' in last:
+            return json.dumps(self.plan)
+        return self.reply
+
+    async def __call__(self, *, messages: list[dict], stream: bool = False, **kwargs):
+        self.calls.append({"messages": messages, "stream": stream, **kwargs})
+        text = self._text_for(messages)
+        if not stream:
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay * max(1, len(text) // self.chunk_size))
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        return self._stream(text)
+
+    async def _stream(self, text: str):
+        for i in range(0, len(text), self.chunk_size):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            delta = SimpleNamespace(content=text[i:i + self.chunk_size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
@@ -0,0 +1,63 @@
+"""Run the set-based engines against an in-memory SQLite database.
+
+The engines take an ``AsyncSession`` and issue Core statements; tests give
+them a synchronous ``Session`` on ``sqlite://`` wrapped in ``SyncSessionDB``,
+which exposes the awaitable subset they use. Importing this module also
+renders PostgreSQL ``JSONB`` columns as SQLite ``JSON`` so the ORM tables
+can be created there (``tests/unit/conftest.py`` imports it once).
+
+``SyncSessionDB`` counts executed statements (``statements``) and commits
+(``commits``). ``fail_on = (fragment, n)`` lets ``n`` statements whose SQL
+contains ``fragment`` through, then raises on the next one.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+class SyncSessionDB:
+    """Awaitable facade over a sync SQLite session: enough of AsyncSession for the engines."""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.statements = 0
+        self.commits = 0
+        self.fail_on: tuple[str, int] | None = None
+
+    @property
+    def identity_map(self):
+        return self.session.identity_map
+
+    def get_bind(self):
+        return self.session.get_bind()
+
+    async def execute(self, statement, params=None):
+        if self.fail_on and self.fail_on[0] in str(statement):
+            fragment, remaining = self.fail_on
+            if remaining == 0:
+                self.fail_on = None
+                raise RuntimeError(f"injected failure on {fragment!r}")
+            self.fail_on = (fragment, remaining - 1)
+        self.statements += 1
+        return self.session.execute(statement, params)
+
+    async def get(self, model, ident):
+        return self.session.get(model, ident)
+
+    async def flush(self):
+        self.session.flush()
+
+    async def commit(self):
+        self.commits += 1
+        self.session.commit()
+
+    async def rollback(self):
+        self.session.rollback()
@@ -0,0 +1,85 @@
+"""Query budgets for tests — fail when code under test issues too much SQL.
+
+Two entry points, both backed by ``app.core.db_instrumentation``:
+
+* ``@pytest.mark.query_budget(max_queries=..., max_repeats=..., max_time_ms=...)``
+  applies the budget to the whole test body;
+* the ``query_budget`` fixture returns a context manager for a single block,
+  typically one request against an endpoint::
+
+      with query_budget(max_queries=6, max_repeats=2):
+          await client.get("/api/v1/projects")
+
+``max_repeats`` bounds how often a single statement fingerprint may run —
+the N+1 guard. Only engines passed through ``instrument_engine`` are seen
+(the application engine and the ``test_engine`` fixture are).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import pytest
+
+from app.core.db_instrumentation import QueryCollector, collect_queries
+
+
+def budget_violations(
+    collector: QueryCollector,
+    max_queries: int | None = None,
+    max_repeats: int | None = None,
+    max_time_ms: float | None = None,
+) -> list[str]:
+    errors = []
+    if max_queries is not None and collector.count > max_queries:
+        errors.append(f"{collector.count} statements > max_queries={max_queries}")
+    if max_repeats is not None:
+        for fp, n in collector.repeated(max_repeats):
+            errors.append(f"{n}x (> max_repeats={max_repeats}): {fp[:200]}")
+    if max_time_ms is not None and collector.total_ms > max_time_ms:
+        errors.append(f"{collector.total_ms:.1f} ms in SQL > max_time_ms={max_time_ms}")
+    return errors
+
+
+def _fail(label: str, errors: list[str]) -> None:
+    pytest.fail(f"Query budget exceeded in {label}:\n  " + "\n  ".join(errors), pytrace=False)
+
+
+@pytest.fixture
+def query_budget():
+    @contextmanager
+    def budget(
+        max_queries: int | None = None,
+        max_repeats: int | None = None,
+        max_time_ms: float | None = None,
+        label: str = "query_budget block",
+    ) -> Iterator[QueryCollector]:
+        with collect_queries(label) as collector:
+            yield collector
+        errors = budget_violations(collector, max_queries, max_repeats, max_time_ms)
+        if errors:
+            _fail(label, errors)
+
+    return budget
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_queries=None, max_repeats=None, max_time_ms=None): "
+        "fail the test when its SQL exceeds the budget",
+    )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+    with collect_queries(item.nodeid) as collector:
+        result = yield
+    errors = budget_violations(collector, *marker.args, **marker.kwargs)
+    if errors:
+        _fail(item.nodeid, errors)
+    return result
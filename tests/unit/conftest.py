@@ -0,0 +1,30 @@
+"""Fixtures shared by the SQLite-backed unit tests."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401  (registers every table referenced by FKs)
+import app.models.asset_registry  # noqa: F401
+import tests.fakes.sqlite  # noqa: F401  (JSONB → JSON on SQLite)
+from app.models.base import Base
+
+
+@pytest.fixture
+def sqlite_session():
+    """Factory: ``sqlite_session(*models)`` → a ``Session`` on a fresh in-memory
+    database holding only those models' tables. Closed at teardown."""
+    sessions: list[Session] = []
+
+    def make(*models) -> Session:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine, tables=[model.__table__ for model in models])
+        session = Session(engine)
+        sessions.append(session)
+        return session
+
+    yield make
+    for session in sessions:
+        session.close()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.api.routes.core import ai_chat
+from app.services.core import ai_tool_index
+from tests.fakes.llm import FakeLLM
+
+TOOLS = [
+    {"name": "list_tiers", "description": "Liste les entreprises tiers clients fournisseurs"},
+    {"name": "list_projects", "description": "Liste les projets avec avancement retard et budget"},
+    {"name": "get_voyage", "description": "Détail d'un voyage navire ou hélicoptère"},
+    {"name": "list_ads", "description": "Liste les avis de séjour PAX offshore"},
+    {"name": "create_tier", "description": "Crée une entreprise tiers"},
+]
+
+
+def _hashing_encode(texts):
+    """Deterministic bag-of-words embedding (no model download)."""
+    out = np.zeros((len(texts), 256), dtype=np.float32)
+    for row, text in enumerate(texts):
+        folded = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+        for word in folded.replace("_", " ").split():
+            if len(word) > 3:
+                out[row, zlib.crc32(word[:6].encode()) % 256] += 1.0
+    norm = np.linalg.norm(out, axis=1, keepdims=True)
+    norm[norm == 0] = 1.0
+    return out / norm
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    calls = []
+
+    def encode(texts):
+        calls.append(len(texts))
+        return _hashing_encode(texts)
+
+    monkeypatch.setattr(ai_tool_index, "_indexes", OrderedDict())
+    monkeypatch.setattr(ai_tool_index, "_encode", encode)
+    return calls
+
+
+def _backend(tools):
+    async def list_tools(context=None):
+        return tools
+
+    return SimpleNamespace(tools_list=tools, list_tools=list_tools)
+
+
+@pytest.mark.asyncio
+async def test_index_is_built_once_per_tool_list(encoder):
+    first = await ai_tool_index.get_tool_index(TOOLS)
+    again = await ai_tool_index.get_tool_index([dict(t) for t in TOOLS])
+    assert again is first and encoder == [5]
+
+    ranked = ai_tool_index.select_tools("quels projets sont en retard ?", TOOLS, first)
+    assert ranked[0]["name"] == "list_projects"
+    assert encoder == [5, 1]  # one query encoding per message
+
+    changed = [*TOOLS[:-1], {"name": "create_tier", "description": "Ajoute un tiers"}]
+    assert (await ai_tool_index.get_tool_index(changed)) is not first
+    assert encoder == [5, 1, 5]
+
+
+@pytest.mark.asyncio
+async def test_candidates_respect_allowlist_and_name_mentions(encoder, monkeypatch):
+    async def get_backend(slug, config):
+        return _backend(TOOLS)
+
+    monkeypatch.setattr(ai_chat, "get_or_create_backend", get_backend)
+
+    read_only = await ai_chat._select_candidate_tools(None, "la liste des entreprises tiers")
+    write = await ai_chat._select_candidate_tools(None, "crée une entreprise tiers Acme")
+    named = await ai_chat._select_candidate_tools(None, "utilise get_voyage pour le dernier")
+
+    assert read_only[0]["name"] == "list_tiers"
+    assert "create_tier" not in {t["name"] for t in read_only}
+    assert "create_tier" in {t["name"] for t in write}
+    assert named[0]["name"] == "get_voyage"
+
+
+@pytest.mark.asyncio
+async def test_keyword_ranking_when_embeddings_unavailable(monkeypatch):
+    def unavailable(texts):
+        raise ImportError("model2vec")
+
+    monkeypatch.setattr(ai_tool_index, "_indexes", OrderedDict())
+    monkeypatch.setattr(ai_tool_index, "_encode", unavailable)
+    index = await ai_tool_index.get_tool_index(TOOLS)
+
+    assert index.vectors is None
+    ranked = ai_tool_index.select_tools("voyage navire", TOOLS, index)
+    assert ranked[0]["name"] == "get_voyage"
+    assert len(ai_tool_index.select_tools("zzz", TOOLS, index)) == len(TOOLS)
+
+
+def test_action_tokens_split_across_deltas_are_sanitised_whole():
+    text = ("  Voir le projet [[action:go:/projets/42|Ouvrir le projet]] ou "
+            "[[action:go:https://evil.example|Cliquer]] puis [[action:go:/projects|Liste]] [")
+    stream = ai_chat._ActionTokenStream()
+    out = []
+    for i in range(0, len(text), 3):
+        piece = stream.feed(text[i:i + 3])
+        assert "[[" not in piece or "]]" in piece
+        out.append(piece)
+    out.append(stream.flush())
+
+    assert "".join(out) == ai_chat._sanitize_action_tokens(text.strip())
+    assert "evil" not in "".join(out)
+
+
+@pytest.mark.parametrize("step", [3, 100, 700])
+def test_oversized_action_token_is_dropped_not_released(step):
+    text = ("Avant [[action:go:https://evil.example|" + "x" * 600 + "]] après "
+            "[[action:go:/projects|Liste]]")
+    stream = ai_chat._ActionTokenStream()
+    out = "".join(stream.feed(text[i:i + step]) for i in range(0, len(text), step)) + stream.flush()
+
+    assert "evil" not in out and "xxx" not in out
+    assert out == "Avant  après " + ai_chat._sanitize_action_tokens("[[action:go:/projects|Liste]]")
+
+
+async def _collect(gen):
+    events, start = [], time.perf_counter()
+    async for raw in gen:
+        events.append((time.perf_counter() - start, json.loads(raw.removeprefix("data: "))))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_stream_forwards_provider_tokens_as_they_arrive(monkeypatch):
+    reply = "Voici le résumé des projets en retard. [[action:go:/projets|Voir les projets]]"
+    fake = FakeLLM(reply=reply, chunk_size=5, token_delay=0.01)
+    monkeypatch.setattr(ai_chat, "_acompletion", fake)
+
+    events = await _collect(ai_chat._stream_completion([{"role": "user", "content": "?"}], {"model": "fake"}))
+
+    contents = [(t, e["text"]) for t, e in events if e["type"] == "content"]
+    assert events[-1][1] == {"type": "done"}
+    assert "".join(text for _, text in contents) == ai_chat._sanitize_action_tokens(reply)
+    assert len(contents) > 5
+    total = events[-1][0]
+    assert contents[0][0] < total / 4  # first token long before generation ends
+    assert fake.calls[0]["stream"] is True
+
+
+@pytest.mark.asyncio
+async def test_stream_reports_provider_errors(monkeypatch):
+    async def failing(**kwargs):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(ai_chat, "_acompletion", failing)
+    events = await _collect(ai_chat._stream_completion([], {"model": "fake"}))
+
+    assert [e for _, e in events] == [{"type": "error", "message": "provider down"}]
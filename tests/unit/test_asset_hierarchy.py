@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.core import redis_client
+from app.services.modules import asset_hierarchy_service
+from app.services.modules.asset_hierarchy_service import AssetHierarchy
+
+
+def _tree():
+    ids = {name: uuid4() for name in ("field", "site", "inst_a", "inst_b")}
+    tree = AssetHierarchy(entity_id=uuid4())
+    # Children before parents: parent pointers are resolved lazily.
+    tree.upsert("installation", ids["inst_b"], ids["site"], code="B", name="Inst B",
+                status="OPERATIONAL", installation_type="WELL_PAD")
+    tree.upsert("installation", ids["inst_a"], ids["site"], pob_capacity=40, code="A",
+                name="Inst A", status="OPERATIONAL", installation_type="FIXED_JACKET_PLATFORM")
+    tree.upsert("site", ids["site"], ids["field"], code="S1", name="Site 1",
+                status="OPERATIONAL", site_type="OFFSHORE")
+    tree.upsert("field", ids["field"], None, pob_capacity=120, code="F1", name="Field 1",
+                status="OPERATIONAL", country="CM")
+    tree.adjust_equipment(ids["inst_a"], 3)
+    return tree, ids
+
+
+def test_ancestors_and_pob_fallback():
+    tree, ids = _tree()
+
+    assert tree.ancestors(ids["inst_b"]) == [ids["inst_b"], ids["site"], ids["field"]]
+    assert tree.effective_pob(ids["inst_a"]) == (40, "installation")
+    assert tree.effective_pob(ids["inst_b"]) == (120, "champ")
+    assert tree.ancestors(uuid4()) == []
+
+
+def test_render_matches_hierarchy_shape_and_filters_subtree():
+    tree, ids = _tree()
+
+    rendered = tree.render()
+    assert rendered[0]["site_count"] == 1
+    site = rendered[0]["sites"][0]
+    assert [i["code"] for i in site["installations"]] == ["A", "B"]
+    assert site["installations"][0]["equipment_count"] == 3
+
+    branch = tree.render(root_id=ids["inst_b"])
+    assert [i["code"] for i in branch[0]["sites"][0]["installations"]] == ["B"]
+
+
+def test_patches_reparent_and_archive():
+    tree, ids = _tree()
+    other_site = uuid4()
+    tree.upsert("site", other_site, ids["field"], code="S2", name="Site 2",
+                status="OPERATIONAL", site_type="ONSHORE")
+
+    inst_b = SimpleNamespace(
+        __tablename__="ar_installations", id=ids["inst_b"], site_id=other_site, archived=False,
+        pob_capacity=None, code="B", name="Inst B", status="OPERATIONAL",
+        installation_type="WELL_PAD",
+    )
+    tree.apply_patch(asset_hierarchy_service.node_patch(inst_b))
+    tree.apply_patch(asset_hierarchy_service.equipment_patch(ids["inst_a"], ids["inst_b"]))
+
+    assert tree.ancestors(ids["inst_b"])[1] == other_site
+    assert tree.subtree_ids(other_site, kinds=("installation",)) == [ids["inst_b"]]
+    assert tree.equipment_count[tree.index[ids["inst_b"]]] == 1
+
+    inst_b.archived = True
+    tree.apply_patch(asset_hierarchy_service.node_patch(inst_b))
+    assert tree.subtree_ids(ids["field"], kinds=("installation",)) == [ids["inst_a"]]
+
+
+def test_etag_without_shared_version_follows_the_data():
+    tree, ids = _tree()
+    assert tree.version is None
+    before = tree.etag()
+    assert tree.etag(rendered=tree.render()) == before
+    assert tree.etag(ids["inst_b"]) != before
+
+    tree.adjust_equipment(ids["inst_a"], 1)
+    assert tree.etag() != before
+
+    tree.version = "7"
+    assert tree.etag() == f'"ah-{tree.entity_id}-7-all"'
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+        return int(self.values[key])
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(f) for f in fields]
+
+    async def expire(self, key, seconds):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_workers_replay_shared_patches_instead_of_reloading(monkeypatch):
+    redis = FakeRedis()
+    tree, ids = _tree()
+    loads = []
+
+    async def fake_load(db, entity_id):
+        loads.append(entity_id)
+        return tree
+
+    monkeypatch.setattr(redis_client, "redis_client", redis)
+    monkeypatch.setattr(asset_hierarchy_service, "load_asset_hierarchy", fake_load)
+    monkeypatch.setattr(asset_hierarchy_service, "_hierarchies", {})
+    entity_id = tree.entity_id
+
+    assert (await asset_hierarchy_service.get_asset_hierarchy(None, entity_id)).version == "0"
+
+    # Another worker publishes an equipment move: this worker replays it.
+    await redis.incr(asset_hierarchy_service._version_key(entity_id))
+    await redis.hset(
+        asset_hierarchy_service._patches_key(entity_id), "1",
+        json.dumps(asset_hierarchy_service.equipment_patch(None, ids["inst_b"])),
+    )
+    current = await asset_hierarchy_service.get_asset_hierarchy(None, entity_id)
+    assert current.version == "1"
+    assert current.equipment_count[current.index[ids["inst_b"]]] == 1
+    assert len(loads) == 1
+
+    # A bump without a stored patch forces a reload.
+    await asset_hierarchy_service.invalidate_asset_hierarchy(entity_id)
+    await asset_hierarchy_service.get_asset_hierarchy(None, entity_id)
+    assert len(loads) == 2
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from datetime import UTC, date, datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.core import audit
+
+
+class FakeResult:
+    def __init__(self, names=(), rowcount=0, value=None):
+        self._names = list(names)
+        self.rowcount = rowcount
+        self._value = value
+
+    def scalar(self):
+        return self._value
+
+    def scalars(self):
+        return SimpleNamespace(all=lambda: self._names)
+
+
+class FakeDB:
+    def __init__(self, partitions=(), default_months=()):
+        self.info = {}
+        self.partitions = list(partitions)
+        self.default_months = set(default_months)  # months with rows in audit_log_default
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "pg_inherits" in sql:
+            return FakeResult(self.partitions)
+        if sql.startswith("SELECT EXISTS"):
+            return FakeResult(value=params["start"] in self.default_months)
+        if sql.startswith("DELETE"):
+            return FakeResult(rowcount=7)
+        return FakeResult()
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.mark.asyncio
+async def test_buffered_entries_are_flushed_as_multi_row_inserts(monkeypatch):
+    db = FakeDB()
+    audit.enable_audit_buffering(db)
+    for i in range(5):
+        await audit.record_audit(
+            db, action="update", resource_type="tier", resource_id=str(i),
+            entity_id=uuid4(), details={"i": i},
+        )
+    assert db.statements == []
+    assert audit.pending_audit_entries(db) == 5
+
+    executed = []
+    session = SimpleNamespace(info=db.info, execute=executed.append)
+    monkeypatch.setattr(audit, "INSERT_CHUNK_SIZE", 2)
+    audit._flush_audit_buffer(session)
+
+    assert [len(stmt._multi_values[0]) for stmt in executed] == [2, 2, 1]
+    assert audit.pending_audit_entries(db) == 0
+
+    # An outer rollback discards what was buffered, a savepoint rollback does not.
+    await audit.record_audit(db, action="create", resource_type="tier", buffered=True)
+    audit._discard_audit_buffer(session, SimpleNamespace(nested=True))
+    assert audit.pending_audit_entries(db) == 1
+    audit._discard_audit_buffer(session, SimpleNamespace(nested=False))
+    assert audit.pending_audit_entries(db) == 0
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_missing_months():
+    db = FakeDB(partitions=["audit_log_p202610", "audit_log_default"])
+
+    created = await audit.ensure_audit_partitions(db, ahead=3, today=date(2026, 10, 19))
+
+    assert created == ["audit_log_p202611", "audit_log_p202612", "audit_log_p202701"]
+    assert any("FROM ('2026-12-01') TO ('2027-01-01')" in sql for sql in db.statements)
+    assert not any("DETACH" in sql or "INSERT" in sql for sql in db.statements)
+    assert db.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_moves_rows_out_of_the_default_partition():
+    # create_all database: only the DEFAULT partition, holding this month's rows.
+    db = FakeDB(partitions=["audit_log_default"], default_months={date(2026, 10, 1)})
+
+    created = await audit.ensure_audit_partitions(db, ahead=1, today=date(2026, 10, 19))
+
+    assert created == ["audit_log_p202610", "audit_log_p202611"]
+    ddl = [sql for sql in db.statements if not sql.startswith(("SELECT", "INSERT", "DELETE"))]
+    assert ddl == [
+        "ALTER TABLE audit_log DETACH PARTITION audit_log_default",
+        "CREATE TABLE IF NOT EXISTS audit_log_p202610 PARTITION OF audit_log "
+        "FOR VALUES FROM ('2026-10-01') TO ('2026-11-01')",
+        "CREATE TABLE IF NOT EXISTS audit_log_p202611 PARTITION OF audit_log "
+        "FOR VALUES FROM ('2026-11-01') TO ('2026-12-01')",
+        "ALTER TABLE audit_log ATTACH PARTITION audit_log_default DEFAULT",
+    ]
+    moved = db.statements[-3:-1]
+    assert moved[0].startswith("INSERT INTO audit_log_p202610 SELECT * FROM audit_log_default WHERE")
+    assert moved[1].startswith("DELETE FROM audit_log_default WHERE")
+    assert db.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_purge_drops_expired_partitions_and_trims_boundary():
+    db = FakeDB(partitions=[
+        "audit_log_p202508", "audit_log_default", "audit_log_p202509",
+        "audit_log_p202510", "audit_log_p202511",
+    ])
+
+    dropped, trimmed = await audit.purge_audit_log_before(db, datetime(2025, 10, 19, tzinfo=UTC))
+
+    assert dropped == ["audit_log_p202508", "audit_log_p202509"]
+    assert "DETACH PARTITION audit_log_p202508" in db.statements[1]
+    assert db.statements[-1].startswith("DELETE FROM audit_log")
+    assert trimmed == 7
+    assert db.commits == 0  # the caller commits
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.core import auth_context, redis_client
+from app.core.auth_context import AuthPrincipal
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+        self.published = []
+
+    async def mget(self, *keys):
+        return [self.values.get(k) for k in keys]
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hset(self, key, mapping):
+        self.hashes[key] = dict(mapping)
+
+    async def expire(self, key, seconds):
+        pass
+
+    async def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_client, "redis_client", fake)
+    monkeypatch.setattr(auth_context, "_local", auth_context.OrderedDict())
+    return fake
+
+
+def _principal(user_id, *entities):
+    return AuthPrincipal(
+        user_id=user_id, active=True, mfa_enabled=False, language="fr",
+        default_entity_id=None, entity_ids=frozenset(entities),
+    )
+
+
+@pytest.mark.asyncio
+async def test_principal_served_from_local_then_redis_until_user_invalidated(redis):
+    user_id, entity = uuid4(), uuid4()
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return _principal(user_id, entity)
+
+    first = await auth_context.get_principal("jti-1", user_id, load)
+    assert first.entity_ids == {entity}
+    assert not auth_context.last_lookup_hit()
+
+    assert await auth_context.get_principal("jti-1", user_id, load) == first
+    assert auth_context.last_lookup_hit()
+
+    # Another worker: empty local LRU, valid Redis entry.
+    auth_context._local.clear()
+    assert await auth_context.get_principal("jti-1", user_id, load) == first
+    assert len(loads) == 1
+
+    await auth_context.invalidate_auth_user(user_id)
+    assert redis.published == [(auth_context.INVALIDATION_CHANNEL, f"user:{user_id}")]
+    await auth_context.get_principal("jti-1", user_id, load)
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_current_entity_uses_cached_memberships(redis):
+    from app.api import deps
+
+    user = SimpleNamespace(
+        id=uuid4(), default_entity_id=uuid4(), active=True, mfa_enabled=False, language="fr",
+    )
+    member_of, other = uuid4(), uuid4()
+    queries = []
+
+    class FakeScalars:
+        def all(self):
+            return [member_of]
+
+    class DB:
+        async def execute(self, stmt):
+            queries.append(stmt)
+            return SimpleNamespace(scalars=lambda: FakeScalars())
+
+    def request():
+        return SimpleNamespace(headers={}, state=SimpleNamespace(auth_token_key="jti-2"))
+
+    assert await deps.get_current_entity(
+        request=request(), x_entity_id=str(member_of), current_user=user, db=DB(),
+    ) == member_of
+    second = request()
+    assert await deps.get_current_entity(
+        request=second, x_entity_id=str(member_of), current_user=user, db=DB(),
+    ) == member_of
+    assert len(queries) == 1
+    assert second.state.auth_db_queries_saved == 1
+
+    from fastapi import HTTPException
+
+    with pytest.raises(HTTPException) as exc:
+        await deps.get_current_entity(
+            request=request(), x_entity_id=str(other), current_user=user, db=DB(),
+        )
+    assert exc.value.status_code == 403
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import random
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.common import TierContact
+from app.models.paxlog import Ads, AdsPax
+from app.services.modules.contact_match_index import match_candidates_query, rebuild_contact_match_index
+from app.services.modules.paxlog_service import (
+    find_external_contact_matches,
+    is_external_contact_match_strong,
+    score_external_contact_match,
+)
+from tests.fakes.sqlite import SyncSessionDB
+
+
+FIRST_NAMES = ["Jean", "Philippe", "Stéphane", "Chloé", "Marc", "Marck", "Filippe", "Moussa", "Jacques", "Rock"]
+LAST_NAMES = ["Mbarga", "N'Dongo", "Nkou", "Nkouh", "Dupont", "Du Pont", "Ekotto", "Ekoto", "Quentin", "Kentin"]
+
+
+def _variant(rng: random.Random, value: str) -> str:
+    return rng.choice([value, value.upper(), f" {value.lower()} "])
+
+
+def _contact(rng: random.Random, tier_id) -> TierContact:
+    return TierContact(
+        tier_id=tier_id,
+        first_name=rng.choice(FIRST_NAMES),
+        last_name=rng.choice(LAST_NAMES),
+        email=rng.choice([None, "", f"p{rng.randint(0, 30)}@ops.example"]),
+        phone=rng.choice([None, f"+237 6{rng.randint(0, 30):02d} 00", f"(+237)6{rng.randint(0, 30):02d}-00"]),
+        badge_number=rng.choice([None, f"BDG-{rng.randint(0, 30)}"]),
+        active=rng.random() < 0.9,
+    )
+
+
+def _lookup(rng: random.Random) -> dict:
+    return {
+        "first_name": _variant(rng, rng.choice(FIRST_NAMES)),
+        "last_name": _variant(rng, rng.choice(LAST_NAMES)),
+        "birth_date": None,
+        "nationality": None,
+        "email": rng.choice([None, f"P{rng.randint(0, 30)}@OPS.example "]),
+        "phone": rng.choice([None, f"+2376{rng.randint(0, 30):02d}00"]),
+        "badge_number": rng.choice([None, f"bdg-{rng.randint(0, 30)}"]),
+    }
+
+
+def _full_scan(session: Session, company_ids, lookup) -> set:
+    """The former lookup: score every active contact of the companies."""
+    contacts = session.execute(
+        select(TierContact).where(TierContact.tier_id.in_(company_ids), TierContact.active == True)  # noqa: E712
+    ).scalars()
+    strong = set()
+    for contact in contacts:
+        score, reasons = score_external_contact_match(candidate=contact, **lookup)
+        if is_external_contact_match_strong(score=score, reasons=reasons):
+            strong.add(contact.id)
+    return strong
+
+
+@pytest.fixture
+def session(sqlite_session):
+    return sqlite_session(TierContact, Ads, AdsPax)
+
+
+@pytest.mark.parametrize("seed", range(10))
+async def test_indexed_candidates_have_the_recall_of_the_full_scan(session, seed):
+    rng = random.Random(seed)
+    companies = [uuid4() for _ in range(3)]
+    session.add_all(_contact(rng, rng.choice(companies)) for _ in range(300))
+    session.commit()
+    allowed = companies[:2]
+    hits = 0
+
+    for _ in range(40):
+        lookup = _lookup(rng)
+        candidates = session.execute(
+            match_candidates_query(
+                allowed,
+                first_name=lookup["first_name"],
+                last_name=lookup["last_name"],
+                email=lookup["email"],
+                phone=lookup["phone"],
+                badge_number=lookup["badge_number"],
+            )
+        ).scalars().all()
+        expected = _full_scan(session, allowed, lookup)
+
+        assert expected <= {c.id for c in candidates}
+        assert len(candidates) < 100
+        matches = await find_external_contact_matches(SyncSessionDB(session), ads_id=uuid4(), allowed_company_ids=allowed, **lookup)
+        assert {m["contact_id"] for m in matches} <= expected
+        assert len(matches) == min(5, len(expected))
+        hits += bool(expected)
+    assert hits > 10
+
+
+def test_keys_are_refreshed_on_contact_write(session):
+    contact = TierContact(tier_id=uuid4(), first_name="Philippe", last_name="Nkouh", email=" J.Doe@Ops.Example ")
+    session.add(contact)
+    session.commit()
+    assert (contact.match_name_key, contact.match_email, contact.match_phone) == ("flp nk", "j.doe@ops.example", None)
+
+    contact.phone = "+237 (6) 99-00"
+    contact.last_name = "Mbarga"
+    session.commit()
+    session.expire_all()
+    assert (contact.match_name_key, contact.match_phone) == ("flp mbrg", "+23769900")
+
+
+async def test_rebuild_backfills_rows_written_without_keys(session):
+    tier_id = uuid4()
+    ids = [uuid4() for _ in range(7)]
+    session.execute(insert(TierContact), [
+        {"id": i, "tier_id": tier_id, "first_name": "Jean", "last_name": f"Nkou{n}", "badge_number": f" B{n} "}
+        for n, i in enumerate(ids)
+    ])
+    session.commit()
+    unkeyed = session.execute(
+        match_candidates_query([tier_id], first_name="x", last_name="y", email=None, phone=None, badge_number=None)
+    ).scalars().all()
+    assert len(unkeyed) == 7  # never indexed: still scored, not missed
+
+    assert await rebuild_contact_match_index(SyncSessionDB(session), tier_ids=[tier_id], chunk_size=3) == 7
+
+    session.expire_all()
+    assert session.get(TierContact, ids[2]).match_badge == "b2"
+    assert session.execute(
+        match_candidates_query([tier_id], first_name="x", last_name="y", email=None, phone=None, badge_number="b2")
+    ).scalars().one().id == ids[2]
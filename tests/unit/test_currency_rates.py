@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from datetime import date
+from uuid import uuid4
+
+import pytest
+
+from app.core import redis_client
+from app.services.core import currency_service
+from app.services.core.currency_service import RateNotFoundError, RateTable
+
+ROWS = [
+    ("USD", "XAF", 600.0, date(2026, 1, 1)),
+    ("USD", "XAF", 610.0, date(2026, 3, 1)),
+    ("XAF", "EUR", 1 / 655.957, date(2026, 1, 1)),
+    ("GBP", "XAF", 780.0, date(2026, 2, 1)),
+]
+
+
+def test_rate_table_resolves_direct_inverse_and_pivot_as_of_date():
+    table = RateTable.build(uuid4(), "XAF", ROWS)
+
+    assert table.rate("USD", "XAF", date(2026, 2, 15)) == 600.0
+    assert table.rate("USD", "XAF", date(2026, 3, 1)) == 610.0
+    assert table.rate("XAF", "USD", date(2026, 3, 2)) == pytest.approx(1 / 610.0)
+    assert table.rate("EUR", "XAF", date(2026, 6, 1)) == pytest.approx(655.957)
+    # USD -> GBP triangulated through XAF once both legs exist.
+    assert table.rate("USD", "GBP", date(2026, 1, 15)) is None
+    assert table.rate("USD", "GBP", date(2026, 3, 5)) == pytest.approx(610.0 / 780.0)
+    assert table.rate("USD", "XAF", date(2025, 12, 31)) is None
+
+
+class FakeResult:
+    def __init__(self, rows=None, scalar=None):
+        self._rows = rows or []
+        self._scalar = scalar
+
+    def all(self):
+        return self._rows
+
+    def scalar_one_or_none(self):
+        return self._scalar
+
+
+class FakeDB:
+    def __init__(self):
+        self.calls = 0
+
+    async def execute(self, statement):
+        self.calls += 1
+        if "currency_rates" in str(statement):
+            return FakeResult(rows=ROWS)
+        return FakeResult(scalar="XAF")
+
+
+@pytest.mark.asyncio
+async def test_convert_many_loads_rates_once(monkeypatch):
+    monkeypatch.setattr(currency_service, "_rate_tables", {})
+    monkeypatch.setattr(redis_client, "redis_client", None)
+    db = FakeDB()
+    entity_id = uuid4()
+
+    converted = await currency_service.convert_many(
+        db, entity_id,
+        [10.0, 20.0, 5.0, 1000.0],
+        ["USD", "USD", "GBP", "XAF"],
+        [date(2026, 2, 1), date(2026, 3, 10), date(2026, 2, 1), date(2026, 2, 1)],
+        "XAF",
+    )
+    assert converted == [6000.0, 12200.0, 3900.0, 1000.0]
+    assert await currency_service.convert(db, entity_id, 1.0, "USD", "XAF", date(2026, 1, 2)) == 600.0
+    assert db.calls == 2  # entity pivot + rate history, then served from memory
+
+    with pytest.raises(RateNotFoundError):
+        await currency_service.convert_many(db, entity_id, [1.0], ["JPY"], [date(2026, 2, 1)], "XAF")
+    assert await currency_service.convert_many(
+        db, entity_id, [1.0], ["JPY"], [date(2026, 2, 1)], "XAF", strict=False,
+    ) == [None]
+
+    await currency_service.invalidate_rate_table(entity_id)
+    await currency_service.get_rate(db, entity_id, "USD", "XAF", date(2026, 2, 1))
+    assert db.calls == 4
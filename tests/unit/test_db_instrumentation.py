@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+
+from app.core import db_instrumentation
+from app.core.db_instrumentation import collect_queries, fingerprint, instrument_engine
+from app.core.middleware.db_query_stats import DbQueryStatsMiddleware
+from tests.plugins.query_budget import budget_violations
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    instrument_engine(engine)  # idempotent: statements must not be counted twice
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO item (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+    yield engine
+    engine.dispose()
+
+
+def _n_plus_one(engine, n=3):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT id FROM item"))
+        for i in range(1, n + 1):
+            conn.execute(text("SELECT name FROM item WHERE id = :id"), {"id": i})
+
+
+def test_fingerprint_collapses_literals_and_lists():
+    assert fingerprint("SELECT * FROM t WHERE id = $1") == fingerprint("SELECT *  FROM t\nWHERE id = 42")
+    assert fingerprint("SELECT * FROM t WHERE name = 'O''Neil'") == "SELECT * FROM t WHERE name = ?"
+    assert fingerprint("SELECT 1 FROM t WHERE id IN ($1, $2, $3)") == fingerprint(
+        "SELECT 1 FROM t WHERE id IN (:a, :b)")
+    assert fingerprint("INSERT INTO t (a) VALUES (%s), (%s), (%s)") == "INSERT INTO t (a) VALUES (?)"
+    assert fingerprint("SELECT col_2 FROM t2") == "SELECT col_2 FROM t2"
+
+
+def test_collector_counts_and_flags_repeated_statements(engine):
+    with collect_queries("outer") as outer:
+        _n_plus_one(engine, 3)
+        with collect_queries("inner") as inner:
+            _n_plus_one(engine, 12)
+
+    assert inner.count == 13 and outer.count == 17
+    assert outer.total_seconds >= inner.total_seconds > 0
+    assert inner.repeated(10) == [("SELECT name FROM item WHERE id = ?", 12)]
+    assert outer.repeated(14) == [("SELECT name FROM item WHERE id = ?", 15)]
+    assert inner.header_value(10).startswith("count=13; time_ms=")
+    assert inner.header_value(10).endswith("n_plus_one=1")
+
+    _n_plus_one(engine)  # no active collector: nothing recorded anywhere
+    assert outer.count == 17
+
+
+def test_failed_statement_leaves_no_timing_behind(engine):
+    with collect_queries("errors") as collector:
+        with engine.connect() as conn:
+            with pytest.raises(Exception, match="no such table"):
+                conn.execute(text("SELECT * FROM missing"))
+            conn.execute(text("SELECT id FROM item"))
+            assert not any(key.startswith("query_start") for key in conn.info)
+
+    assert collector.count == 1
+    assert collector.fingerprints == {"SELECT id FROM item": 1}
+
+
+def test_query_budget_fixture(engine, query_budget):
+    with query_budget(max_queries=4, max_repeats=3) as collector:
+        _n_plus_one(engine, 3)
+    assert collector.count == 4
+
+    with pytest.raises(pytest.fail.Exception, match="max_repeats=2"):
+        with query_budget(max_repeats=2):
+            _n_plus_one(engine, 3)
+
+    with collect_queries("check") as collector:
+        _n_plus_one(engine, 5)
+    assert budget_violations(collector, max_queries=10, max_repeats=5) == []
+    assert budget_violations(collector, max_queries=5) == ["6 statements > max_queries=5"]
+    assert budget_violations(collector, max_time_ms=0)
+
+
+@pytest.mark.query_budget(max_queries=4, max_repeats=3)
+def test_query_budget_marker(engine):
+    _n_plus_one(engine, 3)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("debug_header", [True, False])
+async def test_middleware_reports_per_route(engine, monkeypatch, debug_header):
+    monkeypatch.setattr(db_instrumentation.settings, "ENVIRONMENT", "production")
+    monkeypatch.setattr(db_instrumentation.settings, "DB_QUERY_DEBUG_HEADER", debug_header)
+    observed = []
+    monkeypatch.setattr(
+        "app.core.middleware.db_query_stats.observe_request",
+        lambda route, collector: observed.append((route, collector.count, len(collector.repeated(10)))),
+    )
+    app = FastAPI()
+    app.add_middleware(DbQueryStatsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        _n_plus_one(engine, item_id)
+        return {"ok": True}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/items/11")
+
+    assert response.status_code == 200
+    assert observed == [("/items/{item_id}", 12, 1)]
+    if debug_header:
+        assert response.headers["X-DB-Query-Stats"].startswith("count=12; time_ms=")
+    else:
+        assert "X-DB-Query-Stats" not in response.headers
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.services.modules import deck_packing_engine as engine
+from app.services.modules.deck_packing_engine import DeckItem, Rect, pack_deck
+from app.services.modules.packlog_service import suggest_deck_layout
+
+
+def manifest(n: int, seed: int = 0, hazmat: float = 0.08) -> list[DeckItem]:
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        is_hazmat = rng.random() < hazmat
+        items.append(DeckItem(
+            key=i,
+            code=f"CGO-{i:04d}",
+            width_m=rng.choice([1.0, 1.2, 2.4, 3.0, 6.1]),
+            length_m=rng.choice([1.0, 1.2, 2.4, 2.6]),
+            weight_kg=rng.uniform(200, 8000),
+            stackable=rng.random() < 0.3,
+            hazmat=is_hazmat,
+            explosive=is_hazmat and rng.random() < 0.3,
+            unload_rank=rng.randint(1, 4),
+        ))
+    return items
+
+
+def assert_valid(plan, exclusions=()):
+    floor = [p for p in plan.placements if p.stack_level == 0]
+    for i, a in enumerate(floor):
+        r = a.rect
+        assert r.x >= engine.MARGIN_M - 1e-6 and r.x2 <= plan.width_m - engine.MARGIN_M + 1e-6
+        assert r.y >= engine.MARGIN_M - 1e-6 and r.y2 <= plan.length_m - engine.MARGIN_M + 1e-6
+        assert not any(r.overlaps(e) for e in exclusions)
+        for b in floor[i + 1:]:
+            assert not r.overlaps(b.rect)
+            if a.item.hazmat != b.item.hazmat:
+                assert not r.inflate(engine.HAZMAT_SEPARATION_M - 1e-3).overlaps(b.rect)
+            elif a.item.hazmat and a.item.explosive != b.item.explosive:
+                assert not r.inflate(engine.EXPLOSIVE_SEPARATION_M - 1e-3).overlaps(b.rect)
+    for p in plan.placements:
+        if p.base is not None:
+            base = p.base
+            assert base.item.stackable and not p.item.hazmat
+            assert p.item.weight_kg <= base.item.weight_kg
+            assert p.item.unload_rank <= base.item.unload_rank
+            assert p.rect.w <= base.rect.w + 1e-6 and p.rect.l <= base.rect.l + 1e-6
+    assert len(plan.placements) + len(plan.unplaced) == len({p.item.key for p in plan.placements} | {i.key for i, _ in plan.unplaced})
+
+
+@pytest.mark.parametrize("n,seed", [(50, 1), (120, 2), (300, 3)])
+def test_layouts_respect_geometry_separation_and_stacking(n, seed):
+    exclusions = [Rect(6.0, 10.0, 3.0, 2.0)]
+
+    plan = pack_deck(manifest(n, seed), width_m=15.0, length_m=40.0, max_weight_kg=900_000, exclusions=exclusions)
+
+    assert_valid(plan, exclusions)
+    assert len(plan.placements) + len(plan.unplaced) == n
+
+
+@pytest.mark.parametrize("hazmat", [0, 0.25])
+def test_cargo_for_earlier_stops_is_never_behind_later_cargo(hazmat):
+    plan = pack_deck(manifest(80, 4, hazmat=hazmat), width_m=12.0, length_m=60.0)
+
+    floor = [p for p in plan.placements if p.stack_level == 0]
+    for a in floor:
+        for b in floor:
+            # Hazmat is segregated at the far end, explosives deepest: order
+            # holds within ordinary cargo and within each class of hazmat.
+            same_class = (a.item.hazmat, a.item.explosive) == (b.item.hazmat, b.item.explosive)
+            same_lane = a.rect.x < b.rect.x2 and b.rect.x < a.rect.x2
+            if same_class and same_lane and a.item.unload_rank < b.item.unload_rank:
+                assert a.rect.y < b.rect.y
+
+
+def test_hazmat_for_earlier_stops_sits_nearer_the_working_end():
+    items = [DeckItem(rank, f"HZ{rank}", 3.0, 3.0, 1000, hazmat=True, unload_rank=rank) for rank in (1, 2, 3)]
+
+    plan = pack_deck(items, width_m=4.0, length_m=40.0)
+
+    y = {p.item.unload_rank: p.rect.y for p in plan.placements}
+    assert y[1] < y[2] < y[3]
+
+
+def test_long_items_are_rotated_to_fit_a_narrow_deck():
+    # Usable deck 4 m x 9 m: the 6 m racks only fit lengthwise, the boxes
+    # fill the 2.7 m left behind them.
+    racks = [DeckItem(i, f"R{i}", 6.0, 1.5, 900) for i in range(2)]
+    boxes = [DeckItem(10 + i, f"B{i}", 2.2, 1.0, 300) for i in range(3)]
+
+    plan = pack_deck(racks + boxes, width_m=5.0, length_m=10.0)
+
+    assert plan.unplaced == []
+    assert all(p.rotated for p in plan.placements if p.item.code.startswith("R"))
+    assert_valid(plan)
+
+
+def test_items_without_floor_space_stack_on_heavier_cargo_leaving_no_earlier():
+    base = DeckItem("base", "BASE", 4.0, 4.0, 5000, stackable=True, unload_rank=2)
+    early = DeckItem("early", "EARLY", 3.0, 3.0, 800, unload_rank=2)
+    late = DeckItem("late", "LATE", 3.0, 3.0, 800, unload_rank=3)
+
+    plan = pack_deck([base, early, late], width_m=5.3, length_m=5.3)
+
+    placed = {p.item.key: p for p in plan.placements}
+    assert placed["early"].base is placed["base"] and placed["early"].stack_level == 1
+    assert [(i.key, why) for i, why in plan.unplaced] == [("late", "no_space")]
+
+
+def test_band_load_limits_are_enforced():
+    heavy = [DeckItem(i, f"H{i}", 1.0, 1.0, 3000) for i in range(6)]
+
+    plan = pack_deck(heavy, width_m=6.0, length_m=8.0, max_weight_kg=8000)
+
+    limit = 8000 / engine.LOAD_BAND_COUNT * engine.LOAD_BAND_ALLOWANCE
+    assert all(load <= limit for load in plan.band_loads_kg)
+    assert {why for _, why in plan.unplaced} == {"load_limit"}
+    assert plan.metrics()["band_limit_kg"] == limit
+
+
+def test_local_search_never_worsens_the_greedy_plan():
+    items = manifest(90, 5)
+    greedy = pack_deck(items, width_m=12.0, length_m=30.0)
+
+    searched = pack_deck(items, width_m=12.0, length_m=30.0, time_budget_s=0.3)
+
+    assert searched.search_iterations > 0
+    assert searched.score() <= greedy.score()
+    assert_valid(searched)
+
+
+def test_metrics_report_utilisation_and_centre_of_gravity():
+    plan = pack_deck([DeckItem(1, "A", 2.0, 2.0, 1000), DeckItem(2, "B", 2.0, 2.0, 1000)], width_m=5.5, length_m=5.0)
+
+    metrics = plan.metrics()
+    assert metrics["placed_count"] == 2 and metrics["unplaced_count"] == 0
+    assert metrics["area_utilization_pct"] == pytest.approx(8 / 18 * 100, abs=0.1)
+    assert metrics["cog_lateral_offset_pct"] < 10
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+    def scalars(self):
+        return SimpleNamespace(all=lambda: self.value)
+
+    def all(self):
+        return self.value
+
+
+class _QueuedDB:
+    def __init__(self, *results):
+        self.results = list(results)
+
+    async def execute(self, statement, params=None):
+        return _Result(self.results.pop(0))
+
+
+def _cargo(code, **kw):
+    values = dict(
+        id=uuid4(), tracking_code=code, width_cm=200, length_cm=100, weight_kg=1000.0, stackable=False,
+        cargo_type="unit", description="Pallet", destination_asset_id=None,
+    )
+    values.update(kw)
+    return SimpleNamespace(**values)
+
+
+async def test_suggest_deck_layout_reports_placements_metrics_and_warnings():
+    first_stop, second_stop = uuid4(), uuid4()
+    zone = SimpleNamespace(
+        width_m=8.0, length_m=20.0, max_weight_kg=5000.0,
+        exclusion_zones=[{"x": 0, "y": 0, "w": 8, "h": 2, "reason": "crane"}, {"x": 1}],
+    )
+    cargo = [
+        _cargo("CGO-1", destination_asset_id=second_stop),
+        _cargo("CGO-2", destination_asset_id=first_stop),
+        _cargo("CGO-3", cargo_type="hazmat", description="Explosive charges"),
+        _cargo("CGO-4", weight_kg=4000.0),
+    ]
+    db = _QueuedDB(zone, cargo, [(first_stop, 1), (second_stop, 2)])
+
+    result = await suggest_deck_layout(db, uuid4(), uuid4(), uuid4())
+
+    by_code = {p["tracking_code"]: p for p in result["placements"]}
+    assert by_code["CGO-2"]["suggested_y"] < by_code["CGO-1"]["suggested_y"]
+    assert by_code["CGO-2"]["suggested_y"] >= 2.0  # clear of the crane exclusion
+    assert by_code["CGO-2"]["reason"] == "Grouped by destination (stop 1)"
+    assert by_code["CGO-3"]["zone"] == "hazmat_isolated"
+    assert result["total_weight_kg"] == 7000.0 and result["utilization_pct"] == 140.0
+    assert result["metrics"]["placed_count"] == len(result["placements"])
+    assert any(w.startswith("EXPLOSIVE cargo CGO-3") for w in result["warnings"])
+    assert any(w.startswith("OVERWEIGHT") for w in result["warnings"])
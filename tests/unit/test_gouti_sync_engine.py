@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from app.api.routes.core import gouti_sync
+from app.services.connectors.gouti_connector import GoutiConnector
+
+BASE = "http://gouti.test/v1/client"
+
+# Shapes recorded from /gouti/debug/raw-projects and /raw-tasks (trimmed).
+PROJECTS = {
+    str(1000 + i): {
+        "Ref": f"PRJ-{i}", "Name": f"Projet {i}", "Status": "En cours de réalisation",
+        "Tasks_progress": f"{i * 10}%", "Start_date": "2026-01-05", "Weather": "cloudy",
+    }
+    for i in range(1, 7)
+}
+TASKS = {
+    pid: {
+        f"{pid}1": {"ref_ta": f"{pid}1", "name_ta": "Lot 1", "level_ta": "1", "macro_ta": "1",
+                    "initial_start_date_ta": "2026-01-05 00:00:00"},
+        f"{pid}2": {"ref_ta": f"{pid}2", "name_ta": "Forage", "level_ta": "2", "progress_ta": "40",
+                    "status_ta": "1"},
+        f"{pid}3": {"ref_ta": f"{pid}3", "name_ta": "Réception", "level_ta": "2", "milestone_ta": "1",
+                    "initial_end_date_ta": "2026-03-01 00:00:00"},
+    }
+    for pid in PROJECTS
+}
+
+
+class FakeGouti:
+    """Replays the recorded fixtures and tracks auth calls and concurrency."""
+
+    def __init__(self, latency: float = 0.01, expire_first_token: bool = False):
+        self.latency = latency
+        self.codes = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.tokens_issued = 0
+        self.expired = {"tok-1"} if expire_first_token else set()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.removeprefix("/v1/client")
+        if path == "/code":
+            self.codes += 1
+            await asyncio.sleep(self.latency)
+            return httpx.Response(200, json={"code": "abc"})
+        if path == "/token":
+            self.tokens_issued += 1
+            return httpx.Response(200, json={"token": f"tok-{self.tokens_issued}"})
+        if request.headers["Authorization"].removeprefix("Bearer ") in self.expired:
+            return httpx.Response(401, json={"error": "expired"})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if path == "/projects":
+            return httpx.Response(200, json=PROJECTS)
+        project_id = path.split("/")[2]
+        return httpx.Response(200, json=TASKS[project_id])
+
+
+def _connector(server: FakeGouti, **kwargs) -> GoutiConnector:
+    return GoutiConnector(
+        BASE, "client", "secret", "ENT", transport=httpx.MockTransport(server), **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_connector_shares_token_and_bounds_concurrency():
+    server = FakeGouti()
+    async with _connector(server, max_concurrency=3) as connector:
+        projects = await connector.get_projects()
+        results = {pid: tasks async for pid, tasks in connector.iter_project_tasks(
+            [p["_id"] for p in projects]
+        )}
+
+    assert server.codes == 1
+    assert set(results) == set(PROJECTS)
+    assert all(len(tasks) == 3 and "_id" in tasks[0] for tasks in results.values())
+    assert 1 < server.max_in_flight <= 3
+    assert connector.request_count == 1 + len(PROJECTS)
+    assert connector._client is None  # closed by the context manager
+
+
+@pytest.mark.asyncio
+async def test_connector_reauthenticates_once_on_expired_token():
+    server = FakeGouti(expire_first_token=True)
+    async with _connector(server) as connector:
+        assert len(await connector.get_projects()) == len(PROJECTS)
+    assert server.tokens_issued == 2
+
+
+def test_plan_project_tasks_builds_tree_and_splits_milestones():
+    raw = [{"_id": k, **v} for k, v in TASKS["1001"].items()]
+
+    tasks, milestones = gouti_sync._plan_project_tasks(raw, {"mode": "all"})
+
+    assert [(t["code"], t["parent_ref"]) for t in tasks] == [("10011", None), ("10012", "10011")]
+    assert tasks[1]["status"] == "in_progress" and tasks[1]["progress"] == 40
+    assert [m["name"] for m in milestones] == ["Réception"]
+    assert gouti_sync._plan_project_tasks(raw, {"mode": "none"}) == ([], [])
+
+
+class FakeDB:
+    def __init__(self, existing_refs, failing_commits: int = 0):
+        self.existing_refs = existing_refs
+        self.commits = 0
+        self.failing_commits = failing_commits
+
+    async def execute(self, statement, params=None):
+        refs = list(self.existing_refs)
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: refs))
+
+    async def commit(self):
+        if self.failing_commits:
+            self.failing_commits -= 1
+            raise RuntimeError("deadlock detected")
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_engine_batches_upserts_and_skips_unchanged_projects(monkeypatch):
+    stored_hashes: dict[str, str] = {}
+    upserts: list[list[str]] = []
+    task_applies: list[str] = []
+    published = []
+    db = FakeDB(set())
+
+    async def load_hashes(_db, _entity_id):
+        return dict(stored_hashes)
+
+    async def save_hashes(_db, _entity_id, hashes):
+        stored_hashes.clear()
+        stored_hashes.update(hashes)
+
+    async def bulk_upsert(_db, _entity_id, rows):
+        upserts.append([row["external_ref"] for row in rows])
+        db.existing_refs.update(row["external_ref"] for row in rows)
+        return {row["external_ref"]: uuid4() for row in rows}
+
+    async def apply_tasks(_db, _project_id, raw_tasks, selection):
+        task_applies.append(raw_tasks[0]["_id"][:4])
+        return len(raw_tasks)
+
+    async def publish(_entity_id, snapshot):
+        published.append(snapshot)
+
+    monkeypatch.setattr(gouti_sync, "_load_sync_hashes", load_hashes)
+    monkeypatch.setattr(gouti_sync, "_save_sync_hashes", save_hashes)
+    monkeypatch.setattr(gouti_sync, "_bulk_upsert_projects", bulk_upsert)
+    monkeypatch.setattr(gouti_sync, "_apply_project_tasks", apply_tasks)
+    monkeypatch.setattr(gouti_sync, "_publish_progress", publish)
+    monkeypatch.setattr(gouti_sync, "SYNC_APPLY_BATCH_SIZE", 4)
+
+    selections = {pid: {"mode": "all", "task_ids": []} for pid in ("1001", "1002", "1003")}
+    server = FakeGouti()
+    entity_id = uuid4()
+
+    async with _connector(server) as connector:
+        projects = await connector.get_projects()
+        first = await gouti_sync._sync_gouti_projects(
+            db, entity_id, connector, projects, task_selections=selections,
+        )
+    assert (first.created, first.updated, first.skipped) == (6, 0, 0)
+    assert [len(batch) for batch in upserts] == [4, 2]
+    assert db.commits == 2
+    assert sorted(task_applies) == ["1001", "1002", "1003"]
+    assert first.tasks_synced == 9 and not first.errors
+    assert published[-1]["applied"] == 6 and published[-1]["projects_per_second"] > 0
+
+    upserts.clear()
+    task_applies.clear()
+    changed = json.loads(json.dumps(PROJECTS))
+    changed["1005"]["Tasks_progress"] = "75%"
+    server_projects = [{"_id": k, **v} for k, v in changed.items()]
+    async with _connector(FakeGouti()) as connector:
+        second = await gouti_sync._sync_gouti_projects(
+            db, entity_id, connector, server_projects, task_selections=selections,
+        )
+    assert (second.created, second.updated, second.skipped) == (0, 1, 5)
+    assert upserts == [["gouti:1005"]]
+    assert task_applies == []
+
+    async with _connector(FakeGouti()) as connector:
+        forced = await gouti_sync._sync_gouti_projects(
+            db, entity_id, connector, server_projects, force=True,
+        )
+    assert forced.updated == 6 and forced.skipped == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_not_recorded_and_is_retried(monkeypatch):
+    stored_hashes: dict[str, str] = {}
+    committed_refs: set[str] = set()
+    db = FakeDB(committed_refs, failing_commits=1)
+
+    async def load_hashes(_db, _entity_id):
+        return dict(stored_hashes)
+
+    async def save_hashes(_db, _entity_id, hashes):
+        # Only reaches the store when the surrounding commit succeeds.
+        if not db.failing_commits:
+            stored_hashes.clear()
+            stored_hashes.update(hashes)
+
+    async def bulk_upsert(_db, _entity_id, rows):
+        if not db.failing_commits:
+            committed_refs.update(row["external_ref"] for row in rows)
+        return {row["external_ref"]: uuid4() for row in rows}
+
+    async def noop(*_args):
+        return 0
+
+    monkeypatch.setattr(gouti_sync, "_load_sync_hashes", load_hashes)
+    monkeypatch.setattr(gouti_sync, "_save_sync_hashes", save_hashes)
+    monkeypatch.setattr(gouti_sync, "_bulk_upsert_projects", bulk_upsert)
+    monkeypatch.setattr(gouti_sync, "_publish_progress", noop)
+    monkeypatch.setattr(gouti_sync, "SYNC_APPLY_BATCH_SIZE", 4)
+    projects = [{"_id": k, **v} for k, v in PROJECTS.items()]
+    entity_id = uuid4()
+
+    async with _connector(FakeGouti()) as connector:
+        first = await gouti_sync._sync_gouti_projects(db, entity_id, connector, projects)
+    assert (first.created, first.updated) == (2, 0)
+    assert len(first.errors) == 4
+    assert set(stored_hashes) == {"1005", "1006"}
+
+    async with _connector(FakeGouti()) as connector:
+        second = await gouti_sync._sync_gouti_projects(db, entity_id, connector, projects)
+    assert (second.created, second.updated, second.skipped) == (4, 0, 2)
+    assert not second.errors
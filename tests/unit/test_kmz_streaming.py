@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import io
+import zipfile
+from uuid import uuid4
+
+import pytest
+
+from app.models.asset_registry_import import ImportRun
+from app.services.kmz_import import _Known, _PlatformIndex, import_kmz
+from app.services.kmz_parser import KmlStats, iter_placemarks, open_kml, parse_kmz, parse_kmz_preview
+from tests.fakes.kmz import RecordingSession, synthetic_kmz
+
+
+def _kmz(kml: str) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("layers/export.kml", kml)
+    return buf.getvalue()
+
+
+NESTED_KML = """<?xml version="1.0"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document><name>Nested</name>
+<Placemark><name>loose</name><Point><coordinates>1,1</coordinates></Point></Placemark>
+<Folder><name>Structure details</name>
+  <Folder><name>Wells</name>
+    <Placemark id="w1"><name>ABM-01</name><Point><coordinates>9.1,3.6,0</coordinates></Point></Placemark>
+    <Placemark id="w2"><name>ABM-02</name></Placemark>
+  </Folder>
+  <Placemark id="x"><name>deck</name><Point><coordinates>9.2,3.6</coordinates></Point></Placemark>
+  <Placemark id="y"><name>note</name></Placemark>
+  <Folder><name>Platforms</name>
+    <Placemark id="p1"><name>ABM</name><MultiGeometry><Point><coordinates>9.1,3.6</coordinates></Point></MultiGeometry></Placemark>
+  </Folder>
+</Folder>
+</Document></kml>"""
+
+
+def test_stream_keeps_folder_scoping_of_the_tree_parser():
+    stats = KmlStats()
+    with open_kml(_kmz(NESTED_KML)) as kml:
+        records = [(c, r["kml_id"]) for c, r in iter_placemarks(kml, stats=stats)]
+
+    # Document-level placemarks are ignored, geometry-less ones are skipped,
+    # and the outer folder keeps its category after the nested one closes.
+    assert records == [("wells", "w1"), ("structures", "x"), ("platforms", "p1")]
+    assert (stats.document_name, stats.folder_count, stats.placemark_count) == ("Nested", 3, 5)
+
+
+def test_category_filter_skips_other_records():
+    with open_kml(_kmz(NESTED_KML)) as kml:
+        assert [r["name"] for _, r in iter_placemarks(kml, categories={"platforms"})] == ["ABM"]
+
+
+def test_parse_kmz_and_preview_on_a_synthetic_export():
+    kmz = synthetic_kmz(platforms=9, wells_per_platform=2, bathymetry_points=25)
+
+    full = parse_kmz(kmz)
+    preview = parse_kmz_preview(io.BytesIO(kmz))
+
+    assert full["source"] == {"document_name": "SYNTHETIC_MASTER_MAP", "folder_count": 4, "placemark_count": 60}
+    assert (len(full["platforms"]), len(full["wells"]), len(full["pipelines"])) == (9, 18, 8)
+    assert full["bathymetry"][0]["count"] == 25 and len(full["bathymetry"][0]["samples"]) == 10
+    assert full["pipelines"][0]["parsed_name"]["from_tag"] == "P0000"
+    assert full["platforms"][0]["attributes"]["ALTERNATIV"] == "P0000"
+    assert preview["categories"]["wells"]["count"] == 18
+    assert len(preview["categories"]["wells"]["samples"]) == 5
+    assert preview["categories"]["platforms"]["attribute_keys"] == [
+        "ALTERNATIV", "COUNTRY", "FIELD", "PLATFORM_N", "TYPE_PLATF", "globalid",
+    ]
+    assert preview["categories"]["bathymetry"]["count"] == 25
+
+
+def test_archive_without_kml_is_a_value_error():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("icon.png", b"")
+
+    with pytest.raises(ValueError):
+        parse_kmz(buf.getvalue())
+
+
+def test_platform_index_attaches_within_radius_only():
+    near, far = _Known(uuid4(), lon=9.0, lat=3.5), _Known(uuid4(), lon=9.2, lat=3.5)
+    index = _PlatformIndex([near, far, _Known(uuid4())])
+
+    # ~110 m and ~1.1 km east of the first platform
+    assert index.nearest_within([(9.001, 3.5), (9.01, 3.5)], 0.5) == [near, None]
+    assert _PlatformIndex([]).nearest_within([(9.0, 3.5)], 0.5) == [None]
+
+
+async def test_import_writes_one_insert_per_batch_and_records_the_run():
+    field_id = uuid4()
+    db = RecordingSession(field_id=field_id)
+    events: list[dict] = []
+
+    report = await import_kmz(
+        db, entity_id=uuid4(), field_id=field_id, user_id=None,
+        kmz_bytes=synthetic_kmz(platforms=4, wells_per_platform=3), filename="synthetic.kmz",
+        batch_size=5, progress=events.append,
+    )
+
+    assert [(table, len(rows)) for table, rows in db.inserts] == [
+        ("ar_sites", 3), ("ar_installations", 4),
+        ("ar_equipment", 5), ("ar_equipment", 5), ("ar_equipment", 2),
+        ("ar_pipelines", 3),
+    ]
+    assert [(e["phase"], e["processed"]) for e in events] == [
+        ("platforms", 4), ("wells", 5), ("wells", 10), ("wells", 12), ("pipelines", 3),
+    ]
+    installations = {row["code"]: row["id"] for row in db.rows("ar_installations")}
+    wells = {row["tag_number"]: row["installation_id"] for row in db.rows("ar_equipment")}
+    assert wells["P000102"] == installations["P0001"]
+    pipeline = db.rows("ar_pipelines")[0]
+    assert (pipeline["from_installation_id"], pipeline["to_installation_id"]) == (
+        installations["P0000"], installations["P0001"],
+    )
+    assert report.pipeline_length_km == pytest.approx(4.5)
+    assert report.bbox == [9.0, 3.5, 9.5, 4.0]
+
+    [run] = [obj for obj in db.added if isinstance(obj, ImportRun)]
+    assert run.document_name == "SYNTHETIC_MASTER_MAP"
+    assert run.created_installation_ids == [str(i) for i in installations.values()]
+    assert len(run.created_equipment_ids) == 12
+    assert len(run.created_pipeline_ids) == 3
+    assert report.field["import_run_id"] == str(run.id)
+
+
+async def test_existing_rows_are_updated_not_recreated():
+    field_id, platform, well = uuid4(), uuid4(), uuid4()
+    db = RecordingSession(field_id=field_id, existing={
+        "ar_installations": [(platform, "P0000", None, None, None)],
+        "ar_equipment": [(well, "P000001", None)],
+        "ar_pipelines": [(uuid4(), "P0001-P0002-8IN", None)],
+    })
+
+    report = await import_kmz(
+        db, entity_id=uuid4(), field_id=field_id, user_id=None,
+        kmz_bytes=synthetic_kmz(platforms=3, wells_per_platform=1),
+    )
+
+    assert report.installations == {"created": 2, "matched": 1, "errors": 0}
+    assert db.rows("ar_installations", "updates")[0]["external_id"] == "PLAT-0000"
+    assert report.wells["matched"] == 1
+    assert db.rows("ar_equipment", "updates")[0]["id"] == well
+    assert report.pipelines == {"created": 1, "matched": 0, "skipped": 1, "errors": 0}
+    assert report.warnings[-1]["kind"] == "pipeline_duplicate"
+    [run] = [obj for obj in db.added if isinstance(obj, ImportRun)]
+    assert str(platform) not in run.created_installation_ids
+    assert str(well) not in run.created_equipment_ids
+
+
+async def test_unknown_field_is_rejected_before_parsing():
+    with pytest.raises(ValueError):
+        await import_kmz(
+            RecordingSession(), entity_id=uuid4(), field_id=uuid4(), user_id=None,
+            kmz_bytes=b"not a zip",
+        )
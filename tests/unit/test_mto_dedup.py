@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import random
+
+import pandas as pd
+from rapidfuzz import fuzz
+
+from app.modules.mto.engine import dedup
+
+SPECS = {
+    "sch": ["SCH 40", "SCH 80", "SCH 160", "SCH XS", "SCH STD"],
+    "mat": ["A106 GR B", "A333 GR6", "A312 TP316L", "A105", "A234 WPB", "A350 LF2"],
+    "pr": ["150#", "300#", "600#", "900#", "1500#"],
+    "extra": ["NACE MR0175", "GALV", "PAINTED", "PSL2", "HOT DIP", "LOW TEMP", "HIC", "PMI"],
+}
+
+
+def _mto(lines, diameters=('2"', '4"'), families=("PIPE SMLS BE", "ELBOW 90 LR"), dup_rate=0.15, seed=3):
+    """Synthetic MTO: pipes and elbows with planted shuffled/trimmed duplicates."""
+    rnd = random.Random(seed)
+    rows, planted = [], []
+    while len(rows) < lines:
+        toks = [rnd.choice(families), rnd.choice(diameters),
+                rnd.choice(SPECS["sch"]), rnd.choice(SPECS["mat"]), rnd.choice(SPECS["pr"]),
+                *rnd.sample(SPECS["extra"], 2), f"TAG-{rnd.randint(0, 10**6)}"]
+        rows.append({"article": f"A{len(rows)}", "designation": " ".join(toks)})
+        if rnd.random() < dup_rate:
+            variant = toks[:2] + rnd.sample(toks[2:], len(toks) - 2)
+            variant.pop(rnd.randrange(2, len(variant)))
+            planted.append((rows[-1]["article"], f"A{len(rows)}"))
+            rows.append({"article": f"A{len(rows)}", "designation": " ".join(variant)})
+    return pd.DataFrame(rows), planted
+
+
+def _reference_pairs(df, threshold=88):
+    """Exhaustive all-pairs inside (famille, diametre) blocks, as before the rewrite."""
+    blocks = {}
+    for r in df.to_dict("records"):
+        fam = dedup.detect_family(r["designation"])
+        diam = dedup._diam_from_designation(r["designation"])
+        if fam != "OTHER" and diam is not None:
+            norm = dedup.normalize_text(f"{r['designation']} {r.get('designation_long', '')}")
+            blocks.setdefault((fam, round(diam, 3)), []).append((r["article"], norm))
+    pairs = set()
+    for group in blocks.values():
+        for i in range(len(group)):
+            for j in range(i + 1, len(group)):
+                if fuzz.token_set_ratio(group[i][1], group[j][1]) >= threshold:
+                    pairs.add((group[i][0], group[j][0]))
+    return pairs
+
+
+def _recall(clusters, pairs):
+    where = {a: i for i, c in enumerate(clusters) for a in c.articles}
+    found = sum(1 for a, b in pairs if a in where and where[a] == where.get(b))
+    return found / len(pairs)
+
+
+def _components(pairs):
+    uf = dedup._UnionFind()
+    for a, b in pairs:
+        uf.union(a, b)
+    groups = {}
+    for a in uf.parent:
+        groups.setdefault(uf.find(a), set()).add(a)
+    return {frozenset(g) for g in groups.values()}
+
+
+def test_certain_signals_and_best_reason():
+    df = pd.DataFrame([
+        {"article": "1", "designation": "GASKET SPIRAL", "fabricant": "FLX", "ref_fabricant": "SW-1"},
+        {"article": "2", "designation": "JOINT SPIRALE", "fabricant": "FLX", "ref_fabricant": "SW-1"},
+        {"article": "3", "designation": "BOLT", "subst_ca": "4"},
+        {"article": "4", "designation": "STUD"},
+        {"article": "5", "designation": "VALVE", "fabricant": "X", "ref_fabricant": "n/a"},
+        {"article": "6", "designation": "VALVE", "fabricant": "X", "ref_fabricant": "n/a"},
+        {"article": "7", "designation": 'PIPE 2" SCH 40 A106 GALV'},
+        {"article": "8", "designation": 'PIPE 2" A106 SCH 40 GALV'},
+    ]).fillna("")
+
+    clusters = dedup.find_duplicates(df)
+
+    by_articles = {tuple(c.articles): c for c in clusters}
+    assert set(by_articles) == {("1", "2"), ("3", "4"), ("7", "8")}
+    assert by_articles[("1", "2")].reason == "ref fabricant identique"
+    assert by_articles[("3", "4")].confidence == "Certain"
+    assert by_articles[("7", "8")].score == 100.0 and by_articles[("7", "8")].confidence == "Élevé"
+
+
+def test_dense_blocks_match_exhaustive_reference():
+    df, _ = _mto(300)
+    reference = _reference_pairs(df)
+
+    clusters = dedup.find_duplicates(df)
+
+    assert {frozenset(c.articles) for c in clusters} == _components(reference)
+
+
+def test_lsh_blocks_keep_recall_without_size_cap(monkeypatch):
+    df, planted = _mto(400)
+    reference = _reference_pairs(df)
+    monkeypatch.setattr(dedup, "DENSE_BLOCK_MAX", 8)  # every block goes through signature + LSH
+    monkeypatch.setattr(dedup, "PAIR_CHUNK", 1000)
+
+    clusters = dedup.find_duplicates(df)
+
+    assert _recall(clusters, planted) == 1.0
+    assert _recall(clusters, reference) >= 0.9
+    found = {frozenset(c.articles) for c in clusters}
+    assert all(any(g <= f for f in found) for g in _components(planted))
+
+
+def test_block_above_former_cap_is_still_fuzzy_matched():
+    df, planted = _mto(900, diameters=('6"',), families=("PIPE SMLS BE",), dup_rate=0.02)
+    assert len(df) > 800  # former BLOCK_FUZZY_MAX: this block used to be skipped
+
+    clusters = dedup.find_duplicates(df)
+
+    assert planted and _recall(clusters, planted) == 1.0
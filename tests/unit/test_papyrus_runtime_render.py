@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.services.modules import papyrus_runtime_service as runtime
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def resolve_calls(monkeypatch):
+    calls: list[str] = []
+    in_flight = {"current": 0, "peak": 0}
+
+    async def fake_resolve_ref(*, db, entity_id, ref):
+        calls.append(ref)
+        in_flight["current"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        await asyncio.sleep(0.01)
+        in_flight["current"] -= 1
+        return {"ref": ref, "name": ref.upper(), "tasks": [1, 2]}
+
+    monkeypatch.setattr(runtime, "resolve_ref", fake_resolve_ref)
+    return calls, in_flight
+
+
+def _document(refs):
+    return {
+        "refs": refs,
+        "data": {"form_data": {}},
+        "blocks": [
+            {"id": "k1", "type": "opsflux_kpi", "ref": "kpi://project/a/progress"},
+            {
+                "id": "section",
+                "type": "section",
+                "children": [{"id": "g1", "type": "opsflux_gantt", "ref": "project://a/gantt"}],
+            },
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_render_deduplicates_and_resolves_refs_concurrently(resolve_calls):
+    calls, in_flight = resolve_calls
+    refs = ["kpi://project/a/progress", {"ref": "project://a/gantt"}, "kpi://project/a/progress", "asset://b"]
+    context = runtime.RenderContext(entity_id=uuid4(), session_factory=FakeSession)
+
+    rendered = await runtime.render_papyrus_document(
+        db=None, entity_id=context.entity_id, document=_document(refs), context=context
+    )
+
+    assert sorted(calls) == sorted({"kpi://project/a/progress", "project://a/gantt", "asset://b"})
+    assert in_flight["peak"] > 1
+    assert list(rendered["resolved_refs"]) == ["kpi://project/a/progress", "project://a/gantt", "asset://b"]
+    assert rendered["blocks"][1]["children"][0]["display_value"] == 2
+
+
+@pytest.mark.asyncio
+async def test_render_without_session_factory_stays_sequential(resolve_calls):
+    calls, in_flight = resolve_calls
+    context = runtime.RenderContext(entity_id=uuid4())
+
+    await runtime.render_papyrus_document(
+        db=None, entity_id=context.entity_id, document=_document(["asset://a", "asset://b"]), context=context
+    )
+
+    assert calls == ["asset://a", "asset://b"]
+    assert in_flight["peak"] == 1
+
+
+@pytest.mark.asyncio
+async def test_render_context_memoizes_refs_across_renders_until_ttl(resolve_calls):
+    calls, _ = resolve_calls
+    context = runtime.RenderContext(entity_id=uuid4(), ttl_seconds=60)
+    document = _document(["asset://a"])
+
+    await runtime.render_papyrus_document(db=None, entity_id=context.entity_id, document=document, context=context)
+    await runtime.render_papyrus_document(db=None, entity_id=context.entity_id, document=document, context=context)
+    assert calls == ["asset://a"]
+
+    context.ttl_seconds = -1
+    context._refs.clear()
+    await runtime.render_papyrus_document(db=None, entity_id=context.entity_id, document=document, context=context)
+    await runtime.render_papyrus_document(db=None, entity_id=context.entity_id, document=document, context=context)
+    assert calls == ["asset://a", "asset://a", "asset://a"]
+
+
+@pytest.mark.asyncio
+async def test_render_does_not_mutate_input_document(resolve_calls):
+    document = _document(["asset://a"])
+    context = runtime.RenderContext(entity_id=uuid4())
+
+    rendered = await runtime.render_papyrus_document(
+        db=None, entity_id=context.entity_id, document=document, context=context
+    )
+
+    assert "resolved" in rendered["blocks"][0]
+    assert "resolved" not in document["blocks"][0]
+    assert "display_value" not in document["blocks"][1]["children"][0]
+    assert "resolved_refs" not in document
+
+
+@pytest.mark.asyncio
+async def test_formula_results_are_memoized_per_context(resolve_calls, monkeypatch):
+    evaluations: list[str] = []
+
+    async def fake_evaluate(*, db, entity_id, expression, rendered_refs, resolve_ref):
+        evaluations.append(expression)
+        rendered_refs["asset://a"] = await resolve_ref("asset://a")
+        return 42
+
+    monkeypatch.setattr(runtime, "evaluate_formula_expression", fake_evaluate)
+    context = runtime.RenderContext(entity_id=uuid4())
+    document = {"refs": [], "blocks": [{"type": "formula", "expression": "1+1"}, {"type": "formula", "expression": "1+1"}]}
+
+    rendered = await runtime.render_papyrus_document(
+        db=None, entity_id=context.entity_id, document=document, context=context
+    )
+
+    assert evaluations == ["1+1"]
+    assert [block["computed_value"] for block in rendered["blocks"]] == [42, 42]
+    assert "asset://a" in rendered["resolved_refs"]
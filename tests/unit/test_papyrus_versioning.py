@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+import pytest
+
+from app.services.modules import papyrus_versioning_service as versioning
+
+
+class FakeResult:
+    def __init__(self, *, scalar=None, rows=None):
+        self._scalar = scalar
+        self._rows = rows or []
+
+    def scalar_one(self):
+        return self._scalar
+
+    def all(self):
+        return self._rows
+
+
+class FakeDB:
+    def __init__(self, results):
+        self._results = list(results)
+        self.executed = []
+
+    async def execute(self, statement, params=None):
+        self.executed.append(statement)
+        if not self._results:
+            raise AssertionError("Unexpected execute call")
+        return self._results.pop(0)
+
+
+def _doc(title: str) -> dict:
+    return {"meta": {"title": title}, "blocks": []}
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    versioning.invalidate_reconstruction_cache()
+    yield
+    versioning.invalidate_reconstruction_cache()
+
+
+@pytest.mark.asyncio
+async def test_reconstruct_replays_from_checkpoint_and_caches():
+    entity_id, document_id = uuid4(), uuid4()
+    chain = [
+        (21, "snapshot", _doc("v21")),
+        (22, "diff", [{"op": "replace", "path": "/meta/title", "value": "v22"}]),
+        (23, "diff", [{"op": "add", "path": "/blocks/-", "value": {"id": "b1"}}]),
+    ]
+    db = FakeDB([
+        FakeResult(scalar=23),  # latest version
+        FakeResult(scalar=21),  # nearest checkpoint
+        FakeResult(rows=chain),
+    ])
+
+    doc = await versioning.reconstruct_document_version(db=db, entity_id=entity_id, document_id=document_id)
+    assert doc == {"meta": {"title": "v22"}, "blocks": [{"id": "b1"}]}
+
+    doc["meta"]["title"] = "mutated by caller"
+    again = await versioning.reconstruct_document_version(
+        db=db, entity_id=entity_id, document_id=document_id, version=23
+    )
+    assert again["meta"]["title"] == "v22"
+    assert len(db.executed) == 3
+
+
+@pytest.mark.asyncio
+async def test_reconstruct_starts_from_nearest_cached_version():
+    entity_id, document_id = uuid4(), uuid4()
+    db = FakeDB([
+        FakeResult(scalar=1),
+        FakeResult(rows=[(1, "snapshot", _doc("v1")), (2, "diff", [{"op": "replace", "path": "/meta/title", "value": "v2"}])]),
+        FakeResult(scalar=1),
+        FakeResult(rows=[(3, "diff", [{"op": "replace", "path": "/meta/title", "value": "v3"}])]),
+    ])
+
+    await versioning.reconstruct_document_version(db=db, entity_id=entity_id, document_id=document_id, version=2)
+    doc = await versioning.reconstruct_document_version(
+        db=db, entity_id=entity_id, document_id=document_id, version=3
+    )
+    assert doc["meta"]["title"] == "v3"
+
+
+@pytest.mark.asyncio
+async def test_version_past_the_latest_is_not_cached_under_the_requested_number():
+    entity_id, document_id = uuid4(), uuid4()
+    db = FakeDB([
+        FakeResult(scalar=1),
+        FakeResult(rows=[(1, "snapshot", _doc("v1")), (2, "diff", [{"op": "replace", "path": "/meta/title", "value": "v2"}])]),
+        FakeResult(scalar=1),
+        FakeResult(rows=[(3, "diff", [{"op": "replace", "path": "/meta/title", "value": "v3"}])]),
+    ])
+
+    ahead = await versioning.reconstruct_document_version(db=db, entity_id=entity_id, document_id=document_id, version=3)
+    assert ahead["meta"]["title"] == "v2"  # latest stored version
+
+    # Version 3 is written afterwards: it is rebuilt, not served from the cache.
+    doc = await versioning.reconstruct_document_version(db=db, entity_id=entity_id, document_id=document_id, version=3)
+    assert doc["meta"]["title"] == "v3"
+
+
+@pytest.mark.asyncio
+async def test_reconstruct_returns_none_without_checkpoint():
+    db = FakeDB([FakeResult(scalar=None)])
+    doc = await versioning.reconstruct_document_version(db=db, entity_id=uuid4(), document_id=uuid4(), version=4)
+    assert doc is None
+
+
+@pytest.mark.asyncio
+async def test_reconstruct_many_loads_chain_once():
+    entity_id, document_id = uuid4(), uuid4()
+    chain = [(1, "snapshot", _doc("v1"))] + [
+        (version, "diff", [{"op": "replace", "path": "/meta/title", "value": f"v{version}"}])
+        for version in range(2, 11)
+    ]
+    db = FakeDB([FakeResult(scalar=1), FakeResult(rows=chain)])
+
+    documents = await versioning.reconstruct_many(
+        db=db, entity_id=entity_id, document_id=document_id, versions=[10, 3, 7]
+    )
+    assert {version: doc["meta"]["title"] for version, doc in documents.items()} == {3: "v3", 7: "v7", 10: "v10"}
+    assert len(db.executed) == 2
+
+    cached = await versioning.reconstruct_document_version(
+        db=db, entity_id=entity_id, document_id=document_id, version=7
+    )
+    assert cached["meta"]["title"] == "v7"
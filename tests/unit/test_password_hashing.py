@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import password_hashing
+from app.core.security import hash_password as sync_hash_password
+from app.services.core.password_policy import PasswordPolicyError, check_history_reuse
+
+
+@pytest.fixture(autouse=True)
+def low_cost(monkeypatch):
+    monkeypatch.setattr(password_hashing.settings, "BCRYPT_ROUNDS", 4)
+
+
+@pytest.mark.asyncio
+async def test_hash_verify_roundtrip_and_bad_hashes():
+    hashed = await password_hashing.hash_password("S3cret!pass")
+
+    assert password_hashing.hash_rounds(hashed) == 4
+    assert await password_hashing.verify_password("S3cret!pass", hashed)
+    assert not await password_hashing.verify_password("wrong", hashed)
+    assert not await password_hashing.verify_password("S3cret!pass", None)
+    assert not await password_hashing.verify_password("S3cret!pass", "not-a-bcrypt-hash")
+    assert password_hashing.pool_stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rehash_on_login_when_cost_changes(monkeypatch):
+    stored = await password_hashing.hash_password("S3cret!pass")
+    assert await password_hashing.verify_and_rehash("S3cret!pass", stored) == (True, None)
+    assert await password_hashing.verify_and_rehash("nope", stored) == (False, None)
+
+    monkeypatch.setattr(password_hashing.settings, "BCRYPT_ROUNDS", 5)
+    ok, upgraded = await password_hashing.verify_and_rehash("S3cret!pass", stored)
+
+    assert ok and password_hashing.hash_rounds(upgraded) == 5
+    assert await password_hashing.verify_password("S3cret!pass", upgraded)
+    assert await password_hashing.verify_and_rehash("nope", stored) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_event_loop_keeps_ticking_while_hashing(monkeypatch):
+    monkeypatch.setattr(password_hashing.settings, "BCRYPT_ROUNDS", 10)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    hashes = await asyncio.gather(*(password_hashing.hash_password(f"pw{i}") for i in range(4)))
+    elapsed = time.perf_counter() - start
+    task.cancel()
+
+    assert len(set(hashes)) == 4
+    # Inline bcrypt would freeze the loop for the whole run: the ticker
+    # would only get its first step.
+    assert ticks >= max(3, int(elapsed / 0.005 / 4))
+
+
+@pytest.mark.asyncio
+async def test_history_check_uses_parallel_verification(monkeypatch):
+    history = [sync_hash_password(f"old-{i}") for i in range(3)]
+    user = SimpleNamespace(id=1, hashed_password=sync_hash_password("current"))
+    checked = []
+    real_verify_many = password_hashing.verify_many
+
+    async def spy(plain, hashes):
+        checked.append(len(hashes))
+        return await real_verify_many(plain, hashes)
+
+    monkeypatch.setattr("app.services.core.password_policy.verify_many", spy)
+
+    class _Result:
+        def scalars(self):
+            return self
+
+        def all(self):
+            return history
+
+    class _DB:
+        async def execute(self, _stmt):
+            return _Result()
+
+    config = {"password_history_size": 3}
+    await check_history_reuse("brand-new", user, _DB(), config)
+    with pytest.raises(PasswordPolicyError) as exc:
+        await check_history_reuse("current", user, _DB(), config)
+    assert exc.value.code == "PASSWORD_REUSE"
+    with pytest.raises(PasswordPolicyError) as exc:
+        await check_history_reuse("old-2", user, _DB(), config)
+    assert exc.value.code == "PASSWORD_REUSE_HISTORY"
+    await check_history_reuse("old-2", user, _DB(), {"password_history_size": 0})
+
+    assert checked == [4, 4, 4, 1]  # one batch: current hash + history
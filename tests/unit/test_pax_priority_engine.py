@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import random
+from datetime import date
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.paxlog import Ads, AdsPax, PaxProfileType, ProfileType
+from app.models.planner import PlannerActivity
+from app.services.modules import pax_priority_engine
+from app.services.modules.pax_priority_engine import compute_pax_priorities
+from app.services.modules.paxlog_service import PRIORITY_WEIGHTS, compute_pax_priority
+from tests.fakes.sqlite import SyncSessionDB
+
+
+TABLES = [Ads, AdsPax, ProfileType, PaxProfileType, PlannerActivity]
+PROFILE_CODES = ["cds", "chef_de_site", "supervisor", "chef_quart", "operator", "operateur", "vip", "VIP_GUEST", "hse", "welder"]
+ADS_STATUSES = ["draft", "submitted", "approved", "completed", "rejected"]
+PRIORITIES = ["low", "medium", "high", "critical"]
+
+
+def legacy_score(session: Session, ads_pax_id: UUID) -> int:
+    """The former per-PAX scoring, one query per factor."""
+    ads_pax = session.get(AdsPax, ads_pax_id)
+    score = 0
+    planner_activity_id, entity_id = session.execute(
+        select(Ads.planner_activity_id, Ads.entity_id).where(Ads.id == ads_pax.ads_id)
+    ).one()
+    if planner_activity_id:
+        priority = session.execute(
+            select(PlannerActivity.priority).where(PlannerActivity.id == planner_activity_id)
+        ).scalar_one_or_none()
+        if priority is not None:
+            score += PRIORITY_WEIGHTS.get(f"activity_{priority}", 0)
+
+    col = "user_id" if ads_pax.user_id else "contact_id"
+    pax = ads_pax.user_id or ads_pax.contact_id
+    role = session.execute(
+        select(ProfileType.code)
+        .join(PaxProfileType, PaxProfileType.profile_type_id == ProfileType.id)
+        .where(getattr(PaxProfileType, col) == pax)
+        .order_by(ProfileType.code)
+        .limit(1)
+    ).first()
+    if role:
+        code = (role[0] or "").lower()
+        if "cds" in code or "chef_de_site" in code:
+            score += PRIORITY_WEIGHTS["role_cds"]
+        elif "supervisor" in code or "chef" in code:
+            score += PRIORITY_WEIGHTS["role_supervisor"]
+        elif "operator" in code or "operateur" in code:
+            score += PRIORITY_WEIGHTS["role_operator"]
+        else:
+            score += PRIORITY_WEIGHTS["role_default"]
+
+    vip = session.execute(
+        select(PaxProfileType.id)
+        .join(ProfileType, ProfileType.id == PaxProfileType.profile_type_id)
+        .where(getattr(PaxProfileType, col) == pax, ProfileType.code.ilike("%vip%"))
+    ).first()
+    if vip:
+        score += PRIORITY_WEIGHTS["vip_flag"]
+
+    prior = session.execute(
+        select(func.count())
+        .select_from(AdsPax)
+        .join(Ads, Ads.id == AdsPax.ads_id)
+        .where(getattr(AdsPax, col) == pax, Ads.entity_id == entity_id, Ads.status.in_(("approved", "completed")))
+    ).scalar()
+    if not prior:
+        score += PRIORITY_WEIGHTS["first_time_penalty"]
+    return max(score, 0)
+
+
+def build_world(session: Session, rng: random.Random) -> list[UUID]:
+    entities = [uuid4(), uuid4()]
+    people = [("user_id", uuid4()) for _ in range(6)] + [("contact_id", uuid4()) for _ in range(6)]
+    profiles = {
+        entity: [ProfileType(entity_id=entity, code=code, name=code) for code in PROFILE_CODES]
+        for entity in entities
+    }
+    for rows in profiles.values():
+        session.add_all(rows)
+    session.flush()
+    for kind, pax in people:
+        for profile in rng.sample(profiles[rng.choice(entities)], rng.randint(0, 3)):
+            session.add(PaxProfileType(profile_type_id=profile.id, **{kind: pax}))
+
+    ads_pax_ids = []
+    for n in range(rng.randint(3, 8)):
+        entity = rng.choice(entities)
+        activity_id = None
+        if rng.random() < 0.7:
+            activity = PlannerActivity(
+                entity_id=entity, asset_id=uuid4(), type="project", title="A", created_by=uuid4(),
+                priority=rng.choice(PRIORITIES),
+            )
+            session.add(activity)
+            session.flush()
+            activity_id = activity.id
+        ads = Ads(
+            entity_id=entity, reference=f"ADS-{uuid4().hex[:8]}", created_by=uuid4(), requester_id=uuid4(),
+            site_entry_asset_id=uuid4(), visit_purpose="work", visit_category="project_work",
+            start_date=date(2026, 5, 1), end_date=date(2026, 5, 3), status=rng.choice(ADS_STATUSES),
+            planner_activity_id=activity_id,
+        )
+        session.add(ads)
+        session.flush()
+        for kind, pax in rng.sample(people, rng.randint(1, 5)):
+            entry = AdsPax(ads_id=ads.id, **{kind: pax})
+            session.add(entry)
+            session.flush()
+            ads_pax_ids.append(entry.id)
+    session.commit()
+    return ads_pax_ids
+
+
+@pytest.fixture
+def session(sqlite_session):
+    return sqlite_session(*TABLES)
+
+
+@pytest.mark.parametrize("seed", range(25))
+async def test_batch_scores_match_the_per_pax_scoring(session, seed):
+    ids = build_world(session, random.Random(seed))
+    expected = {i: legacy_score(session, i) for i in ids}
+
+    scores = await compute_pax_priorities(SyncSessionDB(session), ids, persist=False)
+
+    assert scores == expected
+
+
+async def test_scores_are_persisted_in_one_update_per_chunk(session, monkeypatch):
+    ids = build_world(session, random.Random(99))
+    expected = {i: legacy_score(session, i) for i in ids}
+    monkeypatch.setattr(pax_priority_engine, "PRIORITY_CHUNK_SIZE", 4)
+    loaded = session.get(AdsPax, ids[0])
+    db = SyncSessionDB(session)
+
+    await compute_pax_priorities(db, ids + [uuid4()])
+
+    chunks = -(-len(ids) // 4)
+    assert db.statements == 2 * chunks  # facts SELECT + scores UPDATE per chunk
+    assert loaded.priority_score == expected[ids[0]] and loaded not in session.dirty
+    session.expire_all()
+    stored = dict(session.execute(select(AdsPax.id, AdsPax.priority_score)).all())
+    assert stored == expected
+    assert set(session.execute(select(AdsPax.priority_source)).scalars()) == {"auto_computed"}
+
+
+async def test_single_pax_entry_point_delegates(session):
+    ids = build_world(session, random.Random(3))
+
+    assert await compute_pax_priority(SyncSessionDB(session), ids[0]) == legacy_score(session, ids[0])
+    assert await compute_pax_priority(SyncSessionDB(session), uuid4()) == 0
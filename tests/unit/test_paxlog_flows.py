@@ -846,6 +846,9 @@ async def test_submit_ads_places_pax_on_waitlist_when_planner_capacity_is_exceed
             pax_entry_2.priority_source = "auto_computed"
         return 20
 
+    async def fake_compute_priorities(_db, ads_pax_ids, **_kwargs):
+        return {ads_pax_id: await fake_compute_priority(_db, ads_pax_id) for ads_pax_id in ads_pax_ids}
+
     async def fake_send_in_app(_db, **kwargs):
         notifications.append(kwargs)
 
@@ -863,6 +866,7 @@ async def test_submit_ads_places_pax_on_waitlist_when_planner_capacity_is_exceed
     monkeypatch.setattr(paxlog, "record_audit", fake_record_audit)
     monkeypatch.setattr(paxlog, "_build_ads_read_data", fake_build_ads_read_data)
     monkeypatch.setattr("app.services.modules.paxlog_service.compute_pax_priority", fake_compute_priority)
+    monkeypatch.setattr("app.services.modules.paxlog_service.compute_pax_priorities", fake_compute_priorities)
     monkeypatch.setattr("app.core.notifications.send_in_app", fake_send_in_app)
     monkeypatch.setattr("app.core.events.event_bus", FakeEventBus())
 
@@ -937,6 +941,9 @@ async def test_submit_ads_places_pax_on_waitlist_when_site_capacity_is_exceeded_
             pax_entry_2.priority_source = "auto_computed"
         return 20
 
+    async def fake_compute_priorities(_db, ads_pax_ids, **_kwargs):
+        return {ads_pax_id: await fake_compute_priority(_db, ads_pax_id) for ads_pax_id in ads_pax_ids}
+
     class FakeEventBus:
         async def publish(self, _event):
             return None
@@ -957,6 +964,7 @@ async def test_submit_ads_places_pax_on_waitlist_when_site_capacity_is_exceeded_
     monkeypatch.setattr(paxlog, "record_audit", fake_record_audit)
     monkeypatch.setattr(paxlog, "_build_ads_read_data", fake_build_ads_read_data)
     monkeypatch.setattr("app.services.modules.paxlog_service.compute_pax_priority", fake_compute_priority)
+    monkeypatch.setattr("app.services.modules.paxlog_service.compute_pax_priorities", fake_compute_priorities)
     monkeypatch.setattr("app.services.modules.planner_service.get_effective_capacity", fake_get_effective_capacity)
     monkeypatch.setattr("app.core.notifications.send_in_app", fake_send_in_app)
     monkeypatch.setattr("app.core.events.event_bus", FakeEventBus())
@@ -4453,15 +4461,23 @@ async def test_get_profile_site_presence_history_returns_ads_and_boarding_contex
 
 
 @pytest.mark.asyncio
-async def test_check_pax_compliance_exposes_layers_and_status_summary():
+async def test_check_pax_compliance_exposes_layers_and_status_summary(monkeypatch):
+    from app.services.modules import asset_hierarchy_service
+
     entity_id = uuid4()
     asset_id = uuid4()
     user_id = uuid4()
     site_requirement_id = uuid4()
     job_requirement_id = uuid4()
+
+    async def fake_hierarchy(db, hierarchy_entity_id):
+        tree = asset_hierarchy_service.AssetHierarchy(entity_id=hierarchy_entity_id)
+        tree.upsert("installation", asset_id, None)
+        return tree
+
+    monkeypatch.setattr(asset_hierarchy_service, "get_asset_hierarchy", fake_hierarchy)
     db = FakeDB([
         FakeResult(scalar_one_or_none=None),
-        FakeResult(all_rows=[(asset_id,)]),
         FakeResult(all_rows=[
             SimpleNamespace(
                 credential_type_id=site_requirement_id,
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.core import redis_client
+from app.services.modules import pid_graph_service
+from app.services.modules.pid_graph_service import PIDGraph
+
+
+def _conn(pid_id, src, dst, flow="forward", continuation_ref=None):
+    return SimpleNamespace(
+        pid_document_id=pid_id,
+        from_entity_type=src[0], from_entity_id=src[1], from_connection_point="N1",
+        to_entity_type=dst[0], to_entity_id=dst[1], to_connection_point=None,
+        connection_type="process", continuation_ref=continuation_ref, flow_direction=flow,
+    )
+
+
+def _graph():
+    """P-101 → L1 → XV-1 → L2 (continued on PID B) → V-200."""
+    pid_a, pid_b = uuid4(), uuid4()
+    graph = PIDGraph(entity_id=uuid4(), project_id=uuid4())
+    graph.documents = {
+        pid_a: {"number": "PID-A", "title": "A", "status": "afc", "is_active": True},
+        pid_b: {"number": "PID-B", "title": "B", "status": "draft", "is_active": True},
+    }
+    ids = {name: uuid4() for name in ("pump", "l1", "xv", "l2", "drum")}
+    graph.add_node("equipment", ids["pump"], tag="P-101", equipment_type="pump",
+                   pid_document_id=pid_a, mxgraph_cell_id="p1")
+    graph.add_node("equipment", ids["drum"], tag="V-200", equipment_type="vessel",
+                   pid_document_id=pid_b, mxgraph_cell_id="v1")
+    graph.add_node("instrument", ids["xv"], tag_name="XV-1", tag_type="XV", equipment_id=None)
+    for key, number in (("l1", "L-1"), ("l2", "L-2")):
+        graph.add_node("process_line", ids[key], line_number=number, nominal_diameter_inch=None,
+                       spec_class=None, fluid=None, design_pressure_barg=None)
+
+    pump, l1, xv, l2, drum = (
+        ("equipment", ids["pump"]), ("process_line", ids["l1"]), ("instrument", ids["xv"]),
+        ("process_line", ids["l2"]), ("equipment", ids["drum"]),
+    )
+    graph.add_connection(_conn(pid_a, pump, l1))
+    graph.add_connection(_conn(pid_a, l1, xv))
+    graph.add_connection(_conn(pid_a, xv, l2))
+    graph.add_connection(_conn(pid_b, drum, l2, flow="reverse", continuation_ref="PID-A"))
+    return graph, {"pid_a": pid_a, "pid_b": pid_b, **ids}
+
+
+def test_trace_follows_flow_across_pids():
+    graph, ids = _graph()
+
+    downstream = graph.trace(("equipment", ids["pump"]), "downstream")
+    assert [n["tag"] for n in downstream] == ["L-1", "XV-1", "L-2", "V-200"]
+    assert downstream[-1]["hops"] == 4
+    assert downstream[-1]["pid_id"] == str(ids["pid_b"])
+
+    assert [n["tag"] for n in graph.trace(("equipment", ids["pump"]), "downstream", max_hops=2)] == [
+        "L-1", "XV-1",
+    ]
+    assert graph.trace(("equipment", ids["pump"]), "upstream") == []
+
+
+def test_isolation_boundary_stops_at_isolation_devices():
+    graph, ids = _graph()
+
+    boundary = graph.isolation_boundary(("equipment", ids["drum"]))
+
+    assert [n["tag"] for n in boundary["upstream"]] == ["XV-1"]
+    assert boundary["downstream"] == []
+
+
+def test_appearances_include_connection_pids():
+    graph, ids = _graph()
+
+    appearances = graph.appearances("V-200")
+
+    assert {a["pid_number"] for a in appearances} == {"PID-B"}
+    assert appearances[0]["mxgraph_cell_id"] == "v1"
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+
+
+@pytest.mark.asyncio
+async def test_project_graph_cache_rebuilds_after_invalidation(monkeypatch):
+    redis = FakeRedis()
+    builds = []
+
+    async def fake_build(entity_id, project_id, db):
+        builds.append((entity_id, project_id))
+        return PIDGraph(entity_id=entity_id, project_id=project_id)
+
+    monkeypatch.setattr(redis_client, "redis_client", redis)
+    monkeypatch.setattr(pid_graph_service, "build_project_graph", fake_build)
+    monkeypatch.setattr(pid_graph_service, "_graph_cache", {})
+    entity_id, project_id = uuid4(), uuid4()
+
+    first = await pid_graph_service.get_project_graph(entity_id, project_id, db=None)
+    assert await pid_graph_service.get_project_graph(entity_id, project_id, db=None) is first
+    assert len(builds) == 1
+
+    # Another worker bumps the shared version: the local copy is stale.
+    await redis.incr(pid_graph_service._version_key(entity_id, project_id))
+    assert await pid_graph_service.get_project_graph(entity_id, project_id, db=None) is not first
+    assert len(builds) == 2
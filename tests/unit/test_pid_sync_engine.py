@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import Insert, Update
+
+from app.services.modules import pid_sync_service
+
+PID_XML = """<mxGraphModel><root>
+  <mxCell id="0"/>
+  <mxCell id="1" parent="0"/>
+  <mxCell id="p1" value="P-101" style="shape=mxgraph.pid.pumps.centrifugal;" vertex="1" parent="1">
+    <mxGeometry x="10" y="20" width="40" height="40" as="geometry"/>
+  </mxCell>
+  <object id="v1" label="V-200" opsflux_service="Separation">
+    <mxCell style="shape=mxgraph.pid.vessels.drum;" vertex="1" parent="1"/>
+  </object>
+  <mxCell id="l1" value="6&quot;-P-1001" style="shape=mxgraph.pid.piping.pipe;" edge="1" source="p1" target="v1" parent="1"/>
+</root></mxGraphModel>"""
+
+
+class FakeResult:
+    rowcount = 0
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+
+    def all(self):
+        return self.rows
+
+
+class FakeDB:
+    def __init__(self, echo_inserts: bool = False, stored: dict | None = None, conflicts: set | None = None):
+        self.executed = []
+        self.echo_inserts = echo_inserts
+        self.stored = stored or {}
+        self.conflicts = conflicts or set()  # cell ids whose insert ON CONFLICT DO NOTHING skips
+
+    async def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+        if self.echo_inserts and isinstance(statement, Insert) and statement._returning:
+            # Mimic ``RETURNING id, mxgraph_cell_id`` for freshly inserted rows.
+            rows = [{column.key: value for column, value in row.items()} for row in statement._multi_values[0]]
+            return FakeResult(
+                (row["id"], row["mxgraph_cell_id"]) for row in rows if row["mxgraph_cell_id"] not in self.conflicts
+            )
+        if isinstance(statement, Select) and [c.key for c in statement.selected_columns] == ["mxgraph_cell_id", "id"]:
+            return FakeResult(self.stored.items())
+        return FakeResult()
+
+    async def flush(self):
+        pass
+
+    def writes(self):
+        return [stmt for stmt, _ in self.executed if isinstance(stmt, (Insert, Update))]
+
+
+def test_parse_pid_cells_classifies_and_merges_object_wrappers():
+    cells = pid_sync_service.parse_pid_cells(PID_XML)
+
+    assert set(cells) == {"p1", "v1", "l1"}
+    assert cells["p1"].kind == "equipment"
+    assert cells["v1"].value == "V-200"
+    assert cells["v1"].props == {"service": "Separation"}
+    assert cells["l1"].kind == "process_line"
+    assert (cells["l1"].source, cells["l1"].target) == ("p1", "v1")
+
+
+def test_fingerprint_ignores_geometry_but_tracks_properties():
+    base = pid_sync_service.cell_fingerprints(PID_XML)
+    moved = pid_sync_service.cell_fingerprints(PID_XML.replace('x="10"', 'x="500"'))
+    relabelled = pid_sync_service.cell_fingerprints(PID_XML.replace("P-101", "P-102"))
+
+    assert moved == base
+    diff = pid_sync_service.diff_cell_fingerprints(base, relabelled)
+    assert diff["modified"] == {"p1"}
+    assert diff["unchanged"] == {"v1", "l1"}
+
+
+def test_diff_cell_fingerprints_reports_added_and_removed():
+    diff = pid_sync_service.diff_cell_fingerprints({"a": "1", "b": "2"}, {"b": "2", "c": "3"})
+    assert diff == {"added": {"c"}, "removed": {"a"}, "modified": set(), "unchanged": {"b"}}
+
+
+def test_cell_fingerprints_returns_empty_on_invalid_xml():
+    assert pid_sync_service.cell_fingerprints("<mxGraphModel><root>") == {}
+
+
+@pytest.mark.asyncio
+async def test_sync_only_writes_changed_cells():
+    pid = SimpleNamespace(id=uuid4(), project_id=uuid4(), number="PID-001", sync_fingerprints=None)
+    cells = pid_sync_service.parse_pid_cells(PID_XML)
+
+    db = FakeDB(echo_inserts=True)
+    stats = await pid_sync_service.sync_pid_cells(pid=pid, cells=cells, entity_id=uuid4(), db=db)
+    assert stats["changed"] == 3
+    assert stats["equipment"] == 2 and stats["lines"] == 1 and stats["connections"] == 1
+    # equipment insert, line insert, connection insert, removed-equipment update
+    assert len(db.writes()) == 4
+    assert set(pid.sync_fingerprints) == {"p1", "v1", "l1"}
+
+    db = FakeDB()
+    stats = await pid_sync_service.sync_pid_cells(pid=pid, cells=cells, entity_id=uuid4(), db=db)
+    assert stats["changed"] == 0
+    # Only the set-based removed-equipment check runs on an unchanged save.
+    assert len(db.executed) == 1
+
+
+@pytest.mark.asyncio
+async def test_cells_without_an_object_are_retried_on_next_save():
+    pid = SimpleNamespace(id=uuid4(), project_id=uuid4(), number="PID-001", sync_fingerprints=None)
+    cells = pid_sync_service.parse_pid_cells(PID_XML)
+
+    # The vessel insert loses to a conflicting row, so the line cannot be
+    # connected to it yet: neither keeps a fingerprint.
+    db = FakeDB(echo_inserts=True, conflicts={"v1"})
+    await pid_sync_service.sync_pid_cells(pid=pid, cells=cells, entity_id=uuid4(), db=db)
+    assert set(pid.sync_fingerprints) == {"p1"}
+
+    db = FakeDB(echo_inserts=True, stored={"p1": uuid4()})
+    stats = await pid_sync_service.sync_pid_cells(pid=pid, cells=cells, entity_id=uuid4(), db=db)
+    assert stats["changed"] == 2
+    assert set(pid.sync_fingerprints) == {"p1", "v1", "l1"}
+
+
+@pytest.mark.asyncio
+async def test_duplicate_tag_is_synced_once_the_first_cell_is_gone():
+    pid = SimpleNamespace(id=uuid4(), project_id=uuid4(), number="PID-001", sync_fingerprints=None)
+    duplicate = PID_XML.replace(
+        "</root>",
+        '<mxCell id="p2" value="P-101" style="shape=mxgraph.pid.pumps.centrifugal;" vertex="1" parent="1"/></root>',
+    )
+    cells = pid_sync_service.parse_pid_cells(duplicate)
+
+    await pid_sync_service.sync_pid_cells(pid=pid, cells=cells, entity_id=uuid4(), db=FakeDB(echo_inserts=True))
+    assert "p2" not in pid.sync_fingerprints
+
+    del cells["p1"]
+    db = FakeDB(echo_inserts=True)
+    stats = await pid_sync_service.sync_pid_cells(pid=pid, cells=cells, entity_id=uuid4(), db=db)
+    assert stats["changed"] == 1
+    inserted = [stmt for stmt in db.writes() if isinstance(stmt, Insert)]
+    assert [
+        value for row in inserted[0]._multi_values[0] for column, value in row.items() if column.key == "mxgraph_cell_id"
+    ] == ["p2"]
+    assert "p2" in pid.sync_fingerprints
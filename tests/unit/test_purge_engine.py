@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from uuid import UUID
+
+import pytest
+from sqlalchemy import Boolean, Column, ForeignKey, MetaData, Table
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from app.services.core import purge_engine
+
+
+def _metadata() -> MetaData:
+    md = MetaData()
+    Table("tiers", md, Column("id", PG_UUID, primary_key=True),
+          Column("parent_id", PG_UUID, ForeignKey("tiers.id")), Column("archived", Boolean))
+    Table("tier_contacts", md, Column("id", PG_UUID, primary_key=True),
+          Column("tier_id", PG_UUID, ForeignKey("tiers.id"), nullable=False))
+    Table("tier_contact_notes", md, Column("id", PG_UUID, primary_key=True),
+          Column("contact_id", PG_UUID, ForeignKey("tier_contacts.id"), nullable=False))
+    Table("tier_tags", md, Column("id", PG_UUID, primary_key=True),
+          Column("tier_id", PG_UUID, ForeignKey("tiers.id", ondelete="CASCADE")))
+    Table("projects", md, Column("id", PG_UUID, primary_key=True),
+          Column("tier_id", PG_UUID, ForeignKey("tiers.id")))
+    return md
+
+
+def test_cascade_plan_orders_children_first_and_collects_blockers():
+    plan = purge_engine.build_cascade_plan(
+        "tiers", metadata=_metadata(), main_tables=frozenset({"tiers", "projects"}),
+    )
+
+    assert plan.delete_order() == ["tier_contact_notes", "tier_contacts", "tiers"]
+    assert {(b.table, b.column) for b in plan.blockers} == {("tiers", "parent_id"), ("projects", "tier_id")}
+    candidates = str(purge_engine._candidate_query(plan))
+    assert "NOT EXISTS (SELECT 1 FROM projects ref WHERE ref.tier_id = t.id)" in candidates
+    assert "ORDER BY t.id LIMIT :limit" in candidates
+
+
+class FakeDB:
+    """Archived ids served in keyset order; deletes are recorded per table."""
+
+    def __init__(self, ids):
+        self.ids = sorted(ids)
+        self.deleted: dict[str, int] = {}
+        self.added = []
+        self.removed = []
+        self.commits = 0
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        if sql.startswith("SELECT t.id"):
+            after = params["after"]
+            rows = [i for i in self.ids if after is None or str(i) > after][: params["limit"]]
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: rows))
+        if sql.startswith("SELECT"):
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []))
+        table = sql.split()[2]
+        count = len(params["ids"]) if table == "tiers" else 0
+        if table == "tiers":
+            self.ids = [i for i in self.ids if i not in params["ids"]]
+        self.deleted[table] = self.deleted.get(table, 0) + count
+        return SimpleNamespace(rowcount=count)
+
+    async def commit(self):
+        self.commits += 1
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def delete(self, obj):
+        self.removed.append(obj)
+
+
+@pytest.mark.asyncio
+async def test_purge_resumes_from_checkpoint_after_time_budget(monkeypatch):
+    plan = purge_engine.build_cascade_plan(
+        "tiers", metadata=_metadata(), main_tables=frozenset({"tiers", "projects"}),
+    )
+    ids = [UUID(int=i) for i in range(1, 8)]
+    db = FakeDB(ids)
+    stored = {}
+
+    async def load_checkpoint(_db, entity_type):
+        return stored.get(entity_type)
+
+    monkeypatch.setattr(purge_engine, "_load_checkpoint", load_checkpoint)
+
+    first = await purge_engine.purge_table(
+        db, "tier", "tiers", 30, chunk_size=3, time_budget_seconds=1e-9, plan=plan,
+    )
+    assert (first.purged, first.chunks, first.completed) == (3, 1, False)
+    checkpoint = db.added[0]
+    assert checkpoint.value["after_id"] == str(ids[2])
+    stored["tier"] = checkpoint
+
+    second = await purge_engine.purge_table(db, "tier", "tiers", 30, chunk_size=3, plan=plan)
+    assert second.resumed and second.completed
+    assert second.cutoff == first.cutoff
+    assert second.purged == 7
+    assert db.ids == []
+    assert db.removed == [checkpoint]
+    assert second.to_dict()["tables"]["tiers"]["rows"] == 4
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.core import rbac
+from app.models.common import (
+    Entity,
+    GroupPermissionOverride,
+    Permission,
+    RolePermission,
+    User,
+    UserDelegation,
+    UserGroup,
+    UserGroupMember,
+    UserGroupRole,
+    UserPermissionOverride,
+)
+from app.services.core import rbac_export_service
+from tests.fakes.sqlite import SyncSessionDB
+
+TABLES = [
+    Entity, User, Permission, RolePermission, UserGroup, UserGroupMember, UserGroupRole,
+    UserDelegation, UserPermissionOverride, GroupPermissionOverride,
+]
+
+
+@pytest.fixture
+def seeded(sqlite_session):
+    session = sqlite_session(*TABLES)
+
+    entity, other = uuid4(), uuid4()
+    session.add_all([
+        Entity(id=entity, code="E1", name="Perenco Cameroun"),
+        Entity(id=other, code="E2", name="Autre"),
+    ])
+    for code in ("a", "b", "c", "d", "*"):
+        session.add(Permission(code=code, name=code.upper(), module="core"))
+    session.add_all([
+        RolePermission(role_code="r1", permission_code="a"),
+        RolePermission(role_code="r1", permission_code="b"),
+        RolePermission(role_code="r2", permission_code="c"),
+        RolePermission(role_code="admin", permission_code="*"),
+    ])
+    users = [uuid4() for _ in range(7)]
+    for i, uid in enumerate(users):
+        session.add(User(id=uid, email=f"u{i}@example.com", first_name=f"U{i}", last_name="Test"))
+
+    def group(entity_id, roles, active=True):
+        gid = uuid4()
+        session.add(UserGroup(id=gid, entity_id=entity_id, name=str(gid), active=active))
+        session.add_all([UserGroupRole(group_id=gid, role_code=r) for r in roles])
+        return gid
+
+    g1 = group(entity, ["r1"])
+    g2 = group(entity, ["r2"])
+    g_inactive = group(entity, ["admin"], active=False)
+    g_other = group(other, ["admin"])
+    session.add_all([
+        GroupPermissionOverride(group_id=g1, permission_code="d", granted=True),
+        GroupPermissionOverride(group_id=g2, permission_code="b", granted=False),
+        GroupPermissionOverride(group_id=g_other, permission_code="a", granted=True),
+    ])
+    memberships = {
+        users[0]: [g1], users[1]: [g1, g2], users[2]: [g2, g_inactive],
+        users[3]: [g1, g_other], users[4]: [g2],
+    }
+    for uid, groups in memberships.items():
+        session.add_all([UserGroupMember(user_id=uid, group_id=g) for g in groups])
+    session.add_all([
+        UserPermissionOverride(user_id=users[1], permission_code="a", granted=False),
+        UserPermissionOverride(user_id=users[4], permission_code="b", granted=True),
+        UserPermissionOverride(user_id=users[6], permission_code="a", granted=True),
+    ])
+    now = datetime.now(timezone.utc)
+    session.add_all([
+        # users[5] has no group in the entity: present only through a delegation.
+        UserDelegation(delegator_id=users[0], delegate_id=users[5], entity_id=entity,
+                       permissions=["a", "d"], start_date=now - timedelta(days=1),
+                       end_date=now + timedelta(days=1), active=True),
+        UserDelegation(delegator_id=users[0], delegate_id=users[4], entity_id=entity,
+                       permissions=["b", "d"], start_date=now - timedelta(days=1),
+                       end_date=now + timedelta(days=1), active=True),
+        UserDelegation(delegator_id=users[0], delegate_id=users[2], entity_id=entity,
+                       permissions=["a"], start_date=now - timedelta(days=9),
+                       end_date=now - timedelta(days=1), active=True),
+    ])
+    session.commit()
+    return SyncSessionDB(session), entity, users
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["restrictive", "additive"])
+async def test_bulk_resolution_matches_per_user_resolution(seeded, monkeypatch, mode):
+    db, entity, users = seeded
+
+    async def permission_mode(_entity_id, _db):
+        return mode
+
+    monkeypatch.setattr(rbac, "_get_permission_mode", permission_mode)
+
+    expected = {uid: await rbac._resolve_permissions(uid, entity, db) for uid in users}
+
+    db.statements = 0
+    bulk = await rbac.resolve_entity_permissions(entity, db)
+    assert db.statements == 5  # population + one query per layer
+    assert set(bulk) == set(users[:6])  # users[6] has no link to the entity
+    assert all(bulk[uid] == expected[uid] for uid in bulk)
+
+    chunked = {
+        uid: eff async for uid, eff in rbac.iter_entity_permissions(entity, db, users, chunk_size=3)
+    }
+    assert chunked == expected
+
+    holders = await rbac.get_permission_holders(entity, "a", db)
+    assert holders == {uid: eff["a"] for uid, eff in bulk.items() if "a" in eff}
+
+
+@pytest.mark.asyncio
+async def test_restrictive_semantics_on_fixture(seeded, monkeypatch):
+    db, entity, users = seeded
+
+    async def permission_mode(_entity_id, _db):
+        return "restrictive"
+
+    monkeypatch.setattr(rbac, "_get_permission_mode", permission_mode)
+    bulk = await rbac.resolve_entity_permissions(entity, db)
+
+    assert bulk[users[0]] == {"a": "role", "b": "role", "d": "group"}
+    assert bulk[users[1]] == {"c": "role", "d": "group"}  # b group-revoked, a user-revoked
+    assert bulk[users[2]] == {"c": "role"}  # inactive group and expired delegation ignored
+    assert bulk[users[3]] == {"a": "role", "b": "role", "d": "group"}  # other entity ignored
+    assert bulk[users[4]] == {"c": "role", "d": "delegation", "b": "user"}
+    assert bulk[users[5]] == {"a": "delegation", "d": "delegation"}
+
+
+@pytest.mark.asyncio
+async def test_xlsx_matrix_streams_bulk_results(seeded, monkeypatch, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    db, entity, users = seeded
+
+    async def permission_mode(_entity_id, _db):
+        return "restrictive"
+
+    monkeypatch.setattr(rbac, "_get_permission_mode", permission_mode)
+    actor = db.session.get(User, users[0])
+    path = str(tmp_path / "matrix.xlsx")
+
+    summary = await rbac_export_service.write_matrix_user_permissions_xlsx(
+        db, entity, actor, "en", path, audit_event_id="evt-1",
+    )
+    again = await rbac_export_service.write_matrix_user_permissions_xlsx(
+        db, entity, actor, "en", str(tmp_path / "again.xlsx"),
+    )
+
+    assert summary["users"] == 5 and summary["grants"] == 12
+    assert again["data_hash"] == summary["data_hash"]
+    sheet = openpyxl.load_workbook(path, read_only=True)["Matrix"]
+    rows = [tuple(r) for r in sheet.iter_rows(values_only=True)]
+    assert rows[0] == ("User", "Email", "*", "a", "b", "c", "d")
+    by_email = {r[1]: r[2:] for r in rows[1:]}
+    assert by_email["u1@example.com"] == (None, None, None, "Role", "Group")
+    assert by_email["u4@example.com"] == (None, None, "User", "Role", "Delegation")
+
+
+class FakeRedis:
+    """The string/key subset of redis.asyncio used by the RBAC caches."""
+
+    def __init__(self):
+        self.values: dict[str, str] = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+        return int(self.values[key])
+
+    async def keys(self, pattern):
+        prefix = pattern.rstrip("*")
+        return [k for k in self.values if k.startswith(prefix)]
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["restrictive", "additive"])
+async def test_users_with_permission_matches_per_user_checks(seeded, monkeypatch, mode):
+    db, entity, users = seeded
+    # A wildcard grant by user override, and a wildcard group revoke.
+    group_id = db.session.scalars(
+        select(UserGroup.id).where(UserGroup.entity_id == entity, UserGroup.active == True)  # noqa: E712
+    ).first()
+    db.session.add_all([
+        UserPermissionOverride(user_id=users[3], permission_code="*", granted=True),
+        GroupPermissionOverride(group_id=group_id, permission_code="*", granted=False),
+    ])
+    db.session.commit()
+
+    async def permission_mode(_entity_id, _db):
+        return mode
+
+    monkeypatch.setattr(rbac, "_get_permission_mode", permission_mode)
+    monkeypatch.setattr(rbac, "get_redis", lambda: FakeRedis())
+
+    for code in ("a", "b", "c", "d", "unknown"):
+        expected = set()
+        for uid in users:
+            effective = await rbac._resolve_permissions(uid, entity, db)
+            if code in effective or "*" in effective:
+                expected.add(uid)
+        db.statements = 0
+        assert await rbac.users_with_permission(entity, code, db) == expected
+        assert db.statements == 1
+
+
+@pytest.mark.asyncio
+async def test_users_with_permission_is_cached_until_rbac_invalidation(seeded, monkeypatch):
+    db, entity, users = seeded
+    redis = FakeRedis()
+
+    async def permission_mode(_entity_id, _db):
+        return "restrictive"
+
+    monkeypatch.setattr(rbac, "_get_permission_mode", permission_mode)
+    monkeypatch.setattr(rbac, "get_redis", lambda: redis)
+
+    holders = await rbac.users_with_permission(entity, "c", db)
+    assert holders == {users[1], users[2], users[4]}
+
+    db.session.add(UserPermissionOverride(user_id=users[0], permission_code="c", granted=True))
+    db.session.commit()
+    db.statements = 0
+    assert await rbac.users_with_permission(entity, "c", db) == holders
+    assert db.statements == 0  # served from the cache
+
+    await rbac.invalidate_rbac_cache(users[0])
+    assert await rbac.users_with_permission(entity, "c", db) == holders | {users[0]}
+    assert await rbac.users_with_permission(uuid4(), "c", db) == {users[0]}  # override only
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import database, startup
+from app.core.module_registry import ModuleManifest
+
+MODULES = [
+    ModuleManifest(slug="tiers", name="Tiers", version="1.0", permissions=["tier.tier.read"],
+                   roles=[{"code": "TIER_READER", "permissions": ["tier.tier.read"]}]),
+]
+
+
+def test_fingerprint_tracks_manifests_env_and_schema(monkeypatch):
+    base = startup.compute_seed_fingerprint(MODULES, "201_audit_log_partitioning")
+    assert base == startup.compute_seed_fingerprint(MODULES, "201_audit_log_partitioning")
+
+    changed = [ModuleManifest(slug="tiers", name="Tiers", version="1.0",
+                              permissions=["tier.tier.read", "tier.tier.create"])]
+    assert startup.compute_seed_fingerprint(changed, "201_audit_log_partitioning") != base
+    assert startup.compute_seed_fingerprint(MODULES, "202_next") != base
+    monkeypatch.setenv("FIRST_ENTITY_CODE", "PER_CMR")
+    assert startup.compute_seed_fingerprint(MODULES, "201_audit_log_partitioning") != base
+
+
+@pytest.mark.parametrize("module_name", ["app.core.email_templates", "app.core.pdf_templates"])
+def test_fingerprint_tracks_default_templates(monkeypatch, module_name):
+    base = startup.compute_seed_fingerprint(MODULES, "201_audit_log_partitioning")
+    read_bytes = startup.Path.read_bytes
+
+    def edited(path):
+        data = read_bytes(path)
+        return data + b"\n# edited\n" if path.stem == module_name.rsplit(".", 1)[1] else data
+
+    monkeypatch.setattr(startup.Path, "read_bytes", edited)
+    assert startup.compute_seed_fingerprint(MODULES, "201_audit_log_partitioning") != base
+
+
+class FakeConn:
+    def __init__(self, stored, lock_free=True):
+        self.stored = stored
+        self.lock_free = lock_free
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "alembic_version" in sql:
+            value = ["201_audit_log_partitioning"]
+        elif "FROM settings" in sql:
+            value = [{"sha256": self.stored[0]}] if self.stored[0] else []
+        elif "pg_try_advisory_lock" in sql:
+            value = [self.lock_free]
+        else:
+            value = [None]
+        return SimpleNamespace(
+            scalars=lambda: SimpleNamespace(all=lambda: value),
+            scalar_one_or_none=lambda: value[0] if value else None,
+            scalar=lambda: value[0],
+        )
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def _engine(conn):
+    @asynccontextmanager
+    async def connect():
+        yield conn
+
+    return SimpleNamespace(connect=connect)
+
+
+@pytest.mark.asyncio
+async def test_seeding_runs_once_per_fingerprint(monkeypatch):
+    stored = [None]
+    conn = FakeConn(stored)
+    calls = []
+
+    async def store(fingerprint):
+        stored[0] = fingerprint
+
+    async def step():
+        calls.append("permissions")
+
+    monkeypatch.setattr(database, "engine", _engine(conn))
+    monkeypatch.setattr(startup, "_store_fingerprint", store)
+
+    assert await startup.run_seeding(MODULES, [("permissions", step)]) == "seeded"
+    assert await startup.run_seeding(MODULES, [("permissions", step)]) == "skipped"
+    assert calls == ["permissions"]
+    assert "seed:permissions" in startup.get_startup_report()["phases"]
+
+    assert await startup.run_seeding(MODULES, [("permissions", step)], force=True) == "seeded"
+    assert calls == ["permissions", "permissions"]
+
+
+@pytest.mark.asyncio
+async def test_waiting_worker_skips_when_leader_seeded_and_failures_are_retried(monkeypatch):
+    fingerprint = startup.compute_seed_fingerprint(MODULES, "201_audit_log_partitioning")
+    stored = [None]
+    conn = FakeConn(stored, lock_free=False)
+
+    async def leader_finishes(*args, **kwargs):
+        stored[0] = fingerprint
+
+    original_execute = conn.execute
+
+    async def execute(statement, params=None):
+        if "pg_advisory_lock(" in str(statement):
+            await leader_finishes()
+        return await original_execute(statement, params)
+
+    conn.execute = execute
+    monkeypatch.setattr(database, "engine", _engine(conn))
+
+    async def never():
+        raise AssertionError("waiting worker must not seed")
+
+    assert await startup.run_seeding(MODULES, [("permissions", never)]) == "waited"
+
+    stored[0] = None
+    conn.lock_free = True
+    stores = []
+
+    async def store(fp):
+        stores.append(fp)
+
+    async def broken():
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(startup, "_store_fingerprint", store)
+    assert await startup.run_seeding(MODULES, [("essentials", broken)]) == "failed"
+    assert stores == []
+    with pytest.raises(RuntimeError):
+        await startup.run_seeding(MODULES, [("permissions", broken)], fatal=frozenset({"permissions"}))
+    assert any("pg_advisory_unlock" in s for s in conn.statements[-2:])
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import random
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select, update
+
+from app.models.messaging import LoginEvent, LoginEventHourly
+from app.models.support import (
+    TICKET_PRIORITIES,
+    TICKET_STATUSES,
+    TICKET_TYPES,
+    SupportTicket,
+    SupportTicketCounter,
+    TicketComment,
+    TicketStatusHistory,
+    TicketTodo,
+)
+from app.services.core.stats_rollup import (
+    IpSketch,
+    login_event_stats,
+    reconcile_ticket_counters,
+    rollup_login_events,
+    ticket_counts,
+)
+from tests.fakes.sqlite import SyncSessionDB
+
+
+NOW = datetime(2026, 10, 19, 14, 37, 12, tzinfo=UTC)
+REASONS = ["invalid_password", "invalid_email", "account_locked", "rate_limited", "captcha_failed"]
+
+
+@pytest.fixture
+def session(sqlite_session):
+    return sqlite_session(
+        LoginEvent,
+        LoginEventHourly,
+        SupportTicket,
+        SupportTicketCounter,
+        TicketComment,
+        TicketStatusHistory,
+        TicketTodo,
+    )
+
+
+def _login_events(rng: random.Random, n: int, hours: int) -> list[LoginEvent]:
+    events = []
+    for _ in range(n):
+        success = rng.random() < 0.7
+        events.append(LoginEvent(
+            email=f"u{rng.randint(0, 50)}@ops.example",
+            ip_address=f"10.0.{rng.randint(0, 3)}.{rng.randint(0, 120)}",
+            success=success,
+            failure_reason=None if success or rng.random() < 0.1 else rng.choice(REASONS),
+            suspicious=rng.random() < 0.05,
+            blocked=rng.random() < 0.03,
+            created_at=NOW - timedelta(seconds=rng.uniform(0, hours * 3600)),
+        ))
+    return events
+
+
+def _comparable(stats: dict) -> dict:
+    reasons = {r["reason"]: r["count"] for r in stats["top_failure_reasons"]}
+    return {k: stats[k] for k in ("total", "successful", "failed", "blocked", "suspicious")} | {"reasons": reasons}
+
+
+def test_sketch_estimates_distinct_counts_and_merges_as_a_union():
+    small, large = IpSketch(), IpSketch()
+    small.update(f"10.1.0.{i}" for i in range(200))
+    large.update(f"172.16.{i // 256}.{i % 256}" for i in range(60_000))
+
+    assert abs(small.estimate() - 200) <= 200 * 0.02
+    assert abs(large.estimate() - 60_000) <= 60_000 * 0.05
+
+    restored = IpSketch.from_bytes(small.to_bytes())
+    restored.update(f"10.1.0.{i}" for i in range(100))  # duplicates
+    restored.merge(large)
+    assert abs(restored.estimate() - 60_200) <= 60_200 * 0.05
+
+
+@pytest.mark.parametrize("seed", range(4))
+async def test_rolled_up_login_stats_match_the_raw_counts(session, seed):
+    rng = random.Random(seed)
+    session.add_all(_login_events(rng, 2500, hours=80))
+    session.commit()
+    db = SyncSessionDB(session)
+
+    # The job lags three hours behind: the tail past the watermark is raw.
+    assert await rollup_login_events(db, now=NOW - timedelta(hours=3)) > 0
+    for days in (1, 2, 3):
+        since = NOW - timedelta(days=days, minutes=rng.randint(0, 59))
+        rolled = await login_event_stats(db, since=since, now=NOW)
+        exact = await login_event_stats(db, since=since, now=NOW, exact=True)
+
+        assert _comparable(rolled) == _comparable(exact)
+        assert abs(rolled["unique_ips"] - exact["unique_ips"]) <= exact["unique_ips"] * 0.03
+        assert sum(h["total"] for h in rolled["attempts_by_hour"]) == exact["total"]
+        assert exact["attempts_by_hour"] == []
+
+    # Events keep arriving; the next run catches up and the figures still agree.
+    session.add_all(_login_events(rng, 50, hours=2))
+    session.commit()
+    await rollup_login_events(db, now=NOW)
+    since = NOW - timedelta(days=2)
+    assert _comparable(await login_event_stats(db, since=since, now=NOW)) == _comparable(
+        await login_event_stats(db, since=since, now=NOW, exact=True)
+    )
+
+
+async def test_rollup_skips_empty_hours_but_keeps_the_watermark_current(session):
+    session.add_all([
+        LoginEvent(email="a@x", ip_address="1.1.1.1", success=True, created_at=NOW - timedelta(hours=30, minutes=5)),
+        LoginEvent(email="b@x", ip_address="1.1.1.2", success=False, failure_reason="invalid_password",
+                   created_at=NOW - timedelta(hours=30, minutes=1)),
+    ])
+    session.commit()
+    db = SyncSessionDB(session)
+
+    assert await rollup_login_events(db, now=NOW) == 2
+    assert await rollup_login_events(db, now=NOW) == 0
+
+    buckets = session.execute(select(LoginEventHourly).order_by(LoginEventHourly.bucket_start)).scalars().all()
+    assert [(b.total, b.failed, b.failure_reasons) for b in buckets] == [(2, 1, {"invalid_password": 1}), (0, 0, {})]
+    assert buckets[-1].bucket_start.replace(tzinfo=UTC) == datetime(2026, 10, 19, 13, tzinfo=UTC)
+
+
+async def test_tail_past_the_watermark_is_scanned_in_one_query(session):
+    session.add_all(_login_events(random.Random(3), 400, hours=72))
+    session.commit()
+    db = SyncSessionDB(session)
+
+    stats = await login_event_stats(db, since=NOW - timedelta(days=3), now=NOW)
+
+    assert db.statements == 2  # watermark + grouped tail scan
+    assert len(stats["attempts_by_hour"]) > 60
+    assert sum(h["total"] for h in stats["attempts_by_hour"]) == stats["total"] == 400
+    hours = [datetime.fromisoformat(h["hour"]) for h in stats["attempts_by_hour"]]
+    assert hours == sorted(hours) and all(h.minute == 0 and h.tzinfo is not None for h in hours)
+
+
+def _ticket(rng: random.Random, entity_ids: list, n: int) -> SupportTicket:
+    return SupportTicket(
+        entity_id=rng.choice(entity_ids),
+        reference=f"SUP-{n:04d}",
+        title="Ticket",
+        ticket_type=rng.choice(TICKET_TYPES),
+        priority=rng.choice(TICKET_PRIORITIES),
+        status=rng.choice(TICKET_STATUSES),
+        reporter_id=uuid4(),
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+async def test_ticket_counters_follow_inserts_updates_and_deletes(session, seed):
+    rng = random.Random(seed)
+    entity_ids = [uuid4(), uuid4()]
+    tickets = [_ticket(rng, entity_ids, n) for n in range(60)]
+    session.add_all(tickets)
+    session.commit()
+    db = SyncSessionDB(session)
+
+    for _ in range(120):
+        ticket = rng.choice(tickets)
+        action = rng.random()
+        if action < 0.4:
+            ticket.status = rng.choice(TICKET_STATUSES)
+        elif action < 0.6:
+            ticket.priority = rng.choice(TICKET_PRIORITIES)
+            ticket.title = "Retitled"
+        elif action < 0.75:
+            ticket.archived = not ticket.archived
+        elif action < 0.85:
+            session.expire(ticket)  # counted key read back from the row
+            ticket.ticket_type = rng.choice(TICKET_TYPES)
+        elif action < 0.9 and ticket in session:
+            session.delete(ticket)
+            tickets.remove(ticket)
+        else:
+            tickets.append(_ticket(rng, entity_ids, len(tickets) + 100))
+            session.add(tickets[-1])
+        if rng.random() < 0.3:
+            session.commit()
+    session.commit()
+
+    for entity_id in entity_ids:
+        assert await ticket_counts(db, entity_id) == await ticket_counts(db, entity_id, exact=True)
+    assert await reconcile_ticket_counters(db) == 0
+
+
+async def test_reconcile_repairs_counters_after_bulk_updates(session):
+    entity_id = uuid4()
+    rng = random.Random(9)
+    session.add_all(_ticket(rng, [entity_id], n) for n in range(20))
+    session.commit()
+    db = SyncSessionDB(session)
+
+    session.execute(update(SupportTicket).values(status="closed"))  # bypasses the mapper events
+    session.commit()
+    assert (await ticket_counts(db, entity_id))["by_status"] != {"closed": 20}
+
+    assert await reconcile_ticket_counters(db) > 0
+
+    counts = await ticket_counts(db, entity_id)
+    assert counts == await ticket_counts(db, entity_id, exact=True)
+    assert counts["total"] == 20 and counts["by_status"] == {"closed": 20}
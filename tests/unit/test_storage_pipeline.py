@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import hashlib
+import os
+
+import pytest
+
+from app.core import s3_client, storage_service
+from app.core.config import settings
+
+
+class FakeUpload:
+    """Mimics ``UploadFile.read(n)``, recording the largest read."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+        self.max_read = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        self.max_read = max(self.max_read, size)
+        chunk = self.data[self.offset: self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+
+@pytest.fixture
+def local_storage(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(storage_service, "STATIC_DIR", str(tmp_path))
+    monkeypatch.setattr(storage_service, "ATTACHMENTS_DIR", str(tmp_path / "attachments"))
+    return tmp_path
+
+
+@pytest.fixture
+def stub_s3(monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "minio")
+    monkeypatch.setattr(settings, "S3_ENDPOINT", "memory://")
+    monkeypatch.setattr(s3_client, "_s3_client", None)
+    monkeypatch.setattr(storage_service, "MULTIPART_PART_SIZE", 5 * 1024)
+    monkeypatch.setattr(storage_service, "CHUNK_SIZE", 1024)
+    return s3_client.get_s3_client()
+
+
+async def _collect(storage_path, start=0, end=None) -> bytes:
+    return b"".join([chunk async for chunk in storage_service.iter_file(storage_path, start, end)])
+
+
+@pytest.mark.asyncio
+async def test_local_stream_hashes_in_chunks_and_serves_ranges(local_storage, monkeypatch):
+    monkeypatch.setattr(storage_service, "CHUNK_SIZE", 1024)
+    data = os.urandom(10_000)
+    upload = FakeUpload(data)
+
+    stored = await storage_service.store_stream(upload, "tier", "t1", "plan.pdf", "application/pdf")
+
+    assert upload.max_read == 1024
+    assert stored.size_bytes == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert stored.storage_path == f"attachments/tier/t1/{stored.filename}"
+    assert not list((local_storage / "attachments/tier/t1").glob("*.part"))
+    assert await _collect(stored.storage_path, 100, 2_999) == data[100:3_000]
+    assert await storage_service.hash_stored_file(stored.storage_path) == stored.sha256
+
+    with pytest.raises(storage_service.UploadTooLarge):
+        await storage_service.store_stream(FakeUpload(data), "tier", "t1", "big.pdf", max_bytes=4_000)
+    assert len(list((local_storage / "attachments/tier/t1").iterdir())) == 1
+
+
+@pytest.mark.asyncio
+async def test_stub_s3_uses_multipart_above_part_size_and_aborts_on_error(stub_s3):
+    data = os.urandom(12 * 1024)
+    calls = []
+    original = stub_s3.upload_part
+
+    def upload_part(**kwargs):
+        calls.append(len(kwargs["Body"]))
+        return original(**kwargs)
+
+    stub_s3.upload_part = upload_part
+    stored = await storage_service.store_stream(FakeUpload(data), "asset", "a1", "drawing.dwg")
+
+    assert calls == [5 * 1024, 5 * 1024, 2 * 1024]
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert await storage_service.get_file_size(stored.storage_path) == len(data)
+    assert await _collect(stored.storage_path, 6_000, 6_099) == data[6_000:6_100]
+
+    small = await storage_service.store_stream(b"tiny", "asset", "a1", "note.txt")
+    assert calls == [5 * 1024, 5 * 1024, 2 * 1024]  # single PUT
+    assert await storage_service.get_file_bytes(small.storage_path) == b"tiny"
+
+    with pytest.raises(storage_service.UploadTooLarge):
+        await storage_service.store_stream(FakeUpload(data), "asset", "a1", "big.dwg", max_bytes=11 * 1024)
+    assert stub_s3.uploads == {}
+    assert len(stub_s3.objects) == 2
+
+    await storage_service.delete_stored_file(small.storage_path)
+    assert await storage_service.get_file_size(small.storage_path) is None
+
+
+def test_parse_byte_range():
+    assert storage_service.parse_byte_range(None, 100) is None
+    assert storage_service.parse_byte_range("bytes=0-9", 100) == (0, 9)
+    assert storage_service.parse_byte_range("bytes=90-", 100) == (90, 99)
+    assert storage_service.parse_byte_range("bytes=-10", 100) == (90, 99)
+    assert storage_service.parse_byte_range("bytes=50-500", 100) == (50, 99)
+    assert storage_service.parse_byte_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(ValueError):
+        storage_service.parse_byte_range("bytes=100-", 100)
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.models.pid_pfd import DCSTag, DCSTagRenameJournal, Equipment, PIDDocument
+from app.services.modules import tag_service
+from app.services.modules.tag_rename_engine import find_cycles, rewrite_pid_labels
+from tests.fakes.sqlite import SyncSessionDB
+
+
+TABLES = [DCSTag, Equipment, PIDDocument, DCSTagRenameJournal]
+
+PID_XML = (
+    '<mxGraphModel><root>'
+    '<mxCell id="i1" value="PT-101" style="shape=mxgraph.pid.instruments.indicator;" vertex="1"/>'
+    '<object id="i2" label="PT-102" opsflux_tag_name="PT-102">'
+    '<mxCell style="shape=mxgraph.pid.instruments.indicator;" vertex="1"/></object>'
+    '<mxCell id="t1" value="PT-101 upstream" vertex="1"/>'
+    '</root></mxGraphModel>'
+)
+
+
+@pytest.fixture
+def graph_invalidations(monkeypatch):
+    calls: list[tuple[UUID, UUID | None]] = []
+
+    async def record(entity_id, project_id):
+        calls.append((entity_id, project_id))
+
+    monkeypatch.setattr(tag_service, "_invalidate_graph", record)
+    return calls
+
+
+@pytest.fixture
+def env(graph_invalidations, sqlite_session):
+    session = sqlite_session(*TABLES)
+    entity, project, other_project = uuid4(), uuid4(), uuid4()
+    for name in ("PT-101", "PT-102", "PT-103", "TT-200"):
+        session.add(DCSTag(entity_id=entity, project_id=project, tag_name=name, tag_type="PT"))
+    session.add(DCSTag(entity_id=entity, project_id=other_project, tag_name="PT-101", tag_type="PT"))
+    session.add_all([
+        Equipment(entity_id=entity, project_id=project, tag="PT-101", equipment_type="instrument"),
+        Equipment(entity_id=entity, project_id=project, tag="PT-102", equipment_type="pump"),
+        Equipment(entity_id=entity, project_id=project, tag="P-777", equipment_type="pump"),
+        PIDDocument(entity_id=entity, project_id=project, number="PID-1", title="P", pid_type="pid",
+                    xml_content=PID_XML),
+    ])
+    session.commit()
+    return SyncSessionDB(session), entity, project, other_project
+
+
+def names(db, entity, project):
+    return set(db.session.execute(
+        select(DCSTag.tag_name).where(DCSTag.entity_id == entity, DCSTag.project_id == project)
+    ).scalars())
+
+
+def test_find_cycles_reports_each_cycle_once():
+    assert find_cycles({"A": "B", "B": "A", "C": "D", "D": "E"}) == [["A", "B"]]
+    assert find_cycles({"A": "B", "B": "C", "C": "A"}) == [["A", "B", "C"]]
+    assert find_cycles({"A": "B", "B": "C"}) == []
+
+
+def test_rewrite_pid_labels_matches_whole_values_only():
+    xml, count = rewrite_pid_labels(PID_XML, {"PT-101": "PT-201", "PT-102": "PT-101"})
+
+    assert count == 3
+    assert 'value="PT-201"' in xml
+    assert 'label="PT-101" opsflux_tag_name="PT-101"' in xml
+    assert 'value="PT-101 upstream"' in xml
+
+
+async def test_execute_renames_tags_and_propagates_references(env, graph_invalidations):
+    db, entity, project, other_project = env
+
+    result = await tag_service.execute_bulk_rename(
+        entity_id=entity, project_id=str(project), user_id=uuid4(), db=db,
+        renames=[{"old_name": "PT-101", "new_name": "PT-901"}, {"old_name": "PT-102", "new_name": "PT-902"}],
+    )
+
+    assert result["renamed"] == 2
+    assert result["references"] == {"dcs_tags": 2, "equipment": 1, "pid_documents": 1, "pid_labels": 3}
+    assert names(db, entity, project) == {"PT-901", "PT-902", "PT-103", "TT-200"}
+    assert names(db, entity, other_project) == {"PT-101"}
+    equipment = set(db.session.execute(select(Equipment.equipment_type, Equipment.tag)).all())
+    # only instrument records follow the tag
+    assert equipment == {("instrument", "PT-901"), ("pump", "PT-102"), ("pump", "P-777")}
+    xml = db.session.execute(select(PIDDocument.xml_content)).scalar_one()
+    assert 'value="PT-901"' in xml and 'opsflux_tag_name="PT-902"' in xml
+    assert graph_invalidations == [(entity, project)]
+
+
+async def test_collisions_and_cycles_block_the_whole_rename(env, graph_invalidations):
+    db, entity, project, _ = env
+
+    result = await tag_service.execute_bulk_rename(
+        entity_id=entity, project_id=str(project), user_id=uuid4(), db=db,
+        renames=[
+            {"old_name": "PT-101", "new_name": "TT-200"},  # held by a tag not renamed
+            {"old_name": "PT-102", "new_name": "PT-103"},
+            {"old_name": "PT-103", "new_name": "PT-102"},  # swap
+            {"old_name": "NOPE", "new_name": "X"},
+        ],
+    )
+
+    assert result["renamed"] == 0
+    assert {e["code"] for e in result["errors"]} == {"NAME_TAKEN", "RENAME_CYCLE", "TAG_NOT_FOUND"}
+    assert result["cycles"] == [["PT-102", "PT-103"]]
+    assert names(db, entity, project) == {"PT-101", "PT-102", "PT-103", "TT-200"}
+    assert graph_invalidations == []
+
+
+async def test_new_name_used_by_a_unique_reference_is_a_collision(env):
+    db, entity, project, _ = env
+
+    result = await tag_service.execute_bulk_rename(
+        entity_id=entity, project_id=str(project), user_id=uuid4(), db=db,
+        renames=[{"old_name": "PT-101", "new_name": "P-777"}],  # instrument record would clash
+    )
+
+    assert result["renamed"] == 0
+    assert [e["code"] for e in result["errors"]] == ["REFERENCE_NAME_TAKEN"]
+
+
+async def test_duplicate_targets_are_collisions(env):
+    db, entity, project, _ = env
+
+    result = await tag_service.execute_bulk_rename(
+        entity_id=entity, project_id=str(project), user_id=uuid4(), db=db,
+        renames=[{"old_name": "PT-101", "new_name": "PT-500"}, {"old_name": "PT-102", "new_name": "PT-500"}],
+    )
+
+    assert result["renamed"] == 0
+    assert [e["code"] for e in result["errors"]] == ["DUPLICATE_TARGET", "DUPLICATE_TARGET"]
+
+
+async def test_chains_and_allowed_cycles_go_through_placeholders(env):
+    db, entity, project, _ = env
+
+    result = await tag_service.execute_bulk_rename(
+        entity_id=entity, project_id=str(project), user_id=uuid4(), db=db, allow_cycles=True,
+        renames=[
+            {"old_name": "PT-102", "new_name": "PT-103"},
+            {"old_name": "PT-103", "new_name": "PT-102"},
+            {"old_name": "PT-101", "new_name": "TT-200"},
+            {"old_name": "TT-200", "new_name": "TT-201"},
+        ],
+    )
+
+    assert result["renamed"] == 4
+    assert result["cycles"] == [["PT-102", "PT-103"]]
+    rows = dict(db.session.execute(
+        select(DCSTag.id, DCSTag.tag_name).where(DCSTag.project_id == project)
+    ).all())
+    by_old = {r["old_name"]: rows[UUID(r["tag_id"])] for r in result["renames"]}
+    assert by_old == {"PT-102": "PT-103", "PT-103": "PT-102", "PT-101": "TT-200", "TT-200": "TT-201"}
+    assert db.session.execute(
+        select(Equipment.tag).where(Equipment.equipment_type == "instrument")
+    ).scalar_one() == "TT-200"
+
+
+async def test_preview_is_a_dry_run_with_reference_counts(env):
+    db, entity, project, _ = env
+
+    result = await tag_service.preview_bulk_rename(
+        entity_id=entity, project_id=str(project), rename_pattern="PT-* → PX-*", db=db,
+    )
+
+    assert [(p["old_name"], p["new_name"]) for p in result["preview"]] == [
+        ("PT-101", "PX-101"), ("PT-102", "PX-102"), ("PT-103", "PX-103"),
+    ]
+    assert result["errors"] == []
+    assert result["references"] == {"dcs_tags": 3, "equipment": 1, "pid_documents": 1, "pid_labels": 3}
+    assert names(db, entity, project) == {"PT-101", "PT-102", "PT-103", "TT-200"}
+    assert db.session.execute(select(DCSTagRenameJournal)).first() is None
+
+
+async def test_revert_replays_the_journal_backwards(env, graph_invalidations):
+    db, entity, project, _ = env
+    user = uuid4()
+    applied = await tag_service.execute_bulk_rename(
+        entity_id=entity, project_id=str(project), user_id=user, db=db,
+        renames=[{"old_name": "PT-101", "new_name": "PT-901"}, {"old_name": "PT-102", "new_name": "PT-101"}],
+    )
+    assert applied["renamed"] == 2
+
+    reverted = await tag_service.revert_bulk_rename(
+        entity_id=entity, journal_id=applied["journal_id"], user_id=user, db=db,
+    )
+
+    assert reverted["reverted"] == 2
+    assert graph_invalidations == [(entity, project)] * 2
+    assert names(db, entity, project) == {"PT-101", "PT-102", "PT-103", "TT-200"}
+    assert db.session.execute(select(PIDDocument.xml_content)).scalar_one() == PID_XML
+    journals = db.session.execute(select(DCSTagRenameJournal)).scalars().all()
+    original = next(j for j in journals if str(j.id) == applied["journal_id"])
+    assert original.reverted_at is not None
+    assert any(j.reverts_id == original.id for j in journals)
+
+    again = await tag_service.revert_bulk_rename(
+        entity_id=entity, journal_id=applied["journal_id"], user_id=user, db=db,
+    )
+    assert again["reverted"] == 0
+    assert again["errors"][0]["code"] == "ALREADY_REVERTED"
+
+
+async def test_revert_refuses_tags_renamed_since(env):
+    db, entity, project, _ = env
+    applied = await tag_service.execute_bulk_rename(
+        entity_id=entity, project_id=str(project), user_id=None, db=db,
+        renames=[{"old_name": "PT-101", "new_name": "PT-901"}],
+    )
+    await tag_service.execute_bulk_rename(
+        entity_id=entity, project_id=str(project), user_id=None, db=db,
+        renames=[{"old_name": "PT-901", "new_name": "PT-999"}],
+    )
+
+    reverted = await tag_service.revert_bulk_rename(
+        entity_id=entity, journal_id=applied["journal_id"], user_id=None, db=db,
+    )
+
+    assert reverted["reverted"] == 0
+    assert reverted["errors"][0]["code"] == "TAG_CHANGED"
+    assert "PT-999" in names(db, entity, project)
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.core import auth_context, redis_client
+from app.core.auth_context import AuthPrincipal
+from app.models.common import Entity, User, UserGroup, UserGroupMember
+from app.services.connectors.user_sync_service import NormalizedUser, UserSyncProvider
+from app.services.core import user_sync_engine
+from app.services.core.user_sync_engine import UserSyncOptions, run_user_sync
+from tests.fakes.sqlite import SyncSessionDB
+
+TABLES = [Entity, User, UserGroup, UserGroupMember]
+
+
+class FakeDirectory(UserSyncProvider):
+    """In-memory directory: ``people`` is a list of (email, first, last, groups, active)."""
+
+    provider_id = "ldap"
+    label = "Fake"
+
+    def __init__(self, people):
+        self.people = people
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls([])
+
+    async def test_connection(self):
+        return "ok", "fake"
+
+    async def fetch_users(self):
+        return [
+            NormalizedUser(
+                external_ref=f"ldap:cn={email}", email=email, first_name=first, last_name=last,
+                groups=list(groups), active=active,
+            )
+            for email, first, last, groups, active in self.people
+        ]
+
+
+@pytest.fixture
+def env(monkeypatch, sqlite_session):
+    session = sqlite_session(*TABLES)
+    entity = uuid4()
+    groups = {"ops": uuid4(), "hse": uuid4()}
+    session.add(Entity(id=entity, code="E1", name="Perenco Cameroun"))
+    for name, gid in groups.items():
+        session.add(UserGroup(id=gid, entity_id=entity, name=name))
+    session.commit()
+
+    checkpoints: dict[str, dict] = {}
+
+    async def load(db, prefix):
+        return checkpoints.get(prefix)
+
+    async def save(db, prefix, checkpoint):
+        if checkpoint is None:
+            checkpoints.pop(prefix, None)
+        else:
+            checkpoints[prefix] = checkpoint
+
+    hashes: list[str] = []
+
+    async def fake_hash(password):
+        hashes.append(password)
+        return f"hashed:{password}"
+
+    monkeypatch.setattr(user_sync_engine, "_load_checkpoint", load)
+    monkeypatch.setattr(user_sync_engine, "_save_checkpoint", save)
+    monkeypatch.setattr(user_sync_engine, "hash_password", fake_hash)
+    return SyncSessionDB(session), groups, checkpoints, hashes
+
+
+async def sync(db, people, **options):
+    chunk_size = options.pop("chunk_size", None)
+    directory = await FakeDirectory(people).fetch_users()
+    return await run_user_sync(
+        db, provider_id="ldap", settings_prefix="integration.ldap", ref_prefix="ldap",
+        directory=directory, selected_emails=options.pop("selected", None),
+        options=UserSyncOptions(default_password="Temp123!", **options), chunk_size=chunk_size,
+    )
+
+
+def users_by_email(db):
+    return {u.email: u for u in db.session.execute(select(User)).scalars()}
+
+
+def memberships(db, groups):
+    names = {gid: name for name, gid in groups.items()}
+    rows = db.session.execute(
+        select(User.email, UserGroupMember.group_id).join(User, User.id == UserGroupMember.user_id)
+    ).all()
+    return {(email, names[gid]) for email, gid in rows}
+
+
+@pytest.mark.asyncio
+async def test_creates_in_chunks_with_one_hash_per_chunk(env):
+    db, groups, checkpoints, hashes = env
+    people = [(f"user{i:02d}@example.com", f"F{i}", f"L{i}", ["ops"], True) for i in range(7)]
+
+    result = await sync(db, people, chunk_size=3, group_map={"ops": groups["ops"]})
+
+    assert (result.created, result.skipped, result.chunks, result.completed) == (7, 0, 3, True)
+    assert hashes == ["Temp123!"] * 3
+    assert db.commits == 4  # one per chunk + the final checkpoint clear
+    assert checkpoints == {}
+    stored = users_by_email(db)
+    assert stored["user03@example.com"].hashed_password == "hashed:Temp123!"
+    assert stored["user03@example.com"].external_ref == "ldap:cn=user03@example.com"
+    assert result.memberships_added == 7
+    assert memberships(db, groups) == {(f"user{i:02d}@example.com", "ops") for i in range(7)}
+
+
+@pytest.mark.asyncio
+async def test_skip_mode_leaves_existing_accounts_and_memberships(env):
+    db, groups, _, hashes = env
+    await sync(db, [("a@example.com", "Ann", "A", [], True)])
+
+    result = await sync(
+        db,
+        [("A@Example.com", "Changed", "A", ["ops"], False), ("b@example.com", "Bob", "B", ["ops"], True)],
+        group_map={"ops": groups["ops"]},
+    )
+
+    assert (result.created, result.updated, result.skipped) == (1, 0, 1)
+    stored = users_by_email(db)
+    assert stored["a@example.com"].first_name == "Ann"
+    assert stored["a@example.com"].active is True
+    assert memberships(db, groups) == {("b@example.com", "ops")}
+    assert len(hashes) == 2
+
+
+@pytest.mark.asyncio
+async def test_update_mode_updates_changed_and_diffs_mapped_groups(env):
+    db, groups, _, _ = env
+    group_map = {"ops": groups["ops"], "hse": groups["hse"]}
+    await sync(db, [
+        ("a@example.com", "Ann", "A", ["ops", "hse"], True),
+        ("b@example.com", "Bob", "B", ["ops"], True),
+    ], group_map=group_map)
+
+    result = await sync(db, [
+        ("a@example.com", "Ann", "A", ["ops"], True),        # left hse
+        ("b@example.com", "Robert", "B", ["ops", "hse"], True),  # renamed, joined hse
+    ], duplicate_strategy="update", group_map=group_map)
+
+    assert (result.created, result.updated, result.skipped) == (0, 1, 1)
+    assert (result.memberships_added, result.memberships_removed) == (1, 1)
+    assert users_by_email(db)["b@example.com"].first_name == "Robert"
+    assert memberships(db, groups) == {
+        ("a@example.com", "ops"), ("b@example.com", "ops"), ("b@example.com", "hse"),
+    }
+
+
+@pytest.mark.asyncio
+async def test_unmapped_groups_are_not_touched_in_update_mode(env):
+    db, groups, _, _ = env
+    await sync(db, [("a@example.com", "Ann", "A", ["ops", "hse"], True)],
+               group_map={"ops": groups["ops"], "hse": groups["hse"]})
+
+    result = await sync(db, [("a@example.com", "Ann", "A", [], True)],
+                        duplicate_strategy="update", group_map={"ops": groups["ops"]})
+
+    assert result.memberships_removed == 1
+    assert memberships(db, groups) == {("a@example.com", "hse")}
+
+
+@pytest.mark.asyncio
+async def test_deactivate_missing_only_touches_this_provider(env):
+    db, _, _, _ = env
+    await sync(db, [("a@example.com", "Ann", "A", [], True), ("b@example.com", "Bob", "B", [], True)])
+    db.session.add(User(email="local@example.com", first_name="Lo", last_name="Cal", external_ref="azure:1"))
+    db.session.commit()
+
+    result = await sync(db, [("a@example.com", "Ann", "A", [], True)], deactivate_missing=True)
+
+    assert result.deactivated == 1
+    stored = users_by_email(db)
+    assert stored["b@example.com"].active is False
+    assert stored["a@example.com"].active is True
+    assert stored["local@example.com"].active is True
+
+
+@pytest.mark.asyncio
+async def test_empty_directory_never_deactivates(env):
+    db, _, _, _ = env
+    await sync(db, [("a@example.com", "Ann", "A", [], True)])
+
+    result = await sync(db, [], deactivate_missing=True)
+
+    assert result.deactivated == 0
+    assert result.errors
+    assert users_by_email(db)["a@example.com"].active is True
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_resumes_from_checkpoint(env):
+    db, _, checkpoints, _ = env
+    people = [(f"user{i}@example.com", "F", "L", [], True) for i in range(6)]
+    # Third INSERT INTO users (chunk index 2) fails.
+    db.fail_on = ("INSERT INTO users", 2)
+
+    first = await sync(db, people, chunk_size=2)
+
+    assert first.completed is False
+    assert first.created == 4
+    assert checkpoints["integration.ldap"]["next_chunk"] == 2
+    assert len(users_by_email(db)) == 4
+
+    second = await sync(db, people, chunk_size=2)
+
+    assert second.completed is True
+    assert second.resumed_from_chunk == 2
+    assert (second.created, second.skipped) == (6, 0)
+    assert len(users_by_email(db)) == 6
+    assert checkpoints == {}
+
+
+@pytest.mark.asyncio
+async def test_changed_request_does_not_resume(env):
+    db, _, checkpoints, _ = env
+    people = [(f"user{i}@example.com", "F", "L", [], True) for i in range(4)]
+    db.fail_on = ("INSERT INTO users", 1)
+    await sync(db, people, chunk_size=2)
+    assert checkpoints["integration.ldap"]["next_chunk"] == 1
+
+    result = await sync(db, people, chunk_size=2, duplicate_strategy="update")
+
+    assert result.resumed_from_chunk == 0
+    assert (result.created, result.skipped) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_synced_changes_drop_cached_principals(env, monkeypatch):
+    db, groups, _, _ = env
+    monkeypatch.setattr(auth_context, "_local", OrderedDict())
+    monkeypatch.setattr(redis_client, "redis_client", None)
+    group_map = {"ops": groups["ops"]}
+    await sync(db, [
+        ("a@example.com", "Ann", "A", ["ops"], True),
+        ("b@example.com", "Bob", "B", ["ops"], True),
+    ], group_map=group_map)
+    stored = users_by_email(db)
+
+    async def principal(email):
+        """What the auth dependency resolves for this user's access token."""
+        user = stored[email]
+
+        async def load():
+            db.session.refresh(user)
+            entity_ids = db.session.execute(
+                select(UserGroup.entity_id)
+                .join(UserGroupMember, UserGroupMember.group_id == UserGroup.id)
+                .where(UserGroupMember.user_id == user.id)
+            ).scalars().all()
+            return AuthPrincipal(
+                user_id=user.id, active=bool(user.active), mfa_enabled=False, language="fr",
+                default_entity_id=None, entity_ids=frozenset(entity_ids),
+            )
+
+        return await auth_context.get_principal(f"token-{email}", user.id, load)
+
+    assert (await principal("a@example.com")).entity_ids
+    assert (await principal("b@example.com")).active is True
+
+    # a leaves the mapped group, b disappears from the directory.
+    await sync(db, [("a@example.com", "Ann", "A", [], True)],
+               duplicate_strategy="update", group_map=group_map, deactivate_missing=True)
+
+    assert (await principal("a@example.com")).entity_ids == frozenset()
+    assert (await principal("b@example.com")).active is False